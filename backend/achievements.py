@@ -0,0 +1,139 @@
+"""
+Achievements
+Cached achievement catalog and a compiled rule table for unlock evaluation
+"""
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _account_age_days(user: Dict[str, Any], feedback_count: int) -> int:
+    created_at = user.get("created_at")
+    if not created_at:
+        return 0
+    try:
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - created_at).days
+    except (TypeError, ValueError):
+        return 0
+
+
+def _goals_completed(user: Dict[str, Any], feedback_count: int) -> int:
+    goal_progress = user.get("goal_progress") or {}
+    return sum(1 for g in goal_progress.values() if isinstance(g, dict) and g.get("completed", False))
+
+
+# requirement.type -> metric of (user, feedback_count); an achievement unlocks once its
+# metric reaches requirement.value. Each metric is computed once per evaluation.
+METRICS: Dict[str, Callable[[Dict[str, Any], int], float]] = {
+    "streak": lambda user, feedback_count: user.get("streak_count", 0) or 0,
+    # Consecutive days are tracked by streak_count
+    "consecutive_days": lambda user, feedback_count: user.get("streak_count", 0) or 0,
+    "messages": lambda user, feedback_count: user.get("total_messages_received", 0) or 0,
+    "feedback_count": lambda user, feedback_count: feedback_count,
+    # Five-star ratings aren't tracked separately; feedback_count is the proxy
+    "five_star_ratings": lambda user, feedback_count: feedback_count,
+    "has_goal": lambda user, feedback_count: 1 if (user.get("goals") or "").strip() else 0,
+    "goal_completed": _goals_completed,
+    "personality_count": lambda user, feedback_count: len(user.get("personalities") or []),
+    "account_age_days": _account_age_days,
+}
+
+# User fields the metrics read (projection for evaluation)
+USER_FIELDS = {
+    "_id": 0, "email": 1, "achievements": 1, "streak_count": 1, "total_messages_received": 1,
+    "goals": 1, "goal_progress": 1, "personalities": 1, "created_at": 1,
+}
+
+# requirement.type -> (thresholds ascending, achievement ids in the same order)
+RuleTable = Dict[str, Tuple[List[float], List[str]]]
+
+
+def compile_rules(catalog: Dict[str, Dict[str, Any]]) -> RuleTable:
+    """Group achievements by requirement type, sorted by threshold"""
+    grouped: Dict[str, List[Tuple[float, str]]] = {}
+    for achievement_id, achievement in catalog.items():
+        req = achievement.get("requirement") or {}
+        req_type = req.get("type")
+        if req_type not in METRICS:
+            if req_type:
+                logger.warning(f"Achievement {achievement_id} has unknown requirement type '{req_type}'")
+            continue
+        try:
+            threshold = float(req.get("value") if req.get("value") is not None else 1)
+        except (TypeError, ValueError):
+            logger.warning(f"Achievement {achievement_id} has invalid requirement value {req.get('value')!r}")
+            continue
+        grouped.setdefault(req_type, []).append((threshold, achievement_id))
+    table: RuleTable = {}
+    for req_type, rules in grouped.items():
+        rules.sort()
+        table[req_type] = ([t for t, _ in rules], [a for _, a in rules])
+    return table
+
+
+def evaluate_rules(rules: RuleTable, user: Dict[str, Any], feedback_count: int = 0) -> List[str]:
+    """Ids of achievements the user now satisfies but hasn't unlocked yet"""
+    have = set(user.get("achievements") or [])
+    satisfied: List[str] = []
+    for req_type, (thresholds, achievement_ids) in rules.items():
+        metric = METRICS[req_type](user, feedback_count)
+        reached = bisect.bisect_right(thresholds, metric)
+        satisfied.extend(a for a in achievement_ids[:reached] if a not in have)
+    return satisfied
+
+
+class AchievementCatalog:
+    """
+    In-process cache of the active achievements and their compiled rule table.
+
+    The admin achievement endpoints call `invalidate()` after every change; the TTL
+    bounds how long another worker process can serve a catalog it wasn't told about.
+    """
+
+    def __init__(self, db, ttl_seconds: float = 300):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self._catalog: Optional[Dict[str, Dict[str, Any]]] = None
+        self._rules: RuleTable = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._catalog = None
+
+    def _fresh(self) -> bool:
+        return self._catalog is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def _load(self) -> Tuple[Dict[str, Dict[str, Any]], RuleTable]:
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    achievements = await self.db.achievements.find({"active": True}, {"_id": 0}).to_list(None)
+                    catalog = {ach["id"]: ach for ach in achievements}
+                    self._rules = compile_rules(catalog)
+                    self._catalog = catalog
+                    self._loaded_at = time.monotonic()
+                    return catalog, self._rules
+        # Read both together; invalidate() may clear _catalog while we were waiting
+        catalog, rules = self._catalog, self._rules
+        if catalog is None:
+            return await self._load()
+        return catalog, rules
+
+    async def get(self) -> Dict[str, Dict[str, Any]]:
+        """Active achievements by id (shared - don't mutate the entries)"""
+        catalog, _ = await self._load()
+        return catalog
+
+    async def rules(self) -> RuleTable:
+        _, rules = await self._load()
+        return rules
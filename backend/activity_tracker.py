@@ -66,8 +66,17 @@ class UserSession(BaseModel):
 class ActivityTracker:
     """Central tracking service"""
     
-    def __init__(self, db):
+    def __init__(self, db, sink=None):
         self.db = db
+        # Optional BufferedLogSink - when set, append-only logs are batched instead of insert_one per call
+        self.sink = sink
+    
+    async def _insert(self, collection: str, doc: Dict[str, Any]):
+        """Write an append-only log document through the sink if one is configured"""
+        if self.sink is not None:
+            await self.sink.write(collection, doc)
+        else:
+            await self.db[collection].insert_one(doc)
         
     async def log_user_activity(
         self,
@@ -91,7 +100,7 @@ class ActivityTracker:
             session_id=session_id
         )
         
-        await self.db.activity_logs.insert_one(log.model_dump())
+        await self._insert("activity_logs", log.model_dump())
         return log.id
     
     async def log_admin_activity(
@@ -112,7 +121,7 @@ class ActivityTracker:
             ip_address=ip_address
         )
         
-        await self.db.activity_logs.insert_one(log.model_dump())
+        await self._insert("activity_logs", log.model_dump())
         return log.id
     
     async def log_system_event(
@@ -134,7 +143,7 @@ class ActivityTracker:
             status=status
         )
         
-        await self.db.system_events.insert_one(event.model_dump())
+        await self._insert("system_events", event.model_dump())
         return event.id
     
     async def log_api_call(
@@ -160,7 +169,7 @@ class ActivityTracker:
             error_message=error_message
         )
         
-        await self.db.api_analytics.insert_one(analytics.model_dump())
+        await self._insert("api_analytics", analytics.model_dump())
         return analytics.id
     
     async def log_page_view(
@@ -182,7 +191,7 @@ class ActivityTracker:
             time_on_page_seconds=time_on_page_seconds
         )
         
-        await self.db.page_views.insert_one(view.model_dump())
+        await self._insert("page_views", view.model_dump())
         return view.id
     
     async def start_session(
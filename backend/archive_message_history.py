@@ -0,0 +1,48 @@
+"""
+Archive old message history
+Moves message_history entries older than HISTORY_HOT_DAYS (default 90) into per-user
+monthly buckets in message_archive (see history_store.py). The server does this nightly;
+run this once after deploying to archive existing history in one go.
+Safe to re-run - an interrupted run is completed by the next one.
+"""
+import os
+import sys
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from history_store import MessageHistoryStore
+
+# Load environment variables
+load_dotenv()
+
+MONGO_URL = os.getenv('MONGO_URL')
+DB_NAME = os.getenv('DB_NAME', 'inbox_inspire')
+HOT_DAYS = int(os.getenv('HISTORY_HOT_DAYS', '90'))
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    print("=" * 80)
+    print("ARCHIVE MESSAGE HISTORY")
+    print("=" * 80)
+
+    store = MessageHistoryStore(db, hot_days=HOT_DAYS)
+    hot_before = await db.message_history.count_documents({})
+    print(f"\n{hot_before} message(s) in message_history; archiving those older than {HOT_DAYS} days")
+
+    result = await store.archive_all()
+
+    hot_after = await db.message_history.count_documents({})
+    print(f"\nArchived {result['messages_archived']} message(s) for {result['users']} user(s)")
+    print(f"message_history: {hot_before} -> {hot_after}")
+    print(f"message_archive now holds {await store.archived_total()} message(s)")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Backfill message details onto old email_logs
+Copies message_id, personality, goal_id and message_type from message_history onto
+email_logs written before those fields existed, pairing each log with the user's history
+entry closest in time (same subject when both have one). Logs with no matching history
+entry get channel "unknown" so they aren't revisited. Also moves delivery channels that
+early logs stored in message_type into the channel field. Safe to re-run.
+"""
+import os
+import sys
+import asyncio
+from datetime import datetime, timezone, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables
+load_dotenv()
+
+MONGO_URL = os.getenv('MONGO_URL')
+DB_NAME = os.getenv('DB_NAME', 'inbox_inspire')
+
+# A log and its history entry are written moments apart; anything further is a different send
+MAX_SKEW = timedelta(minutes=10)
+
+# Delivery channels that were once stored in message_type -> their channel value
+LEGACY_CHANNEL_TYPES = {
+    "scheduled": "scheduled",
+    "broadcast": "broadcast",
+    "admin_bulk": "admin_bulk",
+    "goal_message": "goal",
+    "unknown": "unknown",
+}
+
+
+def as_datetime(value):
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def pair_logs(logs, history):
+    """Yield (log, history_entry or None), using each history entry at most once"""
+    unused = sorted(
+        ((as_datetime(h.get("sent_at")), h) for h in history if as_datetime(h.get("sent_at"))),
+        key=lambda item: item[0],
+    )
+    for log in logs:
+        log_at = as_datetime(log.get("sent_at"))
+        best = None
+        if log_at:
+            for i, (at, entry) in enumerate(unused):
+                if abs(at - log_at) > MAX_SKEW:
+                    continue
+                if log.get("subject") and entry.get("subject") and log["subject"] != entry["subject"]:
+                    continue
+                if best is None or abs(at - log_at) < abs(unused[best][0] - log_at):
+                    best = i
+        yield log, (unused.pop(best)[1] if best is not None else None)
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    print("=" * 80)
+    print("BACKFILL EMAIL LOG DETAILS")
+    print("=" * 80)
+
+    moved = 0
+    for legacy, channel in LEGACY_CHANNEL_TYPES.items():
+        result = await db.email_logs.update_many(
+            {"message_type": legacy, "channel": {"$exists": False}},
+            {"$set": {"channel": channel}, "$unset": {"message_type": ""}},
+        )
+        moved += result.modified_count
+    print(f"\nMoved the delivery channel out of message_type on {moved} log(s)")
+
+    pending = {"message_id": {"$exists": False}, "message_type": {"$exists": False}, "channel": {"$exists": False}}
+    emails = await db.email_logs.distinct("email", pending)
+    print(f"\nFound {len(emails)} user(s) with logs to backfill")
+
+    matched = unmatched = 0
+    for email in emails:
+        logs = await db.email_logs.find({"email": email, **pending}, {"_id": 1, "subject": 1, "sent_at": 1}).to_list(None)
+        history = await db.message_history.find(
+            {"email": email},
+            {"_id": 0, "id": 1, "subject": 1, "sent_at": 1, "personality": 1, "goal_id": 1, "message_type": 1}
+        ).to_list(None)
+
+        ops = []
+        for log, entry in pair_logs(logs, history):
+            if entry is None:
+                ops.append(UpdateOne({"_id": log["_id"]}, {"$set": {"channel": "unknown"}}))
+                unmatched += 1
+                continue
+            ops.append(UpdateOne({"_id": log["_id"]}, {"$set": {
+                "message_id": entry.get("id"),
+                "personality": (entry.get("personality") or {}).get("value"),
+                "goal_id": entry.get("goal_id"),
+                "message_type": entry.get("message_type") if entry.get("message_type") != "goal_message" else None,
+                "channel": "goal" if entry.get("goal_id") else None,
+            }}))
+            matched += 1
+        if ops:
+            await db.email_logs.bulk_write(ops, ordered=False)
+
+    print(f"\nMatched {matched} log(s) to their message; {unmatched} had no matching message")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
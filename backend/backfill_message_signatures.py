@@ -0,0 +1,66 @@
+"""
+Backfill near-duplicate signatures onto old message_history entries
+Adds the MinHash signature and LSH buckets (see near_duplicates.py) to history entries
+written before they were stored, so repetition checks cover each user's full history.
+Entries with no words are marked with an empty bucket list so they aren't revisited.
+Safe to re-run.
+"""
+import os
+import sys
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from near_duplicates import signature_fields
+
+# Load environment variables
+load_dotenv()
+
+MONGO_URL = os.getenv('MONGO_URL')
+DB_NAME = os.getenv('DB_NAME', 'inbox_inspire')
+
+BATCH_SIZE = 500
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    print("=" * 80)
+    print("BACKFILL MESSAGE SIGNATURES")
+    print("=" * 80)
+
+    pending = {"lsh_buckets": {"$exists": False}}
+    total = await db.message_history.count_documents(pending)
+    print(f"\nFound {total} history entr(y/ies) without a signature")
+
+    processed = 0
+    last_id = None
+    while True:
+        query = dict(pending)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        entries = await db.message_history.find(
+            query, {"_id": 1, "message": 1}
+        ).sort("_id", 1).limit(BATCH_SIZE).to_list(BATCH_SIZE)
+        if not entries:
+            break
+
+        ops = [
+            UpdateOne({"_id": entry["_id"]}, {"$set": signature_fields(entry.get("message") or "") or {"lsh_buckets": []}})
+            for entry in entries
+        ]
+        await db.message_history.bulk_write(ops, ordered=False)
+        processed += len(entries)
+        last_id = entries[-1]["_id"]
+        print(f"  {processed}/{total}")
+
+    print(f"\nSigned {processed} history entr(y/ies)")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+Broadcast Engine
+Runs admin broadcasts as resumable background jobs instead of inside the HTTP request
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Callable, Awaitable, List
+
+try:
+    from backend.job_runner import LeasedJobRunner
+except ImportError:
+    from job_runner import LeasedJobRunner
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastEngine(LeasedJobRunner):
+    """
+    Fan a broadcast out to every active user with bounded concurrency.
+
+    Each page of recipients (see LeasedJobRunner for paging, checkpoints and leases)
+    is sent concurrently and its email_logs are bulk-inserted. A job interrupted by a
+    restart can re-send at most one page.
+    """
+
+    jobs_collection = "broadcast_jobs"
+    lease_prefix = "broadcast"
+    job_label = "📢 Broadcast"
+    status_projection = {"_id": 0, "message": 0}
+
+    def __init__(
+        self,
+        db,
+        send_fn: Callable[..., Awaitable[tuple]],
+        build_log_fn: Callable[..., Dict[str, Any]],
+        batch_size: int = 200,
+        concurrency: int = 15,
+        leases=None,
+        lease_ttl_seconds: int = 120,
+        on_logs_written: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+    ):
+        super().__init__(db, batch_size, leases=leases, lease_ttl_seconds=lease_ttl_seconds)
+        self.send_fn = send_fn
+        self.build_log_fn = build_log_fn
+        # Optional hook for derived data (analytics rollups) - email_logs are bulk-inserted here
+        self.on_logs_written = on_logs_written
+        self.concurrency = concurrency
+
+    async def create_job(self, subject: str, message: str, created_by: str = "admin") -> Dict[str, Any]:
+        """Persist a new broadcast job and start it in the background"""
+        return await self._create_job(
+            {"subject": subject, "message": message, "success": 0, "failed": 0},
+            created_by,
+        )
+
+    async def _send_one(self, email: str, subject: str, message: str, limiter: asyncio.Semaphore) -> Dict[str, Any]:
+        async with limiter:
+            try:
+                success, error = await self.send_fn(to_email=email, subject=subject, html_content=message)
+            except Exception as e:
+                success, error = False, str(e)
+                logger.error(f"Failed to send broadcast to {email}: {error}")
+        return self.build_log_fn(
+            email=email,
+            subject=subject,
+            status="success" if success else "failed",
+            sent_dt=datetime.now(timezone.utc),
+            error_message=None if success else error,
+        )
+
+    async def process_page(self, job: Dict[str, Any], users: List[Dict[str, Any]]) -> Dict[str, int]:
+        limiter = asyncio.Semaphore(self.concurrency)
+        log_docs = await asyncio.gather(
+            *(self._send_one(u["email"], job["subject"], job["message"], limiter) for u in users)
+        )
+        if log_docs:
+            await self.db.email_logs.insert_many(log_docs, ordered=False)
+            if self.on_logs_written is not None:
+                await self.on_logs_written(log_docs)
+        success = sum(1 for doc in log_docs if doc["status"] == "success")
+        return {"success": success, "failed": len(log_docs) - success}
+
+    def completion_summary(self, job: Dict[str, Any]) -> str:
+        return f"({job['success']} success, {job['failed']} failed)"
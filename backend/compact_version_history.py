@@ -0,0 +1,41 @@
+"""
+Compact schedule/personality/profile version history
+Collapses runs of consecutive versions with identical content (left behind by the old
+every-5-minutes "Schedule initialization" saves) into the first version of each run.
+Safe to re-run and to run while the server is up.
+"""
+import os
+import sys
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from version_tracker import VersionTracker, VERSIONED_FIELDS
+
+# Load environment variables
+load_dotenv()
+
+MONGO_URL = os.getenv('MONGO_URL')
+DB_NAME = os.getenv('DB_NAME', 'inbox_inspire')
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    print("=" * 80)
+    print("COMPACT VERSION HISTORY")
+    print("=" * 80)
+    version_tracker = VersionTracker(db)
+    for collection in VERSIONED_FIELDS:
+        before = await db[collection].count_documents({})
+        stats = await version_tracker.compact_history(collection)
+        print(f"\n{collection}: {before} -> {before - stats['removed']} version(s) "
+              f"({stats['removed']} duplicates removed across {stats['users']} user(s))")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
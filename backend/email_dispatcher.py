@@ -0,0 +1,258 @@
+"""
+Primary Email Dispatcher
+Time-bucketed dispatch queue for users' primary-goal emails.
+
+Each active user's next send time is stored on the user document as an indexed
+`next_send_at` field. A once-a-minute tick pulls everything due with a single
+indexed query, claims each user by advancing `next_send_at` atomically, and hands
+the send to a bounded worker pool. Memory and restart cost stay flat regardless of
+user count (no per-user scheduler jobs).
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Set
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+DAY_MAP = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+           'friday': 4, 'saturday': 5, 'sunday': 6}
+
+
+def _parse_time(time_str: str) -> tuple[int, int]:
+    parts = time_str.strip().split(':')
+    return int(parts[0]), int(parts[1])
+
+
+def _localize(tz, day, hour: int, minute: int) -> datetime:
+    naive = datetime(day.year, day.month, day.day, hour, minute)
+    return tz.localize(naive).astimezone(timezone.utc)
+
+
+def compute_next_send_at(schedule: Dict[str, Any], after: datetime) -> Optional[datetime]:
+    """
+    Return the first send time strictly after `after` (UTC) for a user schedule,
+    or None if the schedule is paused / can't produce a time.
+
+    Mirrors the CronTrigger/IntervalTrigger rules the per-user jobs used:
+    - daily:   every entry in `times`
+    - weekly:  `custom_days` (default Monday) at times[0]
+    - monthly: `monthly_dates` 1-31 (default the 1st) at times[0]; short months skip
+    - custom:  every `custom_interval` days at times[0]
+    """
+    if not schedule or schedule.get('paused', False):
+        return None
+
+    try:
+        tz = pytz.timezone(schedule.get('timezone') or 'UTC')
+    except Exception:
+        tz = pytz.UTC
+
+    times = [t for t in (schedule.get('times') or ['09:00']) if t and t.strip()] or ['09:00']
+    frequency = schedule.get('frequency', 'daily')
+    if after.tzinfo is None:
+        after = after.replace(tzinfo=timezone.utc)
+    local_today = after.astimezone(tz).date()
+
+    try:
+        if frequency == 'custom':
+            interval = max(int(schedule.get('custom_interval') or 1), 1)
+            hour, minute = _parse_time(times[0])
+            candidate = _localize(tz, local_today, hour, minute)
+            while candidate <= after:
+                local_today = local_today + timedelta(days=interval)
+                candidate = _localize(tz, local_today, hour, minute)
+            return candidate
+
+        if frequency == 'daily':
+            slots = [_parse_time(t) for t in times]
+        else:
+            slots = [_parse_time(times[0])]
+
+        weekdays = None
+        month_days = None
+        if frequency == 'weekly':
+            weekdays = {DAY_MAP.get(d.lower(), 0) for d in (schedule.get('custom_days') or [])} or {0}
+        elif frequency == 'monthly':
+            month_days = set()
+            for date_str in schedule.get('monthly_dates') or []:
+                try:
+                    day_of_month = int(date_str)
+                except (ValueError, TypeError):
+                    continue
+                if 1 <= day_of_month <= 31:
+                    month_days.add(day_of_month)
+            month_days = month_days or {1}
+
+        # Monthly schedules on the 31st can be ~2 months out; 62 days covers every case
+        for day_offset in range(62):
+            day = local_today + timedelta(days=day_offset)
+            if weekdays is not None and day.weekday() not in weekdays:
+                continue
+            if month_days is not None and day.day not in month_days:
+                continue
+            candidates = [_localize(tz, day, h, m) for h, m in slots]
+            candidates = [c for c in candidates if c > after]
+            if candidates:
+                return min(candidates)
+    except (ValueError, IndexError) as e:
+        logger.warning(f"Could not compute next send time for schedule {schedule}: {e}")
+    return None
+
+
+class PrimaryEmailDispatcher:
+    """
+    Dispatch due primary-goal emails from `users.next_send_at`.
+
+    Claiming is a conditional update on the exact `next_send_at` value that was read,
+    so a user can only be claimed once per slot even if ticks overlap.
+    """
+
+    def __init__(
+        self,
+        db,
+        send_fn: Callable[[str], Awaitable[Any]],
+        workers: int = 20,
+        batch_size: int = 500,
+        misfire_grace_seconds: int = 1800,
+        plan_fn: Optional[Callable[[Optional[datetime]], Optional[datetime]]] = None,
+    ):
+        self.db = db
+        self.send_fn = send_fn
+        # Optional: when to pre-generate content for a slot (stored as pregen_after)
+        self.plan_fn = plan_fn
+        self.batch_size = batch_size
+        self.misfire_grace = timedelta(seconds=misfire_grace_seconds)
+        self._workers = asyncio.Semaphore(workers)
+        self._in_flight: Set[asyncio.Task] = set()
+        self._stats: Dict[str, Any] = {
+            "ticks": 0,
+            "dispatched": 0,
+            "misfired": 0,
+            "last_tick_at": None,
+            "last_tick_due": 0,
+        }
+
+    def _slot_fields(self, next_send_at: Optional[datetime]) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {"next_send_at": next_send_at}
+        if self.plan_fn is not None:
+            fields["pregen_after"] = self.plan_fn(next_send_at)
+        return fields
+
+    @staticmethod
+    def due_query(now: datetime) -> Dict[str, Any]:
+        return {
+            "next_send_at": {"$lte": now},
+            "active": True,
+            "schedule.paused": {"$ne": True},
+        }
+
+    async def reschedule_user(self, email: str, user_data: Optional[dict] = None) -> Optional[datetime]:
+        """Recompute and store one user's next_send_at (call after any schedule/active change)"""
+        if user_data is None:
+            user_data = await self.db.users.find_one({"email": email}, {"_id": 0, "active": 1, "schedule": 1})
+        if not user_data:
+            return None
+
+        next_send_at = None
+        if user_data.get("active", False):
+            next_send_at = compute_next_send_at(user_data.get("schedule", {}), datetime.now(timezone.utc))
+        await self.db.users.update_one({"email": email}, {"$set": self._slot_fields(next_send_at)})
+        return next_send_at
+
+    async def backfill(self) -> int:
+        """Give every active user without a next_send_at one (startup / migration from cron jobs)"""
+        now = datetime.now(timezone.utc)
+        updated = 0
+        while True:
+            users = await self.db.users.find(
+                {"active": True, "next_send_at": {"$exists": False}},
+                {"_id": 0, "email": 1, "schedule": 1}
+            ).limit(self.batch_size).to_list(self.batch_size)
+            if not users:
+                break
+            for user in users:
+                await self.db.users.update_one(
+                    {"email": user["email"]},
+                    {"$set": self._slot_fields(compute_next_send_at(user.get("schedule", {}), now))}
+                )
+                updated += 1
+        return updated
+
+    async def claim(self, user: dict, now: datetime) -> Optional[datetime]:
+        """Atomically advance a due user's next_send_at; returns the claimed slot or None if lost"""
+        due_at = user["next_send_at"]
+        if due_at.tzinfo is None:
+            due_at = due_at.replace(tzinfo=timezone.utc)
+        next_send_at = compute_next_send_at(user.get("schedule", {}), max(due_at, now))
+        claimed = await self.db.users.find_one_and_update(
+            {"email": user["email"], "next_send_at": user["next_send_at"]},
+            {"$set": {**self._slot_fields(next_send_at), "last_dispatched_at": now}},
+            projection={"_id": 0, "email": 1},
+        )
+        return due_at if claimed else None
+
+    async def tick(self) -> int:
+        """Pull everything due, claim it, and queue the sends; returns the number dispatched"""
+        now = datetime.now(timezone.utc)
+        dispatched = 0
+        misfired = 0
+
+        while True:
+            due_users: List[dict] = await self.db.users.find(
+                self.due_query(now),
+                {"_id": 0, "email": 1, "schedule": 1, "next_send_at": 1}
+            ).sort("next_send_at", 1).limit(self.batch_size).to_list(self.batch_size)
+            if not due_users:
+                break
+
+            claimed_any = False
+            for user in due_users:
+                due_at = await self.claim(user, now)
+                if due_at is None:
+                    continue
+                claimed_any = True
+                if now - due_at > self.misfire_grace:
+                    # Missed by more than the grace window (e.g. long downtime) - skip, like a cron misfire
+                    misfired += 1
+                    logger.info(f"⏭️ Skipping stale send for {user['email']} (was due {due_at.isoformat()})")
+                    continue
+                self._spawn(user["email"])
+                dispatched += 1
+
+            if not claimed_any:
+                break
+
+        self._stats["ticks"] += 1
+        self._stats["dispatched"] += dispatched
+        self._stats["misfired"] += misfired
+        self._stats["last_tick_at"] = now.isoformat()
+        self._stats["last_tick_due"] = dispatched
+        if dispatched or misfired:
+            logger.info(f"📬 Dispatch tick: {dispatched} email(s) queued, {misfired} stale skipped, {len(self._in_flight)} in flight")
+        return dispatched
+
+    def _spawn(self, email: str) -> None:
+        task = asyncio.create_task(self._run_send(email))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _run_send(self, email: str) -> None:
+        async with self._workers:
+            try:
+                await self.send_fn(email)
+            except Exception as e:
+                logger.error(f"❌ Dispatch send failed for {email}: {e}", exc_info=True)
+
+    async def shutdown(self, timeout: float = 30.0) -> None:
+        """Let in-flight sends finish (bounded), then cancel the rest"""
+        if not self._in_flight:
+            return
+        done, pending = await asyncio.wait(set(self._in_flight), timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "in_flight": len(self._in_flight)}
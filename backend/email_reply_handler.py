@@ -6,9 +6,13 @@ import os
 import json
 import re
 import uuid
+import asyncio
 import logging
+import queue
+import threading
+import concurrent.futures
 from datetime import datetime, timezone, date, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 from bs4 import BeautifulSoup
 
 logger = logging.getLogger(__name__)
@@ -16,16 +20,127 @@ logger = logging.getLogger(__name__)
 # Try to import imap_tools, but make it optional
 try:
     from imap_tools import MailBox, AND, MailMessageFlags
+    from imap_tools.errors import MailboxTaggedResponseError
     IMAP_AVAILABLE = True
 except ImportError:
     IMAP_AVAILABLE = False
     logger.warning("imap-tools not installed. Email reply polling will be disabled. Install with: pip install imap-tools")
 
 
+def _imap_error_tip(error_msg: str) -> Optional[str]:
+    """Helpful hint for common IMAP connection failures"""
+    error_msg = error_msg.lower()
+    if "authentication failed" in error_msg or "login failed" in error_msg:
+        return "Check your INBOX_PASSWORD - for Gmail, use an App Password, not your regular password"
+    if "connection" in error_msg or "timeout" in error_msg:
+        return "Check your IMAP_HOST and ensure IMAP is enabled in your email provider settings"
+    if "ssl" in error_msg or "tls" in error_msg:
+        return "Some email providers require specific SSL/TLS settings"
+    return None
+
+
+def fetch_unseen_replies(mailbox, skip_uids=()) -> List[Dict[str, Any]]:
+    """
+    Fetch and parse unread messages from the last 24 hours (blocking - run off the event loop).
+    Messages are fetched with BODY.PEEK so they stay unread until they've been handled.
+    """
+    # Use date_gte to get messages from today and yesterday (to catch late-night replies)
+    yesterday = date.today() - timedelta(days=1)
+    replies = []
+    for msg in mailbox.fetch(AND(seen=False, date_gte=yesterday), mark_seen=False):
+        if msg.uid in skip_uids:
+            continue
+        # Extract and clean reply text
+        reply_text = msg.text or msg.html or ""
+        if not msg.text and msg.html:
+            reply_text = strip_html_tags(reply_text)
+        replies.append({
+            "uid": msg.uid,
+            "sender_email": msg.from_,
+            "reply_text": clean_email_reply(reply_text),
+            "date": msg.date,
+        })
+    return replies
+
+
+async def handle_inbound_reply(reply: Dict[str, Any]) -> bool:
+    """
+    Validate one parsed inbound message and hand it to process_user_reply.
+    Returns True when the message is done with (processed or skipped) and can be marked
+    as read, False when processing failed and it should be retried.
+    """
+    from backend.server import db
+    
+    sender_email = reply["sender_email"]
+    reply_text = reply["reply_text"]
+    msg_date = reply.get("date")
+    logger.debug(f"📨 Checking email from: {sender_email}")
+    
+    # Verify sender is a registered user
+    user = await db.users.find_one({"email": sender_email}, {"_id": 0, "email": 1})
+    if not user:
+        logger.debug(f"   ⏭️ Skipping - not a registered user: {sender_email}")
+        return True
+    
+    logger.info(f"   ✅ Found reply from registered user: {sender_email}")
+    
+    # Validate reply length
+    if len(reply_text.strip()) < 10:
+        logger.info(f"Reply too short from {sender_email}")
+        return True
+    
+    # Check for duplicate reply (prevent processing same reply twice)
+    existing_reply = await db.email_reply_conversations.find_one(
+        {
+            "user_email": sender_email,
+            "reply_text": {"$regex": f"^{re.escape(reply_text.strip()[:100])}"},  # Check first 100 chars
+            "reply_timestamp": {
+                "$gte": (msg_date - timedelta(minutes=5)).isoformat() if msg_date else None,
+                "$lte": (msg_date + timedelta(minutes=5)).isoformat() if msg_date else None
+            }
+        }
+    )
+    if existing_reply:
+        logger.info(f"⚠️ Duplicate reply detected from {sender_email}, skipping (already processed at {existing_reply.get('reply_timestamp')})")
+        return True
+    
+    try:
+        await process_user_reply(
+            user_email=sender_email,
+            reply_text=reply_text,
+            reply_timestamp=msg_date or datetime.now(timezone.utc),
+            email_uid=reply["uid"]  # Pass UID for tracking
+        )
+        logger.info(f"✅ Processed reply from {sender_email} (UID: {reply['uid']})")
+        return True
+    except Exception as process_error:
+        # Leave unread so it's retried
+        logger.error(f"❌ Failed to process reply from {sender_email}: {process_error}", exc_info=True)
+        return False
+
+
+def _fetch_and_close(imap_host: str, inbox_email: str, inbox_password: str) -> List[Dict[str, Any]]:
+    with MailBox(imap_host).login(inbox_email, inbox_password) as mailbox:
+        return fetch_unseen_replies(mailbox)
+
+
+def check_imap_login(imap_host: str, inbox_email: str, inbox_password: str) -> Dict[str, Any]:
+    """Log in and out of the inbox (blocking - run in a thread); raises if IMAP is unreachable"""
+    if not IMAP_AVAILABLE:
+        raise RuntimeError("imap-tools not installed")
+    with MailBox(imap_host).login(inbox_email, inbox_password) as mailbox:
+        return {"folder": mailbox.folder.get()}
+
+
+def _mark_seen(imap_host: str, inbox_email: str, inbox_password: str, uids: List[str]) -> None:
+    with MailBox(imap_host).login(inbox_email, inbox_password) as mailbox:
+        mailbox.flag(uids, [MailMessageFlags.SEEN], True)
+
+
 async def poll_email_replies():
     """
-    Poll email inbox for user replies.
-    Called by scheduler every 1 minute for near real-time processing.
+    One-off poll of the inbox for user replies (manual trigger from the admin API).
+    Normal ingestion is push-based via ReplyListener; IMAP I/O runs in a thread here too.
     """
     if not IMAP_AVAILABLE:
         logger.warning("IMAP not available - skipping email reply polling")
@@ -33,7 +148,6 @@ async def poll_email_replies():
     
     # Import here to avoid circular imports
     from backend.config import get_env
-    from backend.server import db, openai_client, tracker
     
     imap_host = get_env("IMAP_HOST")
     inbox_email = get_env("INBOX_EMAIL")
@@ -45,94 +159,214 @@ async def poll_email_replies():
     
     try:
         logger.info(f"📧 Starting email reply polling - Connecting to {imap_host}...")
-        # Connect to email inbox
-        with MailBox(imap_host).login(inbox_email, inbox_password) as mailbox:
-            logger.info(f"✅ Connected to inbox: {inbox_email}")
-            
-            # Fetch unread messages from last 24 hours
-            # Use date_gte to get messages from today and yesterday (to catch late-night replies)
-            yesterday = date.today() - timedelta(days=1)
-            messages = list(mailbox.fetch(AND(seen=False, date_gte=yesterday)))
-            logger.info(f"📬 Found {len(messages)} unread message(s) in inbox")
-            
-            for msg in messages:
-                try:
-                    sender_email = msg.from_
-                    logger.debug(f"📨 Checking email from: {sender_email}")
-                    
-                    # Verify sender is a registered user
-                    user = await db.users.find_one({"email": sender_email})
-                    if not user:
-                        logger.debug(f"   ⏭️ Skipping - not a registered user: {sender_email}")
-                        # Mark as read to avoid checking again
-                        mailbox.flag(msg.uid, [MailMessageFlags.SEEN], True)
-                        continue
-                    
-                    logger.info(f"   ✅ Found reply from registered user: {sender_email}")
-                    
-                    # Extract and clean reply text
-                    reply_text = msg.text or msg.html
-                    if msg.html:
-                        reply_text = strip_html_tags(reply_text)
-                    reply_text = clean_email_reply(reply_text)
-                    
-                    # Validate reply length
-                    if len(reply_text.strip()) < 10:
-                        logger.info(f"Reply too short from {sender_email}")
-                        # Still mark as read to avoid reprocessing
-                        mailbox.flag(msg.uid, [MailMessageFlags.SEEN], True)
-                        continue
-                    
-                    # Check for duplicate reply (prevent processing same reply twice)
-                    reply_hash = str(hash(reply_text.strip()[:500] + str(msg.date)))  # Hash of content + timestamp
-                    existing_reply = await db.email_reply_conversations.find_one(
-                        {
-                            "user_email": sender_email,
-                            "reply_text": {"$regex": f"^{re.escape(reply_text.strip()[:100])}"},  # Check first 100 chars
-                            "reply_timestamp": {
-                                "$gte": (msg.date - timedelta(minutes=5)).isoformat() if msg.date else None,
-                                "$lte": (msg.date + timedelta(minutes=5)).isoformat() if msg.date else None
-                            }
-                        }
-                    )
-                    
-                    if existing_reply:
-                        logger.info(f"⚠️ Duplicate reply detected from {sender_email}, skipping (already processed at {existing_reply.get('reply_timestamp')})")
-                        # Mark as read to avoid reprocessing
-                        mailbox.flag(msg.uid, [MailMessageFlags.SEEN], True)
-                        continue
-                    
-                    # Process the reply
-                    try:
-                        await process_user_reply(
-                            user_email=sender_email,
-                            reply_text=reply_text,
-                            reply_timestamp=msg.date or datetime.now(timezone.utc),
-                            email_uid=msg.uid  # Pass UID for tracking
-                        )
-                        
-                        # Mark as read only after successful processing
-                        mailbox.flag(msg.uid, [MailMessageFlags.SEEN], True)
-                        logger.info(f"✅ Processed reply from {sender_email} (UID: {msg.uid})")
-                    except Exception as process_error:
-                        logger.error(f"❌ Failed to process reply from {sender_email}: {process_error}", exc_info=True)
-                        # Don't mark as read if processing failed - allow retry on next poll
-                        # But log the failure for monitoring
-                    
-                except Exception as e:
-                    logger.error(f"Error processing email from {sender_email}: {e}", exc_info=True)
-                    
+        replies = await asyncio.to_thread(_fetch_and_close, imap_host, inbox_email, inbox_password)
+        logger.info(f"📬 Found {len(replies)} unread message(s) in inbox")
+        
+        done_uids = []
+        for reply in replies:
+            try:
+                if await handle_inbound_reply(reply):
+                    done_uids.append(reply["uid"])
+            except Exception as e:
+                logger.error(f"Error processing email from {reply.get('sender_email')}: {e}", exc_info=True)
+        
+        if done_uids:
+            await asyncio.to_thread(_mark_seen, imap_host, inbox_email, inbox_password, done_uids)
     except Exception as e:
         error_msg = str(e)
         logger.error(f"❌ Error polling email replies: {error_msg}", exc_info=True)
-        
-        # Provide helpful error messages
-        if "authentication failed" in error_msg.lower() or "login failed" in error_msg.lower():
-            logger.error("   💡 TIP: Check your INBOX_PASSWORD - for Gmail, use an App Password, not your regular password")
-        elif "connection" in error_msg.lower() or "timeout" in error_msg.lower():
-            logger.error("   💡 TIP: Check your IMAP_HOST and ensure IMAP is enabled in your email provider settings")
-        elif "ssl" in error_msg.lower() or "tls" in error_msg.lower():
-            logger.error("   💡 TIP: Some email providers require specific SSL/TLS settings")
+        tip = _imap_error_tip(error_msg)
+        if tip:
+            logger.error(f"   💡 TIP: {tip}")
+
+
+class ReplyListener:
+    """
+    Push-based reply ingestion.
+
+    A daemon thread holds one IMAP connection and waits in IDLE for new mail; each
+    wake-up fetches unread messages, parses them, and puts them on a bounded asyncio
+    queue (the thread blocks when the queue is full). Async workers drain the queue
+    through `handle_fn` and report back which UIDs can be marked read - the IMAP
+    thread applies those flags between IDLE cycles, so the socket is only ever used
+    from that one thread. Nothing blocking runs on the event loop.
+    """
+
+    def __init__(
+        self,
+        imap_host: str,
+        inbox_email: str,
+        inbox_password: str,
+        handle_fn: Callable[[Dict[str, Any]], Awaitable[bool]] = handle_inbound_reply,
+        queue_size: int = 100,
+        workers: int = 3,
+        idle_timeout_seconds: int = 30,
+        max_attempts: int = 3,
+    ):
+        self.imap_host = imap_host
+        self.inbox_email = inbox_email
+        self.inbox_password = inbox_password
+        self.handle_fn = handle_fn
+        self.queue_size = queue_size
+        self.workers = workers
+        # Re-issue IDLE this often so acks and stop requests are applied promptly (RFC 2177 caps it at 29 min)
+        self.idle_timeout_seconds = min(idle_timeout_seconds, 29 * 60)
+        self.max_attempts = max_attempts
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event: Optional[threading.Event] = None
+        self._acks: "queue.Queue[tuple]" = queue.Queue()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._stats: Dict[str, Any] = {
+            "connected": False,
+            "idle_supported": None,
+            "connects": 0,
+            "received": 0,
+            "processed": 0,
+            "failed": 0,
+            "last_message_at": None,
+            "last_error": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set()
+
+    def start(self) -> None:
+        """Start the IMAP thread and queue workers (no-op if already running or still stopping)"""
+        if not IMAP_AVAILABLE:
+            logger.warning("IMAP not available - reply listener disabled")
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stop_event = threading.Event()
+        self._acks = queue.Queue()
+        self._worker_tasks = [asyncio.create_task(self._worker(self._queue)) for _ in range(self.workers)]
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(loop, self._queue, self._stop_event, self._acks),
+            name="imap-reply-listener",
+            daemon=True,
+        )
+        self._thread.start()
+        logger.info(f"📧 Reply listener started for {self.inbox_email} on {self.imap_host}")
+
+    def stop(self) -> None:
+        """Signal the IMAP thread to exit after its current IDLE cycle and cancel the workers"""
+        if self._stop_event is not None and not self._stop_event.is_set():
+            self._stop_event.set()
+            logger.info("📧 Reply listener stopping")
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks = []
+
+    async def shutdown(self, timeout: float = 10.0) -> None:
+        self.stop()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, timeout)
+
+    async def _worker(self, inbox: asyncio.Queue) -> None:
+        while True:
+            reply = await inbox.get()
+            try:
+                ok = await self.handle_fn(reply)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing email from {reply.get('sender_email')}: {e}", exc_info=True)
+                ok = False
+            finally:
+                inbox.task_done()
+            self._stats["processed" if ok else "failed"] += 1
+            self._acks.put((reply["uid"], ok))
+
+    def _run(self, loop, inbox: asyncio.Queue, stop_event: threading.Event, acks: "queue.Queue[tuple]") -> None:
+        # UIDs handed to the workers and not yet acknowledged, and failure counts for retries
+        in_flight: set = set()
+        attempts: Dict[str, int] = {}
+        backoff = 5
+        while not stop_event.is_set():
+            try:
+                with MailBox(self.imap_host).login(self.inbox_email, self.inbox_password) as mailbox:
+                    self._stats["connected"] = True
+                    self._stats["connects"] += 1
+                    self._stats["last_error"] = None
+                    backoff = 5
+                    logger.info(f"✅ Reply listener connected to inbox: {self.inbox_email}")
+                    while not stop_event.is_set():
+                        self._apply_acks(mailbox, acks, in_flight, attempts)
+                        for reply in fetch_unseen_replies(mailbox, skip_uids=in_flight):
+                            in_flight.add(reply["uid"])
+                            self._stats["received"] += 1
+                            self._stats["last_message_at"] = datetime.now(timezone.utc).isoformat()
+                            if not self._enqueue(loop, inbox, reply, stop_event):
+                                return
+                        self._wait_for_mail(mailbox, stop_event)
+            except Exception as e:
+                error_msg = str(e)
+                self._stats["last_error"] = error_msg
+                logger.error(f"❌ Reply listener connection error: {error_msg}")
+                tip = _imap_error_tip(error_msg)
+                if tip:
+                    logger.error(f"   💡 TIP: {tip}")
+                # Unacknowledged messages are still unread and will be picked up again
+                in_flight.clear()
+                stop_event.wait(backoff)
+                backoff = min(backoff * 2, 300)
+            finally:
+                self._stats["connected"] = False
+
+    def _enqueue(self, loop, inbox: asyncio.Queue, reply: Dict[str, Any], stop_event: threading.Event) -> bool:
+        """Block until the bounded queue accepts the reply (backpressure); False if stopping"""
+        future = asyncio.run_coroutine_threadsafe(inbox.put(reply), loop)
+        while True:
+            try:
+                future.result(timeout=1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stop_event.is_set():
+                    future.cancel()
+                    return False
+
+    def _wait_for_mail(self, mailbox, stop_event: threading.Event) -> None:
+        if self._stats["idle_supported"] is not False:
+            try:
+                mailbox.idle.wait(timeout=self.idle_timeout_seconds)
+                self._stats["idle_supported"] = True
+                return
+            except MailboxTaggedResponseError:
+                logger.warning("⚠️ IMAP server does not support IDLE - falling back to polling")
+                self._stats["idle_supported"] = False
+        stop_event.wait(self.idle_timeout_seconds)
+
+    def _apply_acks(self, mailbox, acks: "queue.Queue[tuple]", in_flight: set, attempts: Dict[str, int]) -> None:
+        seen = []
+        while True:
+            try:
+                uid, ok = acks.get_nowait()
+            except queue.Empty:
+                break
+            in_flight.discard(uid)
+            if not ok:
+                attempts[uid] = attempts.get(uid, 0) + 1
+                if attempts[uid] < self.max_attempts:
+                    continue  # Left unread - retried on the next fetch
+                logger.error(f"❌ Giving up on reply UID {uid} after {attempts[uid]} attempts")
+            attempts.pop(uid, None)
+            seen.append(uid)
+        if seen:
+            mailbox.flag(seen, [MailMessageFlags.SEEN], True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "workers": len(self._worker_tasks),
+        }
 
 
 def strip_html_tags(html: str) -> str:
@@ -183,7 +417,7 @@ async def process_user_reply(
     """
     try:
         from backend.config import get_env
-        from backend.server import db, openai_client, tracker
+        from backend.server import db, openai_client, tracker, history_store
         from backend.models.message import EmailReplyConversation
         
         # Get user data
@@ -192,10 +426,9 @@ async def process_user_reply(
             return
         
         # Get the MOST RECENT message for this user (to link the reply)
-        last_message = await db.message_history.find_one(
-            {"email": user_email},
-            {"_id": 0, "id": 1, "message": 1, "subject": 1, "sent_at": 1, "goal_id": 1, "goal_title": 1},
-            sort=[("sent_at", -1)]
+        last_message = await history_store.latest(
+            user_email,
+            projection={"_id": 0, "id": 1, "message": 1, "subject": 1, "sent_at": 1, "goal_id": 1, "goal_title": 1},
         )
         
         # Build simple LLM analysis prompt - focus on feedback extraction
@@ -376,16 +609,15 @@ async def send_immediate_encouragement(
     ========================================================================
     """
     try:
-        from backend.server import openai_client, send_email, db
+        from backend.server import openai_client, send_email, db, history_store
         
         # Get context about what they replied to
         original_message_context = ""
         goal_context = ""
         
         if linked_message_id:
-            original_msg = await db.message_history.find_one(
-                {"id": linked_message_id},
-                {"_id": 0, "subject": 1, "message": 1, "goal_title": 1}
+            original_msg = await history_store.find_by_id(
+                linked_message_id, projection={"_id": 0, "subject": 1, "message": 1, "goal_title": 1}
             )
             if original_msg:
                 original_message_context = f"""
@@ -548,9 +780,8 @@ CRITICAL RULES:
         in_reply_to = None
         references = None
         if linked_message_id:
-            original_msg = await db.message_history.find_one(
-                {"id": linked_message_id},
-                {"_id": 0, "message_id": 1, "subject": 1}
+            original_msg = await history_store.find_by_id(
+                linked_message_id, projection={"_id": 0, "message_id": 1, "subject": 1}
             )
             if original_msg and original_msg.get("message_id"):
                 # Use stored Message-ID or generate one from message ID
@@ -0,0 +1,168 @@
+"""
+Health Monitor
+Checks dependencies in the background so health/readiness probes answer from cached state
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class HealthCheck:
+    """One dependency check and the outcome of its last run"""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[Any]],
+        interval_seconds: float,
+        timeout_seconds: float,
+        critical: bool,
+    ):
+        self.name = name
+        self.fn = fn
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.critical = critical
+        self.status = "unknown"  # unknown -> ok | failing | timeout
+        self.detail: Any = None
+        self.error: Optional[str] = None
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[datetime] = None
+        self.last_ok_at: Optional[datetime] = None
+        self.consecutive_failures = 0
+        self.next_run = 0.0  # monotonic
+        self.task: Optional[asyncio.Task] = None
+
+
+class HealthMonitor:
+    """
+    Runs registered dependency checks on their own cadence in a background task.
+
+    Probes never do I/O themselves: `/livez` only needs the event loop to answer,
+    `/readyz` reads the cached state of the critical checks, and the detailed view
+    reports each check's last status, latency and error. Expensive or quota-bound
+    checks (OpenAI, IMAP login) get long intervals; cheap ones (Mongo ping) short ones.
+    """
+
+    def __init__(self, tick_seconds: float = 2.0):
+        self.tick_seconds = tick_seconds
+        self._checks: Dict[str, HealthCheck] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._started_at: Optional[float] = None
+        self._last_tick: Optional[float] = None
+
+    def register(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[Any]],
+        interval_seconds: float = 30,
+        timeout_seconds: float = 5.0,
+        critical: bool = True,
+    ) -> None:
+        """Add a check; fn raises (or times out) when the dependency is unhealthy"""
+        self._checks[name] = HealthCheck(name, fn, interval_seconds, timeout_seconds, critical)
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._started_at = time.monotonic()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        tasks = [c.task for c in self._checks.values() if c.task is not None and not c.task.done()]
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _loop(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._last_tick = now
+            for check in self._checks.values():
+                # Each check runs in its own task so a slow IMAP login can't delay the Mongo ping
+                if check.next_run <= now and (check.task is None or check.task.done()):
+                    check.task = asyncio.create_task(self._run(check))
+            await asyncio.sleep(self.tick_seconds)
+
+    async def _run(self, check: HealthCheck) -> None:
+        started = time.monotonic()
+        try:
+            check.detail = await asyncio.wait_for(check.fn(), timeout=check.timeout_seconds)
+            check.status = "ok"
+            check.error = None
+        except asyncio.TimeoutError:
+            check.status = "timeout"
+            check.error = f"Timed out after {check.timeout_seconds}s"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            check.status = "failing"
+            check.error = str(e)
+        finished = time.monotonic()
+        check.latency_ms = round((finished - started) * 1000, 1)
+        check.checked_at = datetime.now(timezone.utc)
+        check.next_run = finished + check.interval_seconds
+        if check.status == "ok":
+            if check.consecutive_failures:
+                logger.info(f"✅ Health check '{check.name}' recovered after {check.consecutive_failures} failure(s)")
+            check.consecutive_failures = 0
+            check.last_ok_at = check.checked_at
+        else:
+            check.consecutive_failures += 1
+            if check.consecutive_failures == 1:
+                logger.warning(f"⚠️ Health check '{check.name}' {check.status}: {check.error}")
+
+    async def refresh(self, name: Optional[str] = None) -> None:
+        """Run one check (or all of them) now instead of waiting for their next turn"""
+        checks = [self._checks[name]] if name else list(self._checks.values())
+        await asyncio.gather(*(self._run(check) for check in checks))
+
+    @property
+    def monitor_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def readiness(self) -> Dict[str, Any]:
+        """Ready when every critical check's last run succeeded"""
+        failing = [c.name for c in self._checks.values() if c.critical and c.status != "ok"]
+        degraded = [c.name for c in self._checks.values() if not c.critical and c.status not in ("ok", "unknown")]
+        ready = self.monitor_running and not failing
+        if not ready:
+            status = "unhealthy"
+        elif degraded:
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {"ready": ready, "status": status, "failing": failing, "degraded": degraded}
+
+    def snapshot(self, include_errors: bool = True) -> Dict[str, Any]:
+        """Detailed view: every check with its last status, latency and error"""
+        now = time.monotonic()
+        checks = {}
+        for check in self._checks.values():
+            entry = {
+                "status": check.status,
+                "critical": check.critical,
+                "latency_ms": check.latency_ms,
+                "checked_at": check.checked_at.isoformat() if check.checked_at else None,
+                "last_ok_at": check.last_ok_at.isoformat() if check.last_ok_at else None,
+                "consecutive_failures": check.consecutive_failures,
+                "interval_seconds": check.interval_seconds,
+                "detail": check.detail,
+            }
+            if include_errors:
+                entry["error"] = check.error
+            checks[check.name] = entry
+        return {
+            **self.readiness(),
+            "monitor_running": self.monitor_running,
+            "uptime_seconds": round(now - self._started_at, 1) if self._started_at else 0.0,
+            "last_tick_seconds_ago": round(now - self._last_tick, 1) if self._last_tick else None,
+            "checks": checks,
+        }
@@ -0,0 +1,569 @@
+"""
+Message History Store
+Hot/cold tiers for message history: recent messages stay in message_history, older ones
+are packed into compressed per-user monthly buckets in message_archive
+"""
+import logging
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable, Set
+
+import bson
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "message_archive"
+# Running totals document in the archive collection (has no email, so per-user reads skip it)
+ARCHIVE_TOTALS_ID = "_totals"
+
+# Messages older than this many days are moved to the archive
+HOT_DAYS = 90
+# Hot documents moved per archive pass
+ARCHIVE_BATCH_SIZE = 1000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_RANGE_OPS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+def as_utc(value: Any) -> Optional[datetime]:
+    """A stored timestamp (date or ISO string) as an aware UTC datetime"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def sent_time(msg: Dict[str, Any]) -> datetime:
+    return as_utc(msg.get("sent_at")) or as_utc(msg.get("created_at")) or _EPOCH
+
+
+def _merge_time(msg: Dict[str, Any]) -> datetime:
+    # BSON dates keep milliseconds, so both copies of a message tie at that precision
+    ts = sent_time(msg)
+    return ts.replace(microsecond=ts.microsecond // 1000 * 1000)
+
+
+def _send_day(msg: Dict[str, Any]) -> Optional[str]:
+    # Same rule as the streak pipeline: a date's UTC day, or an ISO string's own date prefix
+    ts = msg.get("sent_at") or msg.get("created_at")
+    if isinstance(ts, datetime):
+        return as_utc(ts).strftime("%Y-%m-%d")
+    if isinstance(ts, str) and len(ts) >= 10:
+        return ts[:10]
+    return None
+
+
+def _message_key(msg: Dict[str, Any]) -> str:
+    return msg.get("id") or str(msg.get("_id"))
+
+
+def pack(messages: List[Dict[str, Any]]) -> Binary:
+    """Messages as zlib-compressed BSON (keeps dates and ObjectIds as they were stored)"""
+    return Binary(zlib.compress(bson.encode({"messages": messages}), 6))
+
+
+def unpack(body: bytes) -> List[Dict[str, Any]]:
+    return bson.decode(zlib.decompress(body))["messages"]
+
+
+def project(msg: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply a top-level inclusion or exclusion projection to an archived message"""
+    if not projection:
+        return msg
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        out = {k: msg[k] for k in included if k in msg}
+        if projection.get("_id", 1) and "_id" in msg:
+            out["_id"] = msg["_id"]
+        return out
+    return {k: v for k, v in msg.items() if projection.get(k, 1)}
+
+
+def matches(msg: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """
+    Evaluate the subset of the query language the history reads use against an archived
+    message: equality, $in/$nin/$ne/$exists, $or, and range operators on timestamps.
+    """
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(msg, sub) for sub in cond):
+                return False
+            continue
+        value = msg.get(key)
+        if not (isinstance(cond, dict) and any(op.startswith("$") for op in cond)):
+            if value != cond:
+                return False
+            continue
+        for op, arg in cond.items():
+            if op == "$exists":
+                ok = (key in msg) == bool(arg)
+            elif op == "$in":
+                ok = value in arg
+            elif op == "$nin":
+                ok = value not in arg
+            elif op == "$ne":
+                ok = value != arg
+            elif op in _RANGE_OPS:
+                left, right = as_utc(value), as_utc(arg)
+                if left is None or right is None:
+                    left, right = value, arg
+                try:
+                    ok = left is not None and _RANGE_OPS[op](left, right)
+                except TypeError:
+                    ok = False
+            else:
+                raise ValueError(f"Unsupported operator {op} in archived history query")
+            if not ok:
+                return False
+    return True
+
+
+def _sort_projection(projection: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # Inclusion projections still need the timestamps the tiers are merged on
+    if projection and any(v for k, v in projection.items() if k != "_id"):
+        return {**projection, "id": 1, "sent_at": 1, "created_at": 1}
+    return projection
+
+
+async def _next(iterator) -> Optional[Dict[str, Any]]:
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class MessageHistoryStore:
+    """
+    Reads and archiving for message history across two tiers.
+
+    New messages are inserted into message_history as before. Once a message is older
+    than `hot_days`, `archive_user()` moves it into the user's bucket for that month in
+    message_archive: one document per user per month holding the messages as compressed
+    BSON, plus the few fields queries filter on (ids, send days, LSH buckets, time
+    bounds). The hot collection - and the index working set - then stays proportional
+    to the hot window rather than to account age, and reading a user's full history
+    costs one document per month.
+
+    Reads here merge both tiers transparently. Recent-message reads whose results all
+    fall inside the hot window never touch the archive; this assumes `hot_days` is not
+    raised after messages have been archived.
+    """
+
+    def __init__(self, db, hot_days: int = HOT_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE):
+        self.db = db
+        self.hot = db.message_history
+        self.archive = db[ARCHIVE_COLLECTION]
+        self.hot_days = hot_days
+        self.batch_size = batch_size
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.now(timezone.utc)) - timedelta(days=self.hot_days)
+
+    @staticmethod
+    def _time_range(start: Optional[datetime], end: Optional[datetime]) -> Dict[str, Any]:
+        """sent_at filter for [start, end]; older rows stored sent_at as an ISO string"""
+        if start is None and end is None:
+            return {}
+        date_range: Dict[str, Any] = {}
+        string_range: Dict[str, Any] = {}
+        if start is not None:
+            date_range["$gte"] = start
+            string_range["$gte"] = start.isoformat()
+        if end is not None:
+            date_range["$lte"] = end
+            string_range["$lte"] = end.isoformat()
+        return {"$or": [{"sent_at": date_range}, {"sent_at": string_range}]}
+
+    # ------------------------------------------------------------------ archive reads
+
+    async def _buckets(
+        self,
+        email: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        newest_first: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        query: Dict[str, Any] = {"email": email}
+        if start is not None:
+            query["last_sent_at"] = {"$gte": as_utc(start)}
+        if end is not None:
+            query["first_sent_at"] = {"$lte": as_utc(end)}
+        # Only one bucket body is held at a time
+        cursor = self.archive.find(query).sort("month", -1 if newest_first else 1).batch_size(1)
+        async for bucket in cursor:
+            yield bucket
+
+    async def _archived(
+        self,
+        email: str,
+        query: Optional[Dict[str, Any]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        newest_first: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Archived messages in time order (buckets are months, so order is global)"""
+        start_utc, end_utc = as_utc(start), as_utc(end)
+        async for bucket in self._buckets(email, start, end, newest_first):
+            messages = unpack(bucket["body"])
+            if not newest_first:
+                messages.reverse()
+            for msg in messages:
+                at = sent_time(msg)
+                if start_utc is not None and at < start_utc:
+                    continue
+                if end_utc is not None and at > end_utc:
+                    continue
+                if query and not matches(msg, query):
+                    continue
+                yield msg
+
+    # ------------------------------------------------------------------ merged reads
+
+    async def recent(
+        self,
+        email: str,
+        limit: int,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """The newest `limit` messages matching `query`, across both tiers"""
+        hot = await self.hot.find(
+            {"email": email, **(query or {})}, _sort_projection(projection)
+        ).sort("sent_at", -1).limit(limit).to_list(limit)
+        if len(hot) == limit and sent_time(hot[-1]) >= self.cutoff():
+            # Everything archived is older than the cutoff, so it can't displace these
+            return [project(msg, projection) for msg in hot]
+
+        floor = sent_time(hot[-1]) if hot and len(hot) == limit else None
+        archived: List[Dict[str, Any]] = []
+        async for msg in self._archived(email, query):
+            if len(archived) >= limit or (floor is not None and sent_time(msg) < floor):
+                break
+            archived.append(msg)
+
+        hot_keys = {_message_key(msg) for msg in hot}
+        merged = hot + [msg for msg in archived if _message_key(msg) not in hot_keys]
+        merged.sort(key=sent_time, reverse=True)
+        return [project(msg, projection) for msg in merged[:limit]]
+
+    async def latest(
+        self,
+        email: str,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """The user's most recent message matching `query`, or None"""
+        found = await self.recent(email, 1, query, projection)
+        return found[0] if found else None
+
+    async def iterate(
+        self,
+        email: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        newest_first: bool = True,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the user's messages in [start, end] from both tiers in time order.
+        Holds one hot cursor batch and one archive bucket at a time.
+        """
+        hot = self.hot.find(
+            {"email": email, **self._time_range(start, end)}, _sort_projection(projection)
+        ).sort("sent_at", -1 if newest_first else 1).batch_size(batch_size).__aiter__()
+        archived = self._archived(email, start=start, end=end, newest_first=newest_first)
+        # Messages past the cutoff may be in both tiers (an interrupted archive pass).
+        # Remember the hot copies still waiting to be archived - the only ones an archived
+        # copy can duplicate - and skip the archived copy, which ties and so comes up next
+        cutoff = self.cutoff()
+        unarchived_keys: Set[str] = set()
+
+        a, b = await _next(hot), await _next(archived)
+        while a is not None or b is not None:
+            take_hot = b is None or (a is not None and (
+                _merge_time(a) >= _merge_time(b) if newest_first else _merge_time(a) <= _merge_time(b)
+            ))
+            msg = a if take_hot else b
+            if take_hot:
+                a = await _next(hot)
+            else:
+                b = await _next(archived)
+            if take_hot:
+                if sent_time(msg) < cutoff:
+                    unarchived_keys.add(_message_key(msg))
+            elif unarchived_keys:
+                key = _message_key(msg)
+                if key in unarchived_keys:
+                    unarchived_keys.discard(key)
+                    continue
+            yield project(msg, projection)
+
+    async def between(
+        self,
+        email: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        newest_first: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """`iterate()` collected into a list (at most `limit` messages)"""
+        messages = []
+        async for msg in self.iterate(email, start, end, projection, newest_first):
+            messages.append(msg)
+            if limit is not None and len(messages) >= limit:
+                break
+        return messages
+
+    async def find_by_id(
+        self,
+        message_id: str,
+        email: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        query: Dict[str, Any] = {"id": message_id}
+        if email:
+            query["email"] = email
+        msg = await self.hot.find_one(query, projection)
+        if msg:
+            return msg
+        bucket_query: Dict[str, Any] = {"ids": message_id}
+        if email:
+            bucket_query["email"] = email
+        bucket = await self.archive.find_one(bucket_query)
+        if bucket:
+            for archived in unpack(bucket["body"]):
+                if archived.get("id") == message_id:
+                    return project(archived, projection)
+        return None
+
+    async def find_by_ids(
+        self,
+        email: str,
+        message_ids: List[str],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """The user's messages with these ids, newest first"""
+        found = await self.hot.find(
+            {"email": email, "id": {"$in": message_ids}}, _sort_projection(projection)
+        ).to_list(None)
+        remaining = set(message_ids) - {msg.get("id") for msg in found}
+        if remaining:
+            async for bucket in self.archive.find({"email": email, "ids": {"$in": list(remaining)}}):
+                found.extend(msg for msg in unpack(bucket["body"]) if msg.get("id") in remaining)
+        found.sort(key=sent_time, reverse=True)
+        return [project(msg, projection) for msg in found]
+
+    async def count(self, email: str) -> int:
+        hot = await self.hot.count_documents({"email": email})
+        archived = await self.archive.find({"email": email}, {"count": 1}).to_list(None)
+        return hot + sum(bucket.get("count", 0) for bucket in archived)
+
+    async def archived_total(self) -> int:
+        """Messages held in the archive across all users (running total, no scan)"""
+        totals = await self.archive.find_one({"_id": ARCHIVE_TOTALS_ID})
+        return (totals or {}).get("messages", 0)
+
+    async def archived_personality_counts(self) -> Dict[Optional[str], int]:
+        """Archived message counts by personality value (same shape as grouping the hot tier)"""
+        rows = await self.archive.aggregate([
+            {"$match": {"email": {"$exists": True}}},
+            {"$unwind": "$personalities"},
+            {"$group": {"_id": "$personalities.value", "total": {"$sum": "$personalities.count"}}},
+        ]).to_list(None)
+        return {row["_id"]: row["total"] for row in rows}
+
+    async def archived_send_days(self, emails: List[str]) -> Dict[str, Set[str]]:
+        """Distinct send days (YYYY-MM-DD) per user from the archive"""
+        days: Dict[str, Set[str]] = defaultdict(set)
+        async for bucket in self.archive.find({"email": {"$in": emails}}, {"email": 1, "send_days": 1}):
+            days[bucket["email"]].update(bucket.get("send_days") or [])
+        return days
+
+    async def archived_messages(self, start: Optional[datetime] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Every user's archived messages sent at or after `start` (for rebuilding derived data).
+        Messages an interrupted archive pass left in the hot tier too are skipped, so a scan
+        of both tiers sees each message once.
+        """
+        query: Dict[str, Any] = {"email": {"$exists": True}}
+        start_utc = as_utc(start)
+        if start_utc is not None:
+            query["last_sent_at"] = {"$gte": start_utc}
+        # Only one bucket body is held at a time
+        async for bucket in self.archive.find(query).batch_size(1):
+            messages = unpack(bucket["body"])
+            oids = [msg["_id"] for msg in messages if "_id" in msg]
+            still_hot = set(await self.hot.distinct("_id", {"_id": {"$in": oids}})) if oids else set()
+            for msg in messages:
+                if msg.get("_id") in still_hot:
+                    continue
+                if start_utc is not None and sent_time(msg) < start_utc:
+                    continue
+                yield msg
+
+    async def archived_signatures(self, email: str, lsh_buckets: List[str]) -> List[Dict[str, Any]]:
+        """{id, minhash} of archived messages sharing an LSH bucket with `lsh_buckets`"""
+        wanted = set(lsh_buckets)
+        candidates = []
+        async for bucket in self.archive.find({"email": email, "lsh_buckets": {"$in": lsh_buckets}}, {"body": 1}):
+            for msg in unpack(bucket["body"]):
+                if wanted.intersection(msg.get("lsh_buckets") or []):
+                    candidates.append({"id": msg.get("id"), "minhash": msg.get("minhash")})
+        return candidates
+
+    # ------------------------------------------------------------------ writes
+
+    async def update_by_id(self, message_id: str, fields: Dict[str, Any]) -> bool:
+        """$set fields on a message in whichever tier holds it"""
+        result = await self.hot.update_one({"id": message_id}, {"$set": fields})
+        if result.matched_count:
+            return True
+        bucket = await self.archive.find_one({"ids": message_id}, {"email": 1, "month": 1})
+        if not bucket:
+            return False
+
+        def apply(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            for msg in messages:
+                if msg.get("id") == message_id:
+                    msg.update(fields)
+            return messages
+
+        await self._rewrite_bucket(bucket["email"], bucket["month"], apply)
+        return True
+
+    async def delete_user(self, email: str) -> None:
+        await self.hot.delete_many({"email": email})
+        archived = await self.archive.find({"email": email}, {"count": 1}).to_list(None)
+        await self.archive.delete_many({"email": email})
+        await self._add_to_total(-sum(bucket.get("count", 0) for bucket in archived))
+
+    # ------------------------------------------------------------------ archiving
+
+    def _bucket_doc(self, email: str, month: str, messages: List[Dict[str, Any]], rev: int) -> Dict[str, Any]:
+        messages.sort(key=sent_time, reverse=True)
+        personalities: Dict[str, int] = defaultdict(int)
+        for msg in messages:
+            personality = msg.get("personality")
+            personalities[personality.get("value") if isinstance(personality, dict) else None] += 1
+        return {
+            "email": email,
+            "month": month,
+            "rev": rev,
+            "count": len(messages),
+            "first_sent_at": sent_time(messages[-1]),
+            "last_sent_at": sent_time(messages[0]),
+            "ids": [msg["id"] for msg in messages if msg.get("id")],
+            "send_days": sorted({day for day in map(_send_day, messages) if day}),
+            "lsh_buckets": sorted({b for msg in messages for b in msg.get("lsh_buckets") or []}),
+            "personalities": [{"value": value, "count": count} for value, count in personalities.items()],
+            "body": pack(messages),
+            "updated_at": datetime.now(timezone.utc),
+        }
+
+    async def _add_to_total(self, delta: int) -> None:
+        if delta:
+            await self.archive.update_one({"_id": ARCHIVE_TOTALS_ID}, {"$inc": {"messages": delta}}, upsert=True)
+
+    async def _rewrite_bucket(
+        self,
+        email: str,
+        month: str,
+        mutate: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+        attempts: int = 5,
+    ) -> None:
+        """Read-modify-write one bucket; `rev` guards against a concurrent rewrite"""
+        bucket_id = f"{email}|{month}"
+        for _ in range(attempts):
+            bucket = await self.archive.find_one({"_id": bucket_id})
+            messages = mutate(unpack(bucket["body"]) if bucket else [])
+            if not messages:
+                return
+            if bucket is None:
+                try:
+                    await self.archive.insert_one({"_id": bucket_id, **self._bucket_doc(email, month, messages, 1)})
+                except DuplicateKeyError:
+                    continue
+                await self._add_to_total(len(messages))
+                return
+            doc = self._bucket_doc(email, month, messages, bucket.get("rev", 0) + 1)
+            result = await self.archive.replace_one({"_id": bucket_id, "rev": bucket.get("rev", 0)}, doc)
+            if result.matched_count:
+                await self._add_to_total(doc["count"] - bucket.get("count", 0))
+                return
+        raise RuntimeError(f"Archive bucket {bucket_id} changed during {attempts} rewrite attempts")
+
+    async def archive_user(self, email: str, now: Optional[datetime] = None) -> int:
+        """
+        Move the user's messages older than the hot window into monthly buckets; returns
+        how many moved. Buckets are written before the hot documents are deleted and
+        merge by message id, so an interrupted run is finished by the next one.
+
+        A hot document is only deleted if it is still exactly what was read: one changed
+        in between (e.g. feedback via update_by_id) stays hot and a later pass merges
+        its new version over the archived copy.
+        """
+        cutoff = self.cutoff(now)
+        query = {"email": email, "$or": [
+            {"sent_at": {"$lt": cutoff}},
+            {"sent_at": {"$lt": cutoff.isoformat()}},
+        ]}
+        moved = 0
+        while True:
+            docs = await self.hot.find(query).sort("sent_at", 1).limit(self.batch_size).to_list(self.batch_size)
+            if not docs:
+                break
+            by_month: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            for doc in docs:
+                by_month[sent_time(doc).strftime("%Y-%m")].append(doc)
+            for month, incoming in by_month.items():
+                def merge(existing: List[Dict[str, Any]], incoming=incoming) -> List[Dict[str, Any]]:
+                    by_key = {_message_key(msg): msg for msg in existing}
+                    by_key.update((_message_key(msg), msg) for msg in incoming)
+                    return list(by_key.values())
+                await self._rewrite_bucket(email, month, merge)
+            result = await self.hot.delete_many({"$or": [
+                {"_id": doc["_id"], "$expr": {"$eq": ["$$ROOT", {"$literal": doc}]}} for doc in docs
+            ]})
+            moved += result.deleted_count
+            if len(docs) < self.batch_size or not result.deleted_count:
+                break
+        return moved
+
+    async def archive_all(self, now: Optional[datetime] = None, page_size: int = 500) -> Dict[str, Any]:
+        """Archive every user's cold messages (keyset over users by email)"""
+        users = moved = 0
+        last_email = None
+        while True:
+            query = {"email": {"$gt": last_email}} if last_email else {}
+            page = await self.db.users.find(query, {"_id": 0, "email": 1}).sort("email", 1).limit(page_size).to_list(page_size)
+            if not page:
+                break
+            for user in page:
+                try:
+                    count = await self.archive_user(user["email"], now)
+                except Exception as e:
+                    logger.error(f"❌ Could not archive history for {user['email']}: {e}")
+                    continue
+                if count:
+                    users += 1
+                    moved += count
+            last_email = page[-1]["email"]
+        if moved:
+            logger.info(f"🗄️ Archived {moved} message(s) for {users} user(s)")
+        return {"users": users, "messages_archived": moved}
@@ -0,0 +1,261 @@
+"""
+Index Registry
+Every index the app's queries rely on, declared in one place, plus telemetry retention
+"""
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple, Mapping
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+Keys = List[Tuple[str, int]]
+
+
+class IndexSpec:
+    """One index: collection, key pattern, create_index options and why it exists"""
+
+    def __init__(self, collection: str, keys: Any, purpose: str = "", **options):
+        self.collection = collection
+        self.keys: Keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        self.purpose = purpose
+        self.options = options
+
+    def describe(self) -> str:
+        return f"{self.collection}(" + ", ".join(f"{k}:{d}" for k, d in self.keys) + ")"
+
+
+INDEXES: List[IndexSpec] = [
+    # Users
+    IndexSpec("users", "email", "primary key for every user lookup", unique=True),
+    IndexSpec("users", "clerk_user_id", "Clerk user ID lookups"),
+    IndexSpec("users", "next_send_at", "primary email dispatch queue"),
+    IndexSpec("users", "pregen_after", "primary-email pre-generation queue", sparse=True),
+    IndexSpec("user_stats", "email", "materialized engagement stats", unique=True),
+    IndexSpec("user_stats", [("engagement_rate", 1), ("email", 1)], "user segments by engagement level"),
+    IndexSpec("user_stats", [("avg_rating", 1), ("email", 1)], "user segments by minimum rating"),
+    # Message history
+    IndexSpec("message_history", "email", "per-user history"),
+    IndexSpec("message_history", [("email", 1), ("sent_at", -1)], "recent messages, exports"),
+    IndexSpec("message_history", "id", "feedback / favorites by message id"),
+    IndexSpec("message_history", [("email", 1), ("goal_id", 1), ("sent_at", -1)], "last message of a goal"),
+    IndexSpec("message_history", [("email", 1), ("lsh_buckets", 1)], "near-duplicate candidates"),
+    IndexSpec("message_archive", [("email", 1), ("month", -1)], "a user's archived months"),
+    IndexSpec("message_archive", "ids", "archived message by id"),
+    IndexSpec("message_archive", [("email", 1), ("lsh_buckets", 1)], "archived near-duplicate candidates"),
+    IndexSpec("message_feedback", "email", "per-user feedback"),
+    IndexSpec("message_feedback", "message_id", "feedback for a message"),
+    # Email logs
+    IndexSpec("email_logs", [("email", 1), ("sent_at", -1)], "per-user delivery history"),
+    IndexSpec("email_logs", [("sent_at", 1), ("personality", 1), ("status", 1)], "window scans by personality"),
+    # Goals
+    IndexSpec("goals", "id", "goal lookups"),
+    IndexSpec("goals", [("user_email", 1), ("active", 1), ("category", 1)], "a user's goals"),
+    IndexSpec("goals", [("active", 1), ("id", 1)], "active goal reconciliation"),
+    IndexSpec("goal_messages", "id", "goal message lookups and claims"),
+    IndexSpec("goal_messages", [("goal_id", 1), ("schedule_id", 1), ("status", 1)], "per-schedule messages"),
+    IndexSpec("goal_messages", [("status", 1), ("scheduled_for", 1)], "due goal message sweep"),
+    IndexSpec("goal_messages", [("goal_id", 1), ("status", 1), ("scheduled_for", 1)], "a goal's upcoming messages"),
+    IndexSpec("goal_messages", [("status", 1), ("generate_after", 1)], "goal pre-generation queue"),
+    IndexSpec("send_counters", "expires_at", "daily send counters expire after their day", expireAfterSeconds=0),
+    # Personalities and research
+    IndexSpec("custom_personality_conversations", "email", "a user's conversations"),
+    IndexSpec("custom_personality_conversations", [("email", 1), ("status", 1)], "a user's open conversations"),
+    IndexSpec("custom_personality_conversations", "id", "conversation lookups"),
+    IndexSpec("custom_personality_profiles", "email", "a user's profiles"),
+    IndexSpec("custom_personality_profiles", [("email", 1), ("status", 1)], "a user's active profiles"),
+    IndexSpec("custom_personality_profiles", "id", "profile lookups"),
+    IndexSpec("persona_research", "persona_id", "persona research cache lookups"),
+    IndexSpec("research_cache", "expires_at", "stale research entries expire", expireAfterSeconds=0),
+    IndexSpec("achievements", "id", "achievement lookups"),
+    # Replies
+    IndexSpec("email_reply_conversations", [("user_email", 1), ("reply_timestamp", -1)], "a user's replies"),
+    IndexSpec("email_reply_conversations", [("user_email", 1), ("processed", 1)], "unprocessed replies"),
+    IndexSpec("email_reply_conversations", [("urgency_level", 1), ("immediate_response_sent", 1)], "urgent replies"),
+    # Version history
+    IndexSpec("schedule_history", [("user_email", 1), ("version", -1)], "latest schedule version"),
+    IndexSpec("schedule_history", [("user_email", 1), ("is_active", 1)], "active schedule version"),
+    IndexSpec("personality_history", [("user_email", 1), ("version", -1)], "latest personality version"),
+    IndexSpec("personality_history", [("user_email", 1), ("is_active", 1)], "active personality version"),
+    IndexSpec("profile_history", [("user_email", 1), ("version", -1)], "latest profile version"),
+    IndexSpec("profile_history", [("user_email", 1), ("is_active", 1)], "active profile version"),
+    # Telemetry and the unified log timeline
+    IndexSpec("activity_logs", [("timestamp", -1), ("_id", -1)], "unified log timeline"),
+    IndexSpec("activity_logs", [("user_email", 1), ("timestamp", -1), ("_id", -1)], "a user's activity"),
+    IndexSpec("system_events", [("timestamp", -1), ("_id", -1)], "unified log timeline"),
+    IndexSpec("api_analytics", [("timestamp", -1), ("_id", -1)], "unified log timeline"),
+    IndexSpec("api_analytics", [("user_email", 1), ("timestamp", -1), ("_id", -1)], "a user's API calls"),
+    IndexSpec("analytics_rollups", [("granularity", 1), ("bucket_start", 1)], "dashboard buckets"),
+    IndexSpec("analytics_rollups", "expires_at", "hour buckets expire", expireAfterSeconds=0),
+    # Background jobs
+    IndexSpec("broadcast_jobs", "id", "broadcast job lookups", unique=True),
+    IndexSpec("broadcast_jobs", [("status", 1), ("created_at", -1)], "resumable broadcasts"),
+    IndexSpec("streak_jobs", "id", "streak job lookups", unique=True),
+    IndexSpec("streak_jobs", [("status", 1), ("created_at", -1)], "resumable streak jobs"),
+]
+
+# Telemetry collection -> (timestamp field, env var with the days to keep). Retention is
+# opt-in: unset or 0 keeps the collection forever. The TTL index is a plain {field: 1}
+# index, so it also serves "newest first" reads on these collections.
+TELEMETRY_RETENTION: Dict[str, Tuple[str, str]] = {
+    "api_analytics": ("timestamp", "API_ANALYTICS_RETENTION_DAYS"),
+    "system_events": ("timestamp", "SYSTEM_EVENTS_RETENTION_DAYS"),
+    "page_views": ("timestamp", "PAGE_VIEWS_RETENTION_DAYS"),
+}
+RETENTION_INDEX_NAME = "retention_ttl"
+
+
+def _key_pattern(keys: Any) -> List[Tuple[str, Any]]:
+    """Key pattern for comparison: numeric directions as ints (1.0 == 1), others ("text", "2dsphere") as-is"""
+    return [(k, int(d) if isinstance(d, (int, float)) else d) for k, d in keys]
+
+
+def retention_from_env(environ: Optional[Mapping[str, str]] = None) -> Dict[str, int]:
+    """Days to keep each telemetry collection, from its *_RETENTION_DAYS variable (0 = forever)"""
+    environ = os.environ if environ is None else environ
+    return {collection: int(environ.get(var) or 0) for collection, (_, var) in TELEMETRY_RETENTION.items()}
+
+
+def critical_queries(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Hot-path queries whose plans must use an index (checked with explain() at startup)"""
+    now = now or datetime.now(timezone.utc)
+    return [
+        {"name": "user by email", "collection": "users", "filter": {"email": "probe@example.com"}},
+        {"name": "due primary emails", "collection": "users",
+         "filter": {"next_send_at": {"$lte": now}, "active": True, "schedule.paused": {"$ne": True}},
+         "sort": [("next_send_at", 1)]},
+        {"name": "due goal messages", "collection": "goal_messages",
+         "filter": {"status": "pending", "scheduled_for": {"$lte": now}}},
+        {"name": "goal message by id", "collection": "goal_messages", "filter": {"id": "probe"}},
+        {"name": "goal by id", "collection": "goals", "filter": {"id": "probe"}},
+        {"name": "recent history", "collection": "message_history",
+         "filter": {"email": "probe@example.com"}, "sort": [("sent_at", -1)]},
+        {"name": "archived months", "collection": "message_archive",
+         "filter": {"email": "probe@example.com"}, "sort": [("month", -1)]},
+        {"name": "persona research", "collection": "persona_research", "filter": {"persona_id": "probe"}},
+        {"name": "engagement segment", "collection": "user_stats",
+         "filter": {"engagement_rate": {"$gte": 50}}, "sort": [("email", 1)]},
+        {"name": "activity timeline", "collection": "activity_logs", "filter": {},
+         "sort": [("timestamp", -1), ("_id", -1)]},
+        {"name": "system event timeline", "collection": "system_events", "filter": {},
+         "sort": [("timestamp", -1), ("_id", -1)]},
+        {"name": "api timeline", "collection": "api_analytics", "filter": {},
+         "sort": [("timestamp", -1), ("_id", -1)]},
+    ]
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """Every stage name in an explain() plan tree (classic and slot-based engine layouts)"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+class IndexRegistry:
+    """
+    Creates the declared indexes and TTL retention indexes, reports indexes that are
+    missing, and explain()s the critical queries to catch collection scans.
+
+    Each index is created on its own so one failure (e.g. a unique index over existing
+    duplicates) is reported without skipping the rest.
+    """
+
+    def __init__(self, db, specs: Optional[List[IndexSpec]] = None, retention_days: Optional[Dict[str, int]] = None):
+        self.db = db
+        self.specs = specs if specs is not None else INDEXES
+        # collection -> days to keep (0 or less disables expiry)
+        self.retention_days = {c: 0 for c in TELEMETRY_RETENTION}
+        self.retention_days.update(retention_days or {})
+
+    async def ensure(self) -> Dict[str, Any]:
+        """Create every declared index and apply telemetry retention; returns failures"""
+        failed = []
+        for spec in self.specs:
+            try:
+                await self.db[spec.collection].create_index(spec.keys, **spec.options)
+            except Exception as e:
+                failed.append({"index": spec.describe(), "error": str(e)})
+                logger.warning(f"⚠️ Could not create index {spec.describe()}: {e}")
+        for collection, days in self.retention_days.items():
+            try:
+                await self._apply_retention(collection, days)
+            except Exception as e:
+                failed.append({"index": f"{collection}.{RETENTION_INDEX_NAME}", "error": str(e)})
+                logger.warning(f"⚠️ Could not apply retention to {collection}: {e}")
+        logger.info(f"✅ Database indexes ensured ({len(self.specs) - len(failed)}/{len(self.specs)} ok)")
+        return {"declared": len(self.specs), "failed": failed}
+
+    async def _apply_retention(self, collection: str, days: int) -> None:
+        field = TELEMETRY_RETENTION.get(collection, ("timestamp", ""))[0]
+        existing = (await self.db[collection].index_information()).get(RETENTION_INDEX_NAME)
+        if days <= 0:
+            if existing:
+                await self.db[collection].drop_index(RETENTION_INDEX_NAME)
+                logger.info(f"🗑️ Retention disabled for {collection} (TTL index dropped)")
+            return
+        seconds = int(days * 86400)
+        if existing is None:
+            await self.db[collection].create_index([(field, 1)], name=RETENTION_INDEX_NAME, expireAfterSeconds=seconds)
+        elif existing.get("expireAfterSeconds") != seconds:
+            # Changing a TTL in place - no rebuild needed
+            await self.db.command("collMod", collection, index={"name": RETENTION_INDEX_NAME, "expireAfterSeconds": seconds})
+            logger.info(f"🕒 Retention for {collection} changed to {days} day(s)")
+
+    async def missing(self) -> List[str]:
+        """Declared indexes that don't exist (by key pattern)"""
+        missing = []
+        existing_by_collection: Dict[str, List[Keys]] = {}
+        for spec in self.specs:
+            if spec.collection not in existing_by_collection:
+                try:
+                    info = await self.db[spec.collection].index_information()
+                except OperationFailure:
+                    info = {}
+                existing_by_collection[spec.collection] = [_key_pattern(index["key"]) for index in info.values()]
+            if _key_pattern(spec.keys) not in existing_by_collection[spec.collection]:
+                missing.append(spec.describe())
+        return missing
+
+    async def check_query_plans(self, queries: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """explain() each critical query; warn about any that would scan a whole collection"""
+        results = []
+        for query in queries if queries is not None else critical_queries():
+            cursor = self.db[query["collection"]].find(query["filter"])
+            if query.get("sort"):
+                cursor = cursor.sort(query["sort"])
+            try:
+                plan = await cursor.limit(1).explain()
+            except Exception as e:
+                results.append({"name": query["name"], "status": "error", "error": str(e)})
+                continue
+            stages = _plan_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+            collscan = "COLLSCAN" in stages
+            if collscan:
+                logger.warning(f"⚠️ Query '{query['name']}' on {query['collection']} uses a collection scan")
+            results.append({
+                "name": query["name"],
+                "collection": query["collection"],
+                "status": "collscan" if collscan else "ok",
+                "stages": stages,
+            })
+        return results
+
+    async def report(self) -> Dict[str, Any]:
+        """Missing indexes, retention settings and query plan checks (admin view)"""
+        plans = await self.check_query_plans()
+        return {
+            "declared": len(self.specs),
+            "missing": await self.missing(),
+            "retention_days": self.retention_days,
+            "query_plans": plans,
+            "collection_scans": [p["name"] for p in plans if p["status"] == "collscan"],
+        }
@@ -0,0 +1,261 @@
+"""
+Job Runner
+Resumable, leased background jobs that walk every active user page by page
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+# Job states persisted in each engine's jobs collection
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+class LeasedJobRunner:
+    """
+    Base for admin jobs over all active users (broadcasts, streak recomputes).
+
+    Users are paged with a keyset cursor on the unique `email` index. After each page
+    the job document is checkpointed with the last email processed, so a job
+    interrupted by a restart resumes from there (at most one page is redone). Given a
+    LeaseManager, each job is leased so only one worker across the fleet runs it; a
+    heartbeat renews the lease while a page is in progress, so a slow page can't
+    outlive it.
+
+    Subclasses set `jobs_collection`, `lease_prefix` and `job_label`, and implement
+    `process_page`, which does the work for one page and returns the counters to add
+    to the job document.
+    """
+
+    jobs_collection: str
+    lease_prefix: str
+    job_label: str  # log prefix, e.g. "📢 Broadcast"
+    # Fields read for each user in a page, and fields left out of status responses
+    user_projection: Dict[str, int] = {"_id": 0, "email": 1}
+    status_projection: Dict[str, int] = {"_id": 0}
+
+    def __init__(self, db, batch_size: int, leases=None, lease_ttl_seconds: int = 120):
+        self.db = db
+        self.batch_size = batch_size
+        # Optional LeaseManager - one lease per job so only one worker runs it
+        self.leases = leases
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def jobs(self):
+        return self.db[self.jobs_collection]
+
+    async def process_page(self, job: Dict[str, Any], users: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Do the job's work for one page of users; returns counters to $inc on the job"""
+        raise NotImplementedError
+
+    def completion_summary(self, job: Dict[str, Any]) -> str:
+        """Extra detail for the completion log line, e.g. '(12 changed)'"""
+        return ""
+
+    async def _create_job(self, fields: Dict[str, Any], created_by: str) -> Dict[str, Any]:
+        """Persist a new job with the engine's own `fields` and start it in the background"""
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": str(uuid.uuid4()),
+            **fields,
+            "status": "queued",
+            "created_by": created_by,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "last_email": None,  # keyset checkpoint
+            "total_estimated": await self.db.users.count_documents({"active": True}),
+            "processed": 0,
+            "error": None,
+        }
+        await self.jobs.insert_one(job.copy())
+        self.start(job["id"])
+        return job
+
+    def start(self, job_id: str) -> None:
+        """Spawn the worker task for a job (no-op if it's already running in this process)"""
+        task = self._tasks.get(job_id)
+        if task and not task.done():
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _t: self._tasks.pop(job_id, None))
+
+    async def resume_incomplete_jobs(self) -> int:
+        """Restart queued/running jobs left behind by a previous process"""
+        jobs = await self.jobs.find(
+            {"status": {"$in": ACTIVE_STATUSES}},
+            {"_id": 0, "id": 1, "processed": 1}
+        ).to_list(None)
+        for job in jobs:
+            logger.info(f"{self.job_label} {job['id']}: resuming from checkpoint ({job.get('processed', 0)} already processed)")
+            self.start(job["id"])
+        return len(jobs)
+
+    async def cancel(self, job_id: str) -> bool:
+        """Mark a job cancelled; the worker stops after its current page"""
+        result = await self.jobs.update_one(
+            {"id": job_id, "status": {"$in": ACTIVE_STATUSES}},
+            {"$set": {"status": "cancelled", "updated_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count > 0
+
+    async def shutdown(self) -> None:
+        """Stop local workers; their jobs stay 'running' and resume on next startup"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _lease_name(self, job_id: str) -> str:
+        return f"{self.lease_prefix}:{job_id}"
+
+    async def _hold_lease(self, job_id: str) -> bool:
+        if self.leases is None:
+            return True
+        return await self.leases.acquire(self._lease_name(job_id), self.lease_ttl_seconds)
+
+    async def _heartbeat(self, job_id: str, worker: asyncio.Task) -> None:
+        """Renew the job lease every third of its TTL; stop the worker if it was taken over"""
+        interval = max(self.lease_ttl_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                held = await self._hold_lease(job_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not renew lease for {self.job_label.lower()} {job_id}: {e}")
+                continue
+            if not held:
+                logger.warning(f"{self.job_label} {job_id} lost its lease - stopping (another worker will resume)")
+                worker.cancel()
+                return
+
+    async def _run(self, job_id: str) -> None:
+        if not await self._hold_lease(job_id):
+            logger.info(f"{self.job_label} {job_id} is being run by another worker")
+            return
+        heartbeat = None
+        if self.leases is not None:
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, asyncio.current_task()))
+        try:
+            await self._run_leased(job_id)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            if self.leases is not None:
+                try:
+                    await self.leases.release(self._lease_name(job_id))
+                except Exception:
+                    pass
+
+    async def _run_leased(self, job_id: str) -> None:
+        job = await self.jobs.find_one({"id": job_id}, {"_id": 0})
+        if not job or job.get("status") not in ACTIVE_STATUSES:
+            return
+
+        now = datetime.now(timezone.utc)
+        await self.jobs.update_one(
+            {"id": job_id},
+            {"$set": {"status": "running", "updated_at": now, "started_at": job.get("started_at") or now}}
+        )
+        last_email: Optional[str] = job.get("last_email")
+        logger.info(f"{self.job_label} {job_id} running (resume after: {last_email or 'start'})")
+
+        try:
+            while True:
+                if not await self._hold_lease(job_id):
+                    logger.warning(f"{self.job_label} {job_id} lost its lease - stopping (another worker will resume)")
+                    return
+                current = await self.jobs.find_one({"id": job_id}, {"_id": 0, "status": 1})
+                if not current or current.get("status") != "running":
+                    logger.info(f"{self.job_label} {job_id} stopped (status: {current.get('status') if current else 'missing'})")
+                    return
+
+                query: Dict[str, Any] = {"active": True}
+                if last_email is not None:
+                    query["email"] = {"$gt": last_email}
+                users = await self.db.users.find(
+                    query, self.user_projection
+                ).sort("email", 1).limit(self.batch_size).to_list(self.batch_size)
+                if not users:
+                    break
+
+                counters = await self.process_page(job, users)
+                last_email = users[-1]["email"]
+                await self.jobs.update_one(
+                    {"id": job_id},
+                    {
+                        "$set": {"last_email": last_email, "updated_at": datetime.now(timezone.utc)},
+                        "$inc": {"processed": len(users), **counters},
+                    }
+                )
+
+            await self.jobs.update_one(
+                {"id": job_id, "status": "running"},
+                {"$set": {"status": "completed", "finished_at": datetime.now(timezone.utc), "updated_at": datetime.now(timezone.utc)}}
+            )
+            final = await self.get_status(job_id)
+            logger.info(
+                f"✅ {self.job_label} {job_id} completed: {final['processed']} users "
+                f"{self.completion_summary(final)} in {final['elapsed_seconds']}s"
+            )
+        except asyncio.CancelledError:
+            # Process is shutting down (or the lease was lost) - leave status as running so it resumes from checkpoint
+            raise
+        except Exception as e:
+            logger.error(f"❌ {self.job_label} {job_id} failed: {e}", exc_info=True)
+            await self.jobs.update_one(
+                {"id": job_id},
+                {"$set": {"status": "failed", "error": str(e), "updated_at": datetime.now(timezone.utc)}}
+            )
+
+    async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job progress with throughput (users/sec) and ETA"""
+        job = await self.jobs.find_one({"id": job_id}, self.status_projection)
+        if not job:
+            return None
+        return self._with_progress(job)
+
+    async def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        jobs = await self.jobs.find(
+            {}, self.status_projection
+        ).sort("created_at", -1).limit(limit).to_list(limit)
+        return [self._with_progress(job) for job in jobs]
+
+    def _with_progress(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        started_at = job.get("started_at")
+        end = job.get("finished_at") or datetime.now(timezone.utc)
+        elapsed = 0.0
+        if isinstance(started_at, datetime):
+            if started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            if end.tzinfo is None:
+                end = end.replace(tzinfo=timezone.utc)
+            elapsed = max((end - started_at).total_seconds(), 0.0)
+
+        processed = job.get("processed", 0)
+        total = max(job.get("total_estimated", 0), processed)
+        throughput = processed / elapsed if elapsed > 0 else 0.0
+        remaining = total - processed
+        eta = round(remaining / throughput, 1) if throughput > 0 and job.get("status") == "running" else None
+
+        for key in ("created_at", "updated_at", "started_at", "finished_at"):
+            if isinstance(job.get(key), datetime):
+                job[key] = job[key].isoformat()
+
+        job.update({
+            "total_estimated": total,
+            "progress_percent": round(processed / total * 100, 1) if total else 100.0,
+            "elapsed_seconds": round(elapsed, 1),
+            "throughput_per_second": round(throughput, 2),
+            "eta_seconds": eta,
+            "running_in_this_process": job["id"] in self._tasks,
+        })
+        return job
@@ -0,0 +1,92 @@
+"""
+Lease Manager
+Mongo-backed leases so several API workers/containers can share one database
+without double-running singleton jobs
+"""
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from functools import wraps
+from typing import Optional, Callable, Awaitable, Any, Dict, List
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Lease held by the worker that runs scheduler singletons (reply polling, dispatch ticks, sweeps)
+LEADER_LEASE = "scheduler_leader"
+
+
+class LeaseManager:
+    """
+    Time-bounded exclusive leases stored in db.leases (one document per lease name).
+
+    A lease is acquired or renewed with a single upsert that only matches when the
+    lease is free, expired, or already ours; losing the race surfaces as a duplicate
+    key error on the lease _id. Holders must renew before `ttl` runs out.
+    """
+
+    def __init__(self, db, owner_id: Optional[str] = None):
+        self.db = db
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self, name: str, ttl_seconds: int = 90) -> bool:
+        """Acquire or renew `name` for ttl_seconds; returns True if this process now holds it"""
+        now = datetime.now(timezone.utc)
+        try:
+            doc = await self.db.leases.find_one_and_update(
+                {
+                    "_id": name,
+                    "$or": [
+                        {"owner": self.owner_id},
+                        {"expires_at": {"$lt": now}},
+                    ],
+                },
+                {
+                    "$set": {"owner": self.owner_id, "expires_at": now + timedelta(seconds=ttl_seconds), "renewed_at": now},
+                    "$setOnInsert": {"acquired_at": now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Lease exists, is unexpired and belongs to someone else
+            return False
+        return bool(doc) and doc.get("owner") == self.owner_id
+
+    async def release(self, name: str) -> None:
+        """Give up a lease early (e.g. on shutdown) so another worker can take over immediately"""
+        await self.db.leases.delete_one({"_id": name, "owner": self.owner_id})
+
+    async def holder(self, name: str) -> Optional[Dict[str, Any]]:
+        return await self.db.leases.find_one({"_id": name})
+
+    async def list_leases(self) -> List[Dict[str, Any]]:
+        leases = await self.db.leases.find({}).to_list(None)
+        now = datetime.now(timezone.utc)
+        for lease in leases:
+            expires_at = lease.get("expires_at")
+            if isinstance(expires_at, datetime) and expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            lease["name"] = lease.pop("_id")
+            lease["held_by_me"] = lease.get("owner") == self.owner_id
+            lease["expired"] = bool(expires_at and expires_at < now)
+        return leases
+
+    def singleton(self, name: str = LEADER_LEASE, ttl_seconds: int = 90):
+        """
+        Decorator for scheduler jobs that must run on only one worker.
+        The job runs only if this process holds (or can take) the lease.
+        """
+        def decorator(func: Callable[..., Awaitable[Any]]):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not await self.acquire(name, ttl_seconds):
+                    logger.debug(f"⏭️ Skipping {func.__name__} - lease '{name}' held by another worker")
+                    return None
+                return await func(*args, **kwargs)
+            return wrapper
+        return decorator
@@ -0,0 +1,210 @@
+"""
+Buffered Log Sink
+Batches telemetry/log documents into insert_many calls off the request path
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Deque, List, Callable, Awaitable
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# What to do when a collection's buffer is full (Mongo slow or down):
+#   drop_oldest - evict the oldest buffered doc to make room (telemetry: newest is most useful)
+#   drop_newest - discard the incoming doc
+#   block       - wait up to block_timeout for space, then drop the incoming doc
+DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class BufferedLogSink:
+    """
+    In-process write-behind buffer for append-only collections.
+
+    Writers call `write(collection, doc)`, which only appends to a per-collection
+    buffer. A single background task flushes buffers with insert_many when a buffer
+    reaches `batch_size` or every `flush_interval` seconds. Failed batches are put
+    back at the front of the buffer (subject to the drop policy) and retried on the
+    next flush. Listeners registered with `add_listener` are handed every batch once
+    it has been written (e.g. to maintain rollups).
+    """
+
+    def __init__(
+        self,
+        db,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_buffer: int = 20000,
+        block_timeout: float = 2.0,
+        default_policy: str = "drop_oldest",
+        policies: Optional[Dict[str, str]] = None,
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.block_timeout = block_timeout
+        self.default_policy = default_policy
+        self.policies = policies or {}
+
+        self._buffers: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._listeners: Dict[str, List[Callable[[List[Dict[str, Any]]], Awaitable[None]]]] = {}
+        self._wake = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._stats: Dict[str, Any] = {
+            "enqueued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "flush_batches": 0,
+            "flush_errors": 0,
+            "last_flush_ms": None,
+            "last_error": None,
+        }
+
+    def start(self) -> None:
+        """Start the background flusher (idempotent)"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._flush_loop())
+
+    def add_listener(self, collection: str, fn: Callable[[List[Dict[str, Any]]], Awaitable[None]]) -> None:
+        """Call fn(docs) after documents for `collection` have been written"""
+        self._listeners.setdefault(collection, []).append(fn)
+
+    async def _notify(self, collection: str, docs: List[Dict[str, Any]]) -> None:
+        for fn in self._listeners.get(collection, []):
+            try:
+                await fn(docs)
+            except Exception as e:
+                logger.warning(f"⚠️ Log sink listener for {collection} failed: {e}")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _policy(self, collection: str) -> str:
+        return self.policies.get(collection, self.default_policy)
+
+    async def write(self, collection: str, doc: Dict[str, Any]) -> None:
+        """Buffer one document for `collection`; falls back to insert_one if the flusher isn't running"""
+        if not self.running:
+            await self.db[collection].insert_one(doc)
+            await self._notify(collection, [doc])
+            return
+
+        buffer = self._buffers.setdefault(collection, deque())
+        if len(buffer) >= self.max_buffer:
+            policy = self._policy(collection)
+            if policy == "drop_oldest":
+                buffer.popleft()
+                self._stats["dropped"] += 1
+            elif policy == "block":
+                self._wake.set()
+                try:
+                    async with self._space:
+                        await asyncio.wait_for(
+                            self._space.wait_for(lambda: len(buffer) < self.max_buffer),
+                            timeout=self.block_timeout,
+                        )
+                except asyncio.TimeoutError:
+                    self._stats["dropped"] += 1
+                    logger.warning(f"⚠️ Log sink buffer for {collection} still full after {self.block_timeout}s - dropping document")
+                    return
+            else:
+                self._stats["dropped"] += 1
+                return
+
+        buffer.append(doc)
+        self._stats["enqueued"] += 1
+        if len(buffer) >= self.batch_size:
+            self._wake.set()
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Log sink flush loop error: {e}", exc_info=True)
+
+    async def flush(self) -> int:
+        """Flush every buffer once; returns the number of documents written"""
+        written = 0
+        for collection, buffer in list(self._buffers.items()):
+            while buffer:
+                batch: List[Dict[str, Any]] = [buffer.popleft() for _ in range(min(self.batch_size, len(buffer)))]
+                started = time.monotonic()
+                try:
+                    await self.db[collection].insert_many(batch, ordered=False)
+                except BulkWriteError as e:
+                    # Per-document errors (duplicate _id from an earlier partial write,
+                    # validation) will never succeed on retry - keep what was inserted.
+                    inserted = e.details.get("nInserted", 0)
+                    self._stats["flushed"] += inserted
+                    self._stats["dropped"] += len(batch) - inserted
+                    self._stats["flush_errors"] += 1
+                    self._stats["last_error"] = f"{collection}: {len(e.details.get('writeErrors', []))} write errors"
+                    written += inserted
+                    failed = {err.get("index") for err in e.details.get("writeErrors", [])}
+                    await self._notify(collection, [doc for i, doc in enumerate(batch) if i not in failed])
+                    continue
+                except Exception as e:
+                    self._stats["flush_errors"] += 1
+                    self._stats["last_error"] = f"{collection}: {e}"
+                    logger.warning(f"⚠️ Log sink flush to {collection} failed ({len(batch)} docs), will retry: {e}")
+                    self._requeue(collection, buffer, batch)
+                    break
+                finally:
+                    self._stats["last_flush_ms"] = int((time.monotonic() - started) * 1000)
+                self._stats["flush_batches"] += 1
+                self._stats["flushed"] += len(batch)
+                written += len(batch)
+                await self._notify(collection, batch)
+                async with self._space:
+                    self._space.notify_all()
+        return written
+
+    def _requeue(self, collection: str, buffer: Deque[Dict[str, Any]], batch: List[Dict[str, Any]]) -> None:
+        # insert_many sets _id on each doc, so anything already written before the
+        # failure comes back as a duplicate-key BulkWriteError on retry (handled above).
+        room = self.max_buffer - len(buffer)
+        keep = batch if room >= len(batch) else batch[len(batch) - max(room, 0):]
+        self._stats["dropped"] += len(batch) - len(keep)
+        buffer.extendleft(reversed(keep))
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Stop the flusher and write out everything still buffered (used on shutdown)"""
+        self._stopping = True
+        self._wake.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._task.cancel()
+            except Exception:
+                pass
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pending = sum(len(b) for b in self._buffers.values())
+            logger.warning(f"⚠️ Log sink drain timed out with {pending} documents unwritten")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self.running,
+            "buffered": {name: len(buf) for name, buf in self._buffers.items()},
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "max_buffer": self.max_buffer,
+        }
@@ -0,0 +1,109 @@
+"""
+Log Timeline
+Merges several timestamp-sorted log collections into one paginated timeline
+"""
+import asyncio
+import base64
+import heapq
+import json
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+
+from bson import ObjectId
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(positions: Dict[str, Tuple[datetime, ObjectId]]) -> str:
+    """Opaque continuation token: the last (timestamp, _id) emitted from each source"""
+    payload = {name: [ts.isoformat(), str(oid)] for name, (ts, oid) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(token: str) -> Dict[str, Tuple[datetime, ObjectId]]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return {name: (datetime.fromisoformat(ts), ObjectId(oid)) for name, (ts, oid) in payload.items()}
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+
+
+def _after(position: Tuple[datetime, ObjectId]) -> Dict[str, Any]:
+    """Documents strictly older than `position` in (timestamp desc, _id desc) order"""
+    ts, oid = position
+    return {"$or": [
+        {"timestamp": {"$lt": ts}},
+        {"timestamp": ts, "_id": {"$lt": oid}},
+    ]}
+
+
+class LogTimeline:
+    """
+    K-way merge of log collections that share a `timestamp` field.
+
+    Each source is queried with its own (server-side) filter, sorted by
+    (timestamp desc, _id desc) and resumed strictly after the position recorded in
+    the cursor, so one page reads at most `limit + 1` documents per source no matter
+    how deep it is. The heads of the sources are merged newest-first.
+    """
+
+    def __init__(self, db, sources: Dict[str, str]):
+        # log_type -> collection name
+        self.db = db
+        self.sources = sources
+
+    async def _fetch(self, log_type: str, query: Dict[str, Any], position, limit: int) -> List[Dict[str, Any]]:
+        if position is not None:
+            query = {"$and": [query, _after(position)]} if query else _after(position)
+        return await self.db[self.sources[log_type]].find(query).sort(
+            [("timestamp", -1), ("_id", -1)]
+        ).limit(limit + 1).to_list(limit + 1)
+
+    async def page(
+        self,
+        queries: Dict[str, Dict[str, Any]],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of the merged timeline. `queries` maps each log_type to include onto its
+        filter. Returns {"logs", "next_cursor", "has_more"}.
+        """
+        positions = decode_cursor(cursor) if cursor else {}
+        log_types = [t for t in queries if t in self.sources]
+        heads = await asyncio.gather(
+            *(self._fetch(t, queries[t], positions.get(t), limit) for t in log_types)
+        )
+
+        def key(item):
+            log_type, doc = item
+            ts = doc.get("timestamp")
+            if isinstance(ts, datetime) and ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+            return (ts or datetime.min.replace(tzinfo=timezone.utc), doc["_id"])
+
+        merged = heapq.merge(
+            *([(t, doc) for doc in docs] for t, docs in zip(log_types, heads)),
+            key=key,
+            reverse=True,
+        )
+        logs: List[Dict[str, Any]] = []
+        for log_type, doc in merged:
+            if len(logs) == limit:
+                break
+            positions[log_type] = (doc["timestamp"], doc["_id"])
+            logs.append({"log_type": log_type, **doc})
+
+        # Anything left in a source's head (we fetched limit + 1) means there is more
+        consumed: Dict[str, int] = {}
+        for log in logs:
+            consumed[log["log_type"]] = consumed.get(log["log_type"], 0) + 1
+        has_more = any(len(docs) > consumed.get(t, 0) for t, docs in zip(log_types, heads))
+
+        return {
+            "logs": logs,
+            "next_cursor": encode_cursor(positions) if has_more and positions else None,
+            "has_more": has_more,
+        }
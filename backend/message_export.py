@@ -0,0 +1,104 @@
+"""
+Message Export
+Streams a user's message history as CSV, NDJSON or JSON in constant memory
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Optional, Dict, Any, AsyncIterator
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "json": ("application/json", "json"),
+}
+
+CSV_FIELDS = ["id", "email", "message", "subject", "sent_at", "personality"]
+
+# Cursor batch size and the approximate size of each chunk handed to the response
+BATCH_SIZE = 500
+CHUNK_BYTES = 64 * 1024
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_row(msg: Dict[str, Any]) -> Dict[str, Any]:
+    sent_at = msg.get("sent_at", "")
+    personality = msg.get("personality")
+    return {
+        "id": msg.get("id", ""),
+        "email": msg.get("email", ""),
+        "message": (msg.get("message") or "").replace("\n", " "),
+        "subject": msg.get("subject", ""),
+        "sent_at": sent_at.isoformat() if isinstance(sent_at, datetime) else sent_at,
+        "personality": personality.get("value", "") if isinstance(personality, dict) else "",
+    }
+
+
+async def _encode(messages: AsyncIterator[Dict[str, Any]], fmt: str) -> AsyncIterator[str]:
+    """Text pieces for each document; JSON wraps them as {"messages": [...], "count": N}"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        async for msg in messages:
+            writer.writerow(_csv_row(msg))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    elif fmt == "ndjson":
+        async for msg in messages:
+            yield json.dumps(msg, default=_json_default) + "\n"
+    else:
+        count = 0
+        yield '{"messages": ['
+        async for msg in messages:
+            yield (", " if count else "") + json.dumps(msg, default=_json_default)
+            count += 1
+        yield f'], "count": {count}}}'
+
+
+async def stream_messages(
+    history,
+    email: str,
+    fmt: str = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    compress: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Yield the export in ~CHUNK_BYTES chunks while iterating the user's history (newest
+    first) through a MessageHistoryStore, which merges the hot and archived tiers. Only
+    one cursor batch, one archive bucket and one chunk are held at a time, so memory
+    stays flat however many messages the user has. With `compress`, chunks are gzip.
+    """
+    messages = history.iterate(
+        email, start, end, projection={"_id": 0, "minhash": 0, "lsh_buckets": 0}, batch_size=batch_size
+    )
+    gzip = zlib.compressobj(wbits=31) if compress else None
+
+    pending = []
+    pending_size = 0
+    async for piece in _encode(messages, fmt):
+        pending.append(piece)
+        pending_size += len(piece)
+        if pending_size >= CHUNK_BYTES:
+            data = "".join(pending).encode("utf-8")
+            pending, pending_size = [], 0
+            if gzip:
+                data = gzip.compress(data)
+            if data:
+                yield data
+    data = "".join(pending).encode("utf-8")
+    if gzip:
+        data = gzip.compress(data) + gzip.flush()
+    if data:
+        yield data
@@ -17,6 +17,12 @@ class EmailLog(BaseModel):
     sent_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     timezone: Optional[str] = None
     local_sent_at: Optional[str] = None
+    # What was sent - denormalized so delivery stats don't need to join message_history
+    message_id: Optional[str] = None
+    personality: Optional[str] = None
+    goal_id: Optional[str] = None
+    message_type: Optional[str] = None  # content type of the message (MESSAGE_TYPES), when generated
+    channel: Optional[str] = None  # how it was sent: scheduled, send_now, broadcast, admin_bulk, goal
 
 class BroadcastRequest(BaseModel):
     message: str
@@ -0,0 +1,170 @@
+"""
+Pre-generation
+Generates scheduled email content ahead of its send time so the trigger only hands off to SMTP
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, Callable, Awaitable, List
+
+logger = logging.getLogger(__name__)
+
+
+class PregenerationWorker:
+    """
+    Look-ahead content generation for goal_messages and primary-goal sends.
+
+    Each scheduled send gets a `generate_after` / `pregen_after` time picked uniformly
+    between `max_lead` and `min_lead` before it is due, so a 09:00 cohort is generated
+    gradually over the preceding hours instead of all at 09:00. Every tick claims the
+    items whose time has come and runs the generate callbacks with bounded concurrency.
+    The callbacks store the content (subject, body, rendered HTML) on the document;
+    they return False when the result shouldn't be kept (e.g. the LLM fell back), in
+    which case the item is retried later. Anything not pre-generated in time is simply
+    generated inline at send time.
+    """
+
+    def __init__(
+        self,
+        db,
+        generate_goal_fn: Callable[[dict], Awaitable[bool]],
+        generate_primary_fn: Callable[[dict], Awaitable[bool]],
+        min_lead_minutes: int = 30,
+        max_lead_minutes: int = 360,
+        concurrency: int = 4,
+        batch_size: int = 50,
+        retry_after_minutes: int = 10,
+        claim_stale_after: timedelta = timedelta(minutes=15),
+    ):
+        self.db = db
+        self.generate_goal_fn = generate_goal_fn
+        self.generate_primary_fn = generate_primary_fn
+        self.min_lead = timedelta(minutes=min_lead_minutes)
+        self.max_lead = timedelta(minutes=max(max_lead_minutes, min_lead_minutes))
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.retry_after = timedelta(minutes=retry_after_minutes)
+        self.claim_stale_after = claim_stale_after
+        self._stats: Dict[str, Any] = {
+            "ticks": 0,
+            "goal_generated": 0,
+            "primary_generated": 0,
+            "deferred": 0,
+            "errors": 0,
+            "last_tick_at": None,
+        }
+
+    def plan(self, send_at: Optional[datetime]) -> Optional[datetime]:
+        """Pick when to generate content for a send due at send_at (never in the past)"""
+        if send_at is None:
+            return None
+        if send_at.tzinfo is None:
+            send_at = send_at.replace(tzinfo=timezone.utc)
+        lead_seconds = random.uniform(self.min_lead.total_seconds(), self.max_lead.total_seconds())
+        return max(send_at - timedelta(seconds=lead_seconds), datetime.now(timezone.utc))
+
+    def _claimable(self, now: datetime) -> Dict[str, Any]:
+        return {"$or": [
+            {"pregen_claimed_at": {"$exists": False}},
+            {"pregen_claimed_at": None},
+            {"pregen_claimed_at": {"$lt": now - self.claim_stale_after}},
+        ]}
+
+    async def tick(self) -> int:
+        """Generate everything whose pre-generation time has come; returns the number stored"""
+        now = datetime.now(timezone.utc)
+        limiter = asyncio.Semaphore(self.concurrency)
+
+        goal_candidates = await self.db.goal_messages.find(
+            {
+                "status": "pending",
+                "generate_after": {"$lte": now},
+                "generated_at": {"$exists": False},
+                **self._claimable(now),
+            },
+            {"_id": 0, "id": 1}
+        ).sort("generate_after", 1).limit(self.batch_size).to_list(self.batch_size)
+
+        primary_candidates = await self.db.users.find(
+            {
+                "active": True,
+                "pregen_after": {"$lte": now},
+                "next_send_at": {"$gt": now},
+                **self._claimable(now),
+            },
+            {"_id": 0, "email": 1, "next_send_at": 1}
+        ).sort("pregen_after", 1).limit(self.batch_size).to_list(self.batch_size)
+
+        results: List[bool] = await asyncio.gather(
+            *(self._run_goal(c["id"], now, limiter) for c in goal_candidates),
+            *(self._run_primary(c["email"], c["next_send_at"], now, limiter) for c in primary_candidates),
+        )
+        generated = sum(1 for r in results if r)
+
+        self._stats["ticks"] += 1
+        self._stats["last_tick_at"] = now.isoformat()
+        if goal_candidates or primary_candidates:
+            logger.info(
+                f"🧠 Pre-generation tick: {generated}/{len(results)} email(s) generated ahead "
+                f"({len(goal_candidates)} goal, {len(primary_candidates)} primary)"
+            )
+        return generated
+
+    async def _run_goal(self, message_id: str, now: datetime, limiter: asyncio.Semaphore) -> bool:
+        msg = await self.db.goal_messages.find_one_and_update(
+            {"id": message_id, "status": "pending", "generated_at": {"$exists": False}, **self._claimable(now)},
+            {"$set": {"pregen_claimed_at": now}},
+            projection={"_id": 0},
+        )
+        if not msg:
+            return False
+        async with limiter:
+            stored = await self._generate(self.generate_goal_fn, msg, f"goal message {message_id}")
+        if stored:
+            self._stats["goal_generated"] += 1
+        else:
+            await self.db.goal_messages.update_one(
+                {"id": message_id, "status": "pending"},
+                {"$set": {"generate_after": datetime.now(timezone.utc) + self.retry_after, "pregen_claimed_at": None}}
+            )
+        return stored
+
+    async def _run_primary(self, email: str, send_at: datetime, now: datetime, limiter: asyncio.Semaphore) -> bool:
+        user = await self.db.users.find_one_and_update(
+            {"email": email, "next_send_at": send_at, **self._claimable(now)},
+            {"$set": {"pregen_claimed_at": now}},
+            projection={"_id": 0},
+        )
+        if not user:
+            return False
+        async with limiter:
+            stored = await self._generate(self.generate_primary_fn, user, f"primary email for {email}")
+        if stored:
+            self._stats["primary_generated"] += 1
+        # Clear the claim; a deferred user is retried later, a generated one drops out until its next slot
+        retry_at = None if stored else datetime.now(timezone.utc) + self.retry_after
+        await self.db.users.update_one(
+            {"email": email, "next_send_at": send_at},
+            {"$set": {"pregen_after": retry_at, "pregen_claimed_at": None}}
+        )
+        return stored
+
+    async def _generate(self, fn, doc: dict, label: str) -> bool:
+        try:
+            stored = bool(await fn(doc))
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.error(f"❌ Pre-generation failed for {label}: {e}", exc_info=True)
+            return False
+        if not stored:
+            self._stats["deferred"] += 1
+        return stored
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "min_lead_minutes": int(self.min_lead.total_seconds() // 60),
+            "max_lead_minutes": int(self.max_lead.total_seconds() // 60),
+            "concurrency": self.concurrency,
+        }
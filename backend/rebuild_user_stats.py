@@ -0,0 +1,36 @@
+"""
+Rebuild the materialized user_stats collection
+Recomputes feedback_count, rating_sum, avg_rating, engagement_rate and last_feedback_at
+for every user from users + message_feedback (safe to run while the server is up)
+"""
+import os
+import sys
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from user_stats import UserStatsStore
+
+# Load environment variables
+load_dotenv()
+
+MONGO_URL = os.getenv('MONGO_URL')
+DB_NAME = os.getenv('DB_NAME', 'inbox_inspire')
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    print("=" * 80)
+    print("REBUILD USER STATS")
+    print("=" * 80)
+    processed = await UserStatsStore(db).rebuild()
+    print(f"\nRebuilt stats for {processed} user(s)")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
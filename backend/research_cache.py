@@ -0,0 +1,194 @@
+"""
+Research Cache
+Shared cache for expensive persona research (Tavily searches + LLM voice extraction)
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, Callable, Awaitable, Set
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_persona_key(value: str) -> str:
+    """Case- and whitespace-insensitive persona key ('  Elon  MUSK ' -> 'elon musk')"""
+    return re.sub(r"\s+", " ", (value or "").strip()).casefold()
+
+
+class ResearchCache:
+    """
+    Two-level cache for research results keyed by (kind, normalized persona).
+
+    Level 1 is an in-process LRU with a short TTL; level 2 is a Mongo collection
+    shared by every worker. Entries are fresh for `fresh_ttl_seconds`; after that
+    they are still served (stale-while-revalidate) for up to `max_stale_seconds`
+    while one background refresh runs. Concurrent misses for the same key await a
+    single in-flight fetch. Failed fetches (None) are only remembered locally, for
+    `negative_ttl_seconds`, so a flaky provider isn't hammered but is retried soon; a
+    failed background refresh keeps serving the stale value and retries after that long.
+    """
+
+    def __init__(
+        self,
+        db,
+        collection_name: str = "research_cache",
+        max_entries: int = 512,
+        local_ttl_seconds: int = 600,
+        fresh_ttl_seconds: int = 7 * 24 * 3600,
+        max_stale_seconds: int = 30 * 24 * 3600,
+        negative_ttl_seconds: int = 300,
+    ):
+        self.db = db
+        self.collection_name = collection_name
+        self.max_entries = max_entries
+        self.local_ttl_seconds = local_ttl_seconds
+        self.fresh_ttl_seconds = fresh_ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        # key -> (value, fetched_at epoch seconds, cached_locally_at epoch seconds)
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._stats: Dict[str, int] = {
+            "local_hits": 0,
+            "store_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stale_served": 0,
+            "refreshes": 0,
+            "fetch_errors": 0,
+        }
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def get_or_fetch(
+        self,
+        kind: str,
+        persona: str,
+        fetch_fn: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        """Return the cached result for (kind, persona), fetching it at most once if missing"""
+        key = f"{kind}:{normalize_persona_key(persona)}"
+        now = time.time()
+
+        entry = self._local_get(key, now)
+        if entry is not None:
+            value, fetched_at = entry
+            self._stats["local_hits"] += 1
+            return self._serve(key, value, fetched_at, now, fetch_fn)
+
+        try:
+            doc = await self.collection.find_one({"_id": key})
+        except Exception as e:
+            logger.warning(f"Research cache store read failed for {key}: {e}")
+            doc = None
+        if doc and doc.get("value") is not None:
+            fetched_at = doc["fetched_at"]
+            if fetched_at.tzinfo is None:
+                fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+            fetched_ts = fetched_at.timestamp()
+            if now - fetched_ts < self.max_stale_seconds:
+                self._stats["store_hits"] += 1
+                self._local_put(key, doc["value"], fetched_ts, now)
+                return self._serve(key, doc["value"], fetched_ts, now, fetch_fn)
+
+        self._stats["misses"] += 1
+        return await self._fetch_once(key, fetch_fn)
+
+    def _serve(self, key, value, fetched_at: float, now: float, fetch_fn):
+        if value is not None and now - fetched_at >= self.fresh_ttl_seconds and key not in self._refreshing:
+            # Stale: serve it and refresh in the background
+            self._stats["stale_served"] += 1
+            self._refreshing.add(key)
+            task = asyncio.create_task(self._fetch_once(key, fetch_fn, stale=value))
+            task.add_done_callback(lambda _t: self._refreshing.discard(key))
+        return value
+
+    async def _fetch_once(self, key: str, fetch_fn, stale: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            try:
+                value = await fetch_fn()
+                self._stats["refreshes"] += 1
+            except Exception as e:
+                self._stats["fetch_errors"] += 1
+                logger.error(f"Research fetch failed for {key}: {e}")
+                value = None
+            if value is None and stale is not None:
+                # Failed refresh: keep the stale value and try again after negative_ttl_seconds
+                now = time.time()
+                self._local_put(key, stale, now - self.fresh_ttl_seconds + self.negative_ttl_seconds, now)
+                value = stale
+            else:
+                await self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            # Also reached on cancellation - never leave coalesced waiters hanging
+            if not future.done():
+                future.set_result(None)
+            self._inflight.pop(key, None)
+
+    async def _store(self, key: str, value: Optional[Dict[str, Any]]) -> None:
+        now = time.time()
+        if value is None:
+            # Negative result - remember locally only, as if it were already near expiry
+            self._local_put(key, None, now, now - self.local_ttl_seconds + self.negative_ttl_seconds)
+            return
+        self._local_put(key, value, now, now)
+        fetched_at = datetime.fromtimestamp(now, tz=timezone.utc)
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "value": value,
+                    "fetched_at": fetched_at,
+                    "expires_at": fetched_at + timedelta(seconds=self.max_stale_seconds),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Research cache store write failed for {key}: {e}")
+
+    def _local_get(self, key: str, now: float) -> Optional[tuple]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        value, fetched_at, cached_at = entry
+        if now - cached_at >= self.local_ttl_seconds:
+            self._local.pop(key, None)
+            return None
+        self._local.move_to_end(key)
+        return value, fetched_at
+
+    def _local_put(self, key: str, value, fetched_at: float, cached_at: float) -> None:
+        self._local[key] = (value, fetched_at, cached_at)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def invalidate(self, kind: str, persona: str) -> None:
+        key = f"{kind}:{normalize_persona_key(persona)}"
+        self._local.pop(key, None)
+        await self.collection.delete_one({"_id": key})
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["local_hits"] + self._stats["store_hits"] + self._stats["misses"]
+        hits = self._stats["local_hits"] + self._stats["store_hits"]
+        return {
+            **self._stats,
+            "local_entries": len(self._local),
+            "inflight": len(self._inflight),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
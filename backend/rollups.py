@@ -0,0 +1,358 @@
+"""
+Analytics Rollups
+Per-day and per-hour aggregates (db.analytics_rollups) for the admin dashboards
+"""
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    "emails_total", "emails_success", "emails_failed",
+    "messages", "feedback", "rating_sum", "signups",
+    "llm_calls", "tavily_calls", "api_failures", "rate_limit_events",
+)
+
+# Hour buckets are only needed for short windows (alerts); day buckets are kept forever
+HOUR_BUCKET_RETENTION = timedelta(days=35)
+
+USERS_SNAPSHOT_ID = "snapshot:users"
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _day_start(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _map_key(value: Any) -> str:
+    # Field names can't contain '.' or start with '$'
+    return re.sub(r"[.$]", "_", str(value or "unknown"))[:100]
+
+
+def classify_system_event(doc: Dict[str, Any]) -> Dict[str, int]:
+    """Counters a system_events document contributes to (same rules the dashboards used)"""
+    category = doc.get("event_category")
+    counts: Dict[str, int] = {}
+    if category in ("llm", "openai"):
+        counts["llm_calls"] = 1
+    elif category == "tavily":
+        counts["tavily_calls"] = 1
+    if category in ("llm", "tavily", "openai") and doc.get("status") == "failure":
+        counts["api_failures"] = 1
+    if "rate_limit" in str(doc.get("event_type", "")).lower():
+        counts["rate_limit_events"] = 1
+    return counts
+
+
+class _Delta:
+    """Counter and map increments grouped by bucket, written as one bulk_write"""
+
+    def __init__(self):
+        self.counts: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.maps: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, at: Optional[datetime], counts: Dict[str, int], maps: Optional[Dict[str, str]] = None) -> None:
+        if at is None or not (counts or maps):
+            return
+        at = at.astimezone(timezone.utc)
+        for bucket in (("day", at.strftime("%Y-%m-%d")), ("hour", at.strftime("%Y-%m-%dT%H"))):
+            for name, value in counts.items():
+                self.counts[bucket][name] += value
+            for map_name, key in (maps or {}).items():
+                self.maps[bucket][f"{map_name}.{_map_key(key)}"] += 1
+
+    def operations(self, now: datetime) -> List[UpdateOne]:
+        ops = []
+        for bucket in set(self.counts) | set(self.maps):
+            granularity, key = bucket
+            inc = {f"counts.{name}": value for name, value in self.counts.get(bucket, {}).items()}
+            inc.update(self.maps.get(bucket, {}))
+            ops.append(UpdateOne(
+                {"_id": f"{granularity}:{key}"},
+                {
+                    "$inc": inc,
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": _bucket_fields(granularity, key),
+                },
+                upsert=True,
+            ))
+        return ops
+
+
+def _bucket_fields(granularity: str, key: str) -> Dict[str, Any]:
+    fmt = "%Y-%m-%d" if granularity == "day" else "%Y-%m-%dT%H"
+    start = datetime.strptime(key, fmt).replace(tzinfo=timezone.utc)
+    fields: Dict[str, Any] = {"granularity": granularity, "bucket": key, "bucket_start": start}
+    if granularity == "hour":
+        fields["expires_at"] = start + HOUR_BUCKET_RETENTION
+    return fields
+
+
+class RollupEngine:
+    """
+    Incrementally maintained analytics buckets: one document per UTC day ("day:2026-01-31")
+    and per UTC hour ("hour:2026-01-31T09") holding counters for sends, failures,
+    messages, feedback/ratings, signups and LLM/Tavily calls, plus per-personality maps.
+
+    Writers report events as they are stored (email_logs and system_events via the log
+    sink's flush listener, the rest from their write paths); each batch becomes one $inc
+    bulk_write. `backfill()` rebuilds buckets from the raw collections. Dashboards then
+    read at most a few hundred small documents.
+    """
+
+    def __init__(
+        self,
+        db,
+        collection_name: str = "analytics_rollups",
+        source_windows: Optional[Dict[str, timedelta]] = None,
+        history=None,
+    ):
+        self.db = db
+        self.collection_name = collection_name
+        # Optional MessageHistoryStore - backfill() counts archived messages too
+        self.history = history
+        # Raw collection -> how far back it still holds every document (TTL retention).
+        # backfill() leaves that collection's counters alone in older buckets.
+        self.source_windows = source_windows or {}
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def _apply(self, delta: _Delta) -> None:
+        ops = delta.operations(datetime.now(timezone.utc))
+        if not ops:
+            return
+        try:
+            await self.collection.bulk_write(ops, ordered=False)
+        except Exception as e:
+            # Analytics are advisory - never fail the write path over them
+            logger.warning(f"Failed to update analytics rollups ({len(ops)} buckets): {e}")
+
+    async def record_email_logs(self, docs: Iterable[Dict[str, Any]]) -> None:
+        delta = _Delta()
+        for doc in docs:
+            status = doc.get("status")
+            counts = {"emails_total": 1}
+            if status == "success":
+                counts["emails_success"] = 1
+            elif status == "failed":
+                counts["emails_failed"] = 1
+            delta.add(_as_datetime(doc.get("sent_at")), counts)
+        await self._apply(delta)
+
+    async def record_system_events(self, docs: Iterable[Dict[str, Any]]) -> None:
+        delta = _Delta()
+        for doc in docs:
+            delta.add(_as_datetime(doc.get("timestamp")), classify_system_event(doc))
+        await self._apply(delta)
+
+    async def record_message(self, personality: Optional[str], at: Optional[datetime] = None) -> None:
+        delta = _Delta()
+        delta.add(at or datetime.now(timezone.utc), {"messages": 1}, {"message_personalities": personality})
+        await self._apply(delta)
+
+    async def record_feedback(self, rating: int, personality: Optional[str], at: Optional[datetime] = None) -> None:
+        delta = _Delta()
+        delta.add(
+            at or datetime.now(timezone.utc),
+            {"feedback": 1, "rating_sum": rating or 0},
+            {"feedback_personalities": personality},
+        )
+        await self._apply(delta)
+
+    async def record_signup(self, at: Optional[datetime] = None) -> None:
+        delta = _Delta()
+        delta.add(at or datetime.now(timezone.utc), {"signups": 1})
+        await self._apply(delta)
+
+    async def buckets(self, granularity: str, start: datetime, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Buckets whose period overlaps [start, end], oldest first"""
+        period = timedelta(days=1) if granularity == "day" else timedelta(hours=1)
+        query: Dict[str, Any] = {"granularity": granularity, "bucket_start": {"$gt": start - period}}
+        if end is not None:
+            query["bucket_start"]["$lte"] = end
+        return await self.collection.find(query, {"_id": 0}).sort("bucket_start", 1).to_list(None)
+
+    @staticmethod
+    def totals(buckets: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sum counters and maps over buckets"""
+        counts = {name: 0 for name in COUNTERS}
+        maps: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for bucket in buckets:
+            for name, value in bucket.get("counts", {}).items():
+                counts[name] = counts.get(name, 0) + value
+            for map_name in ("message_personalities", "feedback_personalities"):
+                for key, value in bucket.get(map_name, {}).items():
+                    maps[map_name][key] += value
+        return {**counts, **{name: dict(values) for name, values in maps.items()}}
+
+    async def all_time_totals(self) -> Dict[str, Any]:
+        return self.totals(await self.collection.find({"granularity": "day"}, {"_id": 0}).to_list(None))
+
+    async def users_snapshot(self, max_age: timedelta = timedelta(minutes=10)) -> Dict[str, Any]:
+        """User counts and average streaks, recomputed when older than max_age"""
+        doc = await self.collection.find_one({"_id": USERS_SNAPSHOT_ID}, {"_id": 0})
+        computed_at = _as_datetime(doc.get("computed_at")) if doc else None
+        if computed_at is None or datetime.now(timezone.utc) - computed_at > max_age:
+            doc = await self.refresh_users_snapshot()
+        return doc
+
+    async def refresh_users_snapshot(self) -> Dict[str, Any]:
+        result = await self.db.users.aggregate([
+            {"$group": {
+                "_id": None,
+                "total_users": {"$sum": 1},
+                "active_users": {"$sum": {"$cond": [{"$eq": ["$active", True]}, 1, 0]}},
+                "avg_streak": {"$avg": "$streak_count"},
+                # $avg skips the nulls produced for inactive users
+                "avg_streak_active": {"$avg": {"$cond": [{"$eq": ["$active", True]}, "$streak_count", None]}},
+            }},
+        ]).to_list(1)
+        row = result[0] if result else {}
+        snapshot = {
+            "total_users": row.get("total_users", 0),
+            "active_users": row.get("active_users", 0),
+            "avg_streak": row.get("avg_streak") or 0,
+            "avg_streak_active": row.get("avg_streak_active") or 0,
+            "computed_at": datetime.now(timezone.utc),
+        }
+        await self.collection.replace_one({"_id": USERS_SNAPSHOT_ID}, snapshot, upsert=True)
+        return snapshot
+
+    async def backfill(self, since: Optional[datetime] = None, include_today: bool = False) -> int:
+        """
+        Rebuild buckets from the raw collections (all history, or from `since`) up to the
+        start of the current UTC day. Each rebuilt bucket gets the counters and maps of
+        every collection that still holds that period in full; counters from a collection
+        whose older documents have expired (see source_windows) are kept as stored.
+        Buckets in the range that no longer have any raw rows are reset to zero.
+
+        Today's buckets are left to the live $inc writers, so a rebuild can run under
+        traffic: the buckets it overwrites cover periods that are no longer written to.
+        `include_today` rebuilds them too, which is only safe before any live write (first
+        deploy). Returns the number of buckets written.
+        """
+        now = datetime.now(timezone.utc)
+        until = now if include_today else _day_start(now)
+        if since is not None:
+            # Day buckets are rebuilt whole, so start at a day boundary
+            since = _day_start(since)
+        # First complete day each windowed collection still holds
+        covered_from = {
+            collection: _day_start(now - window) + timedelta(days=1)
+            for collection, window in self.source_windows.items()
+        }
+        # collection -> (counter names, map names) it rebuilds
+        sources: Dict[str, Tuple[List[str], List[str]]] = {}
+        hours: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"counts": defaultdict(int), "maps": defaultdict(lambda: defaultdict(int))})
+
+        async def group(collection: str, field: str, extra: Dict[str, Any], maps: Optional[Dict[str, str]] = None, match: Optional[Dict[str, Any]] = None):
+            sources[collection] = (list(extra), list(maps or {}))
+            start = max((t for t in (since, covered_from.get(collection)) if t is not None), default=None)
+            key_fields = {"hour": {"$dateToString": {"format": "%Y-%m-%dT%H", "date": "$_at"}}}
+            for map_name, path in (maps or {}).items():
+                key_fields[map_name] = path
+            pipeline: List[Dict[str, Any]] = [
+                {"$match": match or {}},
+                # Timestamps are datetimes in some documents and ISO strings in others
+                {"$addFields": {"_at": {"$convert": {"input": f"${field}", "to": "date", "onError": None, "onNull": None}}}},
+                {"$match": {"_at": {"$gte": start, "$lt": until} if start else {"$ne": None, "$lt": until}}},
+                {"$group": {"_id": key_fields, **{name: expr for name, expr in extra.items()}}},
+            ]
+            async for row in self.db[collection].aggregate(pipeline, allowDiskUse=True):
+                hour = row["_id"]["hour"]
+                for name in extra:
+                    hours[hour]["counts"][name] += row[name] or 0
+                for map_name in (maps or {}):
+                    hours[hour]["maps"][map_name][_map_key(row["_id"].get(map_name))] += row[next(iter(extra))] or 0
+
+        await group("email_logs", "sent_at", {
+            "emails_total": {"$sum": 1},
+            "emails_success": {"$sum": {"$cond": [{"$eq": ["$status", "success"]}, 1, 0]}},
+            "emails_failed": {"$sum": {"$cond": [{"$eq": ["$status", "failed"]}, 1, 0]}},
+        })
+        await group("message_history", "sent_at", {"messages": {"$sum": 1}},
+                    maps={"message_personalities": "$personality.value"})
+        if self.history is not None:
+            # Messages past the hot window live in the archive; count them the same way
+            async for msg in self.history.archived_messages(since):
+                at = _as_datetime(msg.get("sent_at"))
+                if at is None or at >= until:
+                    continue
+                hour = hours[at.astimezone(timezone.utc).strftime("%Y-%m-%dT%H")]
+                personality = msg.get("personality")
+                hour["counts"]["messages"] += 1
+                hour["maps"]["message_personalities"][_map_key(personality.get("value") if isinstance(personality, dict) else None)] += 1
+        await group("message_feedback", "created_at", {
+            "feedback": {"$sum": 1},
+            "rating_sum": {"$sum": {"$ifNull": ["$rating", 0]}},
+        }, maps={"feedback_personalities": "$personality.value"})
+        await group("users", "created_at", {"signups": {"$sum": 1}})
+        await group("system_events", "timestamp", {
+            "llm_calls": {"$sum": {"$cond": [{"$in": ["$event_category", ["llm", "openai"]]}, 1, 0]}},
+            "tavily_calls": {"$sum": {"$cond": [{"$eq": ["$event_category", "tavily"]}, 1, 0]}},
+            "api_failures": {"$sum": {"$cond": [{"$and": [
+                {"$in": ["$event_category", ["llm", "tavily", "openai"]]}, {"$eq": ["$status", "failure"]},
+            ]}, 1, 0]}},
+            "rate_limit_events": {"$sum": {"$cond": [
+                {"$regexMatch": {"input": {"$ifNull": ["$event_type", ""]}, "regex": "rate_limit", "options": "i"}}, 1, 0
+            ]}},
+        }, match={"$or": [
+            {"event_category": {"$in": ["llm", "openai", "tavily"]}},
+            {"event_type": {"$regex": "rate_limit", "$options": "i"}},
+        ]})
+
+        # Fold hours into days
+        days: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"counts": defaultdict(int), "maps": defaultdict(lambda: defaultdict(int))})
+        for hour, data in hours.items():
+            day = days[hour[:10]]
+            for name, value in data["counts"].items():
+                day["counts"][name] += value
+            for map_name, values in data["maps"].items():
+                for key, value in values.items():
+                    day["maps"][map_name][key] += value
+
+        # Existing buckets in the range with no raw rows left are rebuilt as zero
+        existing: Dict[str, Any] = {"$lt": until}
+        if since is not None:
+            existing["$gte"] = since
+        async for bucket in self.collection.find({"bucket_start": existing}, {"granularity": 1, "bucket": 1}):
+            if bucket.get("granularity") in ("hour", "day") and bucket.get("bucket"):
+                buckets = hours if bucket["granularity"] == "hour" else days
+                buckets.setdefault(bucket["bucket"], buckets.default_factory())
+
+        ops = []
+        for granularity, buckets in (("hour", hours), ("day", days)):
+            for key, data in buckets.items():
+                fields = _bucket_fields(granularity, key)
+                if granularity == "hour" and fields["expires_at"] < now:
+                    continue
+                update: Dict[str, Any] = {**fields, "updated_at": now}
+                for collection, (counters, map_names) in sources.items():
+                    if collection in covered_from and fields["bucket_start"] < covered_from[collection]:
+                        continue
+                    for name in counters:
+                        update[f"counts.{name}"] = data["counts"].get(name, 0)
+                    for map_name in map_names:
+                        update[map_name] = dict(data["maps"].get(map_name, {}))
+                ops.append(UpdateOne({"_id": f"{granularity}:{key}"}, {"$set": update}, upsert=True))
+        for i in range(0, len(ops), 1000):
+            await self.collection.bulk_write(ops[i:i + 1000], ordered=False)
+        logger.info(f"📈 Rebuilt {len(ops)} analytics rollup bucket(s){f' since {since.isoformat()}' if since else ''}")
+        return len(ops)
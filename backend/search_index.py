@@ -0,0 +1,97 @@
+"""
+Admin Search
+Index-backed search across users, message history, feedback and email logs
+"""
+import asyncio
+import logging
+import re
+from typing import Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Result bucket -> (collection, weighted text fields). Email is part of every text index
+# so whole-address and local-part words match; partial emails use the prefix path.
+SEARCH_TARGETS: Dict[str, Tuple[str, Dict[str, int]]] = {
+    "users": ("users", {"email": 10, "name": 5, "goals": 1}),
+    "messages": ("message_history", {"subject": 5, "email": 3, "message": 1}),
+    "feedback": ("message_feedback", {"email": 3, "feedback_text": 1}),
+    "logs": ("email_logs", {"email": 3, "subject": 3, "error_message": 1}),
+}
+
+# Counts stop at this many matches and are reported as approximate ("10000+")
+COUNT_CAP = 10000
+
+
+def is_email_prefix_query(query: str) -> bool:
+    """Queries containing '@' (e.g. 'jane@', 'jane.doe@gm') are matched as email prefixes"""
+    return "@" in query and not any(c.isspace() for c in query)
+
+
+class AdminSearch:
+    """
+    Search backed by one weighted Mongo text index per collection, so a query touches
+    only the matching postings instead of regex-scanning every document.
+
+    - Word queries use $text and are ranked by textScore (weights in SEARCH_TARGETS).
+    - Email-like queries use an anchored prefix match on the indexed `email` field, as do
+      single words that match nothing as a whole word ("jan" -> jane@example.com).
+    - Counts are capped at COUNT_CAP and flagged approximate beyond it.
+    Mongo maintains the indexes on every write, so there is nothing to keep in sync.
+    """
+
+    def __init__(self, db, count_cap: int = COUNT_CAP):
+        self.db = db
+        self.count_cap = count_cap
+
+    async def ensure_indexes(self) -> None:
+        for bucket, (collection, weights) in SEARCH_TARGETS.items():
+            try:
+                await self.db[collection].create_index(
+                    [(field, "text") for field in weights],
+                    weights=weights,
+                    name=f"{collection}_search",
+                    # Don't let a document's own "language" field change (or break) tokenization
+                    language_override="_search_language",
+                )
+            except Exception as e:
+                logger.warning(f"Could not create search index on {collection}: {e}")
+
+    @staticmethod
+    def _email_prefix_filter(query: str) -> Dict[str, Any]:
+        # Anchored, case-sensitive patterns can use the email index; try the lowercased form too
+        prefixes = {query, query.lower()}
+        return {"email": {"$in": [re.compile(f"^{re.escape(p)}") for p in prefixes]}}
+
+    async def _search_one(self, collection: str, query: str, skip: int, limit: int) -> Dict[str, Any]:
+        if is_email_prefix_query(query):
+            return await self._run(collection, self._email_prefix_filter(query), False, skip, limit)
+        result = await self._run(collection, {"$text": {"$search": query}}, True, skip, limit)
+        if result["total"] == 0 and not any(c.isspace() for c in query):
+            # A single partial word ("jan") matches no whole word - try it as an email prefix
+            result = await self._run(collection, self._email_prefix_filter(query), False, skip, limit)
+        return result
+
+    async def _run(self, collection: str, filter_: Dict[str, Any], ranked: bool, skip: int, limit: int) -> Dict[str, Any]:
+        if ranked:
+            cursor = self.db[collection].find(
+                filter_, {"_id": 0, "score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})])
+        else:
+            cursor = self.db[collection].find(filter_, {"_id": 0}).sort("email", 1)
+        items, total = await asyncio.gather(
+            cursor.skip(skip).limit(limit).to_list(limit),
+            self.db[collection].count_documents(filter_, limit=self.count_cap),
+        )
+        return {"items": items, "total": total, "approximate": total >= self.count_cap}
+
+    async def search(self, query: str, page: int = 1, limit: int = 50) -> Dict[str, Dict[str, Any]]:
+        """Search every bucket concurrently; returns {bucket: {items, total, approximate}}"""
+        query = query.strip()
+        if not query:
+            return {bucket: {"items": [], "total": 0, "approximate": False} for bucket in SEARCH_TARGETS}
+        skip = (max(page, 1) - 1) * limit
+        buckets = list(SEARCH_TARGETS)
+        results: List[Dict[str, Any]] = await asyncio.gather(
+            *(self._search_one(SEARCH_TARGETS[b][0], query, skip, limit) for b in buckets)
+        )
+        return dict(zip(buckets, results))
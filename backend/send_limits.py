@@ -0,0 +1,66 @@
+"""
+Send Limits
+Atomic per-day send counters (db.send_counters) for goal-message daily caps
+"""
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any
+
+import pytz
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Counters are only needed for the day they cover (plus timezone slack)
+COUNTER_RETENTION = timedelta(days=3)
+
+
+def user_local_day(user: Dict[str, Any], at: datetime) -> str:
+    """The user's local calendar day (YYYY-MM-DD) at `at`, using their timezone (UTC if invalid)"""
+    tz_name = user.get("user_timezone") or user.get("schedule", {}).get("timezone", "UTC")
+    try:
+        return at.astimezone(pytz.timezone(tz_name)).date().isoformat()
+    except Exception:
+        return at.astimezone(timezone.utc).date().isoformat()
+
+
+class DailySendCounters:
+    """
+    One counter document per (scope, local day), e.g. "user:<email>:<day>".
+
+    A slot is reserved with a single conditional upsert that only matches while
+    count < limit; once the cap is reached the upsert collides with the existing _id
+    and the reservation is refused. Slots for sends that didn't happen are given back.
+    """
+
+    def __init__(self, db, collection_name: str = "send_counters"):
+        self.db = db
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def reserve(self, counter_id: str, limit: int) -> bool:
+        """Atomically take one of `limit` sends for `counter_id`"""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.find_one_and_update(
+                {"_id": counter_id, "count": {"$lt": limit}},
+                {
+                    "$inc": {"count": 1},
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"expires_at": now + COUNTER_RETENTION},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def release(self, counter_id: str) -> None:
+        """Give back a reserved slot when the send didn't happen"""
+        try:
+            await self.collection.update_one({"_id": counter_id, "count": {"$gt": 0}}, {"$inc": {"count": -1}})
+        except Exception as e:
+            logger.warning(f"Failed to release send counter {counter_id}: {e}")
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, Depends, Header, Request
 from fastapi import Request as FastAPIRequest
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -14,14 +14,12 @@ from typing import List, Optional, Literal, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta, date
 import httpx
-import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from openai import AsyncOpenAI
 import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.date import DateTrigger
 import pytz
 import secrets
@@ -44,11 +42,12 @@ from activity_tracker import ActivityTracker
 from version_tracker import VersionTracker
 import warnings
 from contextlib import asynccontextmanager
-from functools import lru_cache
+from functools import lru_cache, partial
 import re
 import html
 import json
 import random
+from pymongo import ReturnDocument, InsertOne
 
 # Email queue with rate limiting for scalability (10k+ users)
 # Limits concurrent email sends to prevent SMTP server overload
@@ -87,13 +86,32 @@ try:
     )
     from backend.utils import (
         strip_emojis, extract_interactive_sections, redact_sensitive_info,
-        check_profanity, check_impersonation, calculate_similarity,
+        check_profanity, check_impersonation,
         render_email_html, generate_interactive_defaults, resolve_streak_badge,
         fallback_subject_line, derive_goal_theme, cleanup_message_text
     )
     from backend.utils.validation import (
         validate_timezone, validate_email, validate_name, validate_schedule
     )
+    from backend.smtp_pool import SMTPConnectionPool
+    from backend.health_monitor import HealthMonitor
+    from backend.user_stats import UserStatsStore, ENGAGEMENT_LEVELS
+    from backend.search_index import AdminSearch
+    from backend.rollups import RollupEngine
+    from backend.log_timeline import LogTimeline, InvalidCursor
+    from backend.message_export import EXPORT_FORMATS, stream_messages
+    from backend.broadcast_engine import BroadcastEngine
+    from backend.streak_engine import StreakEngine
+    from backend.achievements import AchievementCatalog, evaluate_rules, USER_FIELDS as ACHIEVEMENT_USER_FIELDS
+    from backend.near_duplicates import NearDuplicateIndex, signature_fields, HISTORY_PROJECTION
+    from backend.log_sink import BufferedLogSink
+    from backend.index_registry import IndexRegistry, retention_from_env
+    from backend.history_store import MessageHistoryStore
+    from backend.email_dispatcher import PrimaryEmailDispatcher
+    from backend.pregeneration import PregenerationWorker
+    from backend.lease_manager import LeaseManager, LEADER_LEASE
+    from backend.single_flight import SingleFlight
+    from backend.send_limits import DailySendCounters, user_local_day
 except ImportError:
     # Fallback to relative imports when running from backend directory
     from config import (
@@ -126,10 +144,29 @@ except ImportError:
     )
     from utils import (
         strip_emojis, extract_interactive_sections, redact_sensitive_info,
-        check_profanity, check_impersonation, calculate_similarity,
+        check_profanity, check_impersonation,
         render_email_html, generate_interactive_defaults, resolve_streak_badge,
         fallback_subject_line, derive_goal_theme, cleanup_message_text
     )
+    from smtp_pool import SMTPConnectionPool
+    from health_monitor import HealthMonitor
+    from user_stats import UserStatsStore, ENGAGEMENT_LEVELS
+    from search_index import AdminSearch
+    from rollups import RollupEngine
+    from log_timeline import LogTimeline, InvalidCursor
+    from message_export import EXPORT_FORMATS, stream_messages
+    from broadcast_engine import BroadcastEngine
+    from streak_engine import StreakEngine
+    from achievements import AchievementCatalog, evaluate_rules, USER_FIELDS as ACHIEVEMENT_USER_FIELDS
+    from near_duplicates import NearDuplicateIndex, signature_fields, HISTORY_PROJECTION
+    from log_sink import BufferedLogSink
+    from index_registry import IndexRegistry, retention_from_env
+    from history_store import MessageHistoryStore
+    from email_dispatcher import PrimaryEmailDispatcher
+    from pregeneration import PregenerationWorker
+    from lease_manager import LeaseManager, LEADER_LEASE
+    from single_flight import SingleFlight
+    from send_limits import DailySendCounters, user_local_day
 
 
 # Achievement definitions moved to constants.py - imported above
@@ -166,6 +203,8 @@ async def initialize_achievements():
             else:
                 logger.info(f"✅ All {len(DEFAULT_ACHIEVEMENTS)} achievements already exist in database")
         
+        achievement_catalog.invalidate()
+        
         # Verify final count
         total_count = await db.achievements.count_documents({})
         active_count = await db.achievements.count_documents({"active": True})
@@ -174,99 +213,69 @@ async def initialize_achievements():
         logger.error(f"❌ Error initializing achievements: {e}", exc_info=True)
         raise
 
+# Active achievements and their compiled unlock rules, cached in-process
+achievement_catalog = AchievementCatalog(db)
+
 async def get_achievements_from_db():
-    """Get all active achievements from database"""
-    achievements = await db.achievements.find({"active": True}, {"_id": 0}).to_list(100)
-    return {ach["id"]: ach for ach in achievements}
+    """Get all active achievements (cached; admin changes invalidate the cache)"""
+    return await achievement_catalog.get()
 
 async def check_and_unlock_achievements(email: str, user_data: dict, feedback_count: int = 0):
-    """Check and unlock achievements based on user progress"""
-    unlocked = []
-    current_achievements = user_data.get("achievements", [])
+    """
+    Unlock every achievement the user now satisfies with a single update.
+    Returns the ids unlocked by this call.
+    """
+    candidates = evaluate_rules(await achievement_catalog.rules(), user_data, feedback_count)
+    if not candidates:
+        return []
     
-    # Get achievements from database
-    achievements_dict = await get_achievements_from_db()
+    now = datetime.now(timezone.utc).isoformat()
+    result = await db.users.update_one(
+        # Skip if a concurrent evaluation already unlocked any of them (the next one catches the rest)
+        {"email": email, "achievements": {"$nin": candidates}},
+        {
+            "$addToSet": {"achievements": {"$each": candidates}},
+            "$push": {"achievement_history": {"$each": [
+                # seen=False until the user's client acknowledges the celebration
+                {"achievement_id": achievement_id, "unlocked_at": now, "seen": False}
+                for achievement_id in candidates
+            ]}}
+        }
+    )
+    if result.modified_count == 0:
+        return []
     
-    for achievement_id, achievement in achievements_dict.items():
-        if achievement_id in current_achievements:
-            continue  # Already unlocked
-        
-        req = achievement.get("requirement", {})
-        req_type = req.get("type")
-        req_value = req.get("value")
-        
-        unlocked_this = False
-        
-        if req_type == "streak":
-            if user_data.get("streak_count", 0) >= req_value:
-                unlocked_this = True
-        elif req_type == "messages":
-            if user_data.get("total_messages_received", 0) >= req_value:
-                unlocked_this = True
-        elif req_type == "feedback_count":
-            if feedback_count >= req_value:
-                unlocked_this = True
-        elif req_type == "has_goal":
-            if user_data.get("goals") and len(user_data.get("goals", "").strip()) > 0:
-                unlocked_this = True
-        elif req_type == "goal_completed":
-            goal_progress = user_data.get("goal_progress", {})
-            completed_count = sum(1 for g in goal_progress.values() if isinstance(g, dict) and g.get("completed", False))
-            if completed_count >= req_value:
-                unlocked_this = True
-        elif req_type == "consecutive_days":
-            # Check consecutive days based on streak_count
-            # This ensures the user actually has N consecutive days, not just that their last email was recent
-            streak_count = user_data.get("streak_count", 0)
-            if streak_count >= req_value:
-                        unlocked_this = True
-        elif req_type == "personality_count":
-            personalities = user_data.get("personalities", [])
-            if len(personalities) >= req_value:
-                unlocked_this = True
-        elif req_type == "five_star_ratings":
-            # This would need to be tracked separately or calculated from feedback
-            # For now, we'll check feedback_count as a proxy
-            if feedback_count >= req_value:
-                unlocked_this = True
-        elif req_type == "account_age_days":
-            created_at = user_data.get("created_at")
-            if created_at:
-                try:
-                    created_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    account_age = (datetime.now(timezone.utc) - created_date).days
-                    if account_age >= req_value:
-                        unlocked_this = True
-                except:
-                    pass
-        
-        if unlocked_this:
-            unlocked.append(achievement_id)
-            # Update user achievements with unlock timestamp
-            achievement_unlock = {
+    achievements_dict = await achievement_catalog.get()
+    for achievement_id in candidates:
+        achievement = achievements_dict.get(achievement_id, {})
+        await tracker.log_user_activity(
+            user_email=email,
+            action_type="achievement_unlocked",
+            details={
                 "achievement_id": achievement_id,
-                "unlocked_at": datetime.now(timezone.utc).isoformat()
+                "achievement_name": achievement.get("name", ""),
+                "category": achievement.get("category", "")
             }
-            await db.users.update_one(
-                {"email": email},
-                {
-                    "$addToSet": {"achievements": achievement_id},
-                    "$push": {"achievement_history": achievement_unlock}
-                }
-            )
-            # Log achievement unlock
-            await tracker.log_user_activity(
-                email=email,
-                action_type="achievement_unlocked",
-                action_category="user_action",
-                details={
-                    "achievement_id": achievement_id,
-                    "achievement_name": achievement.get("name", ""),
-                    "category": achievement.get("category", "")
-                }
-            )
-    
-    return unlocked
+        )
+    logger.info(f"🏆 {email} unlocked {len(candidates)} achievement(s): {', '.join(candidates)}")
+    return candidates
+
+async def refresh_user_achievements(email: str) -> List[str]:
+    """Re-evaluate achievements after a write that can move a requirement (send, feedback, goals)"""
+    try:
+        user = await db.users.find_one({"email": email}, ACHIEVEMENT_USER_FIELDS)
+        if not user:
+            return []
+        stats = (await user_stats.get([email])).get(email)
+        if stats is not None:
+            feedback_count = stats.get("feedback_count", 0)
+        else:
+            feedback_count = await db.message_feedback.count_documents({"email": email})
+        return await check_and_unlock_achievements(email, user, feedback_count)
+    except Exception as e:
+        # Achievements are advisory - never fail the write that triggered them
+        logger.warning(f"Failed to evaluate achievements for {email}: {e}")
+        return []
 
 def resolve_streak_badge(streak_count: int) -> tuple[str, str]:
     """Return streak icon label and message without emojis."""
@@ -426,7 +435,7 @@ def cleanup_message_text(message: str) -> str:
     return "\n\n".join(paragraphs)
 
 
-async def record_email_log(
+def build_email_log(
     email: str,
     subject: str,
     status: str,
@@ -434,7 +443,13 @@ async def record_email_log(
     sent_dt: Optional[datetime] = None,
     timezone_value: Optional[str] = None,
     error_message: Optional[str] = None,
-) -> None:
+    message_id: Optional[str] = None,
+    personality: Optional[str] = None,
+    goal_id: Optional[str] = None,
+    message_type: Optional[str] = None,
+    channel: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build an email_logs document (shared by single inserts and bulk writers)"""
     if sent_dt is None:
         sent_dt = datetime.now(timezone.utc)
 
@@ -457,8 +472,36 @@ async def record_email_log(
         sent_at=sent_dt,
         timezone=tz_name,
         local_sent_at=local_sent_at,
+        message_id=message_id,
+        personality=personality,
+        goal_id=goal_id,
+        message_type=message_type,
+        channel=channel,
     )
-    await db.email_logs.insert_one(log_doc.model_dump())
+    return log_doc.model_dump()
+
+
+async def record_email_log(
+    email: str,
+    subject: str,
+    status: str,
+    *,
+    sent_dt: Optional[datetime] = None,
+    timezone_value: Optional[str] = None,
+    error_message: Optional[str] = None,
+    **details: Optional[str],
+) -> None:
+    """Queue an email_logs entry; details are message_id, personality, goal_id, message_type, channel"""
+    log_doc = build_email_log(
+        email,
+        subject,
+        status,
+        sent_dt=sent_dt,
+        timezone_value=timezone_value,
+        error_message=error_message,
+        **details,
+    )
+    await log_sink.write("email_logs", log_doc)
 
 # Create the main app without a prefix
 app = FastAPI(title="Tend API", version="2.0")
@@ -527,12 +570,62 @@ api_router = APIRouter(prefix="/api")
 # Initialize scheduler
 scheduler = AsyncIOScheduler()
 
+# Buffered sink for append-only logs (email_logs + tracker collections) - flushed with insert_many.
+# email_logs blocks briefly when the buffer is full; telemetry drops the oldest entries instead.
+log_sink = BufferedLogSink(
+    db,
+    batch_size=int(os.getenv('LOG_SINK_BATCH_SIZE', '500')),
+    flush_interval=float(os.getenv('LOG_SINK_FLUSH_INTERVAL_SECONDS', '1.0')),
+    max_buffer=int(os.getenv('LOG_SINK_MAX_BUFFER', '20000')),
+    policies={"email_logs": "block"},
+)
+
 # Initialize Activity Tracker
-tracker = ActivityTracker(db)
+tracker = ActivityTracker(db, sink=log_sink)
 
 # Initialize Version Tracker  
 version_tracker = VersionTracker(db)
 
+# Mongo leases - lets several workers/containers share the scheduler without double-sending
+leases = LeaseManager(db)
+
+# Materialized per-user engagement stats (feedback count, avg rating, engagement rate)
+user_stats = UserStatsStore(db)
+
+# Text-index backed admin search (ranked, email prefixes, capped counts)
+admin_search = AdminSearch(db)
+
+# Declared indexes and telemetry retention (opt-in via *_RETENTION_DAYS; 0 keeps telemetry forever)
+telemetry_retention = retention_from_env()
+index_registry = IndexRegistry(db, retention_days=telemetry_retention)
+
+# Message history: hot documents in message_history, older months in compressed archive buckets
+history_store = MessageHistoryStore(db, hot_days=int(os.getenv('HISTORY_HOT_DAYS', '90')))
+
+# Unified admin log timeline (k-way merge over the timestamp-sorted log collections)
+log_timeline = LogTimeline(db, {"activity": "activity_logs", "system": "system_events", "api": "api_analytics"})
+
+# Per-day/per-hour analytics buckets for the dashboards, fed as events are written
+rollups = RollupEngine(db, history=history_store, source_windows={
+    # Collections that expire old documents only hold the full record for their retention window
+    collection: timedelta(days=days) for collection, days in telemetry_retention.items() if days > 0
+})
+log_sink.add_listener("email_logs", rollups.record_email_logs)
+log_sink.add_listener("system_events", rollups.record_system_events)
+
+# Shared SMTP connection pool - created on first send so env validation runs first
+smtp_pool: Optional[SMTPConnectionPool] = None
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Return the process-wide SMTP pool, creating it from SMTP_* env vars on first use"""
+    global smtp_pool
+    if smtp_pool is None:
+        smtp_pool = SMTPConnectionPool.from_env()
+        if smtp_pool is None:
+            raise RuntimeError("SMTP configuration incomplete - missing SMTP_HOST, SMTP_USERNAME, or SMTP_PASSWORD")
+        logger.info(f"✅ SMTP connection pool created (size={smtp_pool.max_size}, cap={smtp_pool.max_messages_per_connection} msgs/connection)")
+    return smtp_pool
+
 # Note: All Pydantic models have been moved to backend/models/ directory
 # They are imported at the top of this file from backend.models
 # All models (SendTimeWindow, GoalSchedule, GoalCreateRequest, GoalUpdateRequest, 
@@ -556,6 +649,8 @@ async def send_email(
     Send email via SMTP with retry logic and improved error handling.
     Handles Hostinger SMTP and other providers with appropriate settings.
     Uses semaphore to limit concurrent sends for scalability (10k+ users).
+    Connections come from the shared SMTP pool, so callers never pay a fresh
+    TLS handshake + AUTH per message.
     """
     # Use semaphore to limit concurrent email sends (prevents SMTP overload)
     async with EMAIL_SEND_SEMAPHORE:
@@ -569,11 +664,7 @@ async def send_email(
             logger.error(error_msg)
             return False, error_msg
         
-        # Determine SSL/TLS settings based on port
-        # Port 465 uses SSL (implicit TLS), port 587 uses STARTTLS (explicit TLS)
-        # aiosmtplib handles this automatically, but we set use_tls=True for both
-        is_ssl_port = smtp_port == 465
-        is_starttls_port = smtp_port == 587
+        # SSL/TLS settings by port are handled by the SMTP pool (see smtp_pool.py)
         
         msg = MIMEMultipart('alternative')
         msg['From'] = f"Tend <{os.getenv('SENDER_EMAIL', smtp_username)}>"
@@ -624,31 +715,8 @@ async def send_email(
         
         for attempt in range(max_retries):
             try:
-                # aiosmtplib automatically handles SSL/TLS based on port
-                # Port 465 = SSL (implicit), Port 587 = STARTTLS (explicit)
-                # For Hostinger (port 465), use_tls=True enables SSL connection
-                smtp_kwargs = {
-                    "hostname": smtp_host,
-                    "port": smtp_port,
-                    "username": smtp_username,
-                    "password": smtp_password,
-                    "timeout": 30  # Increased timeout for Hostinger (30 seconds)
-                }
-                
-                # For port 465 (SSL), use_tls=True enables SSL
-                # For port 587 (STARTTLS), use_tls=True enables STARTTLS
-                if is_ssl_port:
-                    # Port 465: SSL connection (implicit TLS)
-                    smtp_kwargs["use_tls"] = True
-                elif is_starttls_port:
-                    # Port 587: STARTTLS (explicit TLS)
-                    smtp_kwargs["use_tls"] = True
-                    smtp_kwargs["start_tls"] = True
-                else:
-                    # Default: try TLS
-                    smtp_kwargs["use_tls"] = True
-                
-                await aiosmtplib.send(msg, **smtp_kwargs)
+                # Reuses an authenticated session from the pool (reconnects if stale or capped)
+                await get_smtp_pool().send_message(msg)
                 
                 logger.info(f"✅ Email sent successfully to {to_email} (attempt {attempt + 1})")
                 return True, None
@@ -709,15 +777,168 @@ async def send_email(
     # Should not reach here, but just in case
     return False, "Failed after all retry attempts"
 
+# Look-ahead generation: content for scheduled sends is produced during the hours before they're due
+pregeneration_worker = PregenerationWorker(
+    db,
+    generate_goal_fn=lambda msg: pregenerate_goal_message(msg),
+    generate_primary_fn=lambda user: pregenerate_primary_email(user),
+    min_lead_minutes=int(os.getenv('PREGEN_MIN_LEAD_MINUTES', '30')),
+    max_lead_minutes=int(os.getenv('PREGEN_MAX_LEAD_MINUTES', '360')),
+    concurrency=int(os.getenv('PREGEN_CONCURRENCY', '4')),
+)
+
+# Background broadcast jobs (resumable, bounded concurrency)
+broadcast_engine = BroadcastEngine(
+    db, send_fn=send_email, build_log_fn=partial(build_email_log, channel="broadcast"), leases=leases,
+    on_logs_written=rollups.record_email_logs,
+)
+
+# Background streak recomputation jobs (resumable, one aggregation + bulk write per page)
+streak_engine = StreakEngine(db, leases=leases, history=history_store)
+
 # Enhanced LLM Service with deep personality matching
+def fallback_personality_prompt(personality: PersonalityType) -> str:
+    """Voice instructions that need no research or lookups (used when those are unavailable)"""
+    if personality.type == "custom":
+        return f"""CUSTOM PERSONALITY VOICE PROFILE:
+
+CUSTOM DESCRIPTION:
+{personality.value}
+
+CRITICAL INSTRUCTIONS:
+1. Deeply understand what this custom style means - analyze the communication philosophy, emotional tone, and structural preferences.
+2. Research and understand the patterns implied in this description.
+3. Write content that authentically embodies this style - not generic content with a label.
+4. Make every email feel uniquely crafted in this custom style.
+5. The content, structure, vocabulary, and approach MUST change based on this custom description.
+
+RULES:
+- Understand the underlying communication philosophy
+- Match the emotional tone exactly
+- Use appropriate vocabulary and sentence structure
+- Make it feel authentic to this custom style
+- Do not use generic motivational language - make it specific to this style"""
+    return f"""VOICE PROFILE:
+Sound like {personality.value} - research their actual communication style, vocabulary, sentence patterns, and energy.
+
+RULES:
+- Capture their energy and mannerisms authentically.
+- Use their actual speaking/writing patterns.
+- Make it feel authentic to how {personality.value} actually communicates.
+- Do not say you are copying anyone or mention tone explicitly.
+- Keep the language human and grounded.
+- This works for ANY famous personality - adapt to {personality.value}'s unique characteristics.
+- Research how {personality.value} actually talks and writes, then write in that exact style."""
+
+async def build_personality_prompt(personality: PersonalityType) -> str:
+    """Voice instructions for the message prompt (deep research for famous/custom, tone library for tones)"""
+    # Enhanced personality style via deep research
+    from backend.utils.enhanced_personality_research import (
+        research_famous_personality, 
+        research_custom_personality,
+        get_enhanced_tone_instruction
+    )
+    
+    personality_prompt = ""
+    if personality.type == "famous":
+        # Deep research for ALL famous personalities (works universally for any personality)
+        # This works for: Elon Musk, Oprah Winfrey, Steve Jobs, Tony Robbins, etc.
+        logger.info(f"🔍 Starting deep research for famous personality: {personality.value}")
+        research_result = await research_famous_personality(personality.value)
+        if research_result and research_result.get("voice_instruction"):
+            personality_prompt = research_result["voice_instruction"]
+            logger.info(f"✅ Deep personality research completed for {personality.value} - voice profile extracted")
+        else:
+            # Fallback: use basic research (still works for all personalities)
+            logger.warning(f"⚠️ Deep research failed for {personality.value}, using fallback research")
+            voice_profile = await fetch_personality_voice(personality)
+            if voice_profile:
+                personality_prompt = f"""VOICE PROFILE:
+{voice_profile}
+RULES:
+- Write exactly in this voice - capture their authentic communication style.
+- Use their vocabulary, sentence patterns, and energy level.
+- Make it feel like {personality.value} is talking directly to the user.
+- Do not mention these notes, the personality name, or that you researched it.
+- Use natural, human language - no AI phrasing.
+- This works for ANY personality - adapt to {personality.value}'s unique style."""
+            else:
+                # Ultimate fallback: still works generically for any personality
+                personality_prompt = fallback_personality_prompt(personality)
+    elif personality.type == "tone":
+        # Enhanced tone instruction
+        personality_prompt = await get_enhanced_tone_instruction(personality.value)
+        logger.info(f"✅ Enhanced tone instruction loaded for {personality.value}")
+    elif personality.type == "custom":
+        # Research-first approach for custom personalities
+        research_result = await research_custom_personality(personality.value)
+        if research_result and research_result.get("voice_instruction"):
+            personality_prompt = research_result["voice_instruction"]
+            logger.info(f"✅ Custom personality research completed")
+        else:
+            # Fallback: analyze the custom description deeply
+            personality_prompt = fallback_personality_prompt(personality)
+    
+    return personality_prompt
+
+async def gather_message_research(goals: str, personality: PersonalityType) -> tuple[str, Optional[str]]:
+    """
+    Persona voice prompt and Tavily research snippet - independent lookups, so run concurrently.
+    Never raises: a failed voice lookup falls back to the generic voice prompt and a failed
+    research lookup to no snippet, so the send goes ahead either way.
+    """
+    personality_prompt, research_snippet = await asyncio.gather(
+        build_personality_prompt(personality),
+        fetch_research_snippet(goals, personality),
+        return_exceptions=True,
+    )
+    if isinstance(personality_prompt, BaseException):
+        logger.warning(f"⚠️ Voice lookup failed for {personality.value}, using generic voice prompt: {personality_prompt}")
+        personality_prompt = fallback_personality_prompt(personality)
+    if isinstance(research_snippet, BaseException):
+        logger.warning(f"⚠️ Research lookup failed for {personality.value}, sending without a snippet: {research_snippet}")
+        research_snippet = None
+    return personality_prompt, research_snippet
+
+async def get_recent_subjects(email: str, limit: int = 5) -> List[str]:
+    """Subjects of the user's most recent emails (to keep new subject lines distinct)"""
+    try:
+        recent_messages = await history_store.recent(email, limit, projection={"_id": 0, "subject": 1})
+        return [msg.get("subject", "") for msg in recent_messages if msg.get("subject")]
+    except Exception:
+        return []
+
 async def generate_unique_motivational_message(
     goals: str, 
     personality: PersonalityType, 
     name: Optional[str] = None,
     streak_count: int = 0,
-    previous_messages: list = None
+    previous_messages: list = None,
+    research: Optional[tuple] = None
 ) -> tuple[str, str, bool, Optional[str]]:
     """Generate UNIQUE, engaging motivational message with questions - never repeat"""
+    message, _, message_type, used_fallback, research_snippet = await generate_motivational_email(
+        goals, personality, name, streak_count, previous_messages, research=research
+    )
+    return message, message_type, used_fallback, research_snippet
+
+async def generate_motivational_email(
+    goals: str,
+    personality: PersonalityType,
+    name: Optional[str] = None,
+    streak_count: int = 0,
+    previous_messages: list = None,
+    research: Optional[tuple] = None,
+    recent_subjects: Optional[List[str]] = None
+) -> tuple[str, Optional[str], str, bool, Optional[str]]:
+    """
+    Generate the message body - and, when recent_subjects is given, its subject line in the
+    same completion (structured JSON) instead of a second LLM call.
+    `research` is the (personality_prompt, research_snippet) pair from gather_message_research
+    when the caller already fetched it alongside its other lookups.
+    Returns (message, subject, message_type, used_fallback, research_snippet).
+    """
+    with_subject = recent_subjects is not None
     try:
         # Get previous message types to avoid repetition
         recent_types = []
@@ -738,79 +959,9 @@ async def generate_unique_motivational_message(
         include_analogy = random.random() < 0.6
         analogy_instruction = random.choice(ANALOGY_PROMPTS) if include_analogy else ""
         dare_instruction = random.choice(FRIENDLY_DARES) if random.random() < 0.5 else ""
-        # Enhanced personality style via deep research
-        from backend.utils.enhanced_personality_research import (
-            research_famous_personality, 
-            research_custom_personality,
-            get_enhanced_tone_instruction
-        )
-        
-        personality_prompt = ""
-        if personality.type == "famous":
-            # Deep research for ALL famous personalities (works universally for any personality)
-            # This works for: Elon Musk, Oprah Winfrey, Steve Jobs, Tony Robbins, etc.
-            logger.info(f"🔍 Starting deep research for famous personality: {personality.value}")
-            research_result = await research_famous_personality(personality.value)
-            if research_result and research_result.get("voice_instruction"):
-                personality_prompt = research_result["voice_instruction"]
-                logger.info(f"✅ Deep personality research completed for {personality.value} - voice profile extracted")
-            else:
-                # Fallback: use basic research (still works for all personalities)
-                logger.warning(f"⚠️ Deep research failed for {personality.value}, using fallback research")
-                voice_profile = await fetch_personality_voice(personality)
-                if voice_profile:
-                    personality_prompt = f"""VOICE PROFILE:
-    {voice_profile}
-    RULES:
-    - Write exactly in this voice - capture their authentic communication style.
-    - Use their vocabulary, sentence patterns, and energy level.
-    - Make it feel like {personality.value} is talking directly to the user.
-    - Do not mention these notes, the personality name, or that you researched it.
-    - Use natural, human language - no AI phrasing.
-    - This works for ANY personality - adapt to {personality.value}'s unique style."""
-                else:
-                    # Ultimate fallback: still works generically for any personality
-                    personality_prompt = f"""VOICE PROFILE:
-Sound like {personality.value} - research their actual communication style, vocabulary, sentence patterns, and energy.
-
-RULES:
-- Capture their energy and mannerisms authentically.
-- Use their actual speaking/writing patterns.
-- Make it feel authentic to how {personality.value} actually communicates.
-- Do not say you are copying anyone or mention tone explicitly.
-- Keep the language human and grounded.
-- This works for ANY famous personality - adapt to {personality.value}'s unique characteristics.
-- Research how {personality.value} actually talks and writes, then write in that exact style."""
-        elif personality.type == "tone":
-            # Enhanced tone instruction
-            personality_prompt = get_enhanced_tone_instruction(personality.value)
-            logger.info(f"✅ Enhanced tone instruction loaded for {personality.value}")
-        elif personality.type == "custom":
-            # Research-first approach for custom personalities
-            research_result = await research_custom_personality(personality.value)
-            if research_result and research_result.get("voice_instruction"):
-                personality_prompt = research_result["voice_instruction"]
-                logger.info(f"✅ Custom personality research completed")
-            else:
-                # Fallback: analyze the custom description deeply
-                personality_prompt = f"""CUSTOM PERSONALITY VOICE PROFILE:
-
-CUSTOM DESCRIPTION:
-{personality.value}
-
-CRITICAL INSTRUCTIONS:
-1. Deeply understand what this custom style means - analyze the communication philosophy, emotional tone, and structural preferences.
-2. Research and understand the patterns implied in this description.
-3. Write content that authentically embodies this style - not generic content with a label.
-4. Make every email feel uniquely crafted in this custom style.
-5. The content, structure, vocabulary, and approach MUST change based on this custom description.
-
-RULES:
-- Understand the underlying communication philosophy
-- Match the emotional tone exactly
-- Use appropriate vocabulary and sentence structure
-- Make it feel authentic to this custom style
-- Do not use generic motivational language - make it specific to this style"""
+        if research is None:
+            research = await gather_message_research(goals, personality)
+        personality_prompt, research_snippet = research
         
         # Streak milestone messages
         streak_context = ""
@@ -825,7 +976,6 @@ RULES:
         else:
             streak_context = "[LAUNCH] Starting fresh. Let's build momentum."
         
-        research_snippet = await fetch_research_snippet(goals, personality)
         insights_block = f"RESEARCH INSIGHT: {research_snippet}\n" if research_snippet else ""
 
         latest_message_snippet = ""
@@ -901,6 +1051,22 @@ STRUCTURE:
 
 Write an authentic, powerful message that feels personal, impossible to ignore, and COMPLETELY FRESH:"""
 
+        if with_subject:
+            avoid_subjects = ', '.join(recent_subjects[:3]) if recent_subjects else 'None'
+            prompt += f"""
+
+SUBJECT LINE:
+Also write this email's subject line:
+- Under 60 characters (ideally 40-55), personal and handcrafted, curiosity without clickbait
+- Do NOT mention any personality, persona, or tone names, and do not copy the user's goal wording
+- Hint at today's message; acknowledge progress creatively without using the word "streak"
+- Written in the same personality/tone as the message
+- MUST be completely different from recent subjects: {avoid_subjects}
+
+Respond with JSON only, in exactly this shape:
+{{"subject": "<subject line>", "message": "<the full message, including the INTERACTIVE CHECK-IN and QUICK REPLY PROMPT sections>"}}"""
+
+        completion_kwargs = {"response_format": {"type": "json_object"}} if with_subject else {}
         response = await openai_client.chat.completions.create(
             model="gpt-4o",
             messages=[
@@ -911,16 +1077,30 @@ Write an authentic, powerful message that feels personal, impossible to ignore,
                 {"role": "user", "content": prompt}
             ],
             temperature=0.95,  # Higher for maximum creativity and variety
-            max_tokens=600,  # Increased for more detailed, personality-authentic content
+            max_tokens=700 if with_subject else 600,  # Room for the subject line in structured output
             presence_penalty=0.8,  # Strong penalty to avoid repetition
             frequency_penalty=0.8,  # Strong penalty to encourage variety
-            top_p=0.95  # Allow more creative word choices
+            top_p=0.95,  # Allow more creative word choices
+            **completion_kwargs
         )
         
-        message = strip_emojis(response.choices[0].message.content.strip())
+        content = response.choices[0].message.content.strip()
+        subject = None
+        if with_subject:
+            try:
+                payload = json.loads(content)
+                content = str(payload.get("message") or "").strip()
+                subject = strip_emojis(str(payload.get("subject") or "").strip().strip('"\''))
+            except (json.JSONDecodeError, AttributeError):
+                logger.warning("Structured message response was not valid JSON - using it as the message body")
+            if not content:
+                raise ValueError("LLM returned an empty message")
+            subject = subject or fallback_subject_line(streak_count, goals)
+        
+        message = strip_emojis(content)
         message = cleanup_message_text(message)
         
-        return message, message_type, False, research_snippet
+        return message, subject, message_type, False, research_snippet
         
     except Exception as e:
         logger.error(f"Error generating message: {str(e)}")
@@ -947,7 +1127,8 @@ Write an authentic, powerful message that feels personal, impossible to ignore,
         )
         default_msg = strip_emojis(default_msg)
         default_msg = cleanup_message_text(default_msg)
-        return default_msg, "default", True, None
+        default_subject = fallback_subject_line(streak_count, goals) if with_subject else None
+        return default_msg, default_subject, "default", True, None
 
 # Backward compatibility wrapper
 async def generate_motivational_message(goals: str, personality: PersonalityType, name: Optional[str] = None) -> str:
@@ -1208,19 +1389,10 @@ async def compose_subject_line(
     streak = user_data.get("streak_count", 0)
     
     # Get recent subjects to avoid repetition
-    user_email = user_data.get("email", "")
-    recent_subjects = []
-    try:
-        recent_messages = await db.message_history.find(
-            {"email": user_email},
-            {"subject": 1}
-        ).sort("sent_at", -1).limit(5).to_list(5)
-        recent_subjects = [msg.get("subject", "") for msg in recent_messages if msg.get("subject")]
-    except Exception:
-        pass
+    recent_subjects = await get_recent_subjects(user_data.get("email", ""))
     
-    # Dynamic fallback (not hardcoded) - will be generated if LLM fails
-    fallback_subject = await fallback_subject_line(streak, goals, personality)
+    # Deterministic fallback if the LLM fails
+    fallback_subject = fallback_subject_line(streak, goals)
 
     try:
         # Get personality voice context for subject line
@@ -1328,7 +1500,8 @@ Return only the subject line, no quotes, no explanations."""  # noqa: E501
         return fallback_subject
 
 
-def get_current_personality(user_data):
+def get_current_personality(user_data, at: Optional[datetime] = None):
+    """Personality for a send now (or at `at`, e.g. when pre-generating)"""
     personalities = user_data.get('personalities', [])
     if not personalities:
         return PersonalityType(
@@ -1350,21 +1523,21 @@ def get_current_personality(user_data):
     elif rotation_mode == "daily_fixed":
         # Each personality gets a specific day
         from datetime import datetime
-        day_index = datetime.now().weekday()
+        day_index = (at.astimezone() if at else datetime.now()).weekday()
         personality_index = day_index % len(personalities)
         return PersonalityType(**personalities[personality_index])
     
     elif rotation_mode == "weekly_rotation":
         # Rotate weekly - same personality all week
         from datetime import datetime
-        week_number = datetime.now().isocalendar()[1]
+        week_number = (at.astimezone() if at else datetime.now()).isocalendar()[1]
         personality_index = week_number % len(personalities)
         return PersonalityType(**personalities[personality_index])
     
     elif rotation_mode == "time_based":
         # Morning vs Evening personalities
         from datetime import datetime
-        hour = datetime.now().hour
+        hour = (at.astimezone() if at else datetime.now()).hour
         if hour < 12:  # Morning - first half
             personality_index = 0 if len(personalities) == 1 else 0
         else:  # Afternoon/Evening - second half
@@ -1380,44 +1553,37 @@ def get_current_personality(user_data):
         personality = PersonalityType(**personalities[current_index])
         return personality
 
-async def update_streak(email: str, sent_timestamp: Optional[datetime] = None):
+def calculate_days_since_start(created_at, at: datetime) -> int:
+    """Days since account creation, counting the creation day as day 1"""
+    if not created_at:
+        return 1
+    if isinstance(created_at, str):
+        try:
+            created_at_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except:
+            created_at_dt = datetime.fromisoformat(created_at)
+    else:
+        created_at_dt = created_at
+    
+    # Ensure timezone-aware
+    if created_at_dt.tzinfo is None:
+        created_at_dt = created_at_dt.replace(tzinfo=timezone.utc)
+    
+    # Calculate days since account creation
+    days_since_start = (at.date() - created_at_dt.date()).days + 1  # +1 to include today
+    return max(days_since_start, 1)
+
+def compute_streak(user: dict, sent_timestamp: datetime) -> tuple[int, int]:
     """
-    Update streak count based on last email sent date.
+    Streak and days_since_start a send at sent_timestamp would produce (no writes).
     Streak resets if more than 36 hours (1.5 days) have passed since last email (Snapchat-style).
-    Also updates days_since_start which continues regardless of pauses.
-    Returns: (new_streak, days_since_start)
     """
-    user = await db.users.find_one({"email": email})
-    if not user:
-        return 0, 0
-    
-    if sent_timestamp is None:
-        sent_timestamp = datetime.now(timezone.utc)
-    
+    email = user.get('email')
     last_sent = user.get('last_email_sent')
     current_streak = user.get('streak_count', 0)
-    created_at = user.get('created_at')
     
     # Calculate days_since_start (continues regardless of pauses)
-    if created_at:
-        if isinstance(created_at, str):
-            try:
-                created_at_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            except:
-                created_at_dt = datetime.fromisoformat(created_at)
-        else:
-            created_at_dt = created_at
-        
-        # Ensure timezone-aware
-        if created_at_dt.tzinfo is None:
-            created_at_dt = created_at_dt.replace(tzinfo=timezone.utc)
-        
-        # Calculate days since account creation
-        days_since_start = (sent_timestamp.date() - created_at_dt.date()).days + 1  # +1 to include today
-        if days_since_start < 1:
-            days_since_start = 1
-    else:
-        days_since_start = 1
+    days_since_start = calculate_days_since_start(user.get('created_at'), sent_timestamp)
     
     # Calculate streak (resets if > 36 hours since last email)
     if last_sent:
@@ -1451,7 +1617,7 @@ async def update_streak(email: str, sent_timestamp: Optional[datetime] = None):
         elif hours_diff > 36:
             # More than 36 hours passed - reset streak (Snapchat-style)
             new_streak = 1
-            logger.info(f"Streak reset for {email}: {hours_diff:.1f} hours passed (>36h threshold)")
+            logger.debug(f"Streak reset for {email}: {hours_diff:.1f} hours passed (>36h threshold)")
         else:
             # Gap of more than 1 day but less than 36 hours - reset to 1
             new_streak = 1
@@ -1459,6 +1625,24 @@ async def update_streak(email: str, sent_timestamp: Optional[datetime] = None):
         # First email ever - start at 1
         new_streak = 1
     
+    return new_streak, days_since_start
+
+async def update_streak(email: str, sent_timestamp: Optional[datetime] = None):
+    """
+    Update streak count based on last email sent date (see compute_streak).
+    Also updates days_since_start which continues regardless of pauses.
+    Returns: (new_streak, days_since_start)
+    """
+    user = await db.users.find_one({"email": email})
+    if not user:
+        return 0, 0
+    
+    if sent_timestamp is None:
+        sent_timestamp = datetime.now(timezone.utc)
+    
+    current_streak = user.get('streak_count', 0)
+    new_streak, days_since_start = compute_streak(user, sent_timestamp)
+    
     # Update streak and days in database
     await db.users.update_one(
         {"email": email},
@@ -1468,10 +1652,101 @@ async def update_streak(email: str, sent_timestamp: Optional[datetime] = None):
         }}
     )
     
-    logger.info(f"Updated streak for {email}: {current_streak} -> {new_streak}, days_since_start: {days_since_start} (last_sent: {last_sent})")
+    logger.info(f"Updated streak for {email}: {current_streak} -> {new_streak}, days_since_start: {days_since_start} (last_sent: {user.get('last_email_sent')})")
     
     return new_streak, days_since_start
 
+def build_unsubscribe_url(email: str) -> str:
+    """Unsubscribe link - always a web URL, constructed from the sender domain if FRONTEND_URL isn't set"""
+    frontend_url = os.getenv('FRONTEND_URL', '')
+    if frontend_url:
+        return f"{frontend_url}/unsubscribe?email={email}"
+    sender_email = os.getenv('SENDER_EMAIL', '')
+    email_domain = sender_email.split('@')[1] if '@' in sender_email else 'tend.app'
+    return f"https://{email_domain}/unsubscribe?email={email}"
+
+def render_primary_email_html(message: str, goals: str, email: str, streak_count: int, days_since_start: int) -> str:
+    """Render a primary-goal message into the email template"""
+    streak_icon, streak_message = resolve_streak_badge(streak_count)
+    core_message, check_in_lines, quick_reply_lines = extract_interactive_sections(message)
+    ci_defaults, qr_defaults = generate_interactive_defaults(streak_count, goals or '')
+    return render_email_html(
+        streak_count=streak_count,
+        streak_icon=streak_icon,
+        streak_message=streak_message,
+        core_message=core_message,
+        check_in_lines=check_in_lines or ci_defaults,
+        quick_reply_lines=quick_reply_lines or qr_defaults,
+        unsubscribe_url=build_unsubscribe_url(email),
+        days_since_start=days_since_start,
+    )
+
+# Pre-generated content is used if it was written for a slot within this window of the actual send
+PREGENERATED_SLOT_TOLERANCE = timedelta(minutes=30)
+
+def select_pregenerated_email(user_data: dict, personality: PersonalityType, now: datetime) -> Optional[dict]:
+    """Return the user's pre-generated email if it belongs to this send and this personality"""
+    pregenerated = user_data.get("pregenerated_email")
+    if not pregenerated or not pregenerated.get("message") or not pregenerated.get("subject"):
+        return None
+    for_send_at = _as_utc_datetime(pregenerated.get("for_send_at"))
+    if for_send_at is None or abs(now - for_send_at) > PREGENERATED_SLOT_TOLERANCE:
+        return None
+    # Random rotation picks any personality anyway; other modes must match what was generated
+    generated_for = pregenerated.get("personality") or {}
+    if user_data.get("rotation_mode") != "random" and (
+        generated_for.get("type") != personality.type or generated_for.get("value") != personality.value
+    ):
+        return None
+    return pregenerated
+
+async def pregenerate_primary_email(user_data: dict) -> bool:
+    """Generate and store the next primary-goal email for a user ahead of next_send_at"""
+    email = user_data["email"]
+    send_at = _as_utc_datetime(user_data.get("next_send_at"))
+    if send_at is None:
+        return False
+    personality = get_current_personality(user_data, at=send_at)
+    if not personality:
+        return False
+    
+    # Streak the send will produce if nothing else is sent first (re-checked at send time)
+    streak_count, days_since_start = compute_streak(user_data, send_at)
+    previous_messages, recent_subjects, research = await asyncio.gather(
+        history_store.recent(email, 10, projection=HISTORY_PROJECTION),
+        get_recent_subjects(email),
+        gather_message_research(user_data['goals'], personality),
+    )
+    message, subject_line, message_type, used_fallback, research_snippet = await generate_motivational_email(
+        user_data['goals'],
+        personality,
+        user_data.get('name'),
+        streak_count,
+        previous_messages,
+        research=research,
+        recent_subjects=recent_subjects
+    )
+    if used_fallback:
+        # Don't lock in a canned message hours ahead - retry later or generate at send time
+        return False
+    
+    result = await db.users.update_one(
+        {"email": email, "next_send_at": user_data["next_send_at"]},
+        {"$set": {"pregenerated_email": {
+            "for_send_at": send_at,
+            "personality": personality.model_dump(),
+            "message": message,
+            "subject": subject_line,
+            "message_type": message_type,
+            "research_snippet": research_snippet,
+            "streak_count": streak_count,
+            "days_since_start": days_since_start,
+            "html": render_primary_email_html(message, user_data.get('goals', ''), email, streak_count, days_since_start),
+            "generated_at": datetime.now(timezone.utc),
+        }}}
+    )
+    return result.modified_count > 0
+
 # Send email to a SPECIFIC user (called by scheduler)
 async def send_motivation_to_user(email: str):
     """Send motivation email to a specific user - called by their scheduled job"""
@@ -1479,6 +1754,8 @@ async def send_motivation_to_user(email: str):
     subject_line: Optional[str] = None
     sent_dt: Optional[datetime] = None
     schedule: Optional[dict] = None
+    # What is being sent, for the email log (filled in as it becomes known)
+    log_details: Dict[str, Optional[str]] = {"channel": "scheduled"}
     
     logger.info(f"📧 Scheduled email job triggered for: {email}")
     
@@ -1507,36 +1784,65 @@ async def send_motivation_to_user(email: str):
             logger.info(f"⏭️ Skipped {email} - skip_next was set (now reset)")
             return
         
-        # Get user data (we'll update streak after sending email)
-        user_data = await db.users.find_one({"email": email}, {"_id": 0})
-        
         # Get current personality
         personality = get_current_personality(user_data)
         if not personality:
             logger.warning(f"⚠️ No personality found for {email} - cannot send email")
             return
+        log_details["personality"] = personality.value
         
         logger.debug(f"Using personality: {personality.value if personality else 'None'} for {email}")
         
-        # Calculate streak FIRST (before generating message) to use correct streak in email
         sent_dt = datetime.now(timezone.utc)
         sent_timestamp = sent_dt.isoformat()
-        streak_count, days_since_start = await update_streak(email, sent_dt)
-        
-        # Get previous messages to avoid repetition
-        previous_messages = await db.message_history.find(
-            {"email": email},
-            {"_id": 0}
-        ).sort("created_at", -1).limit(10).to_list(10)
-        
-        # Generate UNIQUE message with questions using the CALCULATED streak
-        message, message_type, used_fallback, research_snippet = await generate_unique_motivational_message(
-            user_data['goals'],
-            personality,
-            user_data.get('name'),
-            streak_count,  # Use calculated streak, not old one
-            previous_messages
-        )
+        streak_count = None
+        html_content = None
+        
+        pregenerated = select_pregenerated_email(user_data, personality, sent_dt)
+        if pregenerated:
+            streak_count, days_since_start = await update_streak(email, sent_dt)
+            if pregenerated.get("streak_count") != streak_count:
+                logger.info(f"♻️ Pre-generated email for {email} was written for streak {pregenerated.get('streak_count')}, actual {streak_count} - regenerating")
+                pregenerated = None
+        
+        if pregenerated:
+            # Content was generated ahead of the send time - only the SMTP hand-off is left
+            personality = PersonalityType(**pregenerated["personality"])
+            message = pregenerated["message"]
+            subject_line = pregenerated["subject"]
+            message_type = pregenerated.get("message_type", "default")
+            research_snippet = pregenerated.get("research_snippet")
+            used_fallback = False
+            if pregenerated.get("days_since_start") == days_since_start:
+                html_content = pregenerated.get("html")
+            logger.info(f"⚡ Using pre-generated content for {email}")
+        else:
+            # Independent stages run concurrently: streak (needed in the email), history and recent
+            # subjects (to avoid repetition), and persona research + research snippet
+            stage_start = time.time()
+            lookups = [
+                history_store.recent(email, 10, projection=HISTORY_PROJECTION),
+                get_recent_subjects(email),
+                gather_message_research(user_data['goals'], personality),
+            ]
+            if streak_count is None:
+                lookups.append(update_streak(email, sent_dt))
+            results = await asyncio.gather(*lookups)
+            previous_messages, recent_subjects, research = results[:3]
+            if streak_count is None:
+                streak_count, days_since_start = results[3]
+            logger.debug(f"Prepared inputs for {email} in {time.time() - stage_start:.2f}s")
+            
+            # Generate UNIQUE message and its subject line in one completion, using the CALCULATED streak
+            message, subject_line, message_type, used_fallback, research_snippet = await generate_motivational_email(
+                user_data['goals'],
+                personality,
+                user_data.get('name'),
+                streak_count,  # Use calculated streak, not old one
+                previous_messages,
+                research=research,
+                recent_subjects=recent_subjects
+            )
         
         if used_fallback:
             try:
@@ -1572,55 +1878,22 @@ async def send_motivation_to_user(email: str):
             "message": message,
             "personality": personality.model_dump(),
             "message_type": message_type,
+            "subject": subject_line,
             "created_at": sent_timestamp,
             "sent_at": sent_timestamp,
             "streak_at_time": streak_count,
             "used_fallback": used_fallback,
-            "message_id": email_message_id  # NEW: Store for email threading
+            "message_id": email_message_id,  # NEW: Store for email threading
+            **signature_fields(message)
         }
         await db.message_history.insert_one(history_doc)
+        await rollups.record_message(personality.value)
+        log_details.update(message_id=message_id, personality=personality.value, message_type=message_type)
         
-        streak_icon, streak_message = resolve_streak_badge(streak_count)
-        core_message, check_in_lines, quick_reply_lines = extract_interactive_sections(message)
-        ci_defaults, qr_defaults = generate_interactive_defaults(
-            streak_count,
-            user_data.get('goals', ''),
-        )
-        check_in_lines = check_in_lines or ci_defaults
-        quick_reply_lines = quick_reply_lines or qr_defaults
-
-        # Get unsubscribe URL - always use web URL, construct from email domain if FRONTEND_URL not set
-        frontend_url = os.getenv('FRONTEND_URL', '')
-        sender_email = os.getenv('SENDER_EMAIL', '')
-        email_domain = sender_email.split('@')[1] if '@' in sender_email else 'tend.app'
-        if frontend_url:
-            unsubscribe_url = f"{frontend_url}/unsubscribe?email={user_data['email']}"
-        else:
-            # Construct web URL from email domain as fallback (not mailto)
-            unsubscribe_url = f"https://{email_domain}/unsubscribe?email={user_data['email']}"
-        
-        html_content = render_email_html(
-            streak_count=streak_count,
-            streak_icon=streak_icon,
-            streak_message=streak_message,
-            core_message=core_message,
-            check_in_lines=check_in_lines,
-            quick_reply_lines=quick_reply_lines,
-            unsubscribe_url=unsubscribe_url,
-            days_since_start=days_since_start,
-        )
-
-        # Create updated user_data with new streak for subject line generation
-        updated_user_data = user_data.copy()
-        updated_user_data['streak_count'] = streak_count
-
-        subject_line = await compose_subject_line(
-            personality,
-            message_type,
-            updated_user_data,  # Use updated user_data with new streak
-            used_fallback,
-            research_snippet
-        )
+        if html_content is None:
+            html_content = render_primary_email_html(
+                message, user_data.get('goals', ''), user_data['email'], streak_count, days_since_start
+            )
         
         logger.debug(f"Generated subject line for {email}: {subject_line[:50]}...")
         logger.info(f"📤 Sending email to {email} (streak: {streak_count}, personality: {personality.value})")
@@ -1648,9 +1921,12 @@ async def send_motivation_to_user(email: str):
                 {"email": email},
                 {
                     "$set": update_data,
-                    "$inc": {"total_messages_received": 1}
+                    "$inc": {"total_messages_received": 1},
+                    "$unset": {"pregenerated_email": ""}
                 }
             )
+            await user_stats.record_message_sent(email)
+            await refresh_user_achievements(email)
             
             logger.info(f"✅ Email sent to {email} - Streak updated to {streak_count} days")
             
@@ -1663,6 +1939,7 @@ async def send_motivation_to_user(email: str):
                 status="success",
                 sent_dt=sent_dt,
                 timezone_value=schedule.get("timezone"),
+                **log_details,
             )
         else:
             logger.error(f"❌ Failed to send email to {email}: {error}")
@@ -1673,6 +1950,7 @@ async def send_motivation_to_user(email: str):
                 sent_dt=sent_dt,
                 timezone_value=schedule.get("timezone"),
                 error_message=error,
+                **log_details,
             )
             
     except Exception as e:
@@ -1685,6 +1963,7 @@ async def send_motivation_to_user(email: str):
             sent_dt=sent_dt,
             timezone_value=schedule.get("timezone") if isinstance(schedule, dict) else None,
             error_message=str(e),
+            **log_details,
         )
 
 # Background job to send scheduled emails (DEPRECATED - keeping for backwards compatibility)
@@ -1739,7 +2018,8 @@ async def send_scheduled_motivations():
                         message=message,
                         personality=personality
                     )
-                    await db.message_history.insert_one(history.model_dump())
+                    await db.message_history.insert_one({**history.model_dump(), **signature_fields(message)})
+                    await rollups.record_message(personality.value)
                     
                     html_content = f"""
                     <html>
@@ -1817,6 +2097,8 @@ async def send_scheduled_motivations():
                                 "$inc": {"total_messages_received": 1}
                             }
                         )
+                        await user_stats.record_message_sent(user_data['email'])
+                        await refresh_user_achievements(user_data['email'])
                         
                         logging.info(f"Sent motivation to {user_data['email']}")
                     else:
@@ -1835,73 +2117,101 @@ async def send_scheduled_motivations():
 async def root():
     return {"message": "Tend API", "version": "2.0"}
 
+# Dependency health is checked in the background; probes only read the cached results
+health_monitor = HealthMonitor()
+
+async def _health_check_database():
+    await db.command("ping")
+
+async def _health_check_scheduler():
+    if not scheduler.running:
+        raise RuntimeError("Scheduler is not running")
+    return {"jobs": len(scheduler.get_jobs())}
+
+async def _health_check_openai():
+    # Quota-bound - runs on a long interval (HEALTH_OPENAI_INTERVAL_SECONDS)
+    await openai_client.models.list()
+
+async def _health_check_smtp():
+    # Real EHLO/NOOP round trip through the shared pool (reuses an idle connection when there is one)
+    await get_smtp_pool().check()
+
+async def _health_check_imap():
+    from backend.email_reply_handler import check_imap_login
+    return await asyncio.to_thread(
+        check_imap_login, os.getenv("IMAP_HOST"), os.getenv("INBOX_EMAIL"), os.getenv("INBOX_PASSWORD")
+    )
+
+def register_health_checks():
+    """Register dependency checks; only the database and scheduler gate readiness"""
+    health_monitor.register("database", _health_check_database, interval_seconds=10, timeout_seconds=3)
+    health_monitor.register("scheduler", _health_check_scheduler, interval_seconds=10, timeout_seconds=1)
+    health_monitor.register(
+        "openai", _health_check_openai,
+        interval_seconds=int(os.getenv("HEALTH_OPENAI_INTERVAL_SECONDS", "300")), timeout_seconds=5, critical=False
+    )
+    health_monitor.register(
+        "smtp", _health_check_smtp,
+        interval_seconds=int(os.getenv("HEALTH_SMTP_INTERVAL_SECONDS", "60")), timeout_seconds=10, critical=False
+    )
+    if all([os.getenv("IMAP_HOST"), os.getenv("INBOX_EMAIL"), os.getenv("INBOX_PASSWORD")]):
+        health_monitor.register(
+            "imap", _health_check_imap,
+            interval_seconds=int(os.getenv("HEALTH_IMAP_INTERVAL_SECONDS", "300")), timeout_seconds=15, critical=False
+        )
+
+@api_router.get("/livez")
+@limiter.exempt  # Probes should not be rate limited
+async def liveness_probe():
+    """Liveness: the process and its event loop are responsive (no dependency I/O)"""
+    return {"status": "alive"}
+
+@api_router.get("/readyz")
+@limiter.exempt
+async def readiness_probe():
+    """Readiness: 200 once the database and scheduler checks pass, answered from cached state"""
+    readiness = health_monitor.readiness()
+    return JSONResponse(content=readiness, status_code=200 if readiness["ready"] else 503)
+
 @api_router.get("/health")
 @limiter.exempt  # Health checks should not be rate limited
 async def health_check():
     """
     Health check endpoint for monitoring and load balancers.
-    Returns 200 if healthy, 503 if unhealthy.
+    Returns 200 if healthy, 503 if unhealthy. Answered from the health monitor's cached state.
     """
+    readiness = health_monitor.readiness()
+    snapshot = health_monitor.snapshot(include_errors=False)["checks"]
+    
+    def component(name: str, ok_label: str) -> str:
+        state = snapshot.get(name, {}).get("status", "not_configured")
+        if state == "ok":
+            return ok_label
+        if state in ("unknown", "timeout", "not_configured"):
+            return state
+        return "disconnected"
+    
     checks = {
-        "status": "healthy",
-        "database": "unknown",
-        "openai": "unknown",
-        "smtp": "unknown",
+        "status": readiness["status"],
+        "database": component("database", "connected"),
+        "openai": component("openai", "connected"),
+        "smtp": component("smtp", "connected"),
         "version": "2.0",
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
     
-    # Check database connectivity
-    try:
-        await db.command("ping")
-        checks["database"] = "connected"
-    except Exception as e:
-        logger.error(f"Database health check failed: {e}")
-        checks["database"] = "disconnected"
-        checks["status"] = "unhealthy"
-        # Don't expose internal error details in production
-        is_production = os.getenv('ENVIRONMENT', '').lower() == 'production'
-        if not is_production:
-            checks["database_error"] = str(e)
-    
-    # Check OpenAI API connectivity
-    try:
-        # Simple API call to check connectivity
-        await asyncio.wait_for(
-            openai_client.models.list(),
-            timeout=5.0
-        )
-        checks["openai"] = "connected"
-    except asyncio.TimeoutError:
-        logger.warning("OpenAI API health check timed out")
-        checks["openai"] = "timeout"
-        checks["status"] = "degraded"
-    except Exception as e:
-        logger.error(f"OpenAI API health check failed: {e}")
-        checks["openai"] = "disconnected"
-        checks["status"] = "degraded"
-        # Don't expose internal error details in production
-        is_production = os.getenv('ENVIRONMENT', '').lower() == 'production'
-        if not is_production:
-            checks["openai_error"] = str(e)
-    
-    # Check SMTP configuration (not actual connection, just config)
-    smtp_host = os.getenv('SMTP_HOST')
-    smtp_username = os.getenv('SMTP_USERNAME')
-    smtp_password = os.getenv('SMTP_PASSWORD')
-    
-    if all([smtp_host, smtp_username, smtp_password]):
-        checks["smtp"] = "configured"
-    else:
-        checks["smtp"] = "not_configured"
-        if checks["status"] == "healthy":
-            checks["status"] = "degraded"
-    
-    # Determine status code
     status_code = 200 if checks["status"] == "healthy" else 503
-    
     return JSONResponse(content=checks, status_code=status_code)
 
+@api_router.get("/admin/health", dependencies=[Depends(verify_admin)])
+async def admin_get_health_details(refresh: bool = False):
+    """Detailed dependency health: last status, latency and error of every check"""
+    if refresh:
+        await health_monitor.refresh()
+    # Don't expose internal error details in production
+    is_production = os.getenv('ENVIRONMENT', '').lower() == 'production'
+    return health_monitor.snapshot(include_errors=not is_production)
+
 @api_router.post("/auth/clerk-sync")
 async def sync_clerk_user(request: Request):
     """
@@ -1987,6 +2297,7 @@ async def sync_clerk_user(request: Request):
             }
             
             await db.users.insert_one(new_user)
+            await rollups.record_signup()
             
             logger.info(f"✅ Created new user record in database: {clerk_email}")
             logger.info(f"📧 Attempting to send welcome email to: {clerk_email}")
@@ -2359,6 +2670,7 @@ async def complete_onboarding(request: OnboardingRequest, req: Request):
     else:
         # Create new user
         await db.users.insert_one(doc)
+        await rollups.record_signup()
         logger.info(f"✅ User created in database: {request.email}")
     
     # Save initial version history
@@ -2417,7 +2729,8 @@ async def complete_onboarding(request: OnboardingRequest, req: Request):
     
     # Schedule emails for this new user
     logger.info(f"📅 Scheduling emails for new user: {request.email}")
-    await schedule_user_emails()
+    await email_dispatcher.reschedule_user(request.email)
+    await refresh_user_achievements(request.email)
     
     onboarding_duration = time.time() - start_time
     logger.info(f"✅ Onboarding complete for {request.email} in {onboarding_duration:.2f}s")
@@ -2627,6 +2940,8 @@ async def update_user(email: str, updates: UserProfileUpdate, request: Request):
             user_email=email,
             details={"fields_updated": list(update_data.keys())}
         )
+        # Goals and personalities feed achievement requirements
+        await refresh_user_achievements(email)
     
     updated_user = await db.users.find_one({"email": email}, {"_id": 0})
     if isinstance(updated_user.get('created_at'), str):
@@ -2637,7 +2952,7 @@ async def update_user(email: str, updates: UserProfileUpdate, request: Request):
     # Reschedule if schedule was updated
     if 'schedule' in update_data or 'active' in update_data:
         logger.info(f"📅 Schedule/active changed for {email} - rescheduling emails")
-        await schedule_user_emails()
+        await email_dispatcher.reschedule_user(email, updated_user)
     
     update_duration = time.time() - start_time
     logger.info(f"✅ User update completed for {email} in {update_duration:.2f}s")
@@ -2687,25 +3002,18 @@ async def test_schedule(email: str):
         raise HTTPException(status_code=404, detail="User not found")
     
     schedule = user.get('schedule', {})
-    job_id = f"user_{email.replace('@', '_at_').replace('.', '_')}"
     
-    # Check if job exists
-    job_exists = False
-    next_run = None
-    try:
-        job = scheduler.get_job(job_id)
-        if job:
-            job_exists = True
-            next_run = job.next_run_time.isoformat() if job.next_run_time else None
-    except:
-        pass
+    # Primary emails are dispatched from next_send_at (no per-user scheduler job)
+    next_send_at = user.get('next_send_at')
+    if isinstance(next_send_at, datetime) and next_send_at.tzinfo is None:
+        next_send_at = next_send_at.replace(tzinfo=timezone.utc)
     
     return {
         "email": email,
         "schedule": schedule,
-        "job_exists": job_exists,
-        "job_id": job_id,
-        "next_run": next_run,
+        "job_exists": next_send_at is not None,
+        "job_id": "primary_email_dispatch",
+        "next_run": next_send_at.isoformat() if next_send_at else None,
         "active": user.get('active', False),
         "paused": schedule.get('paused', False)
     }
@@ -2727,17 +3035,23 @@ async def send_motivation_now(email: str, request: FastAPIRequest):
     if not personality:
         raise HTTPException(status_code=400, detail="No personality configured")
     
-    # Calculate streak FIRST (before generating message) to use correct streak in email
+    # Streak (needed in the email), recent subjects and persona research are independent - run concurrently
     sent_dt = datetime.now(timezone.utc)
-    streak_count, days_since_start = await update_streak(email, sent_dt)
+    (streak_count, days_since_start), recent_subjects, research = await asyncio.gather(
+        update_streak(email, sent_dt),
+        get_recent_subjects(email),
+        gather_message_research(user['goals'], personality),
+    )
     
-    # Generate message using the CALCULATED streak
-    message, message_type, used_fallback, research_snippet = await generate_unique_motivational_message(
+    # Generate message and subject line in one completion using the CALCULATED streak
+    message, subject_line, message_type, used_fallback, research_snippet = await generate_motivational_email(
         user['goals'],
         personality,
         user.get('name'),
         streak_count,  # Use calculated streak, not old one
-        []
+        [],
+        research=research,
+        recent_subjects=recent_subjects
     )
     if used_fallback:
         try:
@@ -2778,19 +3092,6 @@ async def send_motivation_now(email: str, request: FastAPIRequest):
         quick_reply_lines=quick_reply_lines,
         unsubscribe_url=unsubscribe_url,
     )
-    
-    # Create updated user with new streak for subject line generation
-    updated_user = user.copy()
-    updated_user['streak_count'] = streak_count
-    updated_user['days_since_start'] = days_since_start
-    
-    subject_line = await compose_subject_line(
-        personality,
-        "instant_boost",
-        updated_user,  # Use updated user with new streak
-        used_fallback,
-        research_snippet=research_snippet
-    )
 
     success, error = await send_email(email, subject_line, html_content)
     
@@ -2807,9 +3108,11 @@ async def send_motivation_now(email: str, request: FastAPIRequest):
             "created_at": sent_dt.isoformat(),
             "sent_at": sent_dt.isoformat(),
             "streak_at_time": streak_count,
-            "used_fallback": used_fallback
+            "used_fallback": used_fallback,
+            **signature_fields(message)
         }
         await db.message_history.insert_one(history_doc)
+        await rollups.record_message(personality.value)
         await db.users.update_one(
             {"email": email},
             {
@@ -2822,6 +3125,8 @@ async def send_motivation_now(email: str, request: FastAPIRequest):
                 "$inc": {"total_messages_received": 1}
             }
         )
+        await user_stats.record_message_sent(email)
+        await refresh_user_achievements(email)
         logger.info(f"✅ Email sent to {email} (send-now) - Streak updated to {streak_count} days")
         await record_email_log(
             email=email,
@@ -2829,6 +3134,10 @@ async def send_motivation_now(email: str, request: FastAPIRequest):
             status="success",
             sent_dt=sent_dt,
             timezone_value=user.get("schedule", {}).get("timezone"),
+            message_id=message_id,
+            personality=personality.value,
+            message_type=message_type,
+            channel="send_now",
         )
         return {"status": "success", "message": "Email sent successfully", "message_id": message_id}
     else:
@@ -2839,6 +3148,9 @@ async def send_motivation_now(email: str, request: FastAPIRequest):
             sent_dt=sent_dt,
             timezone_value=user.get("schedule", {}).get("timezone"),
             error_message=error,
+            personality=personality.value,
+            message_type=message_type,
+            channel="send_now",
         )
         raise HTTPException(status_code=500, detail=f"Failed to send email: {error}")
 
@@ -3016,10 +3328,7 @@ async def get_reply_analytics(admin_token: str = Header(None)):
 async def get_message_history(email: str, limit: int = 50):
     """Get user's message history with replies interleaved chronologically"""
     # Get sent messages
-    messages = await db.message_history.find(
-        {"email": email}, 
-        {"_id": 0}
-    ).sort("sent_at", -1).to_list(limit * 2)  # Get more to account for replies
+    messages = await history_store.recent(email, limit * 2, projection=HISTORY_PROJECTION)  # Get more to account for replies
     
     # Get user replies
     replies = await db.email_reply_conversations.find(
@@ -3181,10 +3490,8 @@ async def get_streak_status(email: str):
             raise HTTPException(status_code=404, detail="User not found")
         
         # Get most recent message
-        last_message = await db.message_history.find_one(
-            {"email": email},
-            {"sent_at": 1, "created_at": 1, "streak_at_time": 1},
-            sort=[("sent_at", -1)]
+        last_message = await history_store.latest(
+            email, projection={"sent_at": 1, "created_at": 1, "streak_at_time": 1}
         )
         
         last_message_streak = None
@@ -3217,10 +3524,9 @@ async def recalculate_streak_from_history(email: str):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get all messages sorted by date (most recent first, then we'll reverse)
-    messages = await db.message_history.find(
-        {"email": email},
-        {"sent_at": 1, "created_at": 1, "streak_at_time": 1}
-    ).sort("sent_at", -1).to_list(1000)  # Most recent first
+    messages = await history_store.recent(
+        email, 1000, projection={"sent_at": 1, "created_at": 1, "streak_at_time": 1}
+    )  # Most recent first
     
     if not messages:
         # No messages - reset streak to 0
@@ -3348,10 +3654,7 @@ async def submit_feedback(email: str, feedback: MessageFeedbackCreate):
     
     message_personality = None
     if feedback.message_id:
-        message_doc = await db.message_history.find_one(
-            {"id": feedback.message_id},
-            {"personality": 1},
-        )
+        message_doc = await history_store.find_by_id(feedback.message_id, projection={"personality": 1})
         if message_doc and message_doc.get("personality"):
             try:
                 message_personality = PersonalityType(**message_doc["personality"])
@@ -3370,16 +3673,16 @@ async def submit_feedback(email: str, feedback: MessageFeedbackCreate):
     
     feedback_dict = feedback_doc.model_dump()
     await db.message_feedback.insert_one(feedback_dict)
+    await user_stats.record_feedback(email, feedback.rating, feedback_doc.created_at)
+    await refresh_user_achievements(email)
+    await rollups.record_feedback(feedback.rating, personality.value if personality else None, feedback_doc.created_at)
     
     # Update message history with rating
     if feedback.message_id:
         update_fields = {"rating": feedback.rating}
         if feedback.feedback_text:
             update_fields["feedback_text"] = feedback.feedback_text
-        await db.message_history.update_one(
-            {"id": feedback.message_id},
-            {"$set": update_fields}
-        )
+        await history_store.update_by_id(feedback.message_id, update_fields)
     
     # Update last active
     await db.users.update_one(
@@ -3482,8 +3785,11 @@ async def get_user_analytics(email: str):
     total_feedback = len(feedbacks)
     engagement_rate = (total_feedback / total_messages * 100) if total_messages > 0 else 0
     
-    # Check for new achievements
-    unlocked = await check_and_unlock_achievements(email, user, total_feedback)
+    # Unlocks happen on the write paths; surface the ones the user hasn't acknowledged yet
+    unlocked = [
+        entry.get("achievement_id") for entry in user.get("achievement_history", [])
+        if isinstance(entry, dict) and entry.get("seen") is False
+    ]
     
     # Get user achievements
     user_achievements = user.get("achievements", [])
@@ -3536,6 +3842,7 @@ async def add_personality(email: str, personality: PersonalityType, background_t
         {"email": email},
         {"$set": {"personalities": personalities}}
     )
+    await refresh_user_achievements(email)
     
     # Trigger persona research in background if personality type supports it
     if personality.type == "famous":
@@ -3735,25 +4042,59 @@ async def log_research_fetch(persona_id: str, source_count: int, fetch_status: s
     except Exception as e:
         logger.error(f"Error logging research fetch: {e}")
 
+# Per-persona single flight: in-process futures, plus a Mongo lease so only one worker fetches
+PERSONA_RESEARCH_LOCK_TTL_SECONDS = 120
+PERSONA_RESEARCH_WAIT_SECONDS = 30
+persona_research_flight = SingleFlight(
+    leases, "persona_research",
+    lock_ttl_seconds=PERSONA_RESEARCH_LOCK_TTL_SECONDS,
+    wait_seconds=PERSONA_RESEARCH_WAIT_SECONDS,
+)
+
+async def load_cached_persona_research(persona_id: str) -> tuple[Optional[dict], bool]:
+    """Return (cached research doc or None, is_fresh)"""
+    cached = await db.persona_research.find_one({"persona_id": persona_id}, {"_id": 0})
+    if not cached:
+        return None, False
+    last_refreshed = cached.get("last_refreshed")
+    if isinstance(last_refreshed, str):
+        last_refreshed = datetime.fromisoformat(last_refreshed.replace('Z', '+00:00'))
+    if not isinstance(last_refreshed, datetime):
+        return cached, False
+    if last_refreshed.tzinfo is None:
+        last_refreshed = last_refreshed.replace(tzinfo=timezone.utc)
+    ttl_hours = cached.get("cache_ttl_hours", 24)
+    age_hours = (datetime.now(timezone.utc) - last_refreshed).total_seconds() / 3600
+    return cached, age_hours < ttl_hours
+
 async def get_or_fetch_persona_research(persona_id: str, persona_type: str, persona_value: str, force_refresh: bool = False) -> PersonaResearch:
     """
     Get persona research from cache or fetch new if stale/missing.
+    Concurrent callers for the same persona_id share one fetch (across workers too).
     Returns PersonaResearch object.
     """
+    stale = None
     # Check cache first
     if not force_refresh:
-        cached = await db.persona_research.find_one({"persona_id": persona_id})
-        if cached:
-            last_refreshed = cached.get("last_refreshed")
-            if isinstance(last_refreshed, str):
-                last_refreshed = datetime.fromisoformat(last_refreshed.replace('Z', '+00:00'))
-            ttl_hours = cached.get("cache_ttl_hours", 24)
-            age_hours = (datetime.now(timezone.utc) - last_refreshed).total_seconds() / 3600
-            if age_hours < ttl_hours:
-                # Cache is fresh
-                cached.pop("_id", None)
-                return PersonaResearch(**cached)
-    
+        cached, fresh = await load_cached_persona_research(persona_id)
+        if cached and fresh:
+            return PersonaResearch(**cached)
+        stale = PersonaResearch(**cached) if cached else None
+    
+    async def load_fresh() -> Optional[PersonaResearch]:
+        cached, fresh = await load_cached_persona_research(persona_id)
+        return PersonaResearch(**cached) if cached and fresh else None
+    
+    return await persona_research_flight.run(
+        persona_id,
+        lambda: refresh_persona_research(persona_id, persona_type, persona_value),
+        load_fresh,
+        stale=stale,
+        recheck=not force_refresh,
+    )
+
+async def refresh_persona_research(persona_id: str, persona_type: str, persona_value: str) -> PersonaResearch:
+    """Fetch, summarize and store persona research (callers should go through get_or_fetch_persona_research)"""
     # Cache miss or stale - fetch new research
     logger.info(f"Fetching fresh persona research for {persona_id}")
     raw_data = await fetch_persona_research_raw(persona_value, persona_type)
@@ -4343,10 +4684,9 @@ def redact_sensitive_info(text: str) -> str:
 async def get_last_3_emails(user_email: str) -> List[Dict[str, str]]:
     """Get last 3 sent emails for context (redacted)"""
     try:
-        messages = await db.message_history.find(
-            {"email": user_email},
-            {"subject": 1, "message": 1, "sent_at": 1}
-        ).sort("sent_at", -1).limit(3).to_list(3)
+        messages = await history_store.recent(
+            user_email, 3, projection={"subject": 1, "message": 1, "sent_at": 1}
+        )
         
         return [
             {
@@ -4375,17 +4715,6 @@ def check_impersonation(body: str, persona_name: str, confidence: float) -> bool
         return any(claim in body_lower for claim in claims)
     return False
 
-def calculate_similarity(text1: str, text2: str) -> float:
-    """Simple similarity check - returns 0-1 score"""
-    # Simple word overlap check
-    words1 = set(text1.lower().split())
-    words2 = set(text2.lower().split())
-    if not words1 or not words2:
-        return 0.0
-    intersection = words1.intersection(words2)
-    union = words1.union(words2)
-    return len(intersection) / len(union) if union else 0.0
-
 async def generate_dynamic_variety_params(
     mode: str,
     persona_research: Optional[Any],
@@ -4617,6 +4946,12 @@ Return ONLY a JSON object with:
 # ============================================================================
 
 # Enhanced LLM generation for goals with streak and last message context using structured pipeline
+# Drafts requested per goal message; the one least similar to the user's history is sent
+GOAL_MESSAGE_CANDIDATES = 3
+
+# MinHash/LSH lookups against each user's full message history
+near_duplicate_index = NearDuplicateIndex(db, history=history_store)
+
 async def generate_goal_message(
     goal: dict,
     user_data: dict,
@@ -4648,10 +4983,10 @@ async def generate_goal_message(
         goal_id = goal.get("id", "")
         
         # Get the most recent message sent for this goal (to find replies to it)
-        last_goal_message = await db.message_history.find_one(
-            {"email": user_email, "goal_id": goal_id},
-            {"_id": 0, "id": 1, "message": 1, "subject": 1, "sent_at": 1},
-            sort=[("sent_at", -1)]
+        last_goal_message = await history_store.latest(
+            user_email,
+            {"goal_id": goal_id},
+            projection={"_id": 0, "id": 1, "message": 1, "subject": 1, "sent_at": 1},
         )
         
         # ========================================================================
@@ -4939,25 +5274,29 @@ ENJOYMENT FACTORS:
 - Create a sense of PROGRESS and MOMENTUM
 - Make them feel SEEN and UNDERSTOOD
 
-OUTPUT FORMAT (JSON only):
+OUTPUT FORMAT (JSON only) - {GOAL_MESSAGE_CANDIDATES} alternative drafts, each taking a clearly different opening, angle and metaphor:
 {{
-    "subject": "<max 8 words, unique and compelling>",
-    "body": "<3-6 short lines, max {max_words} words, engaging and enjoyable>"
+    "candidates": [
+        {{
+            "subject": "<max 8 words, unique and compelling>",
+            "body": "<3-6 short lines, max {max_words} words, engaging and enjoyable>"
+        }}
+    ]
 }}
 
 CRITICAL: This email must be COMPLETELY DIFFERENT from the last 3 emails. Check your subject against {recent_subjects} - it must be unique. Check your themes against {recent_themes} - avoid repetition. Make it fresh, engaging, and something the user will actually ENJOY reading.
 
 Return ONLY valid JSON, no other text."""
 
-        # Step 6: Call LLM with higher creativity for variety
+        # Step 6: Call LLM with higher creativity for variety (several drafts in one completion)
         response = await openai_client.chat.completions.create(
             model="gpt-4o",
             messages=[
-                {"role": "system", "content": "You are a world-class motivational coach who creates unique, engaging, and enjoyable emails. Every email must be different, fresh, and delightful to read. You excel at variety, creativity, and making content that users genuinely enjoy. Return ONLY valid JSON with subject and body fields."},
+                {"role": "system", "content": "You are a world-class motivational coach who creates unique, engaging, and enjoyable emails. Every email must be different, fresh, and delightful to read. You excel at variety, creativity, and making content that users genuinely enjoy. Return ONLY valid JSON with a candidates list of subject and body fields."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.95,  # Higher temperature for more creativity and variety
-            max_tokens=500,  # Increased for more creative content
+            max_tokens=500 * GOAL_MESSAGE_CANDIDATES,
             response_format={"type": "json_object"}  # Force JSON output
         )
         
@@ -4970,103 +5309,59 @@ Return ONLY valid JSON, no other text."""
         content = content.strip()
         
         parsed = json.loads(content)
-        subject = parsed.get("subject", f"Your {goal_title} motivation").strip()
-        body = parsed.get("body", "").strip()
-        
-        # Step 7: Post-generation safety checks
-        # Length checks
-        subject_words = len(subject.split())
-        if subject_words > 8:
-            subject = " ".join(subject.split()[:8])
-        
-        body_words = len(body.split())
-        if body_words > max_words:
-            # Truncate to max_words
-            words = body.split()
-            body = " ".join(words[:max_words])
-        
-        # Profanity check
-        if check_profanity(subject) or check_profanity(body):
-            logger.warning(f"Profanity detected in generated message, sanitizing")
-            # Simple sanitization
-            body = body.replace("damn", "darn").replace("hell", "heck")
-            subject = subject.replace("damn", "darn").replace("hell", "heck")
-        
-        # Impersonation check (if personality mode)
-        if mode == "personality" and persona_research and persona_name:
-            if check_impersonation(body, persona_name, persona_research.confidence_score):
-                logger.warning(f"Impersonation detected, adjusting message")
-                # Add disclaimer or adjust
-                body = body.replace(f"I am {persona_name}", f"Inspired by {persona_name}'s style")
-        
-        # Similarity check vs last 3 emails - retry if too similar
-        max_retries = 2
-        retry_count = 0
-        while retry_count < max_retries:
-            too_similar = False
-            if last_3_emails:
-                for prev_email in last_3_emails:
-                    similarity = calculate_similarity(body, prev_email.get("body", ""))
-                    if similarity > 0.65:  # Too similar
-                        too_similar = True
-                        logger.warning(f"High similarity ({similarity:.2f}) to previous email, retrying with more variety")
-                        break
+        drafts = parsed.get("candidates") if isinstance(parsed.get("candidates"), list) else [parsed]
+        
+        # Step 7: Post-generation safety checks (per draft)
+        candidates = []
+        for draft in drafts:
+            if not isinstance(draft, dict):
+                continue
+            subject = (draft.get("subject") or f"Your {goal_title} motivation").strip()
+            body = (draft.get("body") or "").strip()
+            if not body:
+                continue
             
-            if not too_similar:
-                break
+            # Length checks
+            subject_words = len(subject.split())
+            if subject_words > 8:
+                subject = " ".join(subject.split()[:8])
             
-            # Retry with explicit variety instruction
-            if retry_count < max_retries - 1:
-                retry_prompt = f"""{prompt}
-
-CRITICAL RETRY INSTRUCTION: The previous attempt was too similar to recent emails. You MUST:
-1. Use a COMPLETELY DIFFERENT opening (not {chosen_structure}, try a different one)
-2. Use a COMPLETELY DIFFERENT angle (not {chosen_angle}, try a different one)
-3. Use COMPLETELY DIFFERENT words and phrases
-4. Change the emotional tone significantly
-5. Use different metaphors and examples
-6. Make it RADICALLY different while still being helpful
-
-Generate a NEW, UNIQUE email that is NOTHING like the previous attempt."""
-                
-                try:
-                    retry_response = await openai_client.chat.completions.create(
-                        model="gpt-4o",
-                        messages=[
-                            {"role": "system", "content": "You are a world-class motivational coach who creates unique, engaging, and enjoyable emails. Every email must be different, fresh, and delightful to read. Return ONLY valid JSON with subject and body fields."},
-                            {"role": "user", "content": retry_prompt}
-                        ],
-                        temperature=0.98,  # Even higher for retry
-                        max_tokens=500,
-                        response_format={"type": "json_object"}
-                    )
-                    
-                    retry_content = retry_response.choices[0].message.content.strip()
-                    if retry_content.startswith("```"):
-                        retry_content = retry_content.split("```")[1]
-                        if retry_content.startswith("json"):
-                            retry_content = retry_content[4:]
-                    retry_content = retry_content.strip()
-                    
-                    retry_parsed = json.loads(retry_content)
-                    subject = retry_parsed.get("subject", subject).strip()
-                    body = retry_parsed.get("body", body).strip()
-                    
-                    # Re-check length
-                    subject_words = len(subject.split())
-                    if subject_words > 8:
-                        subject = " ".join(subject.split()[:8])
-                    
-                    body_words = len(body.split())
-                    if body_words > max_words:
-                        words = body.split()
-                        body = " ".join(words[:max_words])
-                    
-                except Exception as e:
-                    logger.error(f"Error in retry generation: {e}")
-                    break
+            body_words = len(body.split())
+            if body_words > max_words:
+                # Truncate to max_words
+                words = body.split()
+                body = " ".join(words[:max_words])
+            
+            # Profanity check
+            if check_profanity(subject) or check_profanity(body):
+                logger.warning(f"Profanity detected in generated message, sanitizing")
+                # Simple sanitization
+                body = body.replace("damn", "darn").replace("hell", "heck")
+                subject = subject.replace("damn", "darn").replace("hell", "heck")
             
-            retry_count += 1
+            # Impersonation check (if personality mode)
+            if mode == "personality" and persona_research and persona_name:
+                if check_impersonation(body, persona_name, persona_research.confidence_score):
+                    logger.warning(f"Impersonation detected, adjusting message")
+                    # Add disclaimer or adjust
+                    body = body.replace(f"I am {persona_name}", f"Inspired by {persona_name}'s style")
+            
+            candidates.append((subject, body))
+        
+        subject, body = candidates[0] if candidates else ("", "")
+        
+        # Repetition check against the user's whole history: keep the most novel draft
+        if candidates and user_email:
+            try:
+                best, similarity = await near_duplicate_index.most_novel(user_email, [b for _, b in candidates])
+                subject, body = candidates[best]
+                if similarity >= near_duplicate_index.threshold:
+                    logger.warning(
+                        f"All {len(candidates)} drafts for {user_email} resemble past messages "
+                        f"(best similarity {similarity:.2f}) - sending the most novel"
+                    )
+            except Exception as e:
+                logger.warning(f"Near-duplicate check failed for {user_email}: {e}")
         
         # Final fallback if empty
         if not subject:
@@ -5084,23 +5379,220 @@ Generate a NEW, UNIQUE email that is NOTHING like the previous attempt."""
         body = f"Day {streak_count} of your journey toward {goal.get('title', 'your goal')}.\n\nKeep pushing forward. Every step counts.\n\nTake one small action today."
         return subject, body, True, None
 
+async def generate_goal_email_content(goal: dict, user: dict, streak_count: int) -> tuple[str, str, bool, Optional[dict]]:
+    """LLM content for a goal email, with the goal's (or user's) last message as context"""
+    goal_id = goal["id"]
+    user_email = user["email"]
+    
+    # Get last message from this goal first
+    last_message = await db.goal_messages.find_one(
+        {"goal_id": goal_id, "status": "sent"},
+        sort=[("sent_at", -1)]
+    )
+    
+    # If no goal message, check main message history for context
+    if not last_message:
+        main_last = await history_store.latest(user_email)
+        if main_last:
+            last_message = {
+                "generated_body": main_last.get("message", ""),
+                "sent_at": main_last.get("sent_at")
+            }
+    
+    return await generate_goal_message(goal, user, streak_count, last_message)
+
+def render_goal_email_html(body: str, goal: dict, streak_count: int, days_since_start: int, user_email: str) -> str:
+    """Render a goal email body into the main goal template"""
+    # Use the same email template as main goal (render_email_html) for all goals
+    # Extract interactive sections from body if present, or generate defaults
+    core_message = body
+    check_in_lines = []
+    quick_reply_lines = []
+    
+    # Try to extract interactive sections from body (if LLM included them)
+    if "INTERACTIVE CHECK-IN:" in body or "QUICK REPLY PROMPT:" in body:
+        parts = body.split("INTERACTIVE CHECK-IN:")
+        if len(parts) > 1:
+            check_part = parts[1].split("QUICK REPLY PROMPT:")[0].strip()
+            core_message = parts[0].strip()
+            # Extract bullet points
+            for line in check_part.split("\n"):
+                line = line.strip()
+                if line.startswith("- "):
+                    check_in_lines.append(line[2:].strip())
+            
+            if len(parts) > 1:
+                reply_part = parts[1].split("QUICK REPLY PROMPT:")
+                if len(reply_part) > 1:
+                    for line in reply_part[1].split("\n"):
+                        line = line.strip()
+                        if line.startswith("- "):
+                            quick_reply_lines.append(line[2:].strip())
+    
+    # Generate defaults if not found
+    if not check_in_lines:
+        check_in_lines, quick_reply_lines = generate_interactive_defaults(
+            streak_count,
+            goal.get('title', '')
+        )
+    
+    streak_icon, streak_message = resolve_streak_badge(streak_count)
+    
+    # Get unsubscribe URL - always use web URL, construct from email domain if FRONTEND_URL not set
+    frontend_url = os.getenv('FRONTEND_URL', '')
+    sender_email = os.getenv('SENDER_EMAIL', '')
+    email_domain = sender_email.split('@')[1] if '@' in sender_email else 'tend.app'
+    if frontend_url:
+        unsubscribe_url = f"{frontend_url}/unsubscribe?email={user_email}"
+    else:
+        # Construct web URL from email domain as fallback (not mailto)
+        unsubscribe_url = f"https://{email_domain}/unsubscribe?email={user_email}"
+    
+    # Use the main goal template (render_email_html) for all goals
+    return render_email_html(
+        streak_count=streak_count,
+        streak_icon=streak_icon,
+        streak_message=streak_message,
+        core_message=core_message,
+        check_in_lines=check_in_lines,
+        quick_reply_lines=quick_reply_lines,
+        unsubscribe_url=unsubscribe_url,
+        days_since_start=days_since_start,
+    )
+
+async def pregenerate_goal_message(msg: dict) -> bool:
+    """Generate and store a pending goal message's subject, body and HTML ahead of scheduled_for"""
+    goal = await db.goals.find_one({"id": msg["goal_id"]}, {"_id": 0})
+    user = await db.users.find_one({"email": msg["user_email"]}, {"_id": 0})
+    if not goal or not goal.get("active") or not user or not user.get("active") or user.get("unsubscribed"):
+        # The send job will skip/fail it with the proper status
+        return False
+    
+    # The send path renders with the user's streak as of send time; re-checked there
+    streak_count = user.get("streak_count", 0)
+    send_at = _as_utc_datetime(msg.get("scheduled_for")) or datetime.now(timezone.utc)
+    days_since_start = calculate_days_since_start(user.get("created_at"), send_at)
+    
+    subject, body, used_fallback, conversation_context = await generate_goal_email_content(goal, user, streak_count)
+    if used_fallback:
+        # Don't lock in a canned message hours ahead - retry later or generate at send time
+        return False
+    
+    result = await db.goal_messages.update_one(
+        {"id": msg["id"], "status": "pending"},
+        {"$set": {
+            "generated_subject": subject,
+            "generated_body": body,
+            "generated_html": render_goal_email_html(body, goal, streak_count, days_since_start, user["email"]),
+            "generated_streak": streak_count,
+            "generated_days_since_start": days_since_start,
+            "generated_used_fallback": False,
+            "generated_conversation_context": conversation_context,
+            "generated_at": datetime.now(timezone.utc),
+        }}
+    )
+    return result.modified_count > 0
+
+def goal_personality_dict(goal: dict, user: dict) -> dict:
+    """Personality a goal message is written in (from the goal's mode, else the user's current one)"""
+    personality_dict = None
+    if goal.get("mode") == "personality" and goal.get("personality_id"):
+        # Find personality in user's personalities
+        personalities = user.get("personalities", [])
+        for p in personalities:
+            if p.get("id") == goal.get("personality_id") or p.get("value") == goal.get("personality_id"):
+                personality_dict = {
+                    "id": p.get("id", str(uuid.uuid4())),
+                    "type": p.get("type", "custom"),
+                    "value": p.get("value", ""),
+                    "active": p.get("active", True)
+                }
+                break
+        # If not found, create from personality_id
+        if not personality_dict:
+            personality_dict = {
+                "id": goal.get("personality_id"),
+                "type": "famous",  # Default assumption
+                "value": goal.get("personality_id"),
+                "active": True
+            }
+    elif goal.get("mode") == "tone" and goal.get("tone"):
+        personality_dict = {
+            "id": str(uuid.uuid4()),
+            "type": "tone",
+            "value": goal.get("tone"),
+            "active": True
+        }
+    elif goal.get("mode") == "custom" and goal.get("custom_text"):
+        personality_dict = {
+            "id": str(uuid.uuid4()),
+            "type": "custom",
+            "value": goal.get("custom_text", ""),
+            "active": True
+        }
+    else:
+        # Fallback: use user's current personality
+        personalities = user.get("personalities", [])
+        current_index = user.get("current_personality_index", 0)
+        if personalities and current_index < len(personalities):
+            p = personalities[current_index]
+            personality_dict = {
+                "id": p.get("id", str(uuid.uuid4())),
+                "type": p.get("type", "custom"),
+                "value": p.get("value", ""),
+                "active": p.get("active", True)
+            }
+        else:
+            # Last resort: default personality
+            personality_dict = {
+                "id": str(uuid.uuid4()),
+                "type": "custom",
+                "value": "motivational coach",
+                "active": True
+            }
+    return personality_dict
+
 # Event-driven goal message sending - schedules one-time jobs for specific send times
+# A "sending" claim older than this is assumed to belong to a crashed worker and may be re-claimed
+GOAL_MESSAGE_CLAIM_STALE_AFTER = timedelta(minutes=15)
+
+async def claim_goal_message(message_id: str) -> Optional[dict]:
+    """Atomically move a goal message from pending to sending; returns it only if this caller won"""
+    now = datetime.now(timezone.utc)
+    return await db.goal_messages.find_one_and_update(
+        {
+            "id": message_id,
+            "$or": [
+                {"status": "pending"},
+                {"status": "sending", "claimed_at": {"$lt": now - GOAL_MESSAGE_CLAIM_STALE_AFTER}},
+            ],
+        },
+        {"$set": {"status": "sending", "claimed_by": leases.owner_id, "claimed_at": now}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+# Per-user cap on goal messages per local day (per-goal caps come from goal.send_limit_per_day)
+GOAL_MESSAGES_GLOBAL_DAILY_LIMIT = 10
+send_counters = DailySendCounters(db)
+
 async def send_goal_message_at_time(message_id: str):
     """Send a specific goal message (called by scheduled job at send time)"""
     logger.info(f"🕐 Goal message job triggered for message_id: {message_id}")
+    # Daily counter slots taken for this send; given back if it doesn't go out
+    reserved_slots: List[str] = []
     try:
-        # Get the message
-        msg = await db.goal_messages.find_one({"id": message_id})
+        # Claim the message - only one worker (or job) can move it out of "pending"
+        msg = await claim_goal_message(message_id)
         if not msg:
-            logger.warning(f"❌ Goal message {message_id} not found in database")
+            existing = await db.goal_messages.find_one({"id": message_id}, {"_id": 0, "status": 1, "claimed_by": 1})
+            if not existing:
+                logger.warning(f"❌ Goal message {message_id} not found in database")
+            else:
+                logger.info(f"⏭️ Goal message {message_id} already claimed/processed (status: {existing.get('status')}, by: {existing.get('claimed_by')}), skipping")
             return
         
-        logger.info(f"📧 Processing goal message {message_id} for goal {msg.get('goal_id')}, user {msg.get('user_email')}, status: {msg.get('status')}")
-        
-        # Check if already sent or skipped
-        if msg.get("status") != "pending":
-            logger.info(f"⏭️ Goal message {message_id} already processed (status: {msg.get('status')}), skipping")
-            return
+        logger.info(f"📧 Processing goal message {message_id} for goal {msg.get('goal_id')}, user {msg.get('user_email')} (claimed by {leases.owner_id})")
         
         goal_id = msg["goal_id"]
         user_email = msg["user_email"]
@@ -5149,184 +5641,89 @@ async def send_goal_message_at_time(message_id: str):
             )
             return
         
-        logger.info(f"✅ Goal and user checks passed, proceeding with email generation for {user_email}")
-        
-        # Check rate limits
-        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Global per-user limit (default 10/day)
-        all_today_messages = await db.goal_messages.find({
-            "user_email": user_email,
-            "status": "sent"
-        }).to_list(1000)
+        logger.info(f"✅ Goal and user checks passed, proceeding with email generation for {user_email}")
         
-        today_sent = 0
-        for sent_msg in all_today_messages:
-            sent_at = sent_msg.get("sent_at")
-            if sent_at:
-                if isinstance(sent_at, str):
-                    try:
-                        sent_dt = datetime.fromisoformat(sent_at.replace('Z', '+00:00'))
-                    except:
-                        continue
-                else:
-                    sent_dt = sent_at
-                if sent_dt >= today_start:
-                    today_sent += 1
+        # Check rate limits - one atomic counter per (user, local day) and (goal, local day)
+        local_day = user_local_day(user, datetime.now(timezone.utc))
         
-        global_limit = 10  # Configurable
-        if today_sent >= global_limit:
+        # Global per-user limit
+        user_counter = f"user:{user_email}:{local_day}"
+        global_limit = GOAL_MESSAGES_GLOBAL_DAILY_LIMIT
+        if not await send_counters.reserve(user_counter, global_limit):
             await db.goal_messages.update_one(
                 {"id": message_id},
                 {"$set": {"status": "skipped", "error_message": f"Global daily limit reached ({global_limit})"}}
             )
             return
+        reserved_slots.append(user_counter)
         
         # Per-goal limit
         goal_limit = goal.get("send_limit_per_day")
         if goal_limit:
-            goal_today_messages = await db.goal_messages.find({
-                "goal_id": goal_id,
-                "status": "sent"
-            }).to_list(1000)
-            
-            goal_today_sent = 0
-            for sent_msg in goal_today_messages:
-                sent_at = sent_msg.get("sent_at")
-                if sent_at:
-                    if isinstance(sent_at, str):
-                        try:
-                            sent_dt = datetime.fromisoformat(sent_at.replace('Z', '+00:00'))
-                        except:
-                            continue
-                    else:
-                        sent_dt = sent_at
-                    if sent_dt >= today_start:
-                        goal_today_sent += 1
-            
-            if goal_today_sent >= goal_limit:
+            goal_counter = f"goal:{goal_id}:{local_day}"
+            if not await send_counters.reserve(goal_counter, goal_limit):
+                for counter_id in reserved_slots:
+                    await send_counters.release(counter_id)
+                reserved_slots.clear()
                 await db.goal_messages.update_one(
                     {"id": message_id},
                     {"$set": {"status": "skipped", "error_message": f"Goal daily limit reached ({goal_limit})"}}
                 )
                 return
+            reserved_slots.append(goal_counter)
         
         # Get user streak and last message
         streak_count = user.get("streak_count", 0)
         
         # Calculate days_since_start
-        created_at = user.get('created_at')
         sent_at = datetime.now(timezone.utc)
-        if created_at:
-            if isinstance(created_at, str):
-                try:
-                    created_at_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                except:
-                    created_at_dt = datetime.fromisoformat(created_at)
-            else:
-                created_at_dt = created_at
-            if created_at_dt.tzinfo is None:
-                created_at_dt = created_at_dt.replace(tzinfo=timezone.utc)
-            days_since_start = (sent_at.date() - created_at_dt.date()).days + 1
-            if days_since_start < 1:
-                days_since_start = 1
+        days_since_start = calculate_days_since_start(user.get('created_at'), sent_at)
+        
+        if msg.get("generated_at") and msg.get("generated_body") and msg.get("generated_streak") == streak_count:
+            # Content was pre-generated ahead of the send time - only the SMTP hand-off is left
+            subject = msg["generated_subject"]
+            body = msg["generated_body"]
+            used_fallback = msg.get("generated_used_fallback", False)
+            conversation_context = msg.get("generated_conversation_context")
+            html_content = msg.get("generated_html") if msg.get("generated_days_since_start") == days_since_start else None
+            logger.info(f"⚡ Using pre-generated content for goal message {message_id}")
         else:
-            days_since_start = 1
-        
-        # Get last message from this goal first
-        last_message = await db.goal_messages.find_one(
-            {"goal_id": goal_id, "status": "sent"},
-            sort=[("sent_at", -1)]
-        )
-        
-        # If no goal message, check main message history for context
-        if not last_message:
-            main_last = await db.message_history.find_one(
-                {"email": user_email},
-                sort=[("sent_at", -1)]
-            )
-            if main_last:
-                last_message = {
-                    "generated_body": main_last.get("message", ""),
-                    "sent_at": main_last.get("sent_at")
-                }
-        
-        # Generate email content
-        subject, body, used_fallback, conversation_context = await generate_goal_message(
-            goal, user, streak_count, last_message
-        )
-        
-        # Update message with generated content
-        await db.goal_messages.update_one(
-            {"id": message_id},
-            {"$set": {
-                "generated_subject": subject,
-                "generated_body": body
-            }}
-        )
-        
-        # Use the same email template as main goal (render_email_html) for all goals
-        # Extract interactive sections from body if present, or generate defaults
-        core_message = body
-        check_in_lines = []
-        quick_reply_lines = []
-        
-        # Try to extract interactive sections from body (if LLM included them)
-        if "INTERACTIVE CHECK-IN:" in body or "QUICK REPLY PROMPT:" in body:
-            parts = body.split("INTERACTIVE CHECK-IN:")
-            if len(parts) > 1:
-                check_part = parts[1].split("QUICK REPLY PROMPT:")[0].strip()
-                core_message = parts[0].strip()
-                # Extract bullet points
-                for line in check_part.split("\n"):
-                    line = line.strip()
-                    if line.startswith("- "):
-                        check_in_lines.append(line[2:].strip())
-                
-                if len(parts) > 1:
-                    reply_part = parts[1].split("QUICK REPLY PROMPT:")
-                    if len(reply_part) > 1:
-                        for line in reply_part[1].split("\n"):
-                            line = line.strip()
-                            if line.startswith("- "):
-                                quick_reply_lines.append(line[2:].strip())
-        
-        # Generate defaults if not found
-        if not check_in_lines:
-            check_in_lines, quick_reply_lines = generate_interactive_defaults(
-                streak_count,
-                goal.get('title', '')
+            # Generate email content
+            subject, body, used_fallback, conversation_context = await generate_goal_email_content(goal, user, streak_count)
+            
+            # Update message with generated content
+            await db.goal_messages.update_one(
+                {"id": message_id},
+                {"$set": {
+                    "generated_subject": subject,
+                    "generated_body": body
+                }}
             )
+            html_content = None
         
-        streak_icon, streak_message = resolve_streak_badge(streak_count)
-        
-        # Get unsubscribe URL - always use web URL, construct from email domain if FRONTEND_URL not set
-        frontend_url = os.getenv('FRONTEND_URL', '')
-        sender_email = os.getenv('SENDER_EMAIL', '')
-        email_domain = sender_email.split('@')[1] if '@' in sender_email else 'tend.app'
-        if frontend_url:
-            unsubscribe_url = f"{frontend_url}/unsubscribe?email={user_email}"
-        else:
-            # Construct web URL from email domain as fallback (not mailto)
-            unsubscribe_url = f"https://{email_domain}/unsubscribe?email={user_email}"
-        
-        # Use the main goal template (render_email_html) for all goals
-        html_content = render_email_html(
-            streak_count=streak_count,
-            streak_icon=streak_icon,
-            streak_message=streak_message,
-            core_message=core_message,
-            check_in_lines=check_in_lines,
-            quick_reply_lines=quick_reply_lines,
-            unsubscribe_url=unsubscribe_url,
-            days_since_start=days_since_start,
-        )
+        if html_content is None:
+            html_content = render_goal_email_html(body, goal, streak_count, days_since_start, user_email)
         
+        personality_dict = goal_personality_dict(goal, user)
         success, error = await send_email(user_email, subject, html_content)
         
         sent_at = datetime.now(timezone.utc)
+        await record_email_log(
+            email=user_email,
+            subject=subject,
+            status="success" if success else "failed",
+            sent_dt=sent_at,
+            timezone_value=user.get("user_timezone") or user.get("schedule", {}).get("timezone"),
+            error_message=None if success else error,
+            message_id=message_id,
+            personality=personality_dict.get("value"),
+            goal_id=goal_id,
+            channel="goal",
+        )
         
         if success:
+            # The send went out - its counter slots are now permanent
+            reserved_slots.clear()
             await db.goal_messages.update_one(
                 {"id": message_id},
                 {"$set": {
@@ -5405,67 +5802,12 @@ async def send_goal_message_at_time(message_id: str):
                     "$inc": {"total_messages_received": 1}
                 }
             )
+            await user_stats.record_message_sent(user_email)
+            await refresh_user_achievements(user_email)
             
             logger.info(f"✅ Goal message sent: {goal_id} -> {user_email}")
             
             # Also save to message_history so it appears in history tab
-            # Determine personality from goal mode
-            personality_dict = None
-            if goal.get("mode") == "personality" and goal.get("personality_id"):
-                # Find personality in user's personalities
-                personalities = user.get("personalities", [])
-                for p in personalities:
-                    if p.get("id") == goal.get("personality_id") or p.get("value") == goal.get("personality_id"):
-                        personality_dict = {
-                            "id": p.get("id", str(uuid.uuid4())),
-                            "type": p.get("type", "custom"),
-                            "value": p.get("value", ""),
-                            "active": p.get("active", True)
-                        }
-                        break
-                # If not found, create from personality_id
-                if not personality_dict:
-                    personality_dict = {
-                        "id": goal.get("personality_id"),
-                        "type": "famous",  # Default assumption
-                        "value": goal.get("personality_id"),
-                        "active": True
-                    }
-            elif goal.get("mode") == "tone" and goal.get("tone"):
-                personality_dict = {
-                    "id": str(uuid.uuid4()),
-                    "type": "tone",
-                    "value": goal.get("tone"),
-                    "active": True
-                }
-            elif goal.get("mode") == "custom" and goal.get("custom_text"):
-                personality_dict = {
-                    "id": str(uuid.uuid4()),
-                    "type": "custom",
-                    "value": goal.get("custom_text", ""),
-                    "active": True
-                }
-            else:
-                # Fallback: use user's current personality
-                personalities = user.get("personalities", [])
-                current_index = user.get("current_personality_index", 0)
-                if personalities and current_index < len(personalities):
-                    p = personalities[current_index]
-                    personality_dict = {
-                        "id": p.get("id", str(uuid.uuid4())),
-                        "type": p.get("type", "custom"),
-                        "value": p.get("value", ""),
-                        "active": p.get("active", True)
-                    }
-                else:
-                    # Last resort: default personality
-                    personality_dict = {
-                        "id": str(uuid.uuid4()),
-                        "type": "custom",
-                        "value": "motivational coach",
-                        "active": True
-                    }
-            
             # Save to message_history
             history_doc = {
                 "id": message_id,  # Use same ID as goal_message for consistency
@@ -5480,13 +5822,19 @@ async def send_goal_message_at_time(message_id: str):
                 "used_fallback": used_fallback,
                 "goal_id": goal_id,  # Link to goal
                 "goal_title": goal.get("title", "Unknown Goal"),
-                "conversation_context": conversation_context  # Include reply context if available
+                "conversation_context": conversation_context,  # Include reply context if available
+                **signature_fields(body)
             }
             await db.message_history.insert_one(history_doc)
+            await rollups.record_message(personality_dict.get("value") if personality_dict else None)
             
             # Schedule next send time for this goal
             await schedule_next_goal_send(goal_id, user_email)
         else:
+            for counter_id in reserved_slots:
+                await send_counters.release(counter_id)
+            reserved_slots.clear()
+            
             # Retry logic
             retry_count = msg.get("retry_count", 0)
             if retry_count < 3:
@@ -5496,6 +5844,7 @@ async def send_goal_message_at_time(message_id: str):
                 await db.goal_messages.update_one(
                     {"id": message_id},
                     {"$set": {
+                        "status": "pending",  # Release the claim so the retry can re-claim it
                         "scheduled_for": new_scheduled_for,
                         "retry_count": retry_count + 1,
                         "error_message": error
@@ -5527,6 +5876,8 @@ async def send_goal_message_at_time(message_id: str):
     
     except Exception as e:
         logger.error(f"Error sending goal message {message_id}: {e}", exc_info=True)
+        for counter_id in reserved_slots:
+            await send_counters.release(counter_id)
         await db.goal_messages.update_one(
             {"id": message_id},
             {"$set": {
@@ -5555,7 +5906,7 @@ async def schedule_next_goal_send(goal_id: str, user_email: str):
                     existing = await db.goal_messages.find_one({
                         "goal_id": goal_id,
                         "scheduled_for": next_time,
-                        "status": {"$in": ["pending", "sent"]}
+                        "status": {"$in": ["pending", "sending", "sent"]}
                     })
                     
                     if not existing:
@@ -5566,6 +5917,7 @@ async def schedule_next_goal_send(goal_id: str, user_email: str):
                             "goal_id": goal_id,
                             "user_email": user_email,
                             "scheduled_for": next_time,
+                            "generate_after": pregeneration_worker.plan(next_time),
                             "status": "pending",
                             "created_at": datetime.now(timezone.utc).isoformat()
                         }
@@ -5589,147 +5941,207 @@ async def schedule_next_goal_send(goal_id: str, user_email: str):
     except Exception as e:
         logger.error(f"Error scheduling next goal send for {goal_id}: {e}", exc_info=True)
 
-async def schedule_goal_jobs_for_goal(goal_id: str, user_email: str):
-    """Schedule all upcoming send jobs for a goal (called when goal is created/updated)"""
-    try:
-        goal = await db.goals.find_one({"id": goal_id}, {"_id": 0})
-        if not goal or not goal.get("active"):
-            return
-        
-        # Remove existing jobs for this goal
-        for job in scheduler.get_jobs():
-            if job.id.startswith(f"goal_msg_") and len(job.args) > 0:
-                # Check if this message belongs to this goal
-                message_id = job.args[0]
-                msg = await db.goal_messages.find_one({"id": message_id})
-                if msg and msg.get("goal_id") == goal_id:
-                    try:
-                        scheduler.remove_job(job.id)
-                    except:
-                        pass
-        
-        # Schedule jobs for EACH schedule in the goal (handles multiple schedules automatically)
-        total_jobs_created = 0
-        for schedule_idx, schedule in enumerate(goal.get("schedules", [])):
-            if not schedule.get("active", True):
-                continue
-            
-            schedule_name = schedule.get("schedule_name", f"Schedule {schedule_idx + 1}")
-            schedule_id = schedule.get("id", str(uuid.uuid4()))
-            
-            # Calculate next send times for THIS schedule (up to 7 days ahead)
-            # This now handles multiple times per day via the times array
-            next_times = await calculate_next_send_times(schedule, goal_id, user_email, lookahead_days=7)
+def _as_utc_datetime(value) -> Optional[datetime]:
+    """Normalize a stored scheduled_for (datetime or ISO string) to an aware UTC datetime"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def _register_goal_message_job(message_id: str, send_time: datetime) -> bool:
+    """Add the DateTrigger job for a goal message unless this process already has it"""
+    job_id = f"goal_msg_{message_id}"
+    if scheduler.get_job(job_id):
+        return False
+    scheduler.add_job(
+        send_goal_message_at_time,
+        DateTrigger(run_date=send_time),
+        args=[message_id],
+        id=job_id,
+        replace_existing=True
+    )
+    return True
+
+async def remove_goal_jobs(goal_id: str) -> int:
+    """Remove this process's scheduled jobs for a goal's not-yet-sent messages"""
+    message_ids = await db.goal_messages.distinct(
+        "id", {"goal_id": goal_id, "status": {"$in": ["pending", "sending", "skipped"]}}
+    )
+    removed = 0
+    for message_id in message_ids:
+        job_id = f"goal_msg_{message_id}"
+        if scheduler.get_job(job_id):
+            try:
+                scheduler.remove_job(job_id)
+                removed += 1
+            except Exception:
+                pass
+    return removed
+
+async def reconcile_goal_jobs(goal_ids: Optional[List[str]] = None, batch_size: int = 200) -> Dict[str, int]:
+    """
+    Incrementally bring goal_messages and scheduler jobs in line with goal schedules.
+
+    For each batch of active goals (keyset-paged by id), the desired send times from
+    calculate_next_send_times are diffed against existing pending/sending/sent messages
+    fetched with one aggregation; missing messages are inserted with one bulk_write and
+    only jobs this process doesn't already hold are registered.
+    """
+    stats = {"goals": 0, "messages_created": 0, "jobs_registered": 0}
+    if not scheduler.running:
+        logger.warning("⚠️ Scheduler not running! Starting scheduler...")
+        scheduler.start()
+    
+    last_id = None
+    while True:
+        id_filter: Dict[str, Any] = {}
+        if goal_ids is not None:
+            id_filter["$in"] = goal_ids
+        if last_id is not None:
+            id_filter["$gt"] = last_id
+        query: Dict[str, Any] = {"active": True}
+        if id_filter:
+            query["id"] = id_filter
+        
+        goals = await db.goals.find(
+            query, {"_id": 0, "id": 1, "user_email": 1, "schedules": 1}
+        ).sort("id", 1).limit(batch_size).to_list(batch_size)
+        if not goals:
+            break
+        last_id = goals[-1]["id"]
+        batch_ids = [g["id"] for g in goals]
+        
+        now = datetime.now(timezone.utc)
+        window_start = now - timedelta(minutes=1)
+        existing_by_goal: Dict[str, List[dict]] = {}
+        # scheduled_for is a datetime for some writers and an ISO string for others
+        async for row in db.goal_messages.aggregate([
+            {"$match": {
+                "goal_id": {"$in": batch_ids},
+                "status": {"$in": ["pending", "sending", "sent"]},
+                "$or": [
+                    {"scheduled_for": {"$gte": window_start}},
+                    {"scheduled_for": {"$gte": window_start.isoformat()}},
+                ],
+            }},
+            {"$group": {
+                "_id": "$goal_id",
+                "messages": {"$push": {"id": "$id", "scheduled_for": "$scheduled_for", "status": "$status"}},
+            }},
+        ]):
+            existing_by_goal[row["_id"]] = row["messages"]
+        
+        inserts = []
+        to_register: List[tuple] = []
+        for goal in goals:
+            goal_id = goal["id"]
+            existing_times = []
+            for existing_msg in existing_by_goal.get(goal_id, []):
+                existing_dt = _as_utc_datetime(existing_msg.get("scheduled_for"))
+                if existing_dt is None:
+                    continue
+                existing_times.append(existing_dt)
+                if existing_msg.get("status") == "pending" and existing_dt > now:
+                    to_register.append((existing_msg["id"], existing_dt))
             
-            for send_time in next_times:
-                # Convert send_time to ISO string for database storage
-                send_time_iso = send_time.isoformat() if isinstance(send_time, datetime) else send_time
-                
-                # Check if message already exists for this exact time
-                # Compare by converting both to ISO strings for reliable comparison
-                existing_messages = await db.goal_messages.find({
-                    "goal_id": goal_id,
-                    "status": {"$in": ["pending", "sent"]}
-                }).to_list(100)
-                
-                # Check if we already have a message for this time (within 1 minute tolerance)
-                is_duplicate = False
-                for existing_msg in existing_messages:
-                    existing_scheduled = existing_msg.get("scheduled_for")
-                    if existing_scheduled:
-                        # Normalize to datetime for comparison
-                        if isinstance(existing_scheduled, str):
-                            try:
-                                existing_dt = datetime.fromisoformat(existing_scheduled.replace('Z', '+00:00'))
-                            except:
-                                try:
-                                    existing_dt = datetime.fromisoformat(existing_scheduled)
-                                except:
-                                    continue
-                        elif isinstance(existing_scheduled, datetime):
-                            existing_dt = existing_scheduled
-                        else:
-                            continue
-                        
-                        # Ensure timezone aware
-                        if existing_dt.tzinfo is None:
-                            existing_dt = existing_dt.replace(tzinfo=timezone.utc)
-                        
-                        # Check if times are within 1 minute of each other (same send time)
-                        time_diff = abs((send_time - existing_dt).total_seconds())
-                        if time_diff < 60:  # Same time (within 1 minute)
-                            logger.debug(f"⏭️ Skipping duplicate send time for goal {goal_id}: {send_time_iso} (existing: {existing_scheduled})")
-                            is_duplicate = True
-                            break
-                
-                if not is_duplicate:
-                    # Create message record
+            for schedule_idx, schedule in enumerate(goal.get("schedules", [])):
+                if not schedule.get("active", True):
+                    continue
+                schedule_name = schedule.get("schedule_name", f"Schedule {schedule_idx + 1}")
+                schedule_id = schedule.get("id", str(uuid.uuid4()))
+                next_times = await calculate_next_send_times(schedule, goal_id, goal["user_email"], lookahead_days=7)
+                for send_time in next_times:
+                    # Same send time if within 1 minute of an existing message
+                    if any(abs((send_time - t).total_seconds()) < 60 for t in existing_times):
+                        continue
                     message_id = str(uuid.uuid4())
-                    message_doc = {
+                    inserts.append(InsertOne({
                         "id": message_id,
                         "goal_id": goal_id,
-                        "user_email": user_email,
-                        "scheduled_for": send_time_iso,  # Store as ISO string for consistency
+                        "user_email": goal["user_email"],
+                        "scheduled_for": send_time.isoformat(),  # Store as ISO string for consistency
+                        "generate_after": pregeneration_worker.plan(send_time),
                         "schedule_name": schedule_name,
                         "schedule_id": schedule_id,
                         "status": "pending",
-                        "created_at": datetime.now(timezone.utc).isoformat()
-                    }
-                    await db.goal_messages.insert_one(message_doc)
-                    
-                    # Schedule the job with APScheduler
-                    job_id = f"goal_msg_{message_id}"
-                    try:
-                        # Ensure scheduler is running
-                        if not scheduler.running:
-                            logger.warning("⚠️ Scheduler not running! Starting scheduler...")
-                            scheduler.start()
-                        
-                        # Check if send_time is in the past (shouldn't happen, but safety check)
-                        now_utc = datetime.now(timezone.utc)
-                        if send_time <= now_utc:
-                            logger.warning(f"⚠️ Send time {send_time.isoformat()} is in the past (now: {now_utc.isoformat()}), skipping job creation")
-                            await db.goal_messages.update_one(
-                                {"id": message_id},
-                                {"$set": {
-                                    "status": "failed",
-                                    "error_message": f"Send time {send_time.isoformat()} is in the past"
-                                }}
-                            )
-                            continue
-                        
-                        # Add job to scheduler
-                        scheduler.add_job(
-                            send_goal_message_at_time,
-                            DateTrigger(run_date=send_time),
-                            args=[message_id],
-                            id=job_id,
-                            replace_existing=True
-                        )
-                        total_jobs_created += 1
-                        
-                        # Calculate time until send
-                        time_until_send = send_time - now_utc
-                        logger.info(f"✅ Scheduled job {job_id} for goal {goal_id} at {send_time.isoformat()} (UTC) - in {time_until_send.total_seconds() / 60:.1f} minutes")
-                    except Exception as job_error:
-                        logger.error(f"❌ Failed to schedule job {job_id} for {send_time.isoformat()}: {job_error}", exc_info=True)
-                        # Mark message as failed
-                        await db.goal_messages.update_one(
-                            {"id": message_id},
-                            {"$set": {
-                                "status": "failed",
-                                "error_message": f"Failed to schedule job: {str(job_error)}"
-                            }}
-                        )
-        
-        logger.info(f"✅ Scheduled {total_jobs_created} jobs for goal {goal_id} ({len(goal.get('schedules', []))} schedules)")
+                        "created_at": now.isoformat()
+                    }))
+                    existing_times.append(send_time)
+                    to_register.append((message_id, send_time))
+        
+        if inserts:
+            await db.goal_messages.bulk_write(inserts, ordered=False)
+            stats["messages_created"] += len(inserts)
+        for message_id, send_time in to_register:
+            try:
+                if _register_goal_message_job(message_id, send_time):
+                    stats["jobs_registered"] += 1
+            except Exception as job_error:
+                logger.error(f"❌ Failed to schedule job goal_msg_{message_id} for {send_time.isoformat()}: {job_error}", exc_info=True)
+        stats["goals"] += len(goals)
+    
+    return stats
+
+async def schedule_goal_jobs_for_goal(goal_id: str, user_email: str):
+    """Schedule all upcoming send jobs for a goal (called when goal is created/updated)"""
+    try:
+        stats = await reconcile_goal_jobs([goal_id])
+        logger.info(f"✅ Scheduled goal {goal_id}: {stats['messages_created']} new messages, {stats['jobs_registered']} jobs registered")
     except Exception as e:
         logger.error(f"Error scheduling goal jobs for {goal_id}: {e}", exc_info=True)
 
-# Legacy function kept for backward compatibility but not used
+@leases.singleton()
+async def reconcile_all_goal_jobs():
+    """Leader-only periodic reconcile - keeps the 7-day window of goal messages topped up"""
+    try:
+        reconcile_start = time.time()
+        stats = await reconcile_goal_jobs()
+        logger.info(
+            f"✅ Goal reconcile: {stats['goals']} goals, {stats['messages_created']} messages created, "
+            f"{stats['jobs_registered']} jobs registered in {time.time() - reconcile_start:.2f}s"
+        )
+    except Exception as e:
+        logger.error(f"❌ Error reconciling goal jobs: {e}", exc_info=True)
+
+@leases.singleton()
 async def dispatch_goal_messages():
-    """Legacy function - no longer used. Jobs are now scheduled individually."""
-    pass
+    """
+    Safety-net sweep for due goal messages whose in-memory DateTrigger job was lost
+    (the worker that registered it restarted or died). Runs on the leader only; each
+    send still claims its message, so a job firing concurrently can't double-send.
+    """
+    now = datetime.now(timezone.utc)
+    # Leave the first minute to the precise DateTrigger jobs
+    due_before = now - timedelta(seconds=60)
+    not_before = now - timedelta(seconds=int(os.getenv('DISPATCH_MISFIRE_GRACE_SECONDS', '1800')))
+    # scheduled_for is stored as a datetime by some writers and an ISO string by others
+    due = await db.goal_messages.find(
+        {
+            "status": "pending",
+            "$or": [
+                {"scheduled_for": {"$gte": not_before, "$lte": due_before}},
+                {"scheduled_for": {"$gte": not_before.isoformat(), "$lte": due_before.isoformat()}},
+            ],
+        },
+        {"_id": 0, "id": 1}
+    ).limit(500).to_list(500)
+    if not due:
+        return
+    
+    logger.info(f"🧹 Goal message sweep: {len(due)} overdue pending message(s) without a live job")
+    sweep_limit = asyncio.Semaphore(10)
+    
+    async def _send(message_id: str):
+        async with sweep_limit:
+            await send_goal_message_at_time(message_id)
+    
+    await asyncio.gather(*(_send(m["id"]) for m in due))
 
 # Helper function to calculate next send times for a schedule
 async def calculate_next_send_times(schedule: dict, goal_id: str, user_email: str, lookahead_days: int = 7) -> List[datetime]:
@@ -6007,32 +6419,13 @@ async def update_goal(email: str, goal_id: str, request: GoalUpdateRequest):
             {"$set": {"status": "skipped", "error_message": "Goal deactivated"}}
         )
         # Remove scheduled jobs for this goal
-        for job in scheduler.get_jobs():
-            if job.id.startswith(f"goal_msg_") and len(job.args) > 0:
-                message_id = job.args[0]
-                msg = await db.goal_messages.find_one({"id": message_id})
-                if msg and msg.get("goal_id") == goal_id:
-                    try:
-                        scheduler.remove_job(job.id)
-                    except:
-                        pass
+        await remove_goal_jobs(goal_id)
     # If schedules were updated or goal reactivated, reschedule jobs
     # ALWAYS reschedule if schedules are provided (even if they look the same, times might have changed)
     if request.schedules is not None or (request.active is True and not goal.get("active", False)):
         logger.info(f"🔄 Rescheduling jobs for goal {goal_id} (schedules updated or goal reactivated)")
         # Remove old jobs
-        removed_count = 0
-        for job in scheduler.get_jobs():
-            if job.id.startswith(f"goal_msg_") and len(job.args) > 0:
-                message_id = job.args[0]
-                msg = await db.goal_messages.find_one({"id": message_id})
-                if msg and msg.get("goal_id") == goal_id:
-                    try:
-                        scheduler.remove_job(job.id)
-                        removed_count += 1
-                        logger.debug(f"🗑️ Removed old job {job.id} for goal {goal_id}")
-                    except Exception as e:
-                        logger.warning(f"⚠️ Failed to remove job {job.id}: {e}")
+        removed_count = await remove_goal_jobs(goal_id)
         logger.info(f"🗑️ Removed {removed_count} old jobs for goal {goal_id}")
         
         # Cancel old pending messages
@@ -6062,15 +6455,7 @@ async def delete_goal(email: str, goal_id: str):
     )
     
     # Remove scheduled jobs for this goal
-    for job in scheduler.get_jobs():
-        if job.id.startswith(f"goal_msg_") and len(job.args) > 0:
-            message_id = job.args[0]
-            msg = await db.goal_messages.find_one({"id": message_id})
-            if msg and msg.get("goal_id") == goal_id:
-                try:
-                    scheduler.remove_job(job.id)
-                except:
-                    pass
+    await remove_goal_jobs(goal_id)
     
     logger.info(f"Deleted goal {goal_id} for user {email}")
     return {"status": "success"}
@@ -6083,17 +6468,18 @@ async def get_goal_history(email: str, goal_id: str, limit: int = 50):
     if goal_id == "main_goal":
         # For primary goals, get messages from message_history where goal_id is null/undefined
         # These are the main scheduled emails (not goal-specific)
-        messages = await db.message_history.find(
+        messages = await history_store.recent(
+            email,
+            limit,
             {
-                "email": email,
                 "$or": [
                     {"goal_id": {"$exists": False}},  # No goal_id field
                     {"goal_id": None},  # goal_id is None
                     {"goal_id": ""}  # goal_id is empty string
                 ]
             },
-            {"_id": 0}
-        ).sort("sent_at", -1).to_list(limit)
+            projection={"_id": 0},
+        )
         
         # Convert to goal_messages format for consistency
         formatted_messages = []
@@ -6210,6 +6596,16 @@ async def get_user_achievements(email: str):
         "total_available": len(achievements_dict)
     }
 
+@api_router.post("/users/{email}/achievements/seen")
+async def mark_achievements_seen(email: str):
+    """Acknowledge newly unlocked achievements so analytics stops reporting them as new"""
+    result = await db.users.update_one(
+        {"email": email, "achievement_history.seen": False},
+        {"$set": {"achievement_history.$[entry].seen": True}},
+        array_filters=[{"entry.seen": False}]
+    )
+    return {"status": "success", "updated": result.modified_count > 0}
+
 # ============================================================================
 # FEATURE 3: MESSAGE ENHANCEMENTS (Favorites, Collections)
 # ============================================================================
@@ -6222,7 +6618,7 @@ async def toggle_message_favorite(email: str, message_id: str):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify message exists
-    message = await db.message_history.find_one({"id": message_id, "email": email})
+    message = await history_store.find_by_id(message_id, email=email, projection={"_id": 0, "id": 1})
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     
@@ -6258,10 +6654,7 @@ async def get_favorite_messages(email: str):
         raise HTTPException(status_code=404, detail="User not found")
     
     favorites = user.get("favorite_messages", [])
-    messages = await db.message_history.find(
-        {"id": {"$in": favorites}, "email": email},
-        {"_id": 0}
-    ).sort("sent_at", -1).to_list(100)
+    messages = (await history_store.find_by_ids(email, favorites, HISTORY_PROJECTION))[:100]
     
     return {"messages": messages, "count": len(messages)}
 
@@ -6370,9 +6763,8 @@ async def update_goal_progress(email: str, goal_data: dict):
         "updated_at": datetime.now(timezone.utc).isoformat()
     }
     
-    # Check if goal completed (for achievement)
-    if goal_data.get("completed") and not goal_progress[goal_id].get("was_completed", False):
-        await check_and_unlock_achievements(email, user, 0)
+    newly_completed = goal_data.get("completed") and not goal_progress[goal_id].get("was_completed", False)
+    if newly_completed:
         goal_progress[goal_id]["was_completed"] = True
     
     await db.users.update_one(
@@ -6380,6 +6772,10 @@ async def update_goal_progress(email: str, goal_data: dict):
         {"$set": {"goal_progress": goal_progress}}
     )
     
+    # Check if goal completed (for achievement)
+    if newly_completed:
+        await refresh_user_achievements(email)
+    
     return {"status": "success", "goal": goal_progress[goal_id]}
 
 @api_router.get("/users/{email}/goals/progress")
@@ -6798,38 +7194,47 @@ async def delete_custom_personality(email: str, personality_id: str):
 # ============================================================================
 
 @api_router.get("/users/{email}/export/messages")
-async def export_messages(email: str, format: str = "json"):
-    """Export messages in various formats"""
-    user = await db.users.find_one({"email": email}, {"_id": 0})
+async def export_messages(
+    email: str,
+    format: str = "json",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    gzip: bool = False
+):
+    """
+    Export a user's full message history as a download (newest first).
+    Formats: json, ndjson, csv. Optional start_date/end_date (ISO) bound sent_at;
+    gzip=true compresses the stream. Rows are streamed from a cursor, so there is no row cap.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    
+    user = await db.users.find_one({"email": email}, {"_id": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    messages = await db.message_history.find(
-        {"email": email},
-        {"_id": 0}
-    ).sort("sent_at", -1).to_list(1000)
-    
-    if format == "json":
-        return {"messages": messages, "count": len(messages)}
-    elif format == "csv":
-        import csv
-        import io
-        output = io.StringIO()
-        if messages:
-            writer = csv.DictWriter(output, fieldnames=["id", "email", "message", "subject", "sent_at", "personality"])
-            writer.writeheader()
-            for msg in messages:
-                writer.writerow({
-                    "id": msg.get("id", ""),
-                    "email": msg.get("email", ""),
-                    "message": msg.get("message", "").replace("\n", " "),
-                    "subject": msg.get("subject", ""),
-                    "sent_at": msg.get("sent_at", ""),
-                    "personality": msg.get("personality", {}).get("value", "") if msg.get("personality") else ""
-                })
-        return {"content": output.getvalue(), "format": "csv"}
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported format. Use 'json' or 'csv'")
+    bounds = []
+    for value in (start_date, end_date):
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+        bounds.append(parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc))
+    start, end = bounds
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"messages_{datetime.now(timezone.utc).strftime('%Y%m%d')}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+    
+    return StreamingResponse(
+        stream_messages(history_store, email, format, start=start, end=end, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # ============================================================================
 # FEATURE 7: CONTENT PERSONALIZATION
@@ -6877,10 +7282,7 @@ async def get_weekly_analytics(email: str, weeks: int = 4):
     end_date = datetime.now(timezone.utc)
     start_date = end_date - timedelta(weeks=weeks)
     
-    messages = await db.message_history.find({
-        "email": email,
-        "sent_at": {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}
-    }).to_list(1000)
+    messages = await history_store.between(email, start_date, end_date, projection={"_id": 0, "id": 1}, limit=1000)
     
     feedbacks = await db.message_feedback.find({
         "email": email,
@@ -6909,10 +7311,7 @@ async def get_monthly_analytics(email: str, months: int = 6):
     end_date = datetime.now(timezone.utc)
     start_date = end_date - timedelta(days=months * 30)
     
-    messages = await db.message_history.find({
-        "email": email,
-        "sent_at": {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}
-    }).to_list(1000)
+    messages = await history_store.between(email, start_date, end_date, projection={"_id": 0, "id": 1}, limit=1000)
     
     return {
         "period": f"{months} months",
@@ -6999,49 +7398,20 @@ async def get_reflections(email: str, limit: int = 50):
 async def get_community_stats():
     """
     Get anonymous community statistics.
-    Uses MongoDB aggregation for accurate average streak calculation (10k+ users).
+    Served from the analytics rollups and the cached users snapshot (no raw collection scans).
     """
-    total_users = await db.users.count_documents({"active": True})
-    total_messages = await db.message_history.count_documents({})
-    total_feedback = await db.message_feedback.count_documents({})
-    
-    # Get average streak using MongoDB aggregation (accurate for 10k+ users)
-    # This is more efficient and accurate than sampling
-    streak_aggregation = await db.users.aggregate([
-        {"$match": {"active": True}},
-        {"$group": {
-            "_id": None,
-            "avg_streak": {"$avg": "$streak_count"},
-            "total_users": {"$sum": 1}
-        }}
-    ]).to_list(1)
-    
-    if streak_aggregation and len(streak_aggregation) > 0:
-        avg_streak = streak_aggregation[0].get("avg_streak", 0) or 0
-    else:
-        avg_streak = 0
-    
-    # Get most popular personalities using aggregation (more efficient)
-    personality_aggregation = await db.message_feedback.aggregate([
-        {"$group": {
-            "_id": "$personality.value",
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"count": -1}},
-        {"$limit": 5}
-    ]).to_list(5)
+    users_snapshot = await rollups.users_snapshot()
+    totals = await rollups.all_time_totals()
+    total_messages = await db.message_history.estimated_document_count() + await history_store.archived_total()
     
-    popular_personalities = [
-        (item.get("_id", "Unknown"), item.get("count", 0))
-        for item in personality_aggregation
-    ]
+    popular = sorted(totals.get("feedback_personalities", {}).items(), key=lambda item: item[1], reverse=True)[:5]
     
     return {
-        "total_active_users": total_users,
+        "total_active_users": users_snapshot["active_users"],
         "total_messages_sent": total_messages,
-        "total_feedback_given": total_feedback,
-        "average_streak": round(avg_streak, 1),
-        "popular_personalities": [{"name": name, "count": count} for name, count in popular_personalities]
+        "total_feedback_given": totals["feedback"],
+        "average_streak": round(users_snapshot["avg_streak_active"], 1),
+        "popular_personalities": [{"name": name, "count": count} for name, count in popular]
     }
 
 @api_router.get("/community/message-insights/{message_id}")
@@ -7097,11 +7467,13 @@ async def get_content_performance(admin_token: str):
     # Combine results
     personality_performance = {}
     
-    # Add message counts
+    # Add message counts (hot tier plus archived months)
+    message_totals = await history_store.archived_personality_counts()
     for item in personality_message_counts:
-        pers = item.get("_id", "Unknown")
+        message_totals[item.get("_id")] = message_totals.get(item.get("_id"), 0) + item.get("total", 0)
+    for pers, total in message_totals.items():
         personality_performance[pers] = {
-            "total": item.get("total", 0),
+            "total": total,
             "ratings": [],
             "avg_rating": 0,
             "feedback_count": 0
@@ -7206,10 +7578,7 @@ async def get_user_journey(email: str, admin_token: str):
     ).sort("timestamp", 1).to_list(1000)
     
     # Get messages
-    messages = await db.message_history.find(
-        {"email": email},
-        {"_id": 0}
-    ).sort("sent_at", 1).to_list(1000)
+    messages = await history_store.between(email, projection=HISTORY_PROJECTION, newest_first=False, limit=1000)
     
     # Get feedback
     feedbacks = await db.message_feedback.find(
@@ -7367,6 +7736,8 @@ async def resume_schedule(email: str, request: Request):
             {"email": email},
             {"$set": {"schedule.paused": False}}
         )
+        # Next send is computed from now, so a resume never fires a backlog of missed slots
+        await email_dispatcher.reschedule_user(email)
         
         if result.matched_count == 0:
             raise HTTPException(
@@ -7480,40 +7851,17 @@ async def admin_get_email_logs(limit: int = 100):
 
 @api_router.get("/admin/stats", dependencies=[Depends(verify_admin)])
 async def admin_get_stats():
-    total_users = await db.users.count_documents({})
-    active_users = await db.users.count_documents({"active": True})
-    total_emails = await db.email_logs.count_documents({})
-    failed_emails = await db.email_logs.count_documents({"status": "failed"})
-    total_messages = await db.message_history.count_documents({})
-    total_feedback = await db.message_feedback.count_documents({})
-    
-    # Calculate average streak using MongoDB aggregation (accurate for 10k+ users)
-    streak_aggregation = await db.users.aggregate([
-        {"$group": {
-            "_id": None,
-            "avg_streak": {"$avg": "$streak_count"},
-            "total_users": {"$sum": 1}
-        }}
-    ]).to_list(1)
-    
-    if streak_aggregation and len(streak_aggregation) > 0:
-        avg_streak = streak_aggregation[0].get("avg_streak", 0) or 0
-    else:
-        avg_streak = 0
-    
-    # Get feedback ratings using aggregation (accurate for 10k+ users)
-    rating_aggregation = await db.message_feedback.aggregate([
-        {"$group": {
-            "_id": None,
-            "avg_rating": {"$avg": "$rating"},
-            "total_feedback": {"$sum": 1}
-        }}
-    ]).to_list(1)
-    
-    if rating_aggregation and len(rating_aggregation) > 0:
-        avg_rating = rating_aggregation[0].get("avg_rating", 0) or 0
-    else:
-        avg_rating = 0
+    """Dashboard totals from the analytics rollups and the cached users snapshot"""
+    users_snapshot = await rollups.users_snapshot()
+    totals = await rollups.all_time_totals()
+    total_users = users_snapshot["total_users"]
+    active_users = users_snapshot["active_users"]
+    total_emails = totals["emails_total"]
+    failed_emails = totals["emails_failed"]
+    total_messages = await db.message_history.estimated_document_count() + await history_store.archived_total()
+    total_feedback = totals["feedback"]
+    avg_streak = users_snapshot["avg_streak"]
+    avg_rating = totals["rating_sum"] / total_feedback if total_feedback else 0
     
     return {
         "total_users": total_users,
@@ -7552,6 +7900,8 @@ async def admin_update_user(email: str, updates: dict):
         {"$set": updates}
     )
     updated_user = await db.users.find_one({"email": email}, {"_id": 0})
+    if updated_user and any(key == "active" or key.startswith("schedule") for key in updates):
+        await email_dispatcher.reschedule_user(email, updated_user)
     
     # Track admin update
     await tracker.log_admin_activity(
@@ -7570,9 +7920,7 @@ async def admin_get_user_details(email: str):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get user's message history
-    messages = await db.message_history.find(
-        {"email": email}, {"_id": 0}
-    ).sort("sent_at", -1).limit(100).to_list(100)
+    messages = await history_store.recent(email, 100, projection=HISTORY_PROJECTION)
     
     # Get user's feedback
     feedbacks = await db.message_feedback.find(
@@ -7678,6 +8026,11 @@ async def admin_bulk_update_users(emails: list, updates: dict):
         details={"target_users": emails, "updates": updates, "modified_count": result.modified_count}
     )
     
+    # next_send_at only changes through the dispatcher, so schedule/activation edits need a reschedule
+    if any(field == "active" or field == "schedule" or field.startswith("schedule.") for field in updates):
+        for email in emails:
+            await email_dispatcher.reschedule_user(email)
+    
     return {
         "status": "success",
         "modified_count": result.modified_count,
@@ -7902,9 +8255,10 @@ async def admin_delete_user(email: str, soft_delete: bool = True):
     else:
         # Hard delete - remove all related data
         await db.users.delete_one({"email": email})
-        await db.message_history.delete_many({"email": email})
+        await history_store.delete_user(email)
         await db.message_feedback.delete_many({"email": email})
         await db.email_logs.delete_many({"email": email})
+        await user_stats.delete(email)
         await tracker.log_admin_activity(
             action_type="user_hard_deleted",
             admin_email="admin",
@@ -7944,12 +8298,55 @@ async def admin_trigger_job(job_id: str):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@api_router.get("/admin/scheduler/leases", dependencies=[Depends(verify_admin)])
+async def admin_get_scheduler_leases():
+    """Get Mongo leases (scheduler leader, running broadcasts) and this worker's id"""
+    return {"worker_id": leases.owner_id, "leases": await leases.list_leases()}
+
+@api_router.get("/admin/smtp/pool", dependencies=[Depends(verify_admin)])
+async def admin_get_smtp_pool_stats():
+    """Get SMTP connection pool metrics (reuse, reconnects, idle/in-use connections)"""
+    if smtp_pool is None:
+        return {"status": "not_started", "stats": None}
+    return {"status": "active", "stats": smtp_pool.get_stats()}
+
+@api_router.get("/admin/reply-listener", dependencies=[Depends(verify_admin)])
+async def admin_get_reply_listener_stats():
+    """Get IMAP reply listener status (connection, IDLE support, queue depth, processed/failed counts)"""
+    if reply_listener is None:
+        return {"status": "not_configured", "stats": None}
+    return {"status": "active" if reply_listener.running else "standby", "stats": reply_listener.get_stats()}
+
+@api_router.get("/admin/pregeneration", dependencies=[Depends(verify_admin)])
+async def admin_get_pregeneration_stats():
+    """Get look-ahead generation metrics and how much upcoming content is already generated"""
+    now = datetime.now(timezone.utc)
+    horizon = now + pregeneration_worker.max_lead
+    return {
+        "stats": pregeneration_worker.get_stats(),
+        "goal_messages_ready": await db.goal_messages.count_documents({"status": "pending", "generated_at": {"$exists": True}}),
+        "goal_messages_waiting": await db.goal_messages.count_documents({"status": "pending", "generate_after": {"$lte": horizon}, "generated_at": {"$exists": False}}),
+        "primary_ready": await db.users.count_documents({"active": True, "pregenerated_email.for_send_at": {"$gte": now}}),
+    }
+
+@api_router.get("/admin/research-cache", dependencies=[Depends(verify_admin)])
+async def admin_get_research_cache_stats():
+    """Get persona voice-profile cache metrics (local/store hits, coalesced misses, stale refreshes)"""
+    from backend.utils.enhanced_personality_research import voice_profile_cache
+    return voice_profile_cache.get_stats()
+
+@api_router.get("/admin/log-sink", dependencies=[Depends(verify_admin)])
+async def admin_get_log_sink_stats():
+    """Get buffered log sink metrics (buffer depth, flushed/dropped counts, flush errors)"""
+    return log_sink.get_stats()
+
 @api_router.get("/admin/database/health", dependencies=[Depends(verify_admin)])
 async def admin_get_database_health():
     """Get database health and collection statistics"""
     collections = {
         "users": await db.users.count_documents({}),
         "message_history": await db.message_history.count_documents({}),
+        "message_archive": await history_store.archived_total(),
         "message_feedback": await db.message_feedback.count_documents({}),
         "email_logs": await db.email_logs.count_documents({}),
         "activity_logs": await db.activity_logs.count_documents({}),
@@ -8164,14 +8561,19 @@ async def admin_get_unified_logs(
     user_email: Optional[str] = None,
     search: Optional[str] = None,
     start_date: Optional[str] = None,
-    end_date: Optional[str] = None
+    end_date: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
     """
     Get unified logs from all sources (activity, system events, API analytics).
-    Combines all log types into a single timeline.
+    Combines all log types into a single timeline, newest first.
+    Pass `next_cursor` from the previous response as `cursor` to continue; every page
+    reads at most limit + 1 documents per source. `page` is only accepted as 1 - later
+    pages need the cursor. `search` is a case-sensitive prefix match.
     """
-    skip = (page - 1) * limit
-    all_logs = []
+    limit = max(1, min(limit, 500))
+    if page > 1 and not cursor:
+        raise HTTPException(status_code=400, detail="Page numbers are no longer supported past page 1 - pass next_cursor as cursor")
     
     # Build date query
     date_query = {}
@@ -8186,236 +8588,134 @@ async def admin_get_unified_logs(
         except:
             date_query["$lte"] = datetime.fromisoformat(end_date)
     
-    # Fetch activity logs
-    if log_type in [None, "all", "activity"]:
-        activity_query = {}
-        if user_email:
-            activity_query["user_email"] = user_email
-        if date_query:
-            activity_query["timestamp"] = date_query
-        
-        activity_logs = await db.activity_logs.find(
-            activity_query,
-            {"_id": 0}
-        ).sort("timestamp", -1).limit(limit * 2).to_list(limit * 2)
-        
-        for log in activity_logs:
-            log['log_type'] = 'activity'
-            log['display_time'] = log.get('timestamp')
-            if isinstance(log.get('timestamp'), datetime):
-                log['timestamp'] = log['timestamp'].isoformat()
-                log['display_time'] = log['timestamp']
-            all_logs.append(log)
-    
-    # Fetch system events
-    if log_type in [None, "all", "system"]:
-        system_query = {}
-        if date_query:
-            system_query["timestamp"] = date_query
-        
-        system_events = await db.system_events.find(
-            system_query,
-            {"_id": 0}
-        ).sort("timestamp", -1).limit(limit * 2).to_list(limit * 2)
-        
-        for event in system_events:
-            event['log_type'] = 'system'
-            event['display_time'] = event.get('timestamp')
-            if isinstance(event.get('timestamp'), datetime):
-                event['timestamp'] = event['timestamp'].isoformat()
-                event['display_time'] = event['timestamp']
-            all_logs.append(event)
-    
-    # Fetch API analytics
-    if log_type in [None, "all", "api"]:
-        api_query = {}
-        if user_email:
-            api_query["user_email"] = user_email
+    # Server-side filters per source (search matches the fields each source is searched by)
+    search_fields = {
+        "activity": ["user_email", "action_type", "action_category"],
+        "system": ["event_type", "event_category", "status"],
+        "api": ["endpoint", "user_email", "error_message"],
+    }
+    queries = {}
+    for source in ("activity", "system", "api"):
+        if log_type not in (None, "all", source):
+            continue
+        query = {}
+        if user_email and source != "system":
+            query["user_email"] = user_email
         if date_query:
-            api_query["timestamp"] = date_query
-        
-        api_analytics = await db.api_analytics.find(
-            api_query,
-            {"_id": 0}
-        ).sort("timestamp", -1).limit(limit * 2).to_list(limit * 2)
-        
-        for item in api_analytics:
-            item['log_type'] = 'api'
-            item['display_time'] = item.get('timestamp')
-            if isinstance(item.get('timestamp'), datetime):
-                item['timestamp'] = item['timestamp'].isoformat()
-                item['display_time'] = item['timestamp']
-            all_logs.append(item)
-    
-    # Sort by timestamp (newest first)
-    all_logs.sort(key=lambda x: x.get('display_time', ''), reverse=True)
-    
-    # Apply search filter if provided
-    if search:
-        search_lower = search.lower()
-        all_logs = [
-            log for log in all_logs
-            if search_lower in str(log).lower() or
-               search_lower in str(log.get('user_email', '')).lower() or
-               search_lower in str(log.get('action_type', '')).lower() or
-               search_lower in str(log.get('event_type', '')).lower() or
-               search_lower in str(log.get('endpoint', '')).lower()
-        ]
+            query["timestamp"] = date_query
+        if search:
+            # Anchored and case-sensitive, so Mongo can bound the match instead of running it on every document
+            pattern = {"$regex": f"^{re.escape(search)}"}
+            query["$or"] = [{field: pattern} for field in search_fields[source]]
+        queries[source] = query
     
-    total = len(all_logs)
+    try:
+        result = await log_timeline.page(queries, limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Paginate
-    paginated_logs = all_logs[skip:skip + limit]
-    total_pages = (total + limit - 1) // limit
+    logs = result["logs"]
+    for log in logs:
+        log.pop("_id", None)
+        if isinstance(log.get('timestamp'), datetime):
+            log['timestamp'] = log['timestamp'].isoformat()
+        log['display_time'] = log.get('timestamp')
     
+    # Loaded so far + whether there is more; an exact total would need a scan of every source
+    loaded = len(logs) if not cursor else None
     return {
-        "logs": paginated_logs,
-        "total": total,
+        "logs": logs,
+        "next_cursor": result["next_cursor"],
+        "has_more": result["has_more"],
+        "total": (loaded + (1 if result["has_more"] else 0)) if loaded is not None else None,
         "page": page,
         "limit": limit,
-        "total_pages": total_pages
     }
 
 class BroadcastRequest(BaseModel):
-    message: str
-    subject: Optional[str] = None
-
-@api_router.post("/admin/broadcast", dependencies=[Depends(verify_admin)])
-async def admin_broadcast_message(request: BroadcastRequest):
-    """
-    Send a message to all active users.
-    Uses pagination to handle 10k+ users efficiently.
-    Email queue automatically limits concurrent sends.
-    """
-    broadcast_start = time.time()
-    message = request.message
-    subject = request.subject
-    broadcast_subject = subject or "Important Update from Tend"
-    
-    logger.info(f"📢 Broadcast message initiated: '{broadcast_subject}'")
-    logger.debug(f"Message length: {len(message)} characters")
-    
-    success_count = 0
-    failed_count = 0
-    batch_size = 100  # Process in batches
-    skip = 0
-    
-    while True:
-        # Fetch batch of users
-        active_users = await db.users.find(
-            {"active": True}, 
-            {"email": 1, "_id": 0}
-        ).skip(skip).limit(batch_size).to_list(batch_size)
-        
-        if not active_users:
-            break
-        
-        emails = [u["email"] for u in active_users]
-        
-        # Send emails in batch (email queue semaphore handles rate limiting)
-        for email in emails:
-            try:
-                success, error = await send_email(
-                    to_email=email,
-                    subject=broadcast_subject,
-                    html_content=message
-                )
-                if success:
-                    success_count += 1
-                    await record_email_log(
-                        email=email,
-                        subject=broadcast_subject,
-                        status="success",
-                        sent_dt=datetime.now(timezone.utc)
-                    )
-                else:
-                    failed_count += 1
-                    await record_email_log(
-                        email=email,
-                        subject=broadcast_subject,
-                        status="failed",
-                        sent_dt=datetime.now(timezone.utc),
-                        error_message=error
-                    )
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Failed to send broadcast to {email}: {str(e)}")
-        
-        skip += batch_size
-        total_processed = success_count + failed_count
-        
-        # Log progress every 1000 users
-        if total_processed % 1000 == 0 and total_processed > 0:
-            logger.info(f"📊 Broadcast progress: {total_processed} users processed ({success_count} success, {failed_count} failed)...")
+    message: str
+    subject: Optional[str] = None
+
+@api_router.post("/admin/broadcast", dependencies=[Depends(verify_admin)])
+async def admin_broadcast_message(request: BroadcastRequest):
+    """
+    Send a message to all active users.
+    Queues a background broadcast job (keyset-paged, concurrent, checkpointed)
+    and returns immediately - poll /admin/broadcast/{job_id} for progress.
+    """
+    broadcast_subject = request.subject or "Important Update from Tend"
     
-    broadcast_duration = time.time() - broadcast_start
-    total_users = success_count + failed_count
+    logger.info(f"📢 Broadcast message initiated: '{broadcast_subject}'")
+    logger.debug(f"Message length: {len(request.message)} characters")
     
-    logger.info(f"✅ Broadcast completed in {broadcast_duration:.2f}s")
-    logger.info(f"   - Total users: {total_users}")
-    logger.info(f"   - Success: {success_count} ({success_count/total_users*100:.1f}%)" if total_users > 0 else "")
-    logger.info(f"   - Failed: {failed_count} ({failed_count/total_users*100:.1f}%)" if total_users > 0 else "")
+    job = await broadcast_engine.create_job(broadcast_subject, request.message)
     
     await tracker.log_admin_activity(
-        action_type="broadcast_sent",
+        action_type="broadcast_queued",
         admin_email="admin",
         details={
-            "total_users": total_users, 
-            "success": success_count, 
-            "failed": failed_count,
-            "duration_seconds": round(broadcast_duration, 2)
+            "job_id": job["id"],
+            "subject": broadcast_subject,
+            "total_estimated": job["total_estimated"]
         }
     )
     
     return {
-        "status": "completed",
-        "total_users": total_users,
-        "success": success_count,
-        "failed": failed_count
+        "status": "queued",
+        "job_id": job["id"],
+        "total_estimated": job["total_estimated"]
     }
 
+@api_router.get("/admin/broadcast", dependencies=[Depends(verify_admin)])
+async def admin_list_broadcasts(limit: int = 20):
+    """List recent broadcast jobs with progress"""
+    return {"jobs": await broadcast_engine.list_jobs(limit)}
+
+@api_router.get("/admin/broadcast/{job_id}", dependencies=[Depends(verify_admin)])
+async def admin_get_broadcast_status(job_id: str):
+    """Get broadcast progress, throughput and ETA"""
+    status = await broadcast_engine.get_status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Broadcast job not found")
+    return status
+
+@api_router.post("/admin/broadcast/{job_id}/cancel", dependencies=[Depends(verify_admin)])
+async def admin_cancel_broadcast(job_id: str):
+    """Cancel a queued or running broadcast (stops after the current page)"""
+    if not await broadcast_engine.cancel(job_id):
+        raise HTTPException(status_code=404, detail="No active broadcast job with this id")
+    await tracker.log_admin_activity(
+        action_type="broadcast_cancelled",
+        admin_email="admin",
+        details={"job_id": job_id}
+    )
+    return {"status": "cancelled", "job_id": job_id}
+
 @api_router.get("/admin/analytics/trends", dependencies=[Depends(verify_admin)])
 async def admin_get_analytics_trends(days: int = 30):
-    """Get analytics trends over time"""
+    """Get analytics trends over time (one rollup document per day)"""
     from datetime import timedelta
     end_date = datetime.now(timezone.utc)
     start_date = end_date - timedelta(days=days)
     
-    # Daily user registrations
-    pipeline_users = [
-        {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}}},
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    user_trends = await db.users.aggregate(pipeline_users).to_list(100)
-    
-    # Daily emails sent
-    pipeline_emails = [
-        {"$match": {"sent_at": {"$gte": start_date, "$lte": end_date}}},
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$sent_at"}},
-            "count": {"$sum": 1},
-            "success": {"$sum": {"$cond": [{"$eq": ["$status", "success"]}, 1, 0]}},
-            "failed": {"$sum": {"$cond": [{"$eq": ["$status", "failed"]}, 1, 0]}}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    email_trends = await db.email_logs.aggregate(pipeline_emails).to_list(100)
-    
-    # Daily feedback
-    pipeline_feedback = [
-        {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}}},
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-            "count": {"$sum": 1},
-            "avg_rating": {"$avg": "$rating"}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    feedback_trends = await db.message_feedback.aggregate(pipeline_feedback).to_list(100)
+    user_trends, email_trends, feedback_trends = [], [], []
+    for bucket in await rollups.buckets("day", start_date, end_date):
+        day, counts = bucket["bucket"], bucket.get("counts", {})
+        if counts.get("signups"):
+            user_trends.append({"_id": day, "count": counts["signups"]})
+        if counts.get("emails_total"):
+            email_trends.append({
+                "_id": day,
+                "count": counts["emails_total"],
+                "success": counts.get("emails_success", 0),
+                "failed": counts.get("emails_failed", 0)
+            })
+        if counts.get("feedback"):
+            feedback_trends.append({
+                "_id": day,
+                "count": counts["feedback"],
+                "avg_rating": counts.get("rating_sum", 0) / counts["feedback"]
+            })
     
     return {
         "user_trends": user_trends,
@@ -8428,94 +8728,16 @@ async def admin_get_analytics_trends(days: int = 30):
 async def admin_global_search(query: str, limit: int = 50, page: int = 1):
     """
     Global search across all collections with pagination.
-    Supports 10k+ users with efficient pagination.
+    Word queries are ranked by text relevance; email-like queries match address prefixes.
+    Per-collection totals are capped (see `approximate`) so counting stays cheap.
     """
-    results = {
-        "users": [],
-        "messages": [],
-        "feedback": [],
-        "logs": []
-    }
-    
-    # Calculate skip for pagination
-    skip = (page - 1) * limit
-    
-    # Search users with pagination
-    users = await db.users.find({
-        "$or": [
-            {"email": {"$regex": query, "$options": "i"}},
-            {"name": {"$regex": query, "$options": "i"}},
-            {"goals": {"$regex": query, "$options": "i"}}
-        ]
-    }, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    results["users"] = users
-    
-    # Get total count for users
-    total_users = await db.users.count_documents({
-        "$or": [
-            {"email": {"$regex": query, "$options": "i"}},
-            {"name": {"$regex": query, "$options": "i"}},
-            {"goals": {"$regex": query, "$options": "i"}}
-        ]
-    })
-    
-    # Search messages with pagination
-    messages = await db.message_history.find({
-        "$or": [
-            {"email": {"$regex": query, "$options": "i"}},
-            {"message": {"$regex": query, "$options": "i"}},
-            {"subject": {"$regex": query, "$options": "i"}}
-        ]
-    }, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    results["messages"] = messages
-    
-    # Get total count for messages
-    total_messages = await db.message_history.count_documents({
-        "$or": [
-            {"email": {"$regex": query, "$options": "i"}},
-            {"message": {"$regex": query, "$options": "i"}},
-            {"subject": {"$regex": query, "$options": "i"}}
-        ]
-    })
+    found = await admin_search.search(query, page=page, limit=limit)
+    results = {bucket: found[bucket]["items"] for bucket in found}
     
-    # Search feedback with pagination
-    feedbacks = await db.message_feedback.find({
-        "$or": [
-            {"email": {"$regex": query, "$options": "i"}},
-            {"feedback_text": {"$regex": query, "$options": "i"}}
-        ]
-    }, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    results["feedback"] = feedbacks
-    
-    # Get total count for feedback
-    total_feedback = await db.message_feedback.count_documents({
-        "$or": [
-            {"email": {"$regex": query, "$options": "i"}},
-            {"feedback_text": {"$regex": query, "$options": "i"}}
-        ]
-    })
-    
-    # Search email logs with pagination
-    logs = await db.email_logs.find({
-        "$or": [
-            {"email": {"$regex": query, "$options": "i"}},
-            {"subject": {"$regex": query, "$options": "i"}},
-            {"error_message": {"$regex": query, "$options": "i"}}
-        ]
-    }, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    results["logs"] = logs
-    
-    # Get total count for logs
-    total_logs = await db.email_logs.count_documents({
-        "$or": [
-            {"email": {"$regex": query, "$options": "i"}},
-            {"subject": {"$regex": query, "$options": "i"}},
-            {"error_message": {"$regex": query, "$options": "i"}}
-        ]
-    })
-    
-    total_results = len(results["users"]) + len(results["messages"]) + len(results["feedback"]) + len(results["logs"])
-    total_all = total_users + total_messages + total_feedback + total_logs
+    total_results = sum(len(items) for items in results.values())
+    total_all = sum(found[bucket]["total"] for bucket in found)
+    # Pages are per collection, so the page count follows the largest collection
+    largest = max((found[bucket]["total"] for bucket in found), default=0)
     
     return {
         "query": query,
@@ -8525,13 +8747,12 @@ async def admin_global_search(query: str, limit: int = 50, page: int = 1):
             "page": page,
             "limit": limit,
             "total": total_all,
-            "total_pages": (total_all + limit - 1) // limit if limit > 0 else 1
+            "total_pages": (largest + limit - 1) // limit if limit > 0 else 1,
+            "approximate": any(found[bucket]["approximate"] for bucket in found)
         },
         "counts": {
-            "users": {"returned": len(results["users"]), "total": total_users},
-            "messages": {"returned": len(results["messages"]), "total": total_messages},
-            "feedback": {"returned": len(results["feedback"]), "total": total_feedback},
-            "logs": {"returned": len(results["logs"]), "total": total_logs}
+            bucket: {"returned": len(found[bucket]["items"]), "total": found[bucket]["total"], "approximate": found[bucket]["approximate"]}
+            for bucket in found
         }
     }
 
@@ -8564,7 +8785,7 @@ async def admin_get_all_message_history(
             except Exception:
                 pass
     
-    messages = await db.message_history.find(query, {"_id": 0}).sort("sent_at", -1).limit(limit).to_list(limit)
+    messages = await db.message_history.find(query, HISTORY_PROJECTION).sort("sent_at", -1).limit(limit).to_list(limit)
     
     # Ensure all datetime objects are timezone-aware (UTC) and convert to ISO format
     for msg in messages:
@@ -8601,46 +8822,38 @@ async def admin_get_email_statistics(days: int = 30):
     from datetime import timedelta
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
     
-    # Total emails sent
-    total_sent = await db.email_logs.count_documents({"sent_at": {"$gte": cutoff}})
-    successful = await db.email_logs.count_documents({"status": "success", "sent_at": {"$gte": cutoff}})
-    failed = await db.email_logs.count_documents({"status": "failed", "sent_at": {"$gte": cutoff}})
+    # Summary, daily breakdown and personalities come from the daily rollups
+    buckets = await rollups.buckets("day", cutoff)
+    totals = rollups.totals(buckets)
+    total_sent = totals["emails_total"]
+    successful = totals["emails_success"]
+    failed = totals["emails_failed"]
     
-    # Emails by personality
+    # Delivery by personality - email_logs carry the personality of what was sent
     personality_pipeline = [
-        {"$match": {"sent_at": {"$gte": cutoff}}},
-        {"$lookup": {
-            "from": "message_history",
-            "localField": "email",
-            "foreignField": "email",
-            "as": "messages"
-        }},
-        {"$unwind": {"path": "$messages", "preserveNullAndEmptyArrays": True}},
-        {"$match": {"messages.sent_at": {"$gte": cutoff}}},
+        {"$match": {"sent_at": {"$gte": cutoff}, "personality": {"$type": "string"}}},
         {"$group": {
-            "_id": "$messages.personality.value",
-            "count": {"$sum": 1}
+            "_id": "$personality",
+            "count": {"$sum": 1},
+            "success": {"$sum": {"$cond": [{"$eq": ["$status", "success"]}, 1, 0]}},
+            "failed": {"$sum": {"$cond": [{"$eq": ["$status", "failed"]}, 1, 0]}}
         }},
         {"$sort": {"count": -1}},
         {"$limit": 10}
     ]
     personality_stats = await db.email_logs.aggregate(personality_pipeline).to_list(10)
     
-    # Daily breakdown
-    daily_pipeline = [
-        {"$match": {"sent_at": {"$gte": cutoff}}},
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$sent_at"}},
-            "total": {"$sum": 1},
-            "success": {"$sum": {"$cond": [{"$eq": ["$status", "success"]}, 1, 0]}},
-            "failed": {"$sum": {"$cond": [{"$eq": ["$status", "failed"]}, 1, 0]}}
-        }},
-        {"$sort": {"_id": -1}},
-        {"$limit": days}
-    ]
-    daily_stats = await db.email_logs.aggregate(daily_pipeline).to_list(days)
+    daily_stats = [
+        {
+            "_id": bucket["bucket"],
+            "total": bucket["counts"].get("emails_total", 0),
+            "success": bucket["counts"].get("emails_success", 0),
+            "failed": bucket["counts"].get("emails_failed", 0)
+        }
+        for bucket in reversed(buckets) if bucket.get("counts", {}).get("emails_total")
+    ][:days]
     
-    # Top users by email count
+    # Top users by email count (per-user data isn't rolled up; uses the sent_at index)
     user_pipeline = [
         {"$match": {"sent_at": {"$gte": cutoff}}},
         {"$group": {
@@ -8762,8 +8975,9 @@ async def admin_bulk_user_action(request: BulkUserActionRequest):
             results["failed"].append({"email": email, "error": str(e)})
     
     # Reschedule emails if schedule was changed
-    if request.action in ["pause_schedule", "resume_schedule"]:
-        await schedule_user_emails()
+    if request.action in ["pause_schedule", "resume_schedule", "activate", "deactivate"]:
+        for entry in results["success"]:
+            await email_dispatcher.reschedule_user(entry["email"])
     
     return {
         "total": len(request.user_emails),
@@ -8795,7 +9009,8 @@ async def admin_bulk_send_email(request: BulkEmailRequest):
                     email=email,
                     subject=request.subject,
                     status="success",
-                    sent_dt=datetime.now(timezone.utc)
+                    sent_dt=datetime.now(timezone.utc),
+                    channel="admin_bulk"
                 )
             else:
                 results["failed"].append({"email": email, "error": error})
@@ -8804,7 +9019,8 @@ async def admin_bulk_send_email(request: BulkEmailRequest):
                     subject=request.subject,
                     status="failed",
                     sent_dt=datetime.now(timezone.utc),
-                    error_message=error
+                    error_message=error,
+                    channel="admin_bulk"
                 )
         except Exception as e:
             results["failed"].append({"email": email, "error": str(e)})
@@ -8829,6 +9045,63 @@ async def admin_bulk_send_email(request: BulkEmailRequest):
 # USER SEGMENTATION
 # ============================================================================
 
+@api_router.post("/admin/analytics/rollups/rebuild", dependencies=[Depends(verify_admin)])
+async def admin_rebuild_analytics_rollups(days: Optional[int] = None):
+    """Rebuild analytics rollups from the raw collections (last `days` days, or all history) up to today"""
+    started = time.time()
+    since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+    buckets = await rollups.backfill(since=since)
+    await rollups.refresh_users_snapshot()
+    return {"status": "success", "buckets_written": buckets, "duration_seconds": round(time.time() - started, 2)}
+
+@api_router.post("/admin/history/archive", dependencies=[Depends(verify_admin)])
+async def admin_archive_message_history(email: Optional[str] = None):
+    """Move message history older than the hot window into monthly archive buckets now"""
+    started = time.time()
+    if email:
+        result = {"users": 1, "messages_archived": await history_store.archive_user(email)}
+    else:
+        result = await history_store.archive_all()
+    await tracker.log_admin_activity(
+        action_type="message_history_archived",
+        admin_email="admin",
+        details={"email": email, **result}
+    )
+    return {"status": "success", **result, "hot_days": history_store.hot_days, "duration_seconds": round(time.time() - started, 2)}
+
+@api_router.post("/admin/history/compact", dependencies=[Depends(verify_admin)])
+async def admin_compact_version_history():
+    """Collapse consecutive identical schedule/personality/profile versions into one"""
+    started = time.time()
+    results = {}
+    for collection in ("schedule_history", "personality_history", "profile_history"):
+        results[collection] = await version_tracker.compact_history(collection)
+    await tracker.log_admin_activity(
+        action_type="version_history_compacted",
+        admin_email="admin",
+        details=results
+    )
+    return {"status": "success", "results": results, "duration_seconds": round(time.time() - started, 2)}
+
+@api_router.get("/admin/indexes", dependencies=[Depends(verify_admin)])
+async def admin_get_index_report():
+    """Declared indexes that are missing, telemetry retention, and critical query plans"""
+    return await index_registry.report()
+
+@api_router.post("/admin/indexes/ensure", dependencies=[Depends(verify_admin)])
+async def admin_ensure_indexes():
+    """Create any missing declared indexes and re-apply telemetry retention"""
+    started = time.time()
+    result = await index_registry.ensure()
+    return {"status": "success", **result, "duration_seconds": round(time.time() - started, 2)}
+
+@api_router.post("/admin/user-stats/rebuild", dependencies=[Depends(verify_admin)])
+async def admin_rebuild_user_stats():
+    """Recompute the materialized user_stats from users and message_feedback"""
+    started = time.time()
+    processed = await user_stats.rebuild()
+    return {"status": "success", "users_processed": processed, "duration_seconds": round(time.time() - started, 2)}
+
 @api_router.get("/admin/users/segments", dependencies=[Depends(verify_admin)])
 async def admin_get_user_segments(
     engagement_level: Optional[Literal["high", "medium", "low"]] = None,
@@ -8859,50 +9132,53 @@ async def admin_get_user_segments(
     if personality:
         query["personalities.value"] = personality
     
-    # Use pagination for scalability
-    skip = (page - 1) * limit
-    total_users = await db.users.count_documents(query)
-    
-    users = await db.users.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    
-    # Filter by engagement level
+    # Engagement/rating filters apply to the materialized user_stats
+    stats_query = {}
     if engagement_level:
-        segmented_users = []
-        for user in users:
-            total_messages = user.get("total_messages_received", 0)
-            feedback_count = await db.message_feedback.count_documents({"email": user["email"]})
-            engagement_rate = (feedback_count / total_messages * 100) if total_messages > 0 else 0
-            
-            if engagement_level == "high" and engagement_rate >= 50:
-                segmented_users.append(user)
-            elif engagement_level == "medium" and 20 <= engagement_rate < 50:
-                segmented_users.append(user)
-            elif engagement_level == "low" and engagement_rate < 20:
-                segmented_users.append(user)
-        users = segmented_users
-    
-    # Filter by rating
+        stats_query["engagement_rate"] = ENGAGEMENT_LEVELS[engagement_level]
     if min_rating is not None:
-        rated_users = []
-        for user in users:
-            feedbacks = await db.message_feedback.find({"email": user["email"]}).to_list(100)
-            if feedbacks:
-                avg_rating = sum(f.get("rating", 0) for f in feedbacks) / len(feedbacks)
-                if avg_rating >= min_rating:
-                    rated_users.append(user)
-        users = rated_users
-    
-    # Add engagement metrics to each user
-    for user in users:
-        total_messages = user.get("total_messages_received", 0)
-        feedback_count = await db.message_feedback.count_documents({"email": user["email"]})
-        user["engagement_rate"] = round((feedback_count / total_messages * 100), 2) if total_messages > 0 else 0
-        
-        feedbacks = await db.message_feedback.find({"email": user["email"]}).to_list(100)
-        if feedbacks:
-            user["avg_rating"] = round(sum(f.get("rating", 0) for f in feedbacks) / len(feedbacks), 2)
+        stats_query["avg_rating"] = {"$ne": None, "$gte": min_rating}
+    
+    skip = (page - 1) * limit
+    page_stages = [{"$sort": {"email": 1}}, {"$skip": skip}, {"$limit": limit}]
+    
+    if stats_query:
+        # Driven from user_stats (indexed on engagement_rate / avg_rating): only users
+        # matching the stats filter are joined, and only to check the user filters
+        join_users = [
+            {"$lookup": {"from": "users", "localField": "email", "foreignField": "email", "as": "_user"}},
+            {"$unwind": "$_user"},
+        ]
+        as_user = [
+            {"$replaceWith": {"$mergeObjects": [
+                "$_user", {"engagement_rate": "$engagement_rate", "avg_rating": "$avg_rating"},
+            ]}},
+            {"$unset": "_id"},
+        ]
+        if query:
+            # User filters must apply before paginating so pages are full and the total is exact
+            pipeline = [{"$match": stats_query}, *join_users,
+                        {"$match": {f"_user.{field}": cond for field, cond in query.items()}},
+                        {"$facet": {"total": [{"$count": "n"}], "users": [*page_stages, *as_user]}}]
         else:
-            user["avg_rating"] = None
+            pipeline = [{"$match": stats_query},
+                        {"$facet": {"total": [{"$count": "n"}], "users": [*page_stages, *join_users, *as_user]}}]
+        result = (await user_stats.collection.aggregate(pipeline).to_list(1))[0]
+    else:
+        # Only the returned page needs its stats joined
+        join_stats = [
+            {"$lookup": {"from": user_stats.collection_name, "localField": "email", "foreignField": "email", "as": "_stats"}},
+            {"$set": {
+                "engagement_rate": {"$ifNull": [{"$arrayElemAt": ["$_stats.engagement_rate", 0]}, 0]},
+                "avg_rating": {"$ifNull": [{"$arrayElemAt": ["$_stats.avg_rating", 0]}, None]},
+            }},
+            {"$unset": ["_stats", "_id"]},
+        ]
+        pipeline = [{"$match": query},
+                    {"$facet": {"total": [{"$count": "n"}], "users": [*page_stages, *join_stats]}}]
+        result = (await db.users.aggregate(pipeline).to_list(1))[0]
+    total_users = result["total"][0]["n"] if result["total"] else 0
+    users = result["users"]
     
     return {
         "total": total_users,
@@ -9034,30 +9310,21 @@ class MessageCollection(BaseModel):
 
 @api_router.get("/admin/alerts", dependencies=[Depends(verify_admin)])
 async def admin_get_alerts():
-    """Get current alert status"""
+    """Get current alert status (from the last 24 hourly rollups)"""
     from datetime import timedelta
     last_24h = datetime.now(timezone.utc) - timedelta(hours=24)
+    totals = rollups.totals(await rollups.buckets("hour", last_24h))
     
     # Error rate alert
-    total_emails = await db.email_logs.count_documents({"sent_at": {"$gte": last_24h}})
-    failed_emails = await db.email_logs.count_documents({
-        "status": "failed",
-        "sent_at": {"$gte": last_24h}
-    })
+    total_emails = totals["emails_total"]
+    failed_emails = totals["emails_failed"]
     error_rate = (failed_emails / total_emails * 100) if total_emails > 0 else 0
     
     # API failures
-    api_failures = await db.system_events.count_documents({
-        "event_category": {"$in": ["llm", "tavily", "openai"]},
-        "status": "failure",
-        "timestamp": {"$gte": last_24h}
-    })
+    api_failures = totals["api_failures"]
     
     # Rate limit hits
-    rate_limits = await db.system_events.count_documents({
-        "event_type": {"$regex": "rate_limit", "$options": "i"},
-        "timestamp": {"$gte": last_24h}
-    })
+    rate_limits = totals["rate_limit_events"]
     
     alerts = []
     
@@ -9546,197 +9813,72 @@ async def create_email_job(user_email: str):
             status="error"
         )
 
+# Primary-goal emails are dispatched from users.next_send_at (see email_dispatcher.py)
+email_dispatcher = PrimaryEmailDispatcher(
+    db,
+    send_fn=create_email_job,
+    workers=int(os.getenv('DISPATCH_WORKERS', '20')),
+    misfire_grace_seconds=int(os.getenv('DISPATCH_MISFIRE_GRACE_SECONDS', '1800')),
+    plan_fn=pregeneration_worker.plan,
+)
+
+@leases.singleton()
+async def pregenerate_scheduled_emails():
+    """Leader-only job: generate content for sends whose pre-generation time has come"""
+    try:
+        await pregeneration_worker.tick()
+    except Exception as e:
+        logger.error(f"❌ Error in pre-generation tick: {str(e)}", exc_info=True)
+
+@leases.singleton()
 async def schedule_user_emails():
     """
-    Schedule emails for all active users based on their preferences.
-    Uses pagination to handle 10k+ users efficiently.
-    Optimized job lookup to avoid O(n²) complexity.
+    Make sure every active user has a next_send_at.
+    Only users missing the field are touched, so this is cheap to call repeatedly;
+    individual schedule changes go through email_dispatcher.reschedule_user().
     """
     schedule_start = time.time()
-    logger.info("🔄 Starting email scheduling for all active users...")
+    logger.info("🔄 Backfilling next_send_at for active users...")
     
     try:
-        batch_size = 100  # Process users in batches
-        skip = 0
-        total_scheduled = 0
-        
-        # Get all existing job IDs once (avoid O(n²) lookup)
-        existing_jobs = scheduler.get_jobs()
-        existing_job_ids = {job.id for job in existing_jobs}
-        logger.info(f"📋 Found {len(existing_job_ids)} existing scheduled jobs")
-        
-        while True:
-            # Fetch batch of users
-            users = await db.users.find(
-                {"active": True}, 
-                {"_id": 0}
-            ).skip(skip).limit(batch_size).to_list(batch_size)
-            
-            if not users:
-                break
-            
-            for user_data in users:
-                try:
-                    schedule = user_data.get('schedule', {})
-                    if schedule.get('paused', False):
-                        continue
-                    
-                    email = user_data['email']
-                    times = schedule.get('times', ['09:00'])
-                    frequency = schedule.get('frequency', 'daily')
-                    user_timezone = schedule.get('timezone', 'UTC')
-                    
-                    # Parse time
-                    time_parts = times[0].split(':')
-                    hour = int(time_parts[0])
-                    minute = int(time_parts[1])
-                    
-                    # Get timezone object
-                    try:
-                        tz = pytz.timezone(user_timezone)
-                    except:
-                        tz = pytz.UTC
-                        logger.warning(f"Invalid timezone {user_timezone} for {email}, using UTC")
-                    
-                    # Create job ID
-                    job_id = f"user_{email.replace('@', '_at_').replace('.', '_')}"
-                    
-                    # Efficiently remove existing jobs for this user
-                    # Check against pre-fetched job IDs instead of iterating all jobs
-                    jobs_to_remove = []
-                    if job_id in existing_job_ids:
-                        jobs_to_remove.append(job_id)
-                    
-                    # Check for sub-jobs (for multiple times/days/dates)
-                    for existing_job_id in existing_job_ids:
-                        if existing_job_id.startswith(job_id + "_"):
-                            jobs_to_remove.append(existing_job_id)
-                    
-                    # Remove jobs
-                    for job_id_to_remove in jobs_to_remove:
-                        try:
-                            scheduler.remove_job(job_id_to_remove)
-                            existing_job_ids.discard(job_id_to_remove)
-                        except:
-                            pass
-                    
-                    # Add new job based on frequency with timezone
-                    # FIXED: Now properly executes async function from scheduler
-                    if frequency == 'daily':
-                        # Handle multiple times per day
-                        for time_idx, time_str in enumerate(times):
-                            time_parts = time_str.split(':')
-                            t_hour = int(time_parts[0])
-                            t_minute = int(time_parts[1])
-                            job_id_with_time = f"{job_id}_time_{time_idx}" if len(times) > 1 else job_id
-                            scheduler.add_job(
-                                create_email_job,
-                                CronTrigger(hour=t_hour, minute=t_minute, timezone=tz),
-                                args=[email],
-                                id=job_id_with_time,
-                                replace_existing=True
-                            )
-                    elif frequency == 'weekly':
-                        # Use custom_days if specified, otherwise default to Monday
-                        custom_days = schedule.get('custom_days', [])
-                        if custom_days:
-                            # Map day names to cron day_of_week (0=Monday, 6=Sunday)
-                            day_map = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 
-                                      'friday': 4, 'saturday': 5, 'sunday': 6}
-                            for day_name in custom_days:
-                                day_num = day_map.get(day_name.lower(), 0)
-                                job_id_with_day = f"{job_id}_day_{day_num}" if len(custom_days) > 1 else job_id
-                                scheduler.add_job(
-                                    create_email_job,
-                                    CronTrigger(day_of_week=day_num, hour=hour, minute=minute, timezone=tz),
-                                    args=[email],
-                                    id=job_id_with_day,
-                                    replace_existing=True
-                                )
-                        else:
-                            # Default to Monday
-                            scheduler.add_job(
-                                create_email_job,
-                                CronTrigger(day_of_week=0, hour=hour, minute=minute, timezone=tz),
-                                args=[email],
-                                id=job_id,
-                                replace_existing=True
-                            )
-                    elif frequency == 'monthly':
-                        # Use monthly_dates if specified, otherwise default to 1st
-                        monthly_dates = schedule.get('monthly_dates', [])
-                        valid_dates = []
-                        if monthly_dates:
-                            for date_str in monthly_dates:
-                                try:
-                                    day_of_month = int(date_str)
-                                    if 1 <= day_of_month <= 31:
-                                        valid_dates.append(day_of_month)
-                                except (ValueError, TypeError):
-                                    logger.warning(f"Invalid monthly date {date_str} for {email}, skipping")
-                        
-                        if valid_dates:
-                            for day_of_month in valid_dates:
-                                job_id_with_date = f"{job_id}_date_{day_of_month}" if len(valid_dates) > 1 else job_id
-                                scheduler.add_job(
-                                    create_email_job,
-                                    CronTrigger(day=day_of_month, hour=hour, minute=minute, timezone=tz),
-                                    args=[email],
-                                    id=job_id_with_date,
-                                    replace_existing=True
-                                )
-                        else:
-                            # Default to 1st of month if no valid dates
-                            scheduler.add_job(
-                                create_email_job,
-                                CronTrigger(day=1, hour=hour, minute=minute, timezone=tz),
-                                args=[email],
-                                id=job_id,
-                                replace_existing=True
-                            )
-                    elif frequency == 'custom':
-                        # Custom interval: every N days
-                        interval = schedule.get('custom_interval', 1)
-                        if interval < 1:
-                            interval = 1
-                        # Use IntervalTrigger for custom intervals
-                        scheduler.add_job(
-                            create_email_job,
-                            IntervalTrigger(days=interval, start_date=datetime.now(tz).replace(hour=hour, minute=minute, second=0)),
-                            args=[email],
-                            id=job_id,
-                            replace_existing=True
-                        )
-                    
-                    logger.info(f"✅ Scheduled emails for {email} at {hour}:{minute:02d} {user_timezone} ({frequency})")
-                    
-                    # Save schedule version history
-                    await version_tracker.save_schedule_version(
-                        user_email=email,
-                        schedule_data=schedule,
-                        changed_by="system",
-                        change_reason="Schedule initialization"
-                    )
-                    
-                    total_scheduled += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error scheduling for {user_data.get('email', 'unknown')}: {str(e)}")
-            
-            skip += batch_size
-            
-            # Log progress every 1000 users
-            if total_scheduled % 1000 == 0 and total_scheduled > 0:
-                logger.info(f"📊 Scheduled {total_scheduled} users so far...")
-        
+        total_scheduled = await email_dispatcher.backfill()
         schedule_duration = time.time() - schedule_start
-        logger.info(f"✅ Completed scheduling emails for {total_scheduled} users in {schedule_duration:.2f}s")
-        logger.info(f"📊 Average: {total_scheduled/schedule_duration:.1f} users/second" if schedule_duration > 0 else "")
-    
+        logger.info(f"✅ next_send_at set for {total_scheduled} users in {schedule_duration:.2f}s")
     except Exception as e:
         schedule_duration = time.time() - schedule_start
         logger.error(f"❌ Error in schedule_user_emails after {schedule_duration:.2f}s: {str(e)}", exc_info=True)
 
+@leases.singleton()
+async def archive_message_history():
+    """Leader-only daily job: move messages older than the hot window into monthly archive buckets"""
+    try:
+        await history_store.archive_all()
+    except Exception as e:
+        logger.error(f"❌ Error archiving message history: {str(e)}", exc_info=True)
+
+@leases.singleton()
+async def dispatch_primary_emails():
+    """Once-a-minute scheduler job: send every primary-goal email that is due"""
+    try:
+        await email_dispatcher.tick()
+    except Exception as e:
+        logger.error(f"❌ Error in primary email dispatch tick: {str(e)}", exc_info=True)
+
+# IMAP IDLE reply listener - created at startup when IMAP credentials are configured
+reply_listener = None
+
+async def supervise_reply_listener():
+    """Keep exactly one reply listener connected: run it on the leader worker, stop it elsewhere"""
+    if reply_listener is None:
+        return
+    try:
+        if await leases.acquire(LEADER_LEASE):
+            reply_listener.start()
+        elif reply_listener.running:
+            reply_listener.stop()
+    except Exception as e:
+        logger.error(f"❌ Reply listener supervisor error: {e}", exc_info=True)
+
 # ============================================================================
 # VERSION HISTORY & DATA PRESERVATION ENDPOINTS
 # ============================================================================
@@ -9818,6 +9960,7 @@ async def admin_create_achievement(achievement: dict):
     achievement["show_on_home"] = achievement.get("show_on_home", False)
     
     await db.achievements.insert_one(achievement)
+    achievement_catalog.invalidate()
     
     await tracker.log_admin_activity(
         action_type="achievement_created",
@@ -9847,6 +9990,7 @@ async def admin_update_achievement(achievement_id: str, achievement_data: dict):
     }
     
     await db.achievements.update_one({"id": achievement_id}, update_data)
+    achievement_catalog.invalidate()
     
     updated = await db.achievements.find_one({"id": achievement_id}, {"_id": 0})
     
@@ -9876,6 +10020,7 @@ async def admin_delete_achievement(achievement_id: str, hard_delete: bool = Fals
             {"$set": {"active": False, "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
         action = "deactivated"
+    achievement_catalog.invalidate()
     
     await tracker.log_admin_activity(
         action_type="achievement_deleted",
@@ -9995,141 +10140,60 @@ async def admin_initialize_achievements():
 @api_router.post("/admin/achievements/recalculate-streaks", dependencies=[Depends(verify_admin)])
 async def admin_recalculate_streaks(email: Optional[str] = None):
     """
-    Recalculate streaks for all users or a specific user based on message history.
-    Uses pagination to handle 10k+ users efficiently.
+    Recalculate streaks from message history.
+    With `email`, recomputes that user immediately and returns the result. Otherwise
+    starts a background job over all active users and returns it - poll
+    /admin/achievements/recalculate-streaks/{job_id} for progress.
     """
     try:
         if email:
-            users = [await db.users.find_one({"email": email}, {"_id": 0})]
-            if not users[0]:
+            user = await db.users.find_one({"email": email}, {"_id": 0, "email": 1, "streak_count": 1})
+            if not user:
                 raise HTTPException(status_code=404, detail="User not found")
-        else:
-            # Use pagination for scalability (10k+ users)
-            batch_size = 100
-            skip = 0
-            all_users = []
-            
-            while True:
-                batch = await db.users.find(
-                    {"active": True}, 
-                    {"_id": 0, "email": 1, "streak_count": 1}
-                ).skip(skip).limit(batch_size).to_list(batch_size)
-                
-                if not batch:
-                    break
-                
-                all_users.extend(batch)
-                skip += batch_size
-                
-                # Log progress every 1000 users
-                if len(all_users) % 1000 == 0:
-                    logger.info(f"📊 Streak recalculation progress: {len(all_users)} users processed...")
-            
-            users = all_users
-            logger.info(f"✅ Fetched {len(users)} users for streak recalculation")
-        
-        updated_count = 0
-        results = []
-        
-        for user in users:
-            user_email = user["email"]
-            
-            # Get all messages for this user, sorted by date
-            messages = await db.message_history.find(
-                {"email": user_email},
-                {"_id": 0, "sent_at": 1, "created_at": 1}
-            ).sort("sent_at", 1).to_list(1000)
-            
-            if not messages:
-                continue
-            
-            # Extract unique dates when emails were sent
-            email_dates = set()
-            for msg in messages:
-                sent_at = msg.get("sent_at") or msg.get("created_at")
-                if sent_at:
-                    if isinstance(sent_at, str):
-                        try:
-                            dt = datetime.fromisoformat(sent_at.replace('Z', '+00:00'))
-                        except:
-                            dt = datetime.fromisoformat(sent_at)
-                    else:
-                        dt = sent_at
-                    email_dates.add(dt.date())
-            
-            # Calculate longest consecutive streak
-            if not email_dates:
-                continue
-            
-            sorted_dates = sorted(email_dates)
-            today = datetime.now(timezone.utc).date()
-            
-            # Calculate current active streak (from most recent date backwards)
-            most_recent_date = sorted_dates[-1]
-            days_since_last = (today - most_recent_date).days
-            
-            # If email was sent today or yesterday, calculate active streak
-            if days_since_last <= 1:
-                # Calculate streak backwards from most recent date
-                # Start from the most recent date and count backwards
-                current_streak = 0
-                expected_date = most_recent_date
-                
-                # Convert sorted_dates to a set for O(1) lookup
-                date_set = set(sorted_dates)
-                
-                # Count consecutive days backwards from most recent
-                while expected_date in date_set:
-                    current_streak += 1
-                    expected_date = expected_date - timedelta(days=1)
-                
-                # Ensure minimum streak of 1
-                current_streak = max(1, current_streak)
-            else:
-                # Gap of more than 1 day - streak is broken
-                current_streak = 1
-            
-            # Update user's streak
-            await db.users.update_one(
-                {"email": user_email},
-                {"$set": {"streak_count": current_streak}}
+            results = await streak_engine.recompute_page([user])
+            await tracker.log_admin_activity(
+                action_type="streaks_recalculated",
+                admin_email="admin",
+                details={"users_updated": len(results), "email_filter": email}
             )
-            
-            # Calculate max streak for reporting
-            max_streak = 1
-            temp_streak = 1
-            for i in range(1, len(sorted_dates)):
-                days_diff = (sorted_dates[i] - sorted_dates[i-1]).days
-                if days_diff == 1:
-                    temp_streak += 1
-                    max_streak = max(max_streak, temp_streak)
-                else:
-                    temp_streak = 1
-            
-            results.append({
-                "email": user_email,
-                "old_streak": user.get("streak_count", 0),
-                "new_streak": current_streak,
-                "total_email_days": len(sorted_dates),
-                "max_streak": max_streak
-            })
-            updated_count += 1
+            return {
+                "status": "success",
+                "message": f"Recalculated streaks for {len(results)} user(s)",
+                "results": results
+            }
         
+        job = await streak_engine.create_job()
         await tracker.log_admin_activity(
             action_type="streaks_recalculated",
             admin_email="admin",
-            details={"users_updated": updated_count, "email_filter": email}
+            details={"job_id": job["id"], "total_estimated": job["total_estimated"]}
         )
-        
         return {
-            "status": "success",
-            "message": f"Recalculated streaks for {updated_count} user(s)",
-            "results": results
+            "status": "started",
+            "message": f"Recalculating streaks for ~{job['total_estimated']} user(s) in the background",
+            "job": await streak_engine.get_status(job["id"])
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error recalculating streaks: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to recalculate streaks: {str(e)}")
 
+@api_router.get("/admin/achievements/recalculate-streaks/{job_id}", dependencies=[Depends(verify_admin)])
+async def admin_get_streak_job(job_id: str):
+    """Get streak recompute progress, throughput and ETA"""
+    status = await streak_engine.get_status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Streak job not found")
+    return status
+
+@api_router.post("/admin/achievements/recalculate-streaks/{job_id}/cancel", dependencies=[Depends(verify_admin)])
+async def admin_cancel_streak_job(job_id: str):
+    """Cancel a queued or running streak recompute (stops after the current page)"""
+    if not await streak_engine.cancel(job_id):
+        raise HTTPException(status_code=404, detail="No active streak job with this id")
+    return {"status": "cancelled", "job_id": job_id}
+
 @api_router.post("/admin/achievements/{achievement_id}/assign-all", dependencies=[Depends(verify_admin)])
 async def admin_assign_achievement_to_all_users(achievement_id: str):
     """
@@ -10250,6 +10314,7 @@ async def restore_deleted_data(deletion_id: str):
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global reply_listener
     startup_start = time.time()
     logger.info("=" * 60)
     logger.info("🚀 Starting Tend API...")
@@ -10266,34 +10331,37 @@ async def lifespan(app: FastAPI):
             logger.error(f"❌ Environment validation failed: {e}")
             raise
         
+        # Start batching log writes off the request path
+        log_sink.start()
+        logger.info(f"✅ Log sink started (batch={log_sink.batch_size}, flush every {log_sink.flush_interval}s)")
+        
         try:
-            await db.users.create_index("email", unique=True)
-            await db.users.create_index("clerk_user_id")  # Index for Clerk user ID lookups
-            await db.message_history.create_index("email")
-            await db.message_feedback.create_index("email")
-            await db.email_logs.create_index([("email", 1), ("sent_at", -1)])
-            # Custom personality indexes
-            await db.custom_personality_conversations.create_index("email")
-            await db.custom_personality_conversations.create_index([("email", 1), ("status", 1)])
-            await db.custom_personality_profiles.create_index("email")
-            await db.custom_personality_profiles.create_index([("email", 1), ("status", 1)])
-            # NEW: Reply conversation indexes
-            await db.email_reply_conversations.create_index([("user_email", 1), ("reply_timestamp", -1)])
-            await db.email_reply_conversations.create_index([("user_email", 1), ("processed", 1)])
-            await db.email_reply_conversations.create_index([("urgency_level", 1), ("immediate_response_sent", 1)])
-            # Enhanced goal indexes
-            await db.goals.create_index([("user_email", 1), ("active", 1), ("category", 1)])
-            await db.goal_messages.create_index([("goal_id", 1), ("schedule_id", 1), ("status", 1)])
-            logger.info("✅ Database indexes created (including reply conversations and multi-goal support)")
+            # Every index the queries rely on (see index_registry.py), plus telemetry retention
+            index_result = await index_registry.ensure()
+            if index_result["failed"]:
+                logger.warning(f"⚠️ {len(index_result['failed'])} index(es) could not be created")
+            # Weighted text indexes for admin search
+            await admin_search.ensure_indexes()
         except Exception as e:
             logger.warning(f"Index creation warning: {e}")
+        
+        # Catch hot-path queries that would scan a whole collection
+        try:
+            plans = await index_registry.check_query_plans()
+            scans = [p["name"] for p in plans if p["status"] == "collscan"]
+            if scans:
+                logger.warning(f"⚠️ Critical queries without an index: {', '.join(scans)}")
+            else:
+                logger.info(f"✅ Query plan check passed ({len(plans)} critical queries use indexes)")
+        except Exception as e:
+            logger.warning(f"Query plan check warning: {e}")
 
         await initialize_achievements()
         logger.info("Achievements initialized")
         
-        # NEW: Add email reply polling job
+        # Push-based reply ingestion: IMAP IDLE listener in a background thread (leader worker only)
         try:
-            from backend.email_reply_handler import poll_email_replies
+            from backend.email_reply_handler import ReplyListener
             import os
             
             # Check if IMAP credentials are configured (optional - use os.getenv with None default)
@@ -10304,14 +10372,25 @@ async def lifespan(app: FastAPI):
             inbox_password = os.getenv("INBOX_PASSWORD")
             
             if all([imap_host, inbox_email, inbox_password]):
+                reply_listener = ReplyListener(
+                    imap_host,
+                    inbox_email,
+                    inbox_password,
+                    queue_size=int(os.getenv("REPLY_QUEUE_SIZE", "100")),
+                    workers=int(os.getenv("REPLY_WORKERS", "3")),
+                    idle_timeout_seconds=int(os.getenv("IMAP_IDLE_TIMEOUT_SECONDS", "30")),
+                )
+                # Start/stop the listener as this worker gains/loses the leader lease
                 scheduler.add_job(
-                    poll_email_replies,
+                    supervise_reply_listener,
                     trigger='interval',
-                    minutes=1,  # Check every 1 minute for near real-time replies
-                    id='email_reply_polling',
-                    replace_existing=True
+                    seconds=30,
+                    id='reply_listener_supervisor',
+                    replace_existing=True,
+                    max_instances=1,
+                    coalesce=True
                 )
-                logger.info("✅ Email reply polling job scheduled (every 1 minute - near real-time)")
+                logger.info("✅ Email reply listener configured (IMAP IDLE - replies processed within seconds)")
                 logger.info(f"   IMAP Host: {imap_host}")
                 logger.info(f"   Inbox Email: {inbox_email}")
             else:
@@ -10325,15 +10404,18 @@ async def lifespan(app: FastAPI):
             logger.error(f"❌ Could not schedule email reply polling: {e}", exc_info=True)
         
         # Schedule goal jobs for all active goals (event-driven approach)
-        # No more polling - jobs are scheduled for specific send times
-        active_goals = await db.goals.find({"active": True}, {"_id": 0}).to_list(1000)
-        for goal in active_goals:
-            try:
-                await schedule_goal_jobs_for_goal(goal["id"], goal["user_email"])
-            except Exception as e:
-                logger.error(f"Error scheduling jobs for goal {goal.get('id')}: {e}")
-        
-        logger.info(f"Scheduled goal jobs for {len(active_goals)} active goals")
+        # Only the leader worker rebuilds them; other workers rely on the goal message sweep
+        is_leader = await leases.acquire(LEADER_LEASE)
+        logger.info(f"{'👑 This worker is the scheduler leader' if is_leader else '👥 Another worker is the scheduler leader'} ({leases.owner_id})")
+        if is_leader:
+            # Incremental: only missing messages are inserted and only missing jobs registered
+            await reconcile_all_goal_jobs()
+            # First deploy of user_stats: backfill it from users + message_feedback
+            if await db.user_stats.estimated_document_count() == 0:
+                await user_stats.rebuild()
+            # First deploy of analytics rollups: backfill them from the raw collections
+            if await db.analytics_rollups.count_documents({"granularity": "day"}, limit=1) == 0:
+                await rollups.backfill(include_today=True)
         
         # Start scheduler if not already running
         if not scheduler.running:
@@ -10353,20 +10435,100 @@ async def lifespan(app: FastAPI):
         else:
             logger.error("❌ CRITICAL: Scheduler is NOT running after startup!")
 
-        # Schedule primary goal emails (user.goals field) - runs every 5 minutes
-        # This ensures users' main goals continue to send emails
+        # Primary goal emails (user.goals field) - backfill next_send_at, then dispatch due users every minute
         await schedule_user_emails()
         logger.info("✅ User email schedules initialized (primary goals)")
         
-        # Add recurring job to keep primary goal emails scheduled
         scheduler.add_job(
-            schedule_user_emails,
+            dispatch_primary_emails,
+            CronTrigger(second=0),  # Top of every minute
+            id='primary_email_dispatch',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        logger.info("✅ Primary email dispatcher job added (runs every minute)")
+        
+        # Leader-only look-ahead generation spreads LLM work across the hours before sends are due
+        scheduler.add_job(
+            pregenerate_scheduled_emails,
+            trigger='interval',
+            minutes=1,
+            id='email_pregeneration',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        
+        # Leader-only hourly reconcile keeps every goal's 7-day message window topped up
+        scheduler.add_job(
+            reconcile_all_goal_jobs,
+            trigger='interval',
+            hours=1,
+            id='goal_job_reconcile',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        
+        # Leader-only sweep for due goal messages whose in-memory job was lost
+        scheduler.add_job(
+            dispatch_goal_messages,
+            CronTrigger(second=30),
+            id='goal_message_sweep',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        
+        # Leader-only nightly move of old message history into the archive tier
+        scheduler.add_job(
+            archive_message_history,
+            CronTrigger(hour=3, minute=30),
+            id='message_history_archive',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        
+        # Leader picks up broadcasts orphaned by a dead worker (their job lease expires)
+        scheduler.add_job(
+            leases.singleton()(broadcast_engine.resume_incomplete_jobs),
+            trigger='interval',
+            minutes=2,
+            id='broadcast_resume',
+            replace_existing=True,
+            max_instances=1
+        )
+        scheduler.add_job(
+            leases.singleton()(streak_engine.resume_incomplete_jobs),
             trigger='interval',
-            minutes=5,  # Run every 5 minutes to maintain schedules
-            id='schedule_primary_goal_emails',
-            replace_existing=True
+            minutes=2,
+            id='streak_job_resume',
+            replace_existing=True,
+            max_instances=1
         )
-        logger.info("✅ Primary goal email scheduler job added (runs every 5 minutes)")
+        
+        # Connect the reply listener right away instead of waiting for the first supervisor tick
+        await supervise_reply_listener()
+        
+        # Background dependency checks for /livez, /readyz and /health
+        register_health_checks()
+        health_monitor.start()
+        
+        # Resume broadcasts interrupted by a restart (continue from their checkpoint)
+        try:
+            resumed = await broadcast_engine.resume_incomplete_jobs()
+            if resumed:
+                logger.info(f"✅ Resumed {resumed} interrupted broadcast job(s)")
+        except Exception as e:
+            logger.error(f"❌ Could not resume broadcast jobs: {e}", exc_info=True)
+        try:
+            resumed = await streak_engine.resume_incomplete_jobs()
+            if resumed:
+                logger.info(f"✅ Resumed {resumed} interrupted streak recompute job(s)")
+        except Exception as e:
+            logger.error(f"❌ Could not resume streak jobs: {e}", exc_info=True)
         
         startup_duration = time.time() - startup_start
         logger.info(f"🚀 Application startup completed in {startup_duration:.2f}s")
@@ -10391,6 +10553,13 @@ async def lifespan(app: FastAPI):
         logger.info("=" * 60)
         logger.info("🛑 Application shutdown initiated...")
         
+        try:
+            await health_monitor.stop()
+        except asyncio.CancelledError:
+            logger.warning("⚠️ Health monitor stop cancelled (ignoring)")
+        except Exception as e:
+            logger.warning(f"⚠️ Health monitor stop warning: {e}")
+        
         try:
             logger.info("Stopping scheduler...")
             if scheduler.running:
@@ -10401,6 +10570,68 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"⚠️ Scheduler shutdown warning: {e}")
         
+        try:
+            await leases.release(LEADER_LEASE)
+            logger.info("✅ Scheduler leader lease released")
+        except asyncio.CancelledError:
+            logger.warning("⚠️ Lease release cancelled (ignoring)")
+        except Exception as e:
+            logger.warning(f"⚠️ Lease release warning: {e}")
+        
+        try:
+            if reply_listener is not None:
+                await reply_listener.shutdown()
+                logger.info("✅ Reply listener stopped")
+        except asyncio.CancelledError:
+            logger.warning("⚠️ Reply listener shutdown cancelled (ignoring)")
+        except Exception as e:
+            logger.warning(f"⚠️ Reply listener shutdown warning: {e}")
+        
+        try:
+            logger.info("Waiting for in-flight primary emails...")
+            await email_dispatcher.shutdown()
+            logger.info("✅ Primary email dispatcher stopped")
+        except asyncio.CancelledError:
+            logger.warning("⚠️ Dispatcher shutdown cancelled (ignoring)")
+        except Exception as e:
+            logger.warning(f"⚠️ Dispatcher shutdown warning: {e}")
+        
+        try:
+            logger.info("Stopping broadcast workers...")
+            await broadcast_engine.shutdown()
+            logger.info("✅ Broadcast workers stopped (progress checkpointed)")
+        except asyncio.CancelledError:
+            logger.warning("⚠️ Broadcast shutdown cancelled (ignoring)")
+        except Exception as e:
+            logger.warning(f"⚠️ Broadcast shutdown warning: {e}")
+        
+        try:
+            await streak_engine.shutdown()
+            logger.info("✅ Streak recompute workers stopped (progress checkpointed)")
+        except asyncio.CancelledError:
+            logger.warning("⚠️ Streak worker shutdown cancelled (ignoring)")
+        except Exception as e:
+            logger.warning(f"⚠️ Streak worker shutdown warning: {e}")
+        
+        try:
+            logger.info("Draining log sink...")
+            await log_sink.drain()
+            logger.info(f"✅ Log sink drained ({log_sink.get_stats()['flushed']} documents written this run)")
+        except asyncio.CancelledError:
+            logger.warning("⚠️ Log sink drain cancelled (ignoring)")
+        except Exception as e:
+            logger.warning(f"⚠️ Log sink drain warning: {e}")
+        
+        try:
+            if smtp_pool is not None:
+                logger.info("Closing SMTP connection pool...")
+                await smtp_pool.close()
+                logger.info(f"✅ SMTP pool closed ({smtp_pool.get_stats()['messages_sent']} messages sent this run)")
+        except asyncio.CancelledError:
+            logger.warning("⚠️ SMTP pool close cancelled (ignoring)")
+        except Exception as e:
+            logger.warning(f"⚠️ SMTP pool close warning: {e}")
+        
         try:
             logger.info("Closing database connection...")
             client.close()
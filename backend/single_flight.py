@@ -0,0 +1,110 @@
+"""
+Single Flight
+Per-key call coalescing: concurrent callers in this process share one in-flight call,
+and a Mongo lease keeps other workers from running the same call at the same time
+"""
+import asyncio
+import logging
+import time
+from typing import Optional, Callable, Awaitable, Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Result handed to waiters when the caller running the call was cancelled
+_ABANDONED = object()
+
+
+class SingleFlight:
+    """
+    Runs `fetch` for a key at most once at a time across every worker.
+
+    Callers in the same process await the first caller's future. Across workers the
+    caller must hold the `{lock_prefix}:{key}` lease; while another worker holds it the
+    caller serves `stale` if it has one, or polls `load_fresh` until the holder's result
+    lands (up to `wait_seconds`, then it fetches anyway).
+    """
+
+    def __init__(
+        self,
+        leases,
+        lock_prefix: str,
+        lock_ttl_seconds: int = 120,
+        wait_seconds: float = 30,
+        poll_seconds: float = 1.0,
+    ):
+        self.leases = leases
+        self.lock_prefix = lock_prefix
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        load_fresh: Callable[[], Awaitable[Optional[Any]]],
+        stale: Optional[Any] = None,
+        recheck: bool = True,
+    ) -> Any:
+        """
+        `load_fresh` returns a fresh stored result or None. With `recheck`, it is tried
+        again once the lease is held, since the previous holder may have just finished.
+        """
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            result = await asyncio.shield(inflight)
+            if result is not _ABANDONED:
+                return result
+            # The caller running it was cancelled - run it ourselves (or join whoever did)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception retrieved so a failure with no other waiters isn't reported as unhandled
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            result = await self._run_leased(key, fetch, load_fresh, stale, recheck)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # Waiters weren't cancelled; wake them so one of them takes over
+            future.set_result(_ABANDONED)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_leased(self, key: str, fetch, load_fresh, stale, recheck: bool) -> Any:
+        """Take the key's lease and fetch, or wait for the worker that holds it"""
+        lock_name = f"{self.lock_prefix}:{key}"
+        deadline = time.time() + self.wait_seconds
+        holds_lock = await self.leases.acquire(lock_name, self.lock_ttl_seconds)
+        while not holds_lock:
+            # Another worker is fetching - serve the stale copy, or wait for its result
+            if stale is not None:
+                return stale
+            if time.time() >= deadline:
+                logger.warning(f"Timed out waiting for lease {lock_name} - fetching anyway")
+                break
+            await asyncio.sleep(self.poll_seconds)
+            fresh = await load_fresh()
+            if fresh is not None:
+                return fresh
+            holds_lock = await self.leases.acquire(lock_name, self.lock_ttl_seconds)
+
+        try:
+            if holds_lock and recheck:
+                fresh = await load_fresh()
+                if fresh is not None:
+                    return fresh
+            return await fetch()
+        finally:
+            if holds_lock:
+                try:
+                    await self.leases.release(lock_name)
+                except Exception:
+                    pass
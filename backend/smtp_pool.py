@@ -0,0 +1,245 @@
+"""
+SMTP Connection Pool
+Keeps authenticated aiosmtplib sessions open and reuses them across sends
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List
+
+import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+# Response codes that mean the server is dropping this session (421 = service closing
+# channel). 451/452 are per-message transient failures and are left to the caller.
+RECONNECT_RESPONSE_CODES = {421}
+
+
+class PooledConnection:
+    """A single authenticated SMTP session plus its usage bookkeeping"""
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.messages_sent = 0
+
+
+class SMTPConnectionPool:
+    """
+    Pool of long-lived, authenticated SMTP sessions.
+
+    Connections are handed out LIFO so a warm session is reused first, and are
+    recycled when idle for too long, too old, or past the per-connection message cap.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str,
+        password: str,
+        max_size: int = 5,
+        max_messages_per_connection: int = 90,
+        max_idle_seconds: float = 60.0,
+        max_lifetime_seconds: float = 900.0,
+        timeout: float = 30.0,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_size = max_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.timeout = timeout
+
+        self._idle: List[PooledConnection] = []
+        self._slots = asyncio.Semaphore(max_size)
+        self._in_use = 0
+        self._closed = False
+        self._stats: Dict[str, int] = {
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "connections_reused": 0,
+            "stale_recycled": 0,
+            "cap_recycled": 0,
+            "reconnects": 0,
+            "messages_sent": 0,
+            "send_failures": 0,
+            "connect_failures": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> Optional["SMTPConnectionPool"]:
+        """Build a pool from SMTP_* environment variables, or None if SMTP isn't configured"""
+        smtp_host = os.getenv('SMTP_HOST')
+        smtp_username = os.getenv('SMTP_USERNAME')
+        smtp_password = os.getenv('SMTP_PASSWORD')
+        if not all([smtp_host, smtp_username, smtp_password]):
+            return None
+
+        return cls(
+            hostname=smtp_host,
+            port=int(os.getenv('SMTP_PORT', '465')),
+            username=smtp_username,
+            password=smtp_password,
+            max_size=int(os.getenv('SMTP_POOL_SIZE', '5')),
+            max_messages_per_connection=int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '90')),
+            max_idle_seconds=float(os.getenv('SMTP_MAX_IDLE_SECONDS', '60')),
+            max_lifetime_seconds=float(os.getenv('SMTP_MAX_CONNECTION_LIFETIME_SECONDS', '900')),
+        )
+
+    def _tls_kwargs(self) -> Dict[str, bool]:
+        # Port 465 = SSL (implicit TLS), port 587 = STARTTLS (explicit TLS)
+        if self.port == 587:
+            return {"use_tls": False, "start_tls": True}
+        return {"use_tls": True}
+
+    async def _open(self) -> PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            timeout=self.timeout,
+            **self._tls_kwargs(),
+        )
+        try:
+            await smtp.connect()
+            await smtp.login(self.username, self.password)
+        except Exception:
+            self._stats["connect_failures"] += 1
+            smtp.close()
+            raise
+
+        self._stats["connections_opened"] += 1
+        logger.debug(f"SMTP pool opened connection to {self.hostname}:{self.port}")
+        return PooledConnection(smtp)
+
+    async def _discard(self, conn: PooledConnection, graceful: bool = True) -> None:
+        self._stats["connections_closed"] += 1
+        try:
+            if graceful and conn.smtp.is_connected:
+                await asyncio.wait_for(conn.smtp.quit(), timeout=5)
+            else:
+                conn.smtp.close()
+        except Exception:
+            conn.smtp.close()
+
+    def _is_stale(self, conn: PooledConnection) -> bool:
+        now = time.monotonic()
+        return (
+            not conn.smtp.is_connected
+            or now - conn.last_used_at > self.max_idle_seconds
+            or now - conn.created_at > self.max_lifetime_seconds
+        )
+
+    async def _probe(self, conn: PooledConnection) -> bool:
+        """RSET a reused session so a dead one is found before MAIL FROM, not mid-message"""
+        try:
+            await conn.smtp.rset()
+            return True
+        except aiosmtplib.SMTPResponseException as e:
+            if e.code not in RECONNECT_RESPONSE_CODES:
+                raise
+        except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError, OSError):
+            pass
+        return False
+
+    async def _checkout(self) -> PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if self._is_stale(conn):
+                self._stats["stale_recycled"] += 1
+                await self._discard(conn)
+                continue
+            if not await self._probe(conn):
+                self._stats["reconnects"] += 1
+                await self._discard(conn, graceful=False)
+                continue
+            self._stats["connections_reused"] += 1
+            return conn
+        return await self._open()
+
+    async def _checkin(self, conn: PooledConnection) -> None:
+        if self._closed:
+            await self._discard(conn)
+        elif conn.messages_sent >= self.max_messages_per_connection:
+            self._stats["cap_recycled"] += 1
+            await self._discard(conn)
+        else:
+            conn.last_used_at = time.monotonic()
+            self._idle.append(conn)
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a connection; it is returned to the pool unless the caller's block raised"""
+        if self._closed:
+            raise RuntimeError("SMTP connection pool is closed")
+
+        async with self._slots:
+            conn = await self._checkout()
+            self._in_use += 1
+            try:
+                yield conn
+            except BaseException:
+                await self._discard(conn, graceful=False)
+                raise
+            else:
+                await self._checkin(conn)
+            finally:
+                self._in_use -= 1
+
+    async def send_message(self, message) -> None:
+        """
+        Send a prepared email.message.Message over a pooled connection.
+
+        Reused sessions are probed before sending, so a dead one is replaced before any
+        of the message goes out. Once sending starts, only a reconnect-class refusal of
+        MAIL FROM is retried (on a fresh connection): nothing has been accepted at that
+        point. A disconnect later in the transaction may come after the server queued
+        the message, so it propagates rather than risk a duplicate.
+        """
+        for attempt in range(2):
+            try:
+                async with self.connection() as conn:
+                    await conn.smtp.send_message(message)
+                    conn.messages_sent += 1
+                self._stats["messages_sent"] += 1
+                return
+            except aiosmtplib.SMTPSenderRefused as e:
+                if attempt == 0 and e.code in RECONNECT_RESPONSE_CODES:
+                    self._stats["reconnects"] += 1
+                    continue
+                self._stats["send_failures"] += 1
+                raise
+            except Exception:
+                self._stats["send_failures"] += 1
+                raise
+
+    async def check(self) -> None:
+        """Round-trip a NOOP (after EHLO on connect) to prove the server is reachable"""
+        async with self.connection() as conn:
+            await conn.smtp.noop()
+
+    async def close(self) -> None:
+        """Close every idle connection; in-flight ones are closed as they are returned"""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool metrics for admin/health endpoints"""
+        return {
+            **self._stats,
+            "host": f"{self.hostname}:{self.port}",
+            "max_size": self.max_size,
+            "idle_connections": len(self._idle),
+            "in_use_connections": self._in_use,
+            "max_messages_per_connection": self.max_messages_per_connection,
+            "max_idle_seconds": self.max_idle_seconds,
+        }
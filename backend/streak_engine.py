@@ -0,0 +1,136 @@
+"""
+Streak Engine
+Recomputes users' streaks from message history as a resumable background job
+"""
+import logging
+from datetime import datetime, timezone, timedelta, date
+from typing import Optional, Dict, Any, List, Iterable
+
+from pymongo import UpdateOne
+
+try:
+    from backend.job_runner import LeasedJobRunner
+except ImportError:
+    from job_runner import LeasedJobRunner
+
+logger = logging.getLogger(__name__)
+
+
+def send_days_pipeline(emails: List[str]) -> List[Dict[str, Any]]:
+    """
+    Distinct send days (YYYY-MM-DD) per user, computed server-side.
+    sent_at (or created_at) may be a date (UTC day) or an ISO string (its own date prefix).
+    """
+    return [
+        {"$match": {"email": {"$in": emails}}},
+        {"$project": {"email": 1, "ts": {"$ifNull": ["$sent_at", "$created_at"]}}},
+        {"$project": {"email": 1, "day": {"$switch": {
+            "branches": [
+                {"case": {"$eq": [{"$type": "$ts"}, "date"]},
+                 "then": {"$dateToString": {"format": "%Y-%m-%d", "date": "$ts"}}},
+                {"case": {"$eq": [{"$type": "$ts"}, "string"]},
+                 "then": {"$substrCP": ["$ts", 0, 10]}},
+            ],
+            "default": None,
+        }}}},
+        {"$match": {"day": {"$ne": None}}},
+        {"$group": {"_id": "$email", "days": {"$addToSet": "$day"}}},
+    ]
+
+
+def compute_streaks(days: Iterable[str], today: date) -> Optional[Dict[str, int]]:
+    """
+    current_streak, max_streak and total_email_days from distinct send days.
+    The current streak counts back from the most recent send day if it was today or
+    yesterday; otherwise it has lapsed to 1. None when no day parses.
+    """
+    parsed = set()
+    for day in days:
+        try:
+            parsed.add(date.fromisoformat(day))
+        except (TypeError, ValueError):
+            continue
+    if not parsed:
+        return None
+    sorted_days = sorted(parsed)
+
+    most_recent = sorted_days[-1]
+    current_streak = 1
+    if (today - most_recent).days <= 1:
+        current_streak = 0
+        expected = most_recent
+        while expected in parsed:
+            current_streak += 1
+            expected -= timedelta(days=1)
+
+    max_streak = run = 1
+    for previous, day in zip(sorted_days, sorted_days[1:]):
+        run = run + 1 if (day - previous).days == 1 else 1
+        max_streak = max(max_streak, run)
+
+    return {"current_streak": current_streak, "max_streak": max_streak, "total_email_days": len(sorted_days)}
+
+
+class StreakEngine(LeasedJobRunner):
+    """
+    Recompute streak_count for every active user from message_history.
+
+    Each page of users (see LeasedJobRunner for paging, checkpoints and leases) costs
+    one aggregation (distinct send days for the whole page, grouped in Mongo) and one
+    bulk_write of the streaks that changed.
+    """
+
+    jobs_collection = "streak_jobs"
+    lease_prefix = "streaks"
+    job_label = "🔥 Streak recompute"
+    user_projection = {"_id": 0, "email": 1, "streak_count": 1}
+
+    def __init__(self, db, batch_size: int = 500, leases=None, lease_ttl_seconds: int = 120, history=None):
+        super().__init__(db, batch_size, leases=leases, lease_ttl_seconds=lease_ttl_seconds)
+        # Optional MessageHistoryStore - adds send days from archived months
+        self.history = history
+
+    async def recompute_page(self, users: List[Dict[str, Any]], today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Recompute and write streaks for one page of users; returns per-user results"""
+        today = today or datetime.now(timezone.utc).date()
+        emails = [u["email"] for u in users]
+        grouped = await self.db.message_history.aggregate(send_days_pipeline(emails)).to_list(None)
+        days_by_email = {g["_id"]: set(g["days"]) for g in grouped}
+        if self.history is not None:
+            for email, days in (await self.history.archived_send_days(emails)).items():
+                days_by_email.setdefault(email, set()).update(days)
+
+        results = []
+        ops = []
+        for user in users:
+            streaks = compute_streaks(days_by_email.get(user["email"], []), today)
+            if streaks is None:
+                continue
+            old_streak = user.get("streak_count", 0)
+            if streaks["current_streak"] != old_streak:
+                ops.append(UpdateOne(
+                    {"email": user["email"]},
+                    {"$set": {"streak_count": streaks["current_streak"]}}
+                ))
+            results.append({
+                "email": user["email"],
+                "old_streak": old_streak,
+                "new_streak": streaks["current_streak"],
+                "total_email_days": streaks["total_email_days"],
+                "max_streak": streaks["max_streak"],
+            })
+        if ops:
+            await self.db.users.bulk_write(ops, ordered=False)
+        return results
+
+    async def create_job(self, created_by: str = "admin") -> Dict[str, Any]:
+        """Persist a new recompute job over all active users and start it in the background"""
+        return await self._create_job({"recomputed": 0, "changed": 0}, created_by)
+
+    async def process_page(self, job: Dict[str, Any], users: List[Dict[str, Any]]) -> Dict[str, int]:
+        results = await self.recompute_page(users)
+        changed = sum(1 for r in results if r["new_streak"] != r["old_streak"])
+        return {"recomputed": len(results), "changed": changed}
+
+    def completion_summary(self, job: Dict[str, Any]) -> str:
+        return f"({job['changed']} changed)"
@@ -0,0 +1,357 @@
+import importlib
+import sys
+import os
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# test_scheduling_logic replaces pydantic (among others) with mocks in sys.modules when
+# it is collected; import the modules whose tests need the real one before that
+importlib.import_module("version_tracker")
+
+_MISSING = object()
+
+_RANGE_OPS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return _MISSING
+        doc = doc[part]
+    return doc
+
+
+def _values(value):
+    # Array fields match a condition when any element does
+    return value if isinstance(value, list) else [value]
+
+
+def _compare(op, value, arg):
+    try:
+        return any(_RANGE_OPS[op](v, arg) for v in _values(value) if v is not None and type(v) is type(arg))
+    except TypeError:
+        return False
+
+
+def matches(doc, query):
+    """The subset of the Mongo query language the app's queries use"""
+    for field, cond in query.items():
+        if field == "$and":
+            ok = all(matches(doc, sub) for sub in cond)
+        elif field == "$or":
+            ok = any(matches(doc, sub) for sub in cond)
+        elif field == "$expr":
+            ok = bool(_evaluate(cond, doc))
+        else:
+            value = _get(doc, field)
+            if isinstance(cond, dict) and any(op.startswith("$") for op in cond):
+                ok = all(_matches_operator(op, value, arg) for op, arg in cond.items())
+            else:
+                ok = value is not _MISSING and (value == cond or cond in _values(value))
+        if not ok:
+            return False
+    return True
+
+
+def _matches_operator(op, value, arg):
+    present = value is not _MISSING
+    if op == "$exists":
+        return present == bool(arg)
+    if op == "$in":
+        return any(v in arg for v in _values(value if present else None))
+    if op == "$nin":
+        return not any(v in arg for v in _values(value if present else None))
+    if op == "$ne":
+        return not (present and (value == arg or arg in _values(value)))
+    if op == "$eq":
+        return present and value == arg
+    if op in _RANGE_OPS:
+        return present and _compare(op, value, arg)
+    if op == "$options":
+        return True
+    raise ValueError(f"FakeCollection does not support {op}")
+
+
+def _sort_key(field):
+    def key(doc):
+        value = _get(doc, field)
+        # Missing and null sort first, like Mongo
+        return (value is not _MISSING and value is not None, value if value not in (_MISSING, None) else 0)
+    return key
+
+
+_EXPRESSIONS = {
+    "$add": lambda args: sum(args),
+    "$max": lambda args: max(args),
+    "$ifNull": lambda args: next((a for a in args if a is not None), None),
+    "$eq": lambda args: args[0] == args[1],
+}
+
+
+def _evaluate(expr, doc):
+    """Aggregation expressions the app uses: field paths, $$ROOT, $literal and _EXPRESSIONS"""
+    if expr == "$$ROOT":
+        return doc
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, dict) and list(expr) == ["$literal"]:
+        return expr["$literal"]
+    if isinstance(expr, dict) and len(expr) == 1 and next(iter(expr)) in _EXPRESSIONS:
+        op, args = next(iter(expr.items()))
+        return _EXPRESSIONS[op]([_evaluate(arg, doc) for arg in args])
+    return expr
+
+
+def apply_update(doc, update, inserting=False):
+    if isinstance(update, list):
+        # Pipeline update: only $set stages
+        for stage in update:
+            for field, expr in stage["$set"].items():
+                _set(doc, field, _evaluate(expr, doc))
+        return
+    for field, value in update.get("$set", {}).items():
+        _set(doc, field, value)
+    for field, amount in update.get("$inc", {}).items():
+        current = _get(doc, field)
+        _set(doc, field, (0 if current is _MISSING else current) + amount)
+    for field in update.get("$unset", {}):
+        parent, _, leaf = field.rpartition(".")
+        target = _get(doc, parent) if parent else doc
+        if isinstance(target, dict):
+            target.pop(leaf, None)
+    if inserting:
+        for field, value in update.get("$setOnInsert", {}).items():
+            _set(doc, field, value)
+
+
+def _set(doc, path, value):
+    *parents, leaf = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[leaf] = value
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys, direction=1):
+        if isinstance(keys, str):
+            keys = [(keys, direction)]
+        for field, order in reversed(keys):
+            self.docs.sort(key=_sort_key(field), reverse=order < 0)
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length):
+        return self.docs if length is None else self.docs[:length]
+
+    async def explain(self):
+        return {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}}
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """
+    In-memory stand-in for a Motor collection. `fail_next[method] = n` makes the next n
+    calls of that method raise ConnectionError; `aggregate_rows` (a list, or a function of
+    the pipeline) is what aggregate() returns.
+    """
+
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+        self.fail_next = {}
+        self.batches = []
+        self.bulk_ops = []
+        self.pipelines = []
+        self.aggregate_rows = []
+        self.indexes = {}
+
+    def _maybe_fail(self, method):
+        if self.fail_next.get(method):
+            self.fail_next[method] -= 1
+            raise ConnectionError(f"{method} failed")
+
+    def _matching(self, query):
+        return [d for d in self.docs if matches(d, query or {})]
+
+    def find(self, query=None, projection=None):
+        self._maybe_fail("find")
+        return FakeCursor([dict(d) for d in self._matching(query)])
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        self._maybe_fail("find_one")
+        found = self.find(query)
+        if sort:
+            found.sort(sort)
+        return found.docs[0] if found.docs else None
+
+    async def count_documents(self, query):
+        return len(self._matching(query))
+
+    async def distinct(self, field, query=None):
+        values = []
+        for doc in self._matching(query):
+            for value in _values(_get(doc, field)):
+                if value is not _MISSING and value not in values:
+                    values.append(value)
+        return values
+
+    async def insert_one(self, doc):
+        self._maybe_fail("insert_one")
+        if "_id" in doc and any(d.get("_id") == doc["_id"] for d in self.docs):
+            raise DuplicateKeyError("duplicate _id")
+        self.docs.append(dict(doc))
+        return SimpleNamespace(inserted_id=doc.get("_id"))
+
+    async def insert_many(self, docs, ordered=True):
+        self._maybe_fail("insert_many")
+        self.batches.append(len(docs))
+        for doc in docs:
+            await self.insert_one(doc)
+
+    def _upsert(self, query, update):
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        if "_id" in doc and self.by_id(doc["_id"]) is not None:
+            # The filter missed an existing document with this _id, as Mongo would report it
+            raise DuplicateKeyError("duplicate _id")
+        apply_update(doc, update, inserting=True)
+        self.docs.append(doc)
+        return doc
+
+    def _update(self, query, update, upsert, many):
+        matched = self._matching(query)
+        if not many:
+            matched = matched[:1]
+        for doc in matched:
+            apply_update(doc, update)
+        upserted_id = None
+        if not matched and upsert:
+            upserted_id = self._upsert(query, update).get("_id")
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched), upserted_id=upserted_id)
+
+    async def update_one(self, query, update, upsert=False):
+        self._maybe_fail("update_one")
+        return self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query, update, upsert=False):
+        self._maybe_fail("update_many")
+        return self._update(query, update, upsert, many=True)
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False, projection=None):
+        # return_document=True is ReturnDocument.AFTER
+        self._maybe_fail("find_one_and_update")
+        matched = self._matching(query)[:1]
+        if matched:
+            before = dict(matched[0])
+            apply_update(matched[0], update)
+            return dict(matched[0]) if return_document else before
+        if upsert:
+            doc = self._upsert(query, update)
+            return dict(doc) if return_document else None
+        return None
+
+    async def replace_one(self, query, doc, upsert=False):
+        self._maybe_fail("replace_one")
+        for i, existing in enumerate(self.docs):
+            if matches(existing, query):
+                self.docs[i] = {"_id": existing.get("_id"), **doc}
+                return SimpleNamespace(matched_count=1, modified_count=1)
+        if upsert:
+            self.docs.append({"_id": query.get("_id"), **doc})
+        return SimpleNamespace(matched_count=0, modified_count=0)
+
+    async def delete_one(self, query):
+        self._maybe_fail("delete_one")
+        for doc in self._matching(query)[:1]:
+            self.docs.remove(doc)
+            return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, query):
+        self._maybe_fail("delete_many")
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not matches(d, query)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    async def bulk_write(self, ops, ordered=True):
+        self._maybe_fail("bulk_write")
+        self.bulk_ops.extend(ops)
+        for op in ops:
+            self._update(op._filter, op._doc, op._upsert, many=False)
+
+    def aggregate(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        rows = self.aggregate_rows(pipeline) if callable(self.aggregate_rows) else self.aggregate_rows
+        return FakeCursor([dict(row) for row in rows])
+
+    async def create_index(self, keys, name=None, **options):
+        self._maybe_fail("create_index")
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = name or "_".join(f"{k}_{d}" for k, d in keys)
+        self.indexes[name] = {"key": keys, **options}
+        return name
+
+    async def drop_index(self, name):
+        del self.indexes[name]
+
+    async def index_information(self):
+        return {"_id_": {"key": [("_id", 1)]}, **self.indexes}
+
+    def by_id(self, _id):
+        """The stored document with this _id (test helper, not part of the Motor API)"""
+        return next((d for d in self.docs if d.get("_id") == _id), None)
+
+
+class FakeDB(dict):
+    """Collections are created on first access, by item or attribute"""
+
+    def __init__(self):
+        super().__init__()
+        self.commands = []
+
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+        return {"ok": 1}
+
+
+@pytest.fixture
+def db():
+    return FakeDB()
@@ -0,0 +1,90 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from achievements import AchievementCatalog, compile_rules, evaluate_rules
+
+
+def achievement(achievement_id, req_type, value=None, **extra):
+    requirement = {"type": req_type}
+    if value is not None:
+        requirement["value"] = value
+    return {"id": achievement_id, "requirement": requirement, "active": True, **extra}
+
+
+CATALOG = {
+    a["id"]: a for a in [
+        achievement("streak_30", "streak", 30),
+        achievement("streak_7", "streak", 7),
+        achievement("streak_3", "streak", "3"),
+        achievement("first_goal", "has_goal"),
+        achievement("veteran", "account_age_days", 365),
+        achievement("feedback_5", "feedback_count", 5),
+    ]
+}
+
+
+def test_compile_rules_sorts_thresholds_per_type():
+    rules = compile_rules(CATALOG)
+
+    assert rules["streak"] == ([3.0, 7.0, 30.0], ["streak_3", "streak_7", "streak_30"])
+    # A missing value means "at least once"
+    assert rules["has_goal"] == ([1.0], ["first_goal"])
+    assert set(rules) == {"streak", "has_goal", "account_age_days", "feedback_count"}
+
+
+def test_compile_rules_skips_unknown_types_and_bad_values():
+    rules = compile_rules({
+        "mystery": achievement("mystery", "moon_phase", 3),
+        "broken": achievement("broken", "messages", "lots"),
+        "no_requirement": {"id": "no_requirement"},
+        "messages_10": achievement("messages_10", "messages", 10),
+    })
+
+    assert rules == {"messages": ([10.0], ["messages_10"])}
+
+
+def test_evaluate_rules_returns_reached_achievements_not_yet_unlocked():
+    rules = compile_rules(CATALOG)
+    user = {
+        "streak_count": 7,
+        "goals": "  Run a marathon ",
+        "achievements": ["streak_3"],
+        "created_at": (datetime.now(timezone.utc) - timedelta(days=400)).isoformat(),
+    }
+
+    assert sorted(evaluate_rules(rules, user, feedback_count=5)) == ["feedback_5", "first_goal", "streak_7", "veteran"]
+    # Thresholds are inclusive, one below isn't reached
+    assert evaluate_rules(rules, {"streak_count": 6, "achievements": ["streak_3"]}, feedback_count=4) == []
+
+
+def test_evaluate_rules_tolerates_missing_and_bad_fields():
+    rules = compile_rules(CATALOG)
+    user = {"streak_count": None, "goals": None, "created_at": "not a date"}
+
+    assert evaluate_rules(rules, user) == []
+    assert evaluate_rules({}, {"streak_count": 100}) == []
+
+
+def test_catalog_caches_until_invalidated(db):
+    db.achievements.docs.extend([
+        {"_id": 1, **achievement("streak_7", "streak", 7)},
+        {"_id": 2, **achievement("retired", "streak", 1, active=False)},
+    ])
+    catalog = AchievementCatalog(db)
+
+    async def run():
+        first = await catalog.get()
+        db.achievements.docs.append({"_id": 3, **achievement("streak_3", "streak", 3)})
+        cached = await catalog.rules()
+        catalog.invalidate()
+        return first, cached, await catalog.rules()
+
+    first, cached, reloaded = asyncio.run(run())
+    assert list(first) == ["streak_7"]
+    assert cached == {"streak": ([7.0], ["streak_7"])}
+    assert reloaded == {"streak": ([3.0, 7.0], ["streak_3", "streak_7"])}
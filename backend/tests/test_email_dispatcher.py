@@ -0,0 +1,60 @@
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from email_dispatcher import compute_next_send_at
+
+
+def test_daily_picks_next_slot_same_day():
+    schedule = {"frequency": "daily", "timezone": "UTC", "times": ["09:00", "17:00"]}
+    after = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+    assert compute_next_send_at(schedule, after) == datetime(2025, 3, 10, 17, 0, tzinfo=timezone.utc)
+
+
+def test_daily_rolls_to_tomorrow_and_is_strictly_after():
+    schedule = {"frequency": "daily", "timezone": "UTC", "times": ["09:00"]}
+    after = datetime(2025, 3, 10, 9, 0, tzinfo=timezone.utc)
+
+    assert compute_next_send_at(schedule, after) == datetime(2025, 3, 11, 9, 0, tzinfo=timezone.utc)
+
+
+def test_daily_respects_user_timezone():
+    schedule = {"frequency": "daily", "timezone": "America/New_York", "times": ["09:00"]}
+    after = datetime(2025, 7, 1, 0, 0, tzinfo=timezone.utc)
+
+    # 09:00 EDT == 13:00 UTC
+    assert compute_next_send_at(schedule, after) == datetime(2025, 7, 1, 13, 0, tzinfo=timezone.utc)
+
+
+def test_weekly_uses_custom_days():
+    schedule = {"frequency": "weekly", "timezone": "UTC", "times": ["10:00"], "custom_days": ["wednesday", "friday"]}
+    after = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)  # Monday
+
+    result = compute_next_send_at(schedule, after)
+    assert result.weekday() == 2
+    assert result == datetime(2025, 3, 12, 10, 0, tzinfo=timezone.utc)
+
+
+def test_monthly_skips_short_months():
+    schedule = {"frequency": "monthly", "timezone": "UTC", "times": ["08:00"], "monthly_dates": ["31"]}
+    after = datetime(2025, 3, 31, 9, 0, tzinfo=timezone.utc)
+
+    # April has no 31st
+    assert compute_next_send_at(schedule, after) == datetime(2025, 5, 31, 8, 0, tzinfo=timezone.utc)
+
+
+def test_custom_interval_advances_by_n_days():
+    schedule = {"frequency": "custom", "timezone": "UTC", "times": ["07:30"], "custom_interval": 3}
+    after = datetime(2025, 3, 10, 7, 30, tzinfo=timezone.utc)
+
+    assert compute_next_send_at(schedule, after) == datetime(2025, 3, 13, 7, 30, tzinfo=timezone.utc)
+
+
+def test_paused_schedule_has_no_next_send():
+    schedule = {"frequency": "daily", "timezone": "UTC", "times": ["09:00"], "paused": True}
+
+    assert compute_next_send_at(schedule, datetime(2025, 3, 10, tzinfo=timezone.utc)) is None
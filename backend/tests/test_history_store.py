@@ -0,0 +1,145 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+from bson import ObjectId
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from history_store import MessageHistoryStore, matches, project
+
+NOW = datetime.now(timezone.utc)
+EMAIL = "a@example.com"
+
+
+def make_store(db, days_ago):
+    """A store whose hot tier holds one message per entry in `days_ago`, newest first"""
+    for i, days in enumerate(days_ago):
+        db.message_history.docs.append({
+            "_id": ObjectId(),
+            "id": f"m{i}",
+            "email": EMAIL,
+            "message": f"message {i}",
+            "sent_at": NOW - timedelta(days=days, minutes=i),
+            "personality": {"type": "famous", "value": "Oprah" if i % 2 else "Elon Musk"},
+        })
+    return MessageHistoryStore(db, hot_days=90)
+
+
+def ids(messages):
+    return [m["id"] for m in messages]
+
+
+def collect(iterator):
+    async def run():
+        return [msg async for msg in iterator]
+    return asyncio.run(run())
+
+
+def test_matches_or_with_missing_or_empty_goal_id():
+    # The main-goal history query from get_goal_history
+    query = {"$or": [{"goal_id": {"$exists": False}}, {"goal_id": None}, {"goal_id": ""}]}
+    assert matches({"id": "a"}, query)
+    assert matches({"id": "b", "goal_id": None}, query)
+    assert matches({"id": "c", "goal_id": ""}, query)
+    assert not matches({"id": "d", "goal_id": "g1"}, query)
+    assert matches({"goal_id": "g1"}, {"goal_id": {"$exists": True, "$ne": None}})
+    assert not matches({"goal_id": None}, {"goal_id": {"$exists": True, "$ne": None}})
+
+
+def test_matches_compares_string_and_date_timestamps():
+    at = datetime(2026, 1, 31, 9, tzinfo=timezone.utc)
+    assert matches({"sent_at": at.isoformat()}, {"sent_at": {"$gte": at - timedelta(hours=1)}})
+    assert matches({"sent_at": at}, {"sent_at": {"$lt": (at + timedelta(hours=1)).isoformat()}})
+    assert not matches({}, {"sent_at": {"$lt": at}})
+    assert matches({"status": "sent"}, {"status": {"$in": ["sent", "queued"]}, "kind": {"$nin": ["goal"]}})
+
+
+def test_project_inclusion_and_exclusion():
+    msg = {"_id": 1, "id": "m1", "message": "hi", "minhash": [1, 2], "lsh_buckets": ["0:ab"]}
+    assert project(msg, {"message": 1}) == {"message": "hi", "_id": 1}
+    assert project(msg, {"message": 1, "id": 1, "_id": 0}) == {"message": "hi", "id": "m1"}
+    assert project(msg, {"_id": 0, "minhash": 0, "lsh_buckets": 0}) == {"id": "m1", "message": "hi"}
+    assert project(msg, None) is msg
+
+
+def test_reads_merge_both_tiers_in_time_order(db):
+    store = make_store(db, [1, 30, 100, 120, 200, 400])
+    before = ids(collect(store.iterate(EMAIL)))
+
+    moved = asyncio.run(store.archive_user(EMAIL))
+
+    assert moved == 4
+    assert ids(db.message_history.docs) == ["m0", "m1"]
+    assert ids(collect(store.iterate(EMAIL))) == before == ["m0", "m1", "m2", "m3", "m4", "m5"]
+    assert ids(collect(store.iterate(EMAIL, newest_first=False))) == list(reversed(before))
+    assert ids(asyncio.run(store.recent(EMAIL, 2))) == ["m0", "m1"]
+    assert ids(asyncio.run(store.recent(EMAIL, 4))) == ["m0", "m1", "m2", "m3"]
+    window = collect(store.iterate(EMAIL, start=NOW - timedelta(days=150), end=NOW - timedelta(days=10)))
+    assert ids(window) == ["m1", "m2", "m3"]
+    assert asyncio.run(store.archived_total()) == 4
+
+
+def test_message_in_both_tiers_is_read_once(db):
+    store = make_store(db, [1, 100, 120, 200])
+    db.message_history.fail_next["delete_many"] = 1
+    try:
+        asyncio.run(store.archive_user(EMAIL))
+    except ConnectionError:
+        pass
+    # Buckets were written but the hot copies weren't deleted
+    assert len(db.message_history.docs) == 4
+    assert asyncio.run(store.archived_total()) == 3
+
+    assert ids(collect(store.iterate(EMAIL))) == ["m0", "m1", "m2", "m3"]
+    assert ids(collect(store.iterate(EMAIL, newest_first=False))) == ["m3", "m2", "m1", "m0"]
+    assert ids(asyncio.run(store.recent(EMAIL, 10))) == ["m0", "m1", "m2", "m3"]
+    assert collect(store.archived_messages()) == []
+
+
+def test_archive_rerun_completes_an_interrupted_pass(db):
+    store = make_store(db, [1, 100, 101, 130, 200])
+    db.message_history.fail_next["delete_many"] = 1
+    try:
+        asyncio.run(store.archive_user(EMAIL))
+    except ConnectionError:
+        pass
+
+    moved = asyncio.run(store.archive_user(EMAIL))
+
+    assert moved == 4
+    assert ids(db.message_history.docs) == ["m0"]
+    buckets = [b for b in db.message_archive.docs if "email" in b]
+    assert sum(b["count"] for b in buckets) == 4
+    assert sorted(i for b in buckets for i in b["ids"]) == ["m1", "m2", "m3", "m4"]
+    assert asyncio.run(store.archived_total()) == 4
+    assert ids(collect(store.iterate(EMAIL))) == ["m0", "m1", "m2", "m3", "m4"]
+    assert sorted(ids(collect(store.archived_messages()))) == ["m1", "m2", "m3", "m4"]
+    assert ids(collect(store.archived_messages(NOW - timedelta(days=120)))) == ["m1", "m2"]
+
+
+def test_message_updated_while_archiving_stays_hot_until_the_next_pass(db):
+    store = make_store(db, [1, 100, 120, 200])
+    rewrite_bucket = store._rewrite_bucket
+    rated = []
+
+    async def rewrite_then_rate(email, month, mutate, **kwargs):
+        await rewrite_bucket(email, month, mutate, **kwargs)
+        # Feedback lands after the buckets were written but before the hot copies are deleted
+        if not rated:
+            rated.append(await store.update_by_id("m1", {"rating": 5}))
+
+    store._rewrite_bucket = rewrite_then_rate
+    moved = asyncio.run(store.archive_user(EMAIL))
+
+    assert moved == 2
+    assert ids(db.message_history.docs) == ["m0", "m1"]
+    assert [m.get("rating") for m in collect(store.iterate(EMAIL)) if m["id"] == "m1"] == [5]
+
+    store._rewrite_bucket = rewrite_bucket
+    assert asyncio.run(store.archive_user(EMAIL)) == 1
+    assert ids(db.message_history.docs) == ["m0"]
+    assert asyncio.run(store.find_by_id("m1"))["rating"] == 5
+    assert asyncio.run(store.archived_total()) == 3
@@ -0,0 +1,79 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from index_registry import (
+    IndexRegistry, IndexSpec, RETENTION_INDEX_NAME, _plan_stages, critical_queries, retention_from_env,
+)
+
+SPECS = [
+    IndexSpec("users", "email", "primary key", unique=True),
+    IndexSpec("message_history", [("email", 1), ("sent_at", -1)], "recent messages"),
+]
+
+
+def test_ensure_creates_every_index_and_reports_failures(db):
+    db.users.fail_next["create_index"] = 1
+    registry = IndexRegistry(db, SPECS)
+
+    result = asyncio.run(registry.ensure())
+
+    assert result == {"declared": 2, "failed": [{"index": "users(email:1)", "error": "create_index failed"}]}
+    assert db.message_history.indexes == {"email_1_sent_at_-1": {"key": [("email", 1), ("sent_at", -1)]}}
+    assert asyncio.run(registry.missing()) == ["users(email:1)"]
+
+
+def test_missing_tolerates_text_and_geo_indexes(db):
+    # A text index reports its keys as ("_fts", "text"), ("_ftsx", 1)
+    db.users.indexes["search"] = {"key": [("_fts", "text"), ("_ftsx", 1)]}
+    db.users.indexes["home"] = {"key": [("location", "2dsphere")]}
+    db.users.indexes["email_1"] = {"key": [("email", 1.0)]}
+    specs = SPECS + [IndexSpec("users", [("location", "2dsphere")], "nearby users")]
+
+    missing = asyncio.run(IndexRegistry(db, specs).missing())
+
+    assert missing == ["message_history(email:1, sent_at:-1)"]
+
+
+def test_retention_index_is_created_changed_and_dropped(db):
+    async def apply(days):
+        await IndexRegistry(db, [], retention_days={"system_events": days}).ensure()
+        return (await db.system_events.index_information()).get(RETENTION_INDEX_NAME)
+
+    assert asyncio.run(apply(0)) is None
+    assert asyncio.run(apply(7)) == {"key": [("timestamp", 1)], "expireAfterSeconds": 7 * 86400}
+
+    db.system_events.indexes[RETENTION_INDEX_NAME]["expireAfterSeconds"] = 0
+    asyncio.run(apply(30))
+    assert db.commands[-1] == (
+        ("collMod", "system_events"),
+        {"index": {"name": RETENTION_INDEX_NAME, "expireAfterSeconds": 30 * 86400}},
+    )
+
+    assert asyncio.run(apply(0)) is None
+    assert retention_from_env({"SYSTEM_EVENTS_RETENTION_DAYS": "14"})["system_events"] == 14
+    assert retention_from_env({})["api_analytics"] == 0
+
+
+def test_plan_stages_finds_collection_scans_in_both_plan_layouts():
+    classic = {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}
+    sbe = {"queryPlan": {"stage": "FETCH", "inputStages": [{"stage": "IXSCAN"}, {"stage": "OR"}]}}
+
+    assert _plan_stages(classic) == ["SORT", "COLLSCAN"]
+    assert _plan_stages(sbe) == ["FETCH", "IXSCAN", "OR"]
+
+
+def test_report_lists_missing_indexes_and_query_plans(db):
+    registry = IndexRegistry(db, SPECS)
+    asyncio.run(registry.ensure())
+
+    report = asyncio.run(registry.report())
+
+    assert report["declared"] == 2
+    assert report["missing"] == []
+    assert report["collection_scans"] == []
+    assert [p["name"] for p in report["query_plans"]] == [q["name"] for q in critical_queries()]
+    assert report["query_plans"][0]["stages"] == ["FETCH", "IXSCAN"]
@@ -0,0 +1,125 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from job_runner import LeasedJobRunner
+
+
+class FakeLeases:
+    def __init__(self, renewals=None):
+        # None renews forever; otherwise the number of successful acquires before losing the lease
+        self.renewals = renewals
+        self.released = []
+
+    async def acquire(self, name, ttl_seconds):
+        if self.renewals is None:
+            return True
+        self.renewals -= 1
+        return self.renewals >= 0
+
+    async def release(self, name):
+        self.released.append(name)
+
+
+class CountingRunner(LeasedJobRunner):
+    jobs_collection = "test_jobs"
+    lease_prefix = "test"
+    job_label = "Test job"
+
+    def __init__(self, db, page_delay=0.0, **kwargs):
+        super().__init__(db, batch_size=2, **kwargs)
+        self.page_delay = page_delay
+        self.pages = []
+
+    async def process_page(self, job, users):
+        await asyncio.sleep(self.page_delay)
+        self.pages.append([u["email"] for u in users])
+        return {"touched": len(users)}
+
+
+def add_users(db, count):
+    db["users"].docs.extend({"email": f"user{i}@example.com", "active": True} for i in range(count))
+    db["users"].docs.append({"email": "inactive@example.com", "active": False})
+
+
+async def wait_for_jobs(runner):
+    while runner._tasks:
+        await asyncio.sleep(0.01)
+
+
+def test_job_pages_through_active_users_and_completes(db):
+    add_users(db, 5)
+
+    async def run():
+        runner = CountingRunner(db, leases=FakeLeases())
+        job = await runner._create_job({"touched": 0}, "admin")
+        await wait_for_jobs(runner)
+        return runner, await runner.get_status(job["id"])
+
+    runner, status = asyncio.run(run())
+    assert runner.pages == [
+        ["user0@example.com", "user1@example.com"],
+        ["user2@example.com", "user3@example.com"],
+        ["user4@example.com"],
+    ]
+    assert status["status"] == "completed"
+    assert status["processed"] == status["touched"] == status["total_estimated"] == 5
+    assert status["progress_percent"] == 100.0
+    assert runner.leases.released == [f"test:{status['id']}"]
+
+
+def test_interrupted_job_resumes_after_its_checkpoint(db):
+    add_users(db, 5)
+    db["test_jobs"].docs.append({
+        "id": "job-1", "status": "running", "last_email": "user1@example.com",
+        "processed": 2, "touched": 2, "total_estimated": 5, "started_at": None,
+    })
+
+    async def run():
+        runner = CountingRunner(db)
+        resumed = await runner.resume_incomplete_jobs()
+        await wait_for_jobs(runner)
+        return runner, resumed
+
+    runner, resumed = asyncio.run(run())
+    assert resumed == 1
+    assert runner.pages[0][0] == "user2@example.com"
+    assert db["test_jobs"].docs[0]["processed"] == 5
+    assert db["test_jobs"].docs[0]["status"] == "completed"
+
+
+def test_cancelled_job_stops_before_the_next_page(db):
+    add_users(db, 6)
+
+    async def run():
+        runner = CountingRunner(db, page_delay=0.05)
+        job = await runner._create_job({"touched": 0}, "admin")
+        while not runner.pages:
+            await asyncio.sleep(0.01)
+        assert await runner.cancel(job["id"])
+        await wait_for_jobs(runner)
+        return runner, await runner.get_status(job["id"])
+
+    runner, status = asyncio.run(run())
+    assert status["status"] == "cancelled"
+    assert len(runner.pages) < 3
+
+
+def test_heartbeat_stops_a_slow_page_when_the_lease_is_lost(db):
+    add_users(db, 2)
+
+    async def run():
+        # The run and its first page check hold the lease; the first heartbeat renewal fails
+        runner = CountingRunner(db, page_delay=5, leases=FakeLeases(renewals=2), lease_ttl_seconds=3)
+        job = await runner._create_job({"touched": 0}, "admin")
+        await asyncio.wait_for(wait_for_jobs(runner), timeout=3)
+        return runner, await runner.get_status(job["id"])
+
+    runner, status = asyncio.run(run())
+    assert runner.pages == []
+    # Left running so whichever worker holds the lease now resumes it
+    assert status["status"] == "running"
+    assert status["processed"] == 0
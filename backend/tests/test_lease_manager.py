@@ -0,0 +1,86 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lease_manager import LeaseManager
+
+
+def test_free_lease_is_acquired_and_blocks_other_workers(db):
+    a, b = LeaseManager(db, owner_id="a"), LeaseManager(db, owner_id="b")
+
+    async def run():
+        return await a.acquire("leader", 60), await b.acquire("leader", 60)
+
+    assert asyncio.run(run()) == (True, False)
+    lease = db.leases.by_id("leader")
+    assert lease["owner"] == "a"
+    assert lease["acquired_at"] == lease["renewed_at"]
+
+
+def test_holder_renews_without_losing_the_lease(db):
+    a = LeaseManager(db, owner_id="a")
+
+    async def run():
+        await a.acquire("leader", 60)
+        first = db.leases.by_id("leader")["expires_at"]
+        await asyncio.sleep(0.01)
+        renewed = await a.acquire("leader", 60)
+        return first, renewed
+
+    first, renewed = asyncio.run(run())
+    lease = db.leases.by_id("leader")
+    assert renewed
+    assert lease["expires_at"] > first
+    assert lease["acquired_at"] < lease["renewed_at"]
+
+
+def test_expired_lease_is_taken_over(db):
+    a, b = LeaseManager(db, owner_id="a"), LeaseManager(db, owner_id="b")
+    asyncio.run(a.acquire("broadcast:job-1", 60))
+    db.leases.by_id("broadcast:job-1")["expires_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    assert asyncio.run(b.acquire("broadcast:job-1", 60))
+    assert db.leases.by_id("broadcast:job-1")["owner"] == "b"
+    # The previous holder's next renewal fails, so its heartbeat stops the local work
+    assert not asyncio.run(a.acquire("broadcast:job-1", 60))
+
+
+def test_release_only_removes_our_own_lease(db):
+    a, b = LeaseManager(db, owner_id="a"), LeaseManager(db, owner_id="b")
+
+    async def run():
+        await a.acquire("leader", 60)
+        await b.release("leader")
+        held = await a.holder("leader")
+        await a.release("leader")
+        return held, await b.acquire("leader", 60)
+
+    held, taken = asyncio.run(run())
+    assert held["owner"] == "a"
+    assert taken
+
+
+def test_singleton_job_runs_only_on_the_lease_holder(db):
+    runs = []
+    a, b = LeaseManager(db, owner_id="a"), LeaseManager(db, owner_id="b")
+
+    async def tick(worker):
+        runs.append(worker)
+        return worker
+
+    async def run():
+        return (
+            await a.singleton("scheduler_leader")(tick)("a"),
+            await b.singleton("scheduler_leader")(tick)("b"),
+        )
+
+    assert asyncio.run(run()) == ("a", None)
+    assert runs == ["a"]
+    leases = asyncio.run(b.list_leases())
+    assert [(lease["name"], lease["held_by_me"], lease["expired"]) for lease in leases] == [
+        ("scheduler_leader", False, False),
+    ]
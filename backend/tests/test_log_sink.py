@@ -0,0 +1,69 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from log_sink import BufferedLogSink
+
+
+def test_writes_go_straight_to_mongo_when_the_flusher_is_not_running(db):
+    sink = BufferedLogSink(db)
+
+    asyncio.run(sink.write("api_analytics", {"n": 1}))
+    assert db["api_analytics"].docs == [{"n": 1}]
+
+
+def test_buffered_writes_flush_in_batches_and_notify_listeners(db):
+    seen = []
+
+    async def run():
+        sink = BufferedLogSink(db, batch_size=4, flush_interval=60)
+
+        async def listener(docs):
+            seen.extend(docs)
+
+        sink.add_listener("email_logs", listener)
+        sink.start()
+        for n in range(10):
+            await sink.write("email_logs", {"n": n})
+        await sink.drain()
+
+    asyncio.run(run())
+    assert [d["n"] for d in db["email_logs"].docs] == list(range(10))
+    assert max(db["email_logs"].batches) <= 4
+    assert [d["n"] for d in seen] == list(range(10))
+
+
+def test_failed_batch_is_requeued_and_retried_in_order(db):
+    db["system_events"].fail_next["insert_many"] = 1
+
+    async def run():
+        sink = BufferedLogSink(db, batch_size=100, flush_interval=60)
+        sink.start()
+        for n in range(3):
+            await sink.write("system_events", {"n": n})
+        assert await sink.flush() == 0
+        assert await sink.flush() == 3
+        await sink.drain()
+        return sink.get_stats()
+
+    stats = asyncio.run(run())
+    assert [d["n"] for d in db["system_events"].docs] == [0, 1, 2]
+    assert stats["flush_errors"] == 1
+
+
+def test_full_buffer_drops_oldest_by_default(db):
+
+    async def run():
+        sink = BufferedLogSink(db, batch_size=100, flush_interval=60, max_buffer=3)
+        sink.start()
+        for n in range(5):
+            await sink.write("page_views", {"n": n})
+        await sink.drain()
+        return sink.get_stats()
+
+    stats = asyncio.run(run())
+    assert [d["n"] for d in db["page_views"].docs] == [2, 3, 4]
+    assert stats["dropped"] == 2
@@ -0,0 +1,79 @@
+import sys
+import os
+import asyncio
+import base64
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from bson import ObjectId
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from log_timeline import LogTimeline, InvalidCursor, encode_cursor, decode_cursor
+
+
+def make_logs(count, start, step_seconds):
+    # step_seconds=0 puts every document on the same timestamp
+    return [
+        {"_id": ObjectId(), "timestamp": start - timedelta(seconds=i * step_seconds), "n": i}
+        for i in range(count)
+    ]
+
+
+def read_all(timeline, queries, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = asyncio.run(timeline.page(queries, limit, cursor))
+        seen.extend(page["logs"])
+        pages += 1
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            return seen, pages
+        cursor = page["next_cursor"]
+
+
+def test_cursor_round_trip():
+    positions = {
+        "system": (datetime(2026, 1, 31, 9, 15, 30, 123000, tzinfo=timezone.utc), ObjectId()),
+        "email": (datetime(2026, 1, 30, tzinfo=timezone.utc), ObjectId()),
+    }
+    token = encode_cursor(positions)
+    assert decode_cursor(token) == positions
+    assert "/" not in token and "+" not in token
+
+
+def test_garbage_cursor_is_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(InvalidCursor):
+        decode_cursor(base64.urlsafe_b64encode(b'{"system": ["yesterday", "abc"]}').decode())
+
+
+def test_pages_resume_across_timestamp_ties(db):
+    now = datetime(2026, 1, 31, 12, tzinfo=timezone.utc)
+    db["system_events"].docs.extend(make_logs(7, now, 0))
+    db["email_logs_view"].docs.extend(make_logs(5, now, 0) + make_logs(4, now - timedelta(minutes=1), 1))
+    timeline = LogTimeline(db, {"system": "system_events", "email": "email_logs_view"})
+
+    seen, pages = read_all(timeline, {"system": {}, "email": {}}, limit=3)
+
+    ids = [log["_id"] for log in seen]
+    assert len(ids) == len(set(ids)) == 16
+    assert pages == 6
+    order = [(log["timestamp"], log["_id"]) for log in seen]
+    assert order == sorted(order, reverse=True)
+
+
+def test_source_filters_apply_on_every_page(db):
+    now = datetime(2026, 1, 31, 12, tzinfo=timezone.utc)
+    logs = make_logs(10, now, 30)
+    for log in logs:
+        log["status"] = "failure" if log["n"] % 2 else "success"
+    db["system_events"].docs.extend(logs)
+    timeline = LogTimeline(db, {"system": "system_events"})
+
+    seen, _ = read_all(timeline, {"system": {"status": "failure"}, "unknown": {}}, limit=2)
+
+    assert [log["n"] for log in seen] == [1, 3, 5, 7, 9]
+    assert {log["log_type"] for log in seen} == {"system"}
@@ -0,0 +1,89 @@
+import sys
+import os
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone, timedelta
+
+from bson import ObjectId
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import message_export
+from history_store import MessageHistoryStore
+from message_export import stream_messages
+
+NOW = datetime.now(timezone.utc)
+EMAIL = "a@example.com"
+
+
+def make_store(db, days_ago):
+    """A store holding one message per entry in `days_ago` (newest first), older ones archived"""
+    for i, days in enumerate(days_ago):
+        db.message_history.docs.append({
+            "_id": ObjectId(),
+            "id": f"m{i}",
+            "email": EMAIL,
+            "message": f"message {i}\nsecond line",
+            "sent_at": NOW - timedelta(days=days, minutes=i),
+            "personality": {"type": "famous", "value": "Oprah"},
+            "minhash": [1, 2, 3],
+            "lsh_buckets": ["0:ab"],
+        })
+    store = MessageHistoryStore(db, hot_days=90)
+    asyncio.run(store.archive_user(EMAIL))
+    return store
+
+
+def export(store, fmt, **kwargs):
+    async def run():
+        return [chunk async for chunk in stream_messages(store, EMAIL, fmt, **kwargs)]
+    return asyncio.run(run())
+
+
+def test_ndjson_export_streams_both_tiers_newest_first(db):
+    store = make_store(db, [1, 30, 100, 200])
+    assert len(db.message_history.docs) == 2
+
+    rows = [json.loads(line) for line in b"".join(export(store, "ndjson")).decode().splitlines()]
+
+    assert [row["id"] for row in rows] == ["m0", "m1", "m2", "m3"]
+    assert all("minhash" not in row and "lsh_buckets" not in row and "_id" not in row for row in rows)
+    assert rows[0]["sent_at"] == (NOW - timedelta(days=1)).isoformat()
+
+
+def test_csv_and_json_exports(db):
+    store = make_store(db, [1, 100])
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(export(store, "csv")).decode())))
+    assert [row["id"] for row in rows] == ["m0", "m1"]
+    assert rows[0]["message"] == "message 0 second line"
+    assert rows[1]["personality"] == "Oprah"
+
+    body = json.loads(b"".join(export(store, "json")))
+    assert body["count"] == 2
+    assert [msg["id"] for msg in body["messages"]] == ["m0", "m1"]
+
+
+def test_export_is_chunked_and_gzip_decodes_to_the_same_body(db, monkeypatch):
+    monkeypatch.setattr(message_export, "CHUNK_BYTES", 100)
+    store = make_store(db, [1, 2, 3, 100, 120, 140])
+
+    plain = export(store, "ndjson", batch_size=2)
+    compressed = export(store, "ndjson", compress=True, batch_size=2)
+
+    assert len(plain) > 1
+    assert gzip.decompress(b"".join(compressed)) == b"".join(plain)
+
+
+def test_export_date_range_and_empty_history(db):
+    store = make_store(db, [1, 30, 100, 200])
+
+    rows = b"".join(export(store, "ndjson", start=NOW - timedelta(days=150), end=NOW - timedelta(days=10)))
+    assert [json.loads(line)["id"] for line in rows.decode().splitlines()] == ["m1", "m2"]
+
+    assert export(store, "ndjson", start=NOW + timedelta(days=1)) == []
+    assert json.loads(b"".join(export(store, "json", start=NOW + timedelta(days=1)))) == {"messages": [], "count": 0}
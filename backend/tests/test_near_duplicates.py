@@ -0,0 +1,71 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from near_duplicates import (
+    NearDuplicateIndex, signature, lsh_buckets, estimate_similarity, signature_fields,
+    NUM_BANDS, NUM_PERM,
+)
+
+MESSAGE = (
+    "Every small step you take today builds the habit that carries you tomorrow. "
+    "Show up for ten focused minutes and let momentum do the rest."
+)
+REWORDED = (
+    "Every small step you take today builds the habit that carries you tomorrow. "
+    "Show up for twenty focused minutes and let momentum handle the rest."
+)
+UNRELATED = "Your marathon plan starts with a slow three mile run and plenty of water afterwards."
+
+
+def history_doc(message_id, text, email="a@example.com"):
+    return {"id": message_id, "email": email, **signature_fields(text)}
+
+
+def test_signature_is_stable_and_case_insensitive():
+    sig = signature(MESSAGE)
+    assert len(sig) == NUM_PERM
+    assert signature(MESSAGE) == sig
+    assert signature(MESSAGE.upper().replace(".", " !")) == sig
+    assert signature("") is None and signature("... !!!") is None
+    assert signature_fields("") == {}
+
+
+def test_signature_matches_pinned_value():
+    # Signatures are persisted and compared across processes - a change here means
+    # stored history needs a backfill
+    sig = signature("keep going")
+    assert sig[:2] == [1252039112870712921, 47925801495601114]
+    assert lsh_buckets(sig)[:2] == ["0:ba231202d71d", "1:01c56478e32c"]
+    assert len(lsh_buckets(signature(MESSAGE))) == NUM_BANDS
+
+
+def test_similar_texts_share_buckets_and_unrelated_do_not():
+    sig, reworded, unrelated = signature(MESSAGE), signature(REWORDED), signature(UNRELATED)
+    assert estimate_similarity(sig, sig) == 1.0
+    assert estimate_similarity(sig, reworded) > estimate_similarity(sig, unrelated)
+    assert set(lsh_buckets(sig)) & set(lsh_buckets(reworded))
+    assert not set(lsh_buckets(sig)) & set(lsh_buckets(unrelated))
+    assert estimate_similarity(sig, sig[:-1]) == 0.0
+
+
+def test_most_novel_picks_the_draft_furthest_from_history(db):
+    db.message_history.docs.extend([history_doc("m1", MESSAGE), history_doc("m2", UNRELATED, email="b@example.com")])
+    index = NearDuplicateIndex(db)
+
+    async def run():
+        return (
+            await index.most_novel("a@example.com", [MESSAGE, UNRELATED, REWORDED]),
+            await index.max_similarity("a@example.com", REWORDED),
+            await index.rank("a@example.com", ["", UNRELATED]),
+        )
+
+    (novel_index, novel_similarity), (closest, closest_id), ranked = asyncio.run(run())
+    assert novel_index == 1
+    assert novel_similarity == 0.0
+    assert closest_id == "m1" and closest > 0
+    # Another user's identical message doesn't count
+    assert ranked == [(0.0, None), (0.0, None)]
@@ -0,0 +1,126 @@
+import sys
+import os
+import asyncio
+import time
+from datetime import datetime, timezone, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from research_cache import ResearchCache, normalize_persona_key
+
+
+def test_persona_keys_ignore_case_and_whitespace():
+    assert normalize_persona_key("  Elon \t MUSK ") == "elon musk"
+    assert normalize_persona_key(None) == ""
+
+
+def test_concurrent_misses_share_one_fetch(db):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"style": "direct"}
+
+    async def run():
+        cache = ResearchCache(db)
+        results = await asyncio.gather(*(cache.get_or_fetch("voice", "Elon Musk", fetch) for _ in range(5)))
+        again = await cache.get_or_fetch("voice", "elon  musk", fetch)
+        return cache, results, again
+
+    cache, results, again = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [{"style": "direct"}] * 5
+    assert again == {"style": "direct"}
+    assert cache.get_stats()["coalesced"] == 4
+    assert db["research_cache"].by_id("voice:elon musk")["value"] == {"style": "direct"}
+
+
+def test_cancelled_fetch_releases_coalesced_waiters(db):
+
+    async def run():
+        cache = ResearchCache(db)
+        in_fetch = asyncio.Event()
+
+        async def fetch():
+            in_fetch.set()
+            await asyncio.sleep(60)
+
+        leader = asyncio.create_task(cache.get_or_fetch("voice", "Oprah", fetch))
+        await in_fetch.wait()
+        waiter = asyncio.create_task(cache.get_or_fetch("voice", "Oprah", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await asyncio.wait_for(waiter, timeout=1)
+        return cache, leader, result
+
+    cache, leader, result = asyncio.run(run())
+    assert leader.cancelled()
+    assert result is None
+    assert cache.get_stats()["inflight"] == 0
+
+
+def test_failed_fetch_is_only_remembered_locally(db):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        raise RuntimeError("tavily down")
+
+    async def run():
+        cache = ResearchCache(db)
+        first = await cache.get_or_fetch("voice", "Oprah", fetch)
+        second = await cache.get_or_fetch("voice", "Oprah", fetch)
+        return cache, first, second
+
+    cache, first, second = asyncio.run(run())
+    assert first is None and second is None
+    assert len(calls) == 1
+    assert cache.get_stats()["fetch_errors"] == 1
+    assert db["research_cache"].docs == []
+
+
+def test_stale_store_entry_is_served_while_refreshing(db):
+    fetched_at = datetime.now(timezone.utc) - timedelta(days=8)
+    db["research_cache"].docs.append({"_id": "voice:oprah", "value": {"v": "old"}, "fetched_at": fetched_at})
+
+    async def fetch():
+        return {"v": "new"}
+
+    async def run():
+        cache = ResearchCache(db)
+        served = await cache.get_or_fetch("voice", "Oprah", fetch)
+        await asyncio.sleep(0.01)
+        return cache, served
+
+    cache, served = asyncio.run(run())
+    assert served == {"v": "old"}
+    assert cache.get_stats()["stale_served"] == 1
+    assert db["research_cache"].by_id("voice:oprah")["value"] == {"v": "new"}
+    assert db["research_cache"].by_id("voice:oprah")["fetched_at"].timestamp() > time.time() - 60
+
+
+def test_failed_refresh_keeps_serving_the_stale_value(db):
+    fetched_at = datetime.now(timezone.utc) - timedelta(days=8)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        raise RuntimeError("tavily down")
+
+    async def run():
+        cache = ResearchCache(db)
+        first = await cache.get_or_fetch("voice", "Oprah", fetch)
+        await asyncio.sleep(0.01)
+        second = await cache.get_or_fetch("voice", "Oprah", fetch)
+        await asyncio.sleep(0.01)
+        return cache, first, second
+
+    db["research_cache"].docs.append({"_id": "voice:oprah", "value": {"v": "old"}, "fetched_at": fetched_at})
+    cache, first, second = asyncio.run(run())
+    assert first == second == {"v": "old"}
+    # The retry waits out negative_ttl_seconds instead of firing on every call
+    assert len(calls) == 1
+    assert cache.get_stats()["fetch_errors"] == 1
+    assert db["research_cache"].by_id("voice:oprah")["value"] == {"v": "old"}
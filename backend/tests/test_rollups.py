@@ -0,0 +1,201 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rollups import RollupEngine, _Delta, classify_system_event, HOUR_BUCKET_RETENTION
+
+
+def test_classify_llm_and_tavily_calls():
+    assert classify_system_event({"event_category": "llm", "status": "success"}) == {"llm_calls": 1}
+    assert classify_system_event({"event_category": "openai"}) == {"llm_calls": 1}
+    assert classify_system_event({"event_category": "tavily", "status": "success"}) == {"tavily_calls": 1}
+
+
+def test_classify_api_failures_only_for_provider_categories():
+    assert classify_system_event({"event_category": "tavily", "status": "failure"}) == {
+        "tavily_calls": 1,
+        "api_failures": 1,
+    }
+    assert classify_system_event({"event_category": "email", "status": "failure"}) == {}
+
+
+def test_classify_rate_limit_events_by_event_type():
+    assert classify_system_event({"event_category": "api", "event_type": "RATE_LIMIT_HIT"}) == {"rate_limit_events": 1}
+    assert classify_system_event({"event_category": "llm", "event_type": "rate_limit_exceeded", "status": "failure"}) == {
+        "llm_calls": 1,
+        "api_failures": 1,
+        "rate_limit_events": 1,
+    }
+    assert classify_system_event({}) == {}
+
+
+def test_delta_groups_increments_into_day_and_hour_buckets():
+    delta = _Delta()
+    at = datetime(2026, 1, 31, 9, 15, tzinfo=timezone.utc)
+    delta.add(at, {"emails_total": 1, "emails_success": 1}, {"personalities": "Elon Musk"})
+    delta.add(at + timedelta(minutes=30), {"emails_total": 1}, {"personalities": "elon.musk"})
+    delta.add(at + timedelta(hours=1), {"emails_total": 1})
+
+    now = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    ops = {op._filter["_id"]: op._doc for op in delta.operations(now)}
+
+    assert set(ops) == {"day:2026-01-31", "hour:2026-01-31T09", "hour:2026-01-31T10"}
+    assert ops["day:2026-01-31"]["$inc"] == {
+        "counts.emails_total": 3,
+        "counts.emails_success": 1,
+        "personalities.Elon Musk": 1,
+        "personalities.elon_musk": 1,
+    }
+    assert ops["hour:2026-01-31T09"]["$inc"]["counts.emails_total"] == 2
+    assert ops["hour:2026-01-31T10"]["$inc"] == {"counts.emails_total": 1}
+    assert all(doc["$set"] == {"updated_at": now} for doc in ops.values())
+
+
+def test_delta_bucket_fields_and_hour_expiry():
+    delta = _Delta()
+    delta.add(datetime(2026, 1, 31, 23, 59, tzinfo=timezone(timedelta(hours=-5))), {"signups": 1})
+    ops = {op._filter["_id"]: op._doc for op in delta.operations(datetime.now(timezone.utc))}
+
+    # 23:59 at UTC-5 is 04:59 UTC on the next day
+    day = ops["day:2026-02-01"]["$setOnInsert"]
+    hour = ops["hour:2026-02-01T04"]["$setOnInsert"]
+    assert day == {
+        "granularity": "day",
+        "bucket": "2026-02-01",
+        "bucket_start": datetime(2026, 2, 1, tzinfo=timezone.utc),
+    }
+    assert hour["bucket_start"] == datetime(2026, 2, 1, 4, tzinfo=timezone.utc)
+    assert hour["expires_at"] == hour["bucket_start"] + HOUR_BUCKET_RETENTION
+
+
+def test_delta_skips_events_without_timestamp_or_counters():
+    delta = _Delta()
+    delta.add(None, {"emails_total": 1})
+    delta.add(datetime.now(timezone.utc), {})
+    assert delta.operations(datetime.now(timezone.utc)) == []
+
+
+def raw_rows(rows):
+    """aggregate() rows for a raw collection: (datetime, row) pairs filtered by the pipeline's time match"""
+    def aggregate(pipeline):
+        window = pipeline[2]["$match"]["_at"]
+        return [
+            row for at, row in rows
+            if ("$gte" not in window or at >= window["$gte"]) and at < window["$lt"]
+        ]
+    return aggregate
+
+
+def hour(at):
+    return at.strftime("%Y-%m-%dT%H")
+
+
+def rebuilt(db):
+    return {op._filter["_id"]: op._doc["$set"] for op in db["analytics_rollups"].bulk_ops}
+
+
+def test_backfill_keeps_expired_system_event_counters(db):
+    now = datetime.now(timezone.utc)
+    old, recent = now - timedelta(days=60), now - timedelta(days=2)
+
+    db["email_logs"].aggregate_rows = raw_rows([
+        (at, {"_id": {"hour": hour(at)}, "emails_total": 2, "emails_success": 2, "emails_failed": 0})
+        for at in (old, recent)
+    ])
+    db["system_events"].aggregate_rows = raw_rows([
+        (at, {"_id": {"hour": hour(at)}, "llm_calls": 5, "tavily_calls": 1, "api_failures": 0, "rate_limit_events": 0})
+        for at in (old, recent)
+    ])
+    engine = RollupEngine(db, source_windows={"system_events": timedelta(days=30)})
+
+    asyncio.run(engine.backfill())
+
+    updates = rebuilt(db)
+    old_day, recent_day = updates[f"day:{old:%Y-%m-%d}"], updates[f"day:{recent:%Y-%m-%d}"]
+    assert old_day["counts.emails_total"] == 2
+    assert "counts.llm_calls" not in old_day
+    assert recent_day["counts.llm_calls"] == 5
+    assert recent_day["counts.messages"] == 0
+    # Expired events aren't aggregated at all
+    assert db["system_events"].pipelines[0][2]["$match"]["_at"]["$gte"] > old
+    assert "$gte" not in db["email_logs"].pipelines[0][2]["$match"]["_at"]
+
+
+def test_backfill_leaves_today_to_live_writers(db):
+    now = datetime.now(timezone.utc)
+    today = f"day:{now:%Y-%m-%d}"
+    db["analytics_rollups"].docs.append({
+        "_id": today, "granularity": "day", "bucket": today[4:],
+        "bucket_start": datetime(now.year, now.month, now.day, tzinfo=timezone.utc),
+        "counts": {"emails_total": 7},
+    })
+    db["email_logs"].aggregate_rows = raw_rows([
+        (now, {"_id": {"hour": hour(now)}, "emails_total": 3, "emails_success": 3, "emails_failed": 0}),
+    ])
+    engine = RollupEngine(db)
+
+    asyncio.run(engine.backfill())
+
+    assert today not in rebuilt(db)
+    assert db["analytics_rollups"].by_id(today)["counts"] == {"emails_total": 7}
+
+    asyncio.run(engine.backfill(include_today=True))
+
+    assert db["analytics_rollups"].by_id(today)["counts"]["emails_total"] == 3
+
+
+def test_backfill_resets_buckets_with_no_raw_rows(db):
+    now = datetime.now(timezone.utc)
+    stale_day = (now - timedelta(days=5)).replace(hour=0, minute=0, second=0, microsecond=0)
+    outside = stale_day - timedelta(days=10)
+    for start in (stale_day, outside):
+        db["analytics_rollups"].docs.append({
+            "_id": f"day:{start:%Y-%m-%d}", "granularity": "day", "bucket": f"{start:%Y-%m-%d}",
+            "bucket_start": start, "counts": {"emails_total": 4, "messages": 2},
+            "message_personalities": {"Oprah": 2},
+        })
+    engine = RollupEngine(db)
+
+    assert asyncio.run(engine.backfill(since=stale_day)) == 1
+
+    reset = db["analytics_rollups"].by_id(f"day:{stale_day:%Y-%m-%d}")
+    assert reset["counts"]["emails_total"] == 0
+    assert reset["counts"]["messages"] == 0
+    assert reset["message_personalities"] == {}
+    # Buckets before `since` aren't touched
+    assert db["analytics_rollups"].by_id(f"day:{outside:%Y-%m-%d}")["counts"]["emails_total"] == 4
+
+
+class FakeArchive:
+    def __init__(self, messages):
+        self.messages = messages
+        self.starts = []
+
+    async def archived_messages(self, start=None):
+        self.starts.append(start)
+        for msg in self.messages:
+            yield msg
+
+
+def test_backfill_counts_archived_messages(db):
+    old = datetime.now(timezone.utc) - timedelta(days=200)
+    db["message_history"].aggregate_rows = raw_rows([
+        (old, {"_id": {"hour": hour(old), "message_personalities": "Oprah"}, "messages": 1}),
+    ])
+    archive = FakeArchive([
+        {"sent_at": old, "personality": {"value": "Oprah"}},
+        {"sent_at": old.isoformat(), "personality": {"value": "Elon Musk"}},
+        {"sent_at": None},
+    ])
+    engine = RollupEngine(db, history=archive)
+
+    asyncio.run(engine.backfill())
+
+    day = rebuilt(db)[f"day:{old:%Y-%m-%d}"]
+    assert day["counts.messages"] == 3
+    assert day["message_personalities"] == {"Oprah": 2, "Elon Musk": 1}
+    assert archive.starts == [None]
@@ -0,0 +1,64 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timezone
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from send_limits import DailySendCounters, user_local_day
+
+
+def test_reservations_stop_at_the_limit(db):
+    counters = DailySendCounters(db)
+
+    async def run():
+        return [await counters.reserve("user:a@example.com:2026-03-01", 3) for _ in range(5)]
+
+    assert asyncio.run(run()) == [True, True, True, False, False]
+    counter = db.send_counters.by_id("user:a@example.com:2026-03-01")
+    assert counter["count"] == 3
+    assert counter["expires_at"] > counter["updated_at"]
+
+
+def test_concurrent_reservations_never_exceed_the_limit(db):
+    counters = DailySendCounters(db)
+
+    async def run():
+        return await asyncio.gather(*(counters.reserve("goal:g1:2026-03-01", 2) for _ in range(6)))
+
+    assert sum(asyncio.run(run())) == 2
+    assert db.send_counters.by_id("goal:g1:2026-03-01")["count"] == 2
+
+
+def test_released_slot_can_be_reserved_again(db):
+    counters = DailySendCounters(db)
+
+    async def run():
+        await counters.reserve("goal:g1:2026-03-01", 1)
+        refused = await counters.reserve("goal:g1:2026-03-01", 1)
+        await counters.release("goal:g1:2026-03-01")
+        return refused, await counters.reserve("goal:g1:2026-03-01", 1)
+
+    assert asyncio.run(run()) == (False, True)
+
+
+def test_release_never_goes_below_zero_or_creates_counters(db):
+    counters = DailySendCounters(db)
+
+    async def run():
+        await counters.reserve("user:a@example.com:2026-03-01", 5)
+        for _ in range(3):
+            await counters.release("user:a@example.com:2026-03-01")
+        await counters.release("user:b@example.com:2026-03-01")
+
+    asyncio.run(run())
+    assert db.send_counters.by_id("user:a@example.com:2026-03-01")["count"] == 0
+    assert db.send_counters.by_id("user:b@example.com:2026-03-01") is None
+
+
+def test_counters_are_separate_per_local_day():
+    at = datetime(2026, 3, 1, 3, 30, tzinfo=timezone.utc)
+    assert user_local_day({"user_timezone": "America/New_York"}, at) == "2026-02-28"
+    assert user_local_day({"schedule": {"timezone": "Asia/Tokyo"}}, at) == "2026-03-01"
+    assert user_local_day({"user_timezone": "Not/AZone"}, at) == "2026-03-01"
@@ -0,0 +1,132 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lease_manager import LeaseManager
+from single_flight import SingleFlight
+
+
+def make_flight(db, owner, **kwargs):
+    return SingleFlight(LeaseManager(db, owner_id=owner), "persona_research", poll_seconds=0.01, **kwargs)
+
+
+async def nothing_stored():
+    return None
+
+
+def test_concurrent_callers_share_one_fetch_and_release_the_lease(db):
+    calls = []
+    flight = make_flight(db, "a")
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "research"
+
+    async def run():
+        return await asyncio.gather(*(flight.run("oprah", fetch, nothing_stored) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["research"] * 5
+    assert len(calls) == 1
+    assert db.leases.docs == []
+
+
+def test_other_worker_waits_for_the_lease_holders_result(db):
+    stored = {}
+    holder, waiter = make_flight(db, "a"), make_flight(db, "b")
+    calls = []
+
+    async def fetch(worker):
+        calls.append(worker)
+        await asyncio.sleep(0.05)
+        stored["oprah"] = f"research from {worker}"
+        return stored["oprah"]
+
+    async def load_fresh():
+        return stored.get("oprah")
+
+    async def run():
+        first = asyncio.create_task(holder.run("oprah", lambda: fetch("a"), load_fresh))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(first, waiter.run("oprah", lambda: fetch("b"), load_fresh))
+
+    assert asyncio.run(run()) == ["research from a", "research from a"]
+    assert calls == ["a"]
+
+
+def test_other_worker_serves_stale_instead_of_waiting(db):
+    holder, waiter = make_flight(db, "a"), make_flight(db, "b")
+
+    async def slow_fetch():
+        await asyncio.sleep(0.05)
+        return "new"
+
+    async def run():
+        first = asyncio.create_task(holder.run("oprah", slow_fetch, nothing_stored))
+        await asyncio.sleep(0.01)
+        second = await waiter.run("oprah", slow_fetch, nothing_stored, stale="old")
+        return await first, second
+
+    assert asyncio.run(run()) == ("new", "old")
+
+
+def test_waiter_fetches_itself_after_the_wait_times_out(db):
+    holder, waiter = make_flight(db, "a"), make_flight(db, "b", wait_seconds=0.03)
+
+    async def fetch(worker, delay):
+        await asyncio.sleep(delay)
+        return worker
+
+    async def run():
+        first = asyncio.create_task(holder.run("oprah", lambda: fetch("a", 0.2), nothing_stored))
+        await asyncio.sleep(0.01)
+        second = await waiter.run("oprah", lambda: fetch("b", 0), nothing_stored)
+        return await first, second
+
+    assert asyncio.run(run()) == ("a", "b")
+
+
+def test_cancelled_caller_hands_the_fetch_to_its_waiters(db):
+    flight = make_flight(db, "a")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+        return f"fetch {len(calls)}"
+
+    async def run():
+        leader = asyncio.create_task(flight.run("oprah", fetch, nothing_stored))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(flight.run("oprah", fetch, nothing_stored)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return leader, await asyncio.gather(*waiters)
+
+    leader, results = asyncio.run(run())
+    assert leader.cancelled()
+    # One waiter took over and the others joined it
+    assert results == ["fetch 2"] * 3
+    assert len(calls) == 2
+
+
+def test_fetch_errors_reach_every_waiter(db):
+    flight = make_flight(db, "a")
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("tavily down")
+
+    async def run():
+        return await asyncio.gather(*(flight.run("oprah", fetch, nothing_stored) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert db.leases.docs == []
+    with pytest.raises(RuntimeError):
+        asyncio.run(flight.run("oprah", fetch, nothing_stored))
@@ -0,0 +1,132 @@
+import sys
+import os
+import asyncio
+
+import aiosmtplib
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from smtp_pool import SMTPConnectionPool, PooledConnection
+
+
+class FakeSMTP:
+    def __init__(self, fail_with=None):
+        self.is_connected = True
+        self.sent = []
+        self.fail_with = fail_with
+        self.resets = 0
+        # Closed by the server while idle - the client only notices on the next command
+        self.dropped = False
+
+    async def send_message(self, message):
+        if self.fail_with:
+            error, self.fail_with = self.fail_with, None
+            self.is_connected = False
+            raise error
+        self.sent.append(message)
+
+    async def rset(self):
+        if self.dropped:
+            raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+        self.resets += 1
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+class FakePool(SMTPConnectionPool):
+    """Pool whose connections are in-memory fakes (queued failures apply to new sessions)"""
+
+    def __init__(self, failures=(), **kwargs):
+        super().__init__("smtp.test", 465, "user", "secret", **kwargs)
+        self.failures = list(failures)
+        self.opened = []
+
+    async def _open(self):
+        smtp = FakeSMTP(self.failures.pop(0) if self.failures else None)
+        self.opened.append(smtp)
+        self._stats["connections_opened"] += 1
+        return PooledConnection(smtp)
+
+
+def test_sessions_are_reused_across_sends():
+    pool = FakePool()
+
+    async def run():
+        for n in range(3):
+            await pool.send_message(f"message {n}")
+
+    asyncio.run(run())
+    assert len(pool.opened) == 1
+    assert pool.opened[0].sent == ["message 0", "message 1", "message 2"]
+    assert pool.get_stats()["connections_reused"] == 2
+
+
+def test_dead_reused_session_is_replaced_before_sending():
+    pool = FakePool()
+
+    async def run():
+        await pool.send_message("first")
+        # The server dropped the idle session; the RSET probe finds out before MAIL FROM
+        pool.opened[0].dropped = True
+        await pool.send_message("second")
+
+    asyncio.run(run())
+    assert len(pool.opened) == 2
+    assert pool.opened[1].sent == ["second"]
+    assert pool.get_stats()["reconnects"] == 1
+
+
+def test_disconnect_mid_send_is_not_retried():
+    # The server may already have queued the message, so a retry could deliver it twice
+    pool = FakePool(failures=[aiosmtplib.SMTPServerDisconnected("gone")])
+
+    try:
+        asyncio.run(pool.send_message("hello"))
+    except aiosmtplib.SMTPServerDisconnected:
+        pass
+    else:
+        raise AssertionError("expected the disconnect to propagate")
+    assert len(pool.opened) == 1
+    assert pool.get_stats()["send_failures"] == 1
+
+
+def test_sender_refused_with_421_is_retried_once_on_a_fresh_connection():
+    pool = FakePool(failures=[aiosmtplib.SMTPSenderRefused(421, "closing channel", "tend@example.com")])
+
+    asyncio.run(pool.send_message("hello"))
+    assert len(pool.opened) == 2
+    assert pool.opened[1].sent == ["hello"]
+    assert pool.get_stats()["reconnects"] == 1
+
+
+def test_non_reconnect_errors_propagate_without_retry():
+    for error in (
+        aiosmtplib.SMTPResponseException(550, "mailbox unavailable"),
+        aiosmtplib.SMTPSenderRefused(451, "try again later", "tend@example.com"),
+    ):
+        pool = FakePool(failures=[error])
+        try:
+            asyncio.run(pool.send_message("hello"))
+        except aiosmtplib.SMTPResponseException as e:
+            assert e.code == error.code
+        else:
+            raise AssertionError(f"expected the {error.code} to propagate")
+        assert len(pool.opened) == 1
+        assert pool.get_stats()["send_failures"] == 1
+
+
+def test_connection_is_recycled_at_the_message_cap():
+    pool = FakePool(max_messages_per_connection=2)
+
+    async def run():
+        for n in range(3):
+            await pool.send_message(n)
+
+    asyncio.run(run())
+    assert len(pool.opened) == 2
+    assert pool.get_stats()["cap_recycled"] == 1
@@ -0,0 +1,37 @@
+import sys
+import os
+from datetime import date
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from streak_engine import compute_streaks
+
+TODAY = date(2026, 3, 1)
+
+
+def test_streak_ending_today_counts_back_across_month_boundary():
+    streaks = compute_streaks(["2026-02-27", "2026-02-28", "2026-03-01"], TODAY)
+    assert streaks == {"current_streak": 3, "max_streak": 3, "total_email_days": 3}
+
+
+def test_streak_ending_yesterday_is_still_current():
+    streaks = compute_streaks(["2026-02-26", "2026-02-27", "2026-02-28"], TODAY)
+    assert streaks["current_streak"] == 3
+
+
+def test_streak_ending_two_days_ago_has_lapsed():
+    streaks = compute_streaks(["2026-02-25", "2026-02-26", "2026-02-27"], TODAY)
+    assert streaks == {"current_streak": 1, "max_streak": 3, "total_email_days": 3}
+
+
+def test_gap_before_today_restarts_the_current_streak():
+    streaks = compute_streaks(["2026-02-20", "2026-02-21", "2026-02-22", "2026-02-28", "2026-03-01"], TODAY)
+    assert streaks == {"current_streak": 2, "max_streak": 3, "total_email_days": 5}
+
+
+def test_duplicates_and_unparseable_days_are_ignored():
+    streaks = compute_streaks(["2026-03-01", "2026-03-01", "not-a-day", None, "2026-02-28"], TODAY)
+    assert streaks == {"current_streak": 2, "max_streak": 2, "total_email_days": 2}
+    assert compute_streaks(["garbage"], TODAY) is None
+    assert compute_streaks([], TODAY) is None
@@ -0,0 +1,91 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from version_tracker import VersionTracker, fingerprint
+
+EMAIL = "a@example.com"
+DAILY = {"frequency": "daily", "times": ["09:00"], "timezone": "UTC"}
+WEEKLY = {"frequency": "weekly", "times": ["09:00"], "timezone": "UTC"}
+
+
+def versions(db, collection="schedule_history"):
+    return sorted((d["version"], d["is_active"]) for d in db[collection].docs)
+
+
+def test_saving_the_active_content_again_is_a_no_op(db):
+    tracker = VersionTracker(db)
+
+    async def run():
+        first = await tracker.save_schedule_version(EMAIL, DAILY)
+        # Same content, different metadata and key order
+        again = await tracker.save_schedule_version(EMAIL, dict(reversed(list(DAILY.items()))), changed_by="admin")
+        changed = await tracker.save_schedule_version(EMAIL, WEEKLY)
+        return first, again, changed
+
+    first, again, changed = asyncio.run(run())
+    assert again == first
+    assert first[1] == 1 and changed[1] == 2
+    assert versions(db) == [(1, False), (2, True)]
+
+
+def test_version_numbers_continue_from_existing_history(db):
+    db.profile_history.docs.append({"id": "old", "user_email": EMAIL, "version": 4, "is_active": True, "name": "A", "goals": ""})
+    tracker = VersionTracker(db)
+
+    _, version = asyncio.run(tracker.save_profile_version(EMAIL, "B", ""))
+
+    assert version == 5
+    assert versions(db, "profile_history") == [(4, False), (5, True)]
+
+
+def test_a_slower_save_does_not_deactivate_a_newer_version(db):
+    tracker = VersionTracker(db)
+    # A concurrent save allocated version 2 and finished first
+    db.schedule_history.docs.append({
+        "id": "newer", "user_email": EMAIL, "version": 2, "is_active": True,
+        "fingerprint": fingerprint("schedule_history", WEEKLY), **WEEKLY,
+    })
+
+    async def allocate(collection, user_email):
+        return 1
+
+    tracker._next_version = allocate
+    asyncio.run(tracker.save_schedule_version(EMAIL, DAILY))
+
+    assert versions(db) == [(1, True), (2, True)]
+    # Reads take the highest active version
+    assert asyncio.run(tracker.get_schedule_history(EMAIL))[0]["id"] == "newer"
+
+
+def test_compact_history_collapses_repeated_runs(db):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    contents = [DAILY, DAILY, WEEKLY, WEEKLY, WEEKLY, DAILY]
+    for i, content in enumerate(contents):
+        doc = {
+            "_id": i + 1, "id": f"v{i + 1}", "user_email": EMAIL, "version": i + 1,
+            "changed_at": start + timedelta(days=i), "is_active": i == 4, **content,
+        }
+        if i % 2:
+            # Versions written before fingerprints were stored
+            doc["fingerprint"] = fingerprint("schedule_history", content)
+        db.schedule_history.docs.append(doc)
+    tracker = VersionTracker(db)
+
+    stats = asyncio.run(tracker.compact_history("schedule_history", batch_size=2))
+
+    assert stats == {"users": 1, "removed": 3}
+    kept = {d["version"]: d for d in db.schedule_history.docs}
+    assert sorted(kept) == [1, 3, 6]
+    assert kept[1]["duplicates_collapsed"] == 1 and kept[1]["last_seen_at"] == start + timedelta(days=1)
+    assert kept[3]["duplicates_collapsed"] == 2 and kept[3]["last_seen_at"] == start + timedelta(days=4)
+    assert [kept[v]["is_active"] for v in (1, 3, 6)] == [False, False, True]
+    assert all(d["fingerprint"] for d in kept.values())
+
+    # Nothing left to collapse
+    assert asyncio.run(tracker.compact_history("schedule_history")) == {"users": 0, "removed": 0}
+    assert kept[3]["duplicates_collapsed"] == 2
@@ -0,0 +1,142 @@
+"""
+User Stats
+Materialized per-user engagement stats (db.user_stats) kept up to date incrementally
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Engagement segments by engagement_rate (feedback given per message received, in percent)
+ENGAGEMENT_LEVELS = {
+    "high": {"$gte": 50},
+    "medium": {"$gte": 20, "$lt": 50},
+    "low": {"$lt": 20},
+}
+
+
+def _derived_fields() -> Dict[str, Any]:
+    """Pipeline stage recomputing avg_rating and engagement_rate from the counters"""
+    return {"$set": {
+        "avg_rating": {"$cond": [
+            {"$gt": ["$feedback_count", 0]},
+            {"$round": [{"$divide": ["$rating_sum", "$feedback_count"]}, 2]},
+            None,
+        ]},
+        "engagement_rate": {"$cond": [
+            {"$gt": ["$messages_received", 0]},
+            {"$round": [{"$multiply": [{"$divide": ["$feedback_count", "$messages_received"]}, 100]}, 2]},
+            0,
+        ]},
+    }}
+
+
+def _counter(field: str, delta: Any) -> Dict[str, Any]:
+    return {"$add": [{"$ifNull": [f"${field}", 0]}, delta]}
+
+
+class UserStatsStore:
+    """
+    One document per user in db.user_stats:
+    messages_received, feedback_count, rating_sum, avg_rating, engagement_rate, last_feedback_at.
+
+    The send path and submit_feedback update it with a single pipeline upsert each, so
+    the derived fields are recomputed atomically with the counters. `rebuild()` recomputes
+    everything from users + message_feedback (for backfills or after drift).
+    """
+
+    def __init__(self, db, collection_name: str = "user_stats"):
+        self.db = db
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def _apply(self, email: str, fields: Dict[str, Any]) -> None:
+        try:
+            await self.collection.update_one(
+                {"email": email},
+                [
+                    {"$set": {
+                        "messages_received": {"$ifNull": ["$messages_received", 0]},
+                        "feedback_count": {"$ifNull": ["$feedback_count", 0]},
+                        "rating_sum": {"$ifNull": ["$rating_sum", 0]},
+                    }},
+                    {"$set": {**fields, "updated_at": datetime.now(timezone.utc)}},
+                    _derived_fields(),
+                ],
+                upsert=True,
+            )
+        except Exception as e:
+            # Stats are advisory - never fail a send or a feedback submission over them
+            logger.warning(f"Failed to update user_stats for {email}: {e}")
+
+    async def record_message_sent(self, email: str) -> None:
+        await self._apply(email, {"messages_received": _counter("messages_received", 1)})
+
+    async def record_feedback(self, email: str, rating: int, at: Optional[datetime] = None) -> None:
+        await self._apply(email, {
+            "feedback_count": _counter("feedback_count", 1),
+            "rating_sum": _counter("rating_sum", rating or 0),
+            "last_feedback_at": at or datetime.now(timezone.utc),
+        })
+
+    async def delete(self, email: str) -> None:
+        await self.collection.delete_one({"email": email})
+
+    async def get(self, emails: List[str]) -> Dict[str, Dict[str, Any]]:
+        docs = await self.collection.find({"email": {"$in": emails}}, {"_id": 0}).to_list(len(emails))
+        return {doc["email"]: doc for doc in docs}
+
+    async def rebuild(self, batch_size: int = 500) -> int:
+        """Recompute every user's stats from users + message_feedback; returns users processed"""
+        last_email: Optional[str] = None
+        processed = 0
+        while True:
+            query: Dict[str, Any] = {"email": {"$gt": last_email}} if last_email is not None else {}
+            users = await self.db.users.find(
+                query, {"_id": 0, "email": 1, "total_messages_received": 1}
+            ).sort("email", 1).limit(batch_size).to_list(batch_size)
+            if not users:
+                break
+
+            emails = [u["email"] for u in users]
+            feedback = await self.db.message_feedback.aggregate([
+                {"$match": {"email": {"$in": emails}}},
+                {"$group": {
+                    "_id": "$email",
+                    "feedback_count": {"$sum": 1},
+                    "rating_sum": {"$sum": {"$ifNull": ["$rating", 0]}},
+                    "last_feedback_at": {"$max": "$created_at"},
+                }},
+            ]).to_list(None)
+            by_email = {f["_id"]: f for f in feedback}
+
+            now = datetime.now(timezone.utc)
+            ops = []
+            for user in users:
+                f = by_email.get(user["email"], {})
+                ops.append(UpdateOne(
+                    {"email": user["email"]},
+                    [
+                        {"$set": {
+                            "messages_received": user.get("total_messages_received", 0),
+                            "feedback_count": f.get("feedback_count", 0),
+                            "rating_sum": f.get("rating_sum", 0),
+                            "last_feedback_at": f.get("last_feedback_at"),
+                            "updated_at": now,
+                        }},
+                        _derived_fields(),
+                    ],
+                    upsert=True,
+                ))
+            await self.collection.bulk_write(ops, ordered=False)
+            processed += len(users)
+            last_email = emails[-1]
+
+        logger.info(f"📊 Rebuilt user_stats for {processed} user(s)")
+        return processed
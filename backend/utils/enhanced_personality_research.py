@@ -7,9 +7,46 @@ from typing import Optional, Dict, Any
 from datetime import datetime, timezone
 import httpx
 import os
-from backend.config import TAVILY_API_KEY, TAVILY_SEARCH_URL, openai_client, logger, tracker
+from backend.config import TAVILY_API_KEY, TAVILY_SEARCH_URL, openai_client, logger, db
+from backend.research_cache import ResearchCache
+
+# Voice profiles shared by every user of the same persona (in-process LRU over db.research_cache)
+voice_profile_cache = ResearchCache(db)
+
+
+async def _log_tavily_rate_limit(details: Dict[str, Any]) -> None:
+    try:
+        # Import here to avoid circular imports
+        from backend.server import tracker
+        await tracker.log_system_event(
+            event_type="tavily_rate_limit",
+            event_category="research",
+            details=details,
+            status="warning"
+        )
+    except Exception:
+        pass
+
 
 async def research_famous_personality(personality_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Cached voice profile for a famous personality - one research run per persona
+    (normalized name) is shared by every email, refreshed in the background when stale.
+    """
+    if not TAVILY_API_KEY:
+        logger.warning(f"Tavily API key not available - cannot research {personality_name}")
+        return None
+    
+    if not personality_name or len(personality_name.strip()) < 2:
+        logger.warning(f"Invalid personality name: {personality_name}")
+        return None
+    
+    return await voice_profile_cache.get_or_fetch(
+        "famous", personality_name, lambda: _research_famous_personality_uncached(personality_name)
+    )
+
+
+async def _research_famous_personality_uncached(personality_name: str) -> Optional[Dict[str, Any]]:
     """
     Deep research on ANY famous personality to extract authentic communication style.
     Works universally for all personalities - Elon Musk, Oprah Winfrey, Steve Jobs, etc.
@@ -63,12 +100,7 @@ async def research_famous_personality(personality_name: str) -> Optional[Dict[st
                 async with httpx.AsyncClient(timeout=10) as client:
                     response = await client.post(TAVILY_SEARCH_URL, json=payload)
                     if response.status_code == 429:
-                        await tracker.log_system_event(
-                            event_type="tavily_rate_limit",
-                            event_category="research",
-                            details={"query": query, "personality": personality_name},
-                            status="warning"
-                        )
+                        await _log_tavily_rate_limit({"query": query, "personality": personality_name})
                         continue
                     response.raise_for_status()
                     data = response.json()
@@ -204,6 +236,16 @@ CRITICAL RULES:
 
 
 async def research_custom_personality(custom_description: str) -> Optional[Dict[str, Any]]:
+    """Cached voice profile for a custom personality description (shared across users)"""
+    if not TAVILY_API_KEY or not custom_description or len(custom_description) < 20:
+        return None
+    
+    return await voice_profile_cache.get_or_fetch(
+        "custom", custom_description, lambda: _research_custom_personality_uncached(custom_description)
+    )
+
+
+async def _research_custom_personality_uncached(custom_description: str) -> Optional[Dict[str, Any]]:
     """
     Research custom personality description to understand the style, then create voice profile.
     First researches what the description means, then extracts communication patterns.
@@ -1,12 +1,33 @@
 """
 Data Versioning & History Tracking System
-NEVER DELETE DATA - Always keep history with versions
+NEVER DELETE DATA - Always keep history with versions. The one exception is
+compact_history(), which deletes versions that repeat the content of the version
+before them (the kept version records how many it absorbed).
 """
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from pydantic import BaseModel
+from pymongo import ReturnDocument
+import hashlib
+import json
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
+# History collection -> the fields that make up a version's content (what gets fingerprinted)
+VERSIONED_FIELDS = {
+    "schedule_history": ["frequency", "times", "custom_days", "custom_interval", "timezone", "paused", "skip_next"],
+    "personality_history": ["personalities", "rotation_mode"],
+    "profile_history": ["name", "goals"],
+}
+
+
+def fingerprint(collection: str, data: Dict[str, Any]) -> str:
+    """Content hash of a version's payload (key order and metadata don't matter)"""
+    payload = {field: data.get(field) for field in VERSIONED_FIELDS[collection]}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
 class ScheduleHistory(BaseModel):
     """Track every schedule change"""
     id: str
@@ -23,6 +44,7 @@ class ScheduleHistory(BaseModel):
     changed_by: str  # system, user, admin
     change_reason: Optional[str] = None
     is_active: bool = True  # Current version or historical
+    fingerprint: Optional[str] = None
 
 class PersonalityHistory(BaseModel):
     """Track every personality change"""
@@ -34,6 +56,7 @@ class PersonalityHistory(BaseModel):
     changed_at: datetime
     changed_by: str
     is_active: bool = True
+    fingerprint: Optional[str] = None
 
 class ProfileHistory(BaseModel):
     """Track every profile update"""
@@ -46,6 +69,7 @@ class ProfileHistory(BaseModel):
     changed_by: str
     change_details: Dict[str, Any] = {}
     is_active: bool = True
+    fingerprint: Optional[str] = None
 
 class DataDeletion(BaseModel):
     """Track 'deleted' data (soft deletes only)"""
@@ -64,6 +88,51 @@ class VersionTracker:
     def __init__(self, db):
         self.db = db
     
+    async def _next_version(self, collection: str, user_email: str) -> int:
+        """Allocate the next version number from an atomic per-user counter"""
+        counter_id = f"{collection}:{user_email}"
+        floor = 0
+        if not await self.db.version_counters.find_one({"_id": counter_id}, {"_id": 1}):
+            # First allocation since counters were introduced - continue from existing history
+            latest = await self.db[collection].find_one(
+                {"user_email": user_email}, {"version": 1}, sort=[("version", -1)]
+            )
+            floor = latest.get("version", 0) if latest else 0
+        counter = await self.db.version_counters.find_one_and_update(
+            {"_id": counter_id},
+            [{"$set": {"seq": {"$add": [{"$max": [{"$ifNull": ["$seq", 0]}, floor]}, 1]}}}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+    
+    async def _save_version(self, collection: str, history: BaseModel) -> Tuple[str, int]:
+        """
+        Store `history` as the user's active version unless its content matches the
+        active version already, in which case nothing is written.
+        Returns (history id, version) of the version now in effect.
+        """
+        doc = history.model_dump()
+        doc["fingerprint"] = fingerprint(collection, doc)
+        
+        current = await self.db[collection].find_one(
+            {"user_email": doc["user_email"], "is_active": True},
+            {"_id": 0},
+            sort=[("version", -1)]
+        )
+        if current and (current.get("fingerprint") or fingerprint(collection, current)) == doc["fingerprint"]:
+            return current.get("id"), current.get("version")
+        
+        doc["version"] = await self._next_version(collection, doc["user_email"])
+        await self.db[collection].insert_one(doc)
+        # Mark all previous versions as inactive. Only lower versions: a concurrent save
+        # that allocated a higher version must stay active whichever finishes last
+        await self.db[collection].update_many(
+            {"user_email": doc["user_email"], "is_active": True, "version": {"$lt": doc["version"]}},
+            {"$set": {"is_active": False}}
+        )
+        return doc["id"], doc["version"]
+    
     async def save_schedule_version(
         self,
         user_email: str,
@@ -71,26 +140,11 @@ class VersionTracker:
         changed_by: str = "user",
         change_reason: Optional[str] = None
     ):
-        """Save a new version of schedule"""
-        # Get current version number
-        latest = await self.db.schedule_history.find_one(
-            {"user_email": user_email},
-            sort=[("version", -1)]
-        )
-        
-        version = (latest.get('version', 0) + 1) if latest else 1
-        
-        # Mark all previous versions as inactive
-        await self.db.schedule_history.update_many(
-            {"user_email": user_email, "is_active": True},
-            {"$set": {"is_active": False}}
-        )
-        
-        # Save new version
+        """Save a new version of schedule (no-op if it matches the current one)"""
         history = ScheduleHistory(
             id=str(uuid.uuid4()),
             user_email=user_email,
-            version=version,
+            version=0,  # allocated on write
             frequency=schedule_data.get('frequency', 'daily'),
             times=schedule_data.get('times', ['09:00']),
             custom_days=schedule_data.get('custom_days'),
@@ -103,9 +157,7 @@ class VersionTracker:
             change_reason=change_reason,
             is_active=True
         )
-        
-        await self.db.schedule_history.insert_one(history.model_dump())
-        return history.id, version
+        return await self._save_version("schedule_history", history)
     
     async def save_personality_version(
         self,
@@ -114,35 +166,18 @@ class VersionTracker:
         rotation_mode: str,
         changed_by: str = "user"
     ):
-        """Save a new version of personalities"""
-        # Get current version
-        latest = await self.db.personality_history.find_one(
-            {"user_email": user_email},
-            sort=[("version", -1)]
-        )
-        
-        version = (latest.get('version', 0) + 1) if latest else 1
-        
-        # Mark previous as inactive
-        await self.db.personality_history.update_many(
-            {"user_email": user_email, "is_active": True},
-            {"$set": {"is_active": False}}
-        )
-        
-        # Save new version
+        """Save a new version of personalities (no-op if they match the current one)"""
         history = PersonalityHistory(
             id=str(uuid.uuid4()),
             user_email=user_email,
-            version=version,
+            version=0,  # allocated on write
             personalities=personalities,
             rotation_mode=rotation_mode,
             changed_at=datetime.now(timezone.utc),
             changed_by=changed_by,
             is_active=True
         )
-        
-        await self.db.personality_history.insert_one(history.model_dump())
-        return history.id, version
+        return await self._save_version("personality_history", history)
     
     async def save_profile_version(
         self,
@@ -152,23 +187,11 @@ class VersionTracker:
         changed_by: str = "user",
         change_details: Optional[Dict] = None
     ):
-        """Save a new version of profile"""
-        latest = await self.db.profile_history.find_one(
-            {"user_email": user_email},
-            sort=[("version", -1)]
-        )
-        
-        version = (latest.get('version', 0) + 1) if latest else 1
-        
-        await self.db.profile_history.update_many(
-            {"user_email": user_email, "is_active": True},
-            {"$set": {"is_active": False}}
-        )
-        
+        """Save a new version of profile (no-op if it matches the current one)"""
         history = ProfileHistory(
             id=str(uuid.uuid4()),
             user_email=user_email,
-            version=version,
+            version=0,  # allocated on write
             name=name,
             goals=goals,
             changed_at=datetime.now(timezone.utc),
@@ -176,9 +199,65 @@ class VersionTracker:
             change_details=change_details or {},
             is_active=True
         )
+        return await self._save_version("profile_history", history)
+    
+    async def compact_history(self, collection: str, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Collapse runs of consecutive versions with identical content into the first
+        version of each run (which keeps when the change happened). The kept version
+        records how many duplicates it absorbed and when the last one was written;
+        the user's newest remaining version stays active. Safe to re-run.
+        """
+        stats = {"users": 0, "removed": 0}
+        for user_email in await self.db[collection].distinct("user_email"):
+            cursor = self.db[collection].find(
+                {"user_email": user_email},
+                {
+                    "_id": 1, "fingerprint": 1, "changed_at": 1, "is_active": 1, "duplicates_collapsed": 1,
+                    **{field: 1 for field in VERSIONED_FIELDS[collection]},
+                }
+            ).sort("version", 1)
+            
+            kept = None
+            kept_updates: Dict[Any, Dict[str, Any]] = {}
+            active_ids = []
+            remove = []
+            async for doc in cursor:
+                doc_fingerprint = doc.get("fingerprint") or fingerprint(collection, doc)
+                if kept is not None and doc_fingerprint == kept["fingerprint"]:
+                    remove.append(doc["_id"])
+                    update = kept_updates.setdefault(kept["_id"], {})
+                    update["duplicates_collapsed"] = (
+                        update.get("duplicates_collapsed", kept.get("duplicates_collapsed", 0))
+                        + 1 + doc.get("duplicates_collapsed", 0)
+                    )
+                    update["last_seen_at"] = doc.get("changed_at")
+                    continue
+                kept = {**doc, "fingerprint": doc_fingerprint}
+                if doc.get("is_active"):
+                    active_ids.append(doc["_id"])
+                if not doc.get("fingerprint"):
+                    kept_updates.setdefault(doc["_id"], {})["fingerprint"] = doc_fingerprint
+            if kept is None:
+                continue
+            
+            if remove:
+                for i in range(0, len(remove), batch_size):
+                    await self.db[collection].delete_many({"_id": {"$in": remove[i:i + batch_size]}})
+                stats["removed"] += len(remove)
+                stats["users"] += 1
+            # The newest remaining version is the active one
+            if active_ids != [kept["_id"]]:
+                await self.db[collection].update_many(
+                    {"user_email": user_email, "is_active": True, "_id": {"$ne": kept["_id"]}},
+                    {"$set": {"is_active": False}}
+                )
+                kept_updates.setdefault(kept["_id"], {})["is_active"] = True
+            for doc_id, update in kept_updates.items():
+                await self.db[collection].update_one({"_id": doc_id}, {"$set": update})
         
-        await self.db.profile_history.insert_one(history.model_dump())
-        return history.id, version
+        logger.info(f"🗜️ Compacted {collection}: removed {stats['removed']} duplicate version(s) for {stats['users']} user(s)")
+        return stats
     
     async def soft_delete(
         self,
@@ -1493,6 +1493,10 @@ function DashboardScreen({ user, onLogout, onUserUpdate }) {
   const handleNewAchievements = useCallback((achievementIds, analyticsData) => {
     if (!achievementIds || achievementIds.length === 0) return;
     
+    // Acknowledge them so the next analytics refresh doesn't celebrate them again
+    axios.post(`${API}/users/${encodeURIComponent(user.email)}/achievements/seen`)
+      .catch(error => console.error("Failed to acknowledge achievements:", error));
+    
     // Use detailed achievements from analytics if available
     let newAchievementDetails = analyticsData.new_achievements_details || [];
     
@@ -2916,8 +2920,8 @@ function AdminDashboard() {
   const [logFilterEmail, setLogFilterEmail] = useState("");
   const [unifiedLogs, setUnifiedLogs] = useState([]);
   const [unifiedLogsLoading, setUnifiedLogsLoading] = useState(false);
-  const [unifiedLogsPage, setUnifiedLogsPage] = useState(1);
-  const [unifiedLogsTotal, setUnifiedLogsTotal] = useState(0);
+  const [unifiedLogsCursor, setUnifiedLogsCursor] = useState(null);
+  const [unifiedLogsHasMore, setUnifiedLogsHasMore] = useState(false);
   const [unifiedLogsType, setUnifiedLogsType] = useState("all"); // all, activity, system, api
   const [unifiedLogsSearch, setUnifiedLogsSearch] = useState("");
   const [unifiedLogsStartDate, setUnifiedLogsStartDate] = useState("");
@@ -3205,23 +3209,26 @@ function AdminDashboard() {
       const headers = { Authorization: `Bearer ${sessionStorage.getItem('adminToken')}` };
       const response = await axios.post(`${API}/admin/achievements/recalculate-streaks`, {}, { headers });
       
-      const results = response.data.results || [];
-      const summary = results.reduce((acc, r) => {
-        if (r.old_streak !== r.new_streak) {
-          acc.changed++;
-        }
-        return acc;
-      }, { changed: 0, total: results.length });
+      // The recompute runs as a background job - poll it until it finishes
+      let job = response.data.job;
+      toast.info("Streak recalculation started...");
+      while (job && ["queued", "running"].includes(job.status)) {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = (await axios.get(`${API}/admin/achievements/recalculate-streaks/${job.id}`, { headers })).data;
+      }
       
+      if (!job || job.status !== "completed") {
+        throw new Error(job?.error || `Streak recalculation ${job?.status || "failed"}`);
+      }
       toast.success(
-        `Streaks recalculated! ${summary.changed} user(s) had their streaks updated. Total: ${summary.total} users processed.`
+        `Streaks recalculated! ${job.changed} user(s) had their streaks updated. Total: ${job.processed} users processed.`
       );
       
       // Refresh admin data to show updated streaks
       handleRefresh();
     } catch (error) {
       console.error("Failed to recalculate streaks:", error);
-      toast.error(error.response?.data?.detail || "Failed to recalculate streaks");
+      toast.error(error.response?.data?.detail || error.message || "Failed to recalculate streaks");
     } finally {
       setAchievementsLoading(false);
     }
@@ -3388,7 +3395,7 @@ function AdminDashboard() {
         { message: broadcastMessage, subject: broadcastSubject || undefined },
         { headers }
       );
-      toast.success(`Broadcast sent: ${response.data.success} success, ${response.data.failed} failed`);
+      toast.success(`Broadcast queued for ~${response.data.total_estimated} users (job ${response.data.job_id.slice(0, 8)})`);
       setBroadcastMessage("");
       setBroadcastSubject("");
       handleRefresh();
@@ -3441,17 +3448,19 @@ function AdminDashboard() {
     }
   };
 
-  const fetchUnifiedLogs = async (page = 1, reset = false) => {
+  const fetchUnifiedLogs = async (cursor = null, reset = false) => {
     try {
       setUnifiedLogsLoading(true);
       const headers = { Authorization: `Bearer ${sessionStorage.getItem('adminToken')}` };
       
       const params = new URLSearchParams({
-        page: page.toString(),
         limit: "100",
         log_type: unifiedLogsType,
       });
       
+      if (cursor) {
+        params.append("cursor", cursor);
+      }
       if (unifiedLogsSearch) {
         params.append("search", unifiedLogsSearch);
       }
@@ -3473,8 +3482,8 @@ function AdminDashboard() {
         setUnifiedLogs([...unifiedLogs, ...response.data.logs]);
       }
       
-      setUnifiedLogsTotal(response.data.total);
-      setUnifiedLogsPage(response.data.page);
+      setUnifiedLogsCursor(response.data.next_cursor);
+      setUnifiedLogsHasMore(response.data.has_more);
     } catch (error) {
       console.error("Failed to fetch unified logs:", error);
       toast.error("Failed to load logs");
@@ -3485,7 +3494,7 @@ function AdminDashboard() {
 
   useEffect(() => {
     if (authenticated) {
-      fetchUnifiedLogs(1, true);
+      fetchUnifiedLogs(null, true);
     }
   }, [authenticated, unifiedLogsType, unifiedLogsSearch, unifiedLogsStartDate, unifiedLogsEndDate, logFilterEmail]);
 
@@ -3996,7 +4005,7 @@ function AdminDashboard() {
                         View all activity logs, system events, and API analytics in one place
                       </CardDescription>
                     </div>
-                    <Button variant="outline" size="sm" onClick={() => fetchUnifiedLogs(1, true)}>
+                    <Button variant="outline" size="sm" onClick={() => fetchUnifiedLogs(null, true)}>
                       <RefreshCw className={unifiedLogsLoading ? 'animate-spin' : ''} />
                       Refresh
                     </Button>
@@ -4007,7 +4016,7 @@ function AdminDashboard() {
                       placeholder="Search logs..."
                       value={unifiedLogsSearch}
                       onChange={(e) => setUnifiedLogsSearch(e.target.value)}
-                      onKeyPress={(e) => e.key === 'Enter' && fetchUnifiedLogs(1, true)}
+                      onKeyPress={(e) => e.key === 'Enter' && fetchUnifiedLogs(null, true)}
                       className="flex-1 min-w-[200px]"
                     />
                     <Input
@@ -4051,7 +4060,7 @@ function AdminDashboard() {
                         setUnifiedLogsStartDate("");
                         setUnifiedLogsEndDate("");
                         setUnifiedLogsType("all");
-                        fetchUnifiedLogs(1, true);
+                        fetchUnifiedLogs(null, true);
                       }}
                     >
                       Clear
@@ -4059,7 +4068,7 @@ function AdminDashboard() {
                   </div>
                   
                   <div className="mt-2 text-sm text-muted-foreground">
-                    Showing {unifiedLogs.length} of {unifiedLogsTotal} logs
+                    Showing {unifiedLogs.length}{unifiedLogsHasMore ? "+" : ""} logs
                   </div>
                 </CardHeader>
                 <CardContent>
@@ -4157,11 +4166,11 @@ function AdminDashboard() {
                           );
                         })}
                         
-                        {unifiedLogsPage < Math.ceil(unifiedLogsTotal / 100) && (
+                        {unifiedLogsHasMore && unifiedLogsCursor && (
                           <div className="text-center pt-4">
                             <Button 
                               variant="outline" 
-                              onClick={() => fetchUnifiedLogs(unifiedLogsPage + 1, false)}
+                              onClick={() => fetchUnifiedLogs(unifiedLogsCursor, false)}
                               disabled={unifiedLogsLoading}
                             >
                               {unifiedLogsLoading ? (
@@ -4171,7 +4180,7 @@ function AdminDashboard() {
                                 </>
                               ) : (
                                 <>
-                                  Load More ({unifiedLogsTotal - unifiedLogs.length} remaining)
+                                  Load More
                                 </>
                               )}
                             </Button>
@@ -4181,7 +4190,7 @@ function AdminDashboard() {
                     ) : (
                       <div className="text-center py-8">
                         <p className="text-muted-foreground mb-4">No logs found</p>
-                        <Button onClick={() => fetchUnifiedLogs(1, true)}>Refresh</Button>
+                        <Button onClick={() => fetchUnifiedLogs(null, true)}>Refresh</Button>
                       </div>
                     )}
                   </div>